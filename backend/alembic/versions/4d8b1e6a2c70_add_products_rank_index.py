@@ -0,0 +1,28 @@
+"""Add products rank index for cursor pagination
+
+Revision ID: 4d8b1e6a2c70
+Revises: 9c3e5f27a1b4
+Create Date: 2026-10-16 22:05:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '4d8b1e6a2c70'
+down_revision = '9c3e5f27a1b4'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_index(
+        'ix_products_rank_product_id',
+        'products',
+        [sa.column('rank').desc(), 'product_id'],
+    )
+
+
+def downgrade() -> None:
+    op.drop_index('ix_products_rank_product_id', table_name='products')
@@ -0,0 +1,92 @@
+"""Add fulltext indexes for catalog search
+
+Revision ID: 9c3e5f27a1b4
+Revises: 36abf0e1dd74
+Create Date: 2026-10-16 21:20:00.000000
+
+MySQL gets ngram FULLTEXT indexes; SQLite gets FTS5 trigram tables kept in
+sync by triggers (see app/db/fulltext.py). The SQLite DDL is written out
+here rather than imported, so the migration keeps creating the schema of
+this revision whatever the app code later becomes.
+"""
+from alembic import op
+from sqlalchemy import text
+
+
+# revision identifiers, used by Alembic.
+revision = '9c3e5f27a1b4'
+down_revision = '36abf0e1dd74'
+branch_labels = None
+depends_on = None
+
+SQLITE_FULLTEXT_DDL = [
+    "CREATE VIRTUAL TABLE IF NOT EXISTS products_fts USING fts5("
+    "product_name, brand_name, category, content='products', "
+    "content_rowid='product_id', tokenize='trigram')",
+    "CREATE TRIGGER IF NOT EXISTS products_fts_ai AFTER INSERT ON products BEGIN "
+    "INSERT INTO products_fts(rowid, product_name, brand_name, category) "
+    "VALUES (new.product_id, new.product_name, new.brand_name, new.category); "
+    "END",
+    "CREATE TRIGGER IF NOT EXISTS products_fts_ad AFTER DELETE ON products BEGIN "
+    "INSERT INTO products_fts(products_fts, rowid, product_name, brand_name, "
+    "category) VALUES ('delete', old.product_id, old.product_name, "
+    "old.brand_name, old.category); "
+    "END",
+    "CREATE TRIGGER IF NOT EXISTS products_fts_au AFTER UPDATE ON products BEGIN "
+    "INSERT INTO products_fts(products_fts, rowid, product_name, brand_name, "
+    "category) VALUES ('delete', old.product_id, old.product_name, "
+    "old.brand_name, old.category); "
+    "INSERT INTO products_fts(rowid, product_name, brand_name, category) "
+    "VALUES (new.product_id, new.product_name, new.brand_name, new.category); "
+    "END",
+    "INSERT INTO products_fts(products_fts) VALUES ('rebuild')",
+    "CREATE VIRTUAL TABLE IF NOT EXISTS ingredients_fts USING fts5("
+    "inci_name, content='ingredients', content_rowid='ingredient_id', "
+    "tokenize='trigram')",
+    "CREATE TRIGGER IF NOT EXISTS ingredients_fts_ai AFTER INSERT ON ingredients "
+    "BEGIN "
+    "INSERT INTO ingredients_fts(rowid, inci_name) "
+    "VALUES (new.ingredient_id, new.inci_name); "
+    "END",
+    "CREATE TRIGGER IF NOT EXISTS ingredients_fts_ad AFTER DELETE ON ingredients "
+    "BEGIN "
+    "INSERT INTO ingredients_fts(ingredients_fts, rowid, inci_name) "
+    "VALUES ('delete', old.ingredient_id, old.inci_name); "
+    "END",
+    "CREATE TRIGGER IF NOT EXISTS ingredients_fts_au AFTER UPDATE ON ingredients "
+    "BEGIN "
+    "INSERT INTO ingredients_fts(ingredients_fts, rowid, inci_name) "
+    "VALUES ('delete', old.ingredient_id, old.inci_name); "
+    "INSERT INTO ingredients_fts(rowid, inci_name) "
+    "VALUES (new.ingredient_id, new.inci_name); "
+    "END",
+    "INSERT INTO ingredients_fts(ingredients_fts) VALUES ('rebuild')",
+]
+
+
+def upgrade() -> None:
+    bind = op.get_bind()
+    if bind.dialect.name == "mysql":
+        op.execute(
+            "CREATE FULLTEXT INDEX ft_products_name_brand_category "
+            "ON products (product_name, brand_name, category) WITH PARSER ngram"
+        )
+        op.execute(
+            "CREATE FULLTEXT INDEX ft_ingredients_inci_name "
+            "ON ingredients (inci_name) WITH PARSER ngram"
+        )
+    elif bind.dialect.name == "sqlite":
+        for statement in SQLITE_FULLTEXT_DDL:
+            bind.execute(text(statement))
+
+
+def downgrade() -> None:
+    bind = op.get_bind()
+    if bind.dialect.name == "mysql":
+        op.drop_index("ft_ingredients_inci_name", table_name="ingredients")
+        op.drop_index("ft_products_name_brand_category", table_name="products")
+    elif bind.dialect.name == "sqlite":
+        for table in ("products", "ingredients"):
+            for suffix in ("ai", "ad", "au"):
+                bind.execute(text(f"DROP TRIGGER IF EXISTS {table}_fts_{suffix}"))
+            bind.execute(text(f"DROP TABLE IF EXISTS {table}_fts"))
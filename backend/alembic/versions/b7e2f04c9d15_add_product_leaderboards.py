@@ -0,0 +1,34 @@
+"""Add product leaderboards
+
+Revision ID: b7e2f04c9d15
+Revises: 4d8b1e6a2c70
+Create Date: 2026-10-16 22:40:00.000000
+
+Only the table is created here. On a database seeded before this revision,
+fill the boards with scripts/rebuild_leaderboards.py; seed_db.py rebuilds
+them on every seed.
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'b7e2f04c9d15'
+down_revision = '4d8b1e6a2c70'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_table('product_leaderboards',
+    sa.Column('board', sa.String(length=128), nullable=False),
+    sa.Column('position', sa.Integer(), nullable=False),
+    sa.Column('product_id', sa.Integer(), nullable=False),
+    sa.Column('rank', sa.Float(), nullable=False),
+    sa.ForeignKeyConstraint(['product_id'], ['products.product_id'], ),
+    sa.PrimaryKeyConstraint('board', 'position')
+    )
+
+
+def downgrade() -> None:
+    op.drop_table('product_leaderboards')
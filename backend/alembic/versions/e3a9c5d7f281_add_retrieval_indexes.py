@@ -0,0 +1,45 @@
+"""Add indexes for the retrieval query shapes
+
+Revision ID: e3a9c5d7f281
+Revises: b7e2f04c9d15
+Create Date: 2026-10-16 23:10:00.000000
+
+Reversed junction indexes, so products can be found by skin type or
+ingredient. ``products (rank DESC, product_id)`` came with cursor pagination.
+Run scripts/explain_queries.py to check the plans.
+"""
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision = 'e3a9c5d7f281'
+down_revision = 'b7e2f04c9d15'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_index(
+        'ix_product_ingredients_ingredient_product',
+        'product_ingredients',
+        ['ingredient_id', 'product_id'],
+    )
+    op.create_index(
+        'ix_product_skin_types_skin_type_product',
+        'product_skin_types',
+        ['skin_type_id', 'product_id'],
+    )
+
+
+def downgrade() -> None:
+    if op.get_bind().dialect.name == "mysql":
+        # InnoDB dropped its implicit foreign key indexes once these could
+        # serve the constraints, and refuses to drop these without them
+        op.create_index('ingredient_id', 'product_ingredients', ['ingredient_id'])
+        op.create_index('skin_type_id', 'product_skin_types', ['skin_type_id'])
+    op.drop_index(
+        'ix_product_skin_types_skin_type_product', table_name='product_skin_types'
+    )
+    op.drop_index(
+        'ix_product_ingredients_ingredient_product', table_name='product_ingredients'
+    )
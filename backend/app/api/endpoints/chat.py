@@ -2,15 +2,22 @@
 Chat endpoint for skincare recommendations with intake form integration
 """
 
+import json
 import logging
 from fastapi import APIRouter, Depends, HTTPException
-from sqlalchemy.orm import Session
+from fastapi.responses import StreamingResponse
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.exc import SQLAlchemyError
 from app.schemas import ChatRequest, ChatResponse
-from app.db.session import get_db
-from app.core.rag_pipeline import run_pipeline
+from app.db.session import get_async_db
+from app.core.rag_pipeline import run_pipeline, stream_pipeline
 from app.core.generate import generate_answer
+from app.core.answer_cache import answer_cache_stats
+from app.core.llm_limiter import llm_limiter_stats
 from app.core.prompts import build_freeform_chat_prompt
+from app.core.hybrid_retrieve import retrieval_cache_stats
+from app.core.rerank import rerank_stats
+from app.core.single_flight import single_flight_stats
 
 
 router = APIRouter()
@@ -18,7 +25,7 @@ logger = logging.getLogger(__name__)
 
 
 @router.post("/ask", response_model=ChatResponse)
-async def chat_ask(request: ChatRequest, db: Session = Depends(get_db)):
+async def chat_ask(request: ChatRequest, db: AsyncSession = Depends(get_async_db)):
     """
     Main chat endpoint that integrates intake form data with RAG pipeline.
 
@@ -26,6 +33,7 @@ async def chat_ask(request: ChatRequest, db: Session = Depends(get_db)):
     - question: User's natural language question
     - intake_data: Optional intake form responses
     - concern: Optional additional concern
+    - bypass_cache: Optional flag to skip the LLM answer cache
     """
     try:
         logger.info("Received chat request: %s...", request.question[:100])
@@ -38,6 +46,7 @@ async def chat_ask(request: ChatRequest, db: Session = Depends(get_db)):
                 intake_data=request.intake_data,
                 concern=request.concern,
                 k=8,
+                use_cache=not request.bypass_cache,
             )
 
             # Log for monitoring
@@ -76,7 +85,10 @@ async def chat_ask(request: ChatRequest, db: Session = Depends(get_db)):
 
             # Use direct LLM generation
             answer = await generate_answer(
-                request.question, context, request.intake_data
+                request.question,
+                context,
+                request.intake_data,
+                use_cache=not request.bypass_cache,
             )
 
             # Build user_profile safely to avoid multiline f-string parsing issues
@@ -104,6 +116,62 @@ async def chat_ask(request: ChatRequest, db: Session = Depends(get_db)):
         ) from e
 
 
+def _sse_event(event: str, data: dict) -> str:
+    """Format one server-sent event."""
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+
+@router.post("/ask/stream")
+async def chat_ask_stream(
+    request: ChatRequest, db: AsyncSession = Depends(get_async_db)
+):
+    """
+    Streaming variant of ``/ask`` as server-sent events.
+
+    Sends a ``context`` event (context_summary, user_profile, citations) as
+    soon as retrieval is done, a ``delta`` event with each piece of the
+    answer as the LLM generates it, and a final ``done`` event (answer,
+    recommendation_confidence, routine_suggestion, conversation_id). Events
+    are produced only as fast as the client reads them, and a client that
+    disconnects cancels the upstream LLM request.
+    """
+    logger.info("Received streaming chat request: %s...", request.question[:100])
+    events = stream_pipeline(
+        question=request.question,
+        db_session=db,
+        intake_data=request.intake_data,
+        concern=request.concern,
+        k=8,
+        use_cache=not request.bypass_cache,
+    )
+    try:
+        # Retrieval runs here, while the database session is still open
+        first = await anext(events)
+    except SQLAlchemyError as e:
+        logger.error("Streaming chat retrieval error: %s", e, exc_info=True)
+        raise HTTPException(
+            status_code=500,
+            detail="I'm sorry, I'm having trouble processing your request. Please try again.",
+        ) from e
+
+    async def body():
+        try:
+            yield _sse_event(*first)
+            async for event, data in events:
+                if event == "done":
+                    data = {**data, "conversation_id": request.conversation_id}
+                yield _sse_event(event, data)
+        finally:
+            await events.aclose()
+
+    return StreamingResponse(
+        body(),
+        media_type="text/event-stream",
+        # Keep proxies from buffering the stream
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
 @router.post("/intake")
 async def submit_intake_form(intake_data: dict):
     """Intake form submission endpoint"""
@@ -163,7 +231,12 @@ async def direct_chat(request: dict):
         prompt = build_freeform_chat_prompt(question, conversation_history)
 
         # Generate answer using the conversational prompt
-        answer = await generate_answer(question, "", prompt=prompt)
+        answer = await generate_answer(
+            question,
+            "",
+            prompt=prompt,
+            use_cache=not request.get("bypass_cache", False),
+        )
 
         logger.info("Generated free-form chat response")
 
@@ -185,3 +258,15 @@ async def direct_chat(request: dict):
 async def health_check():
     """Health check endpoint for chat service."""
     return {"status": "healthy", "service": "chat"}
+
+
+@router.get("/metrics")
+async def metrics():
+    """Cache, reranker, coalescing and LLM queue counters for the chat pipeline."""
+    return {
+        "retrieval_cache": retrieval_cache_stats(),
+        "answer_cache": answer_cache_stats(),
+        "rerank": rerank_stats(),
+        "single_flight": single_flight_stats(),
+        "llm_limiter": llm_limiter_stats(),
+    }
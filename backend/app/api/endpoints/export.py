@@ -0,0 +1,158 @@
+"""
+Streaming export of the product catalog
+
+Paging through ``/api/products`` builds a page of Pydantic models at a time.
+The export instead streams every product with its ingredients and skin types
+as NDJSON or CSV, reading plain rows with ``yield_per`` (a server-side cursor
+on MySQL) so memory stays flat whatever the size of the catalog.
+"""
+import csv
+import io
+import json
+from typing import Dict, Iterable, Iterator, List
+
+from fastapi import APIRouter, Depends, Query
+from fastapi.responses import StreamingResponse
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+from app.db import models
+from app.db.session import get_db
+
+router = APIRouter()
+
+EXPORT_FIELDS = [
+    "product_id",
+    "product_name",
+    "brand_name",
+    "category",
+    "rank",
+    "ingredients",
+    "skin_types",
+]
+
+MEDIA_TYPES = {"ndjson": "application/x-ndjson", "csv": "text/csv"}
+
+# Separator of list values within one CSV cell
+CSV_LIST_SEPARATOR = "; "
+
+
+# (association table, its foreign key, name table, name column) per list field
+_RELATED_NAMES = {
+    "ingredients": (
+        models.product_ingredients_table,
+        models.product_ingredients_table.c.ingredient_id,
+        models.Ingredient.ingredient_id,
+        models.Ingredient.inci_name,
+    ),
+    "skin_types": (
+        models.product_skin_types_table,
+        models.product_skin_types_table.c.skin_type_id,
+        models.SkinType.skin_type_id,
+        models.SkinType.type_name,
+    ),
+}
+
+
+def _names_by_product(connection, field: str, product_ids: List[int]) -> Dict:
+    """
+    ``product_id -> [name, ...]`` for one list field, in the order the
+    ``Product`` relationships use
+    """
+    table, foreign_key, key, name = _RELATED_NAMES[field]
+    rows = connection.execute(
+        select(table.c.product_id, name)
+        .join_from(table, key.class_, foreign_key == key)
+        .where(table.c.product_id.in_(product_ids))
+        .order_by(table.c.product_id, key)
+    )
+    names: Dict = {}
+    for product_id, value in rows:
+        names.setdefault(product_id, []).append(value)
+    return names
+
+
+def export_rows(bind, batch_size: int) -> Iterator[List[Dict]]:
+    """
+    Products as plain dicts, ``batch_size`` at a time in ``product_id`` order
+
+    Rows are read as tuples rather than ORM objects, and the ingredient and
+    skin type names of each batch take one IN query each. Those run on a
+    second connection because MySQL cannot run other statements on a
+    connection that is streaming a server-side cursor.
+    """
+    columns = [models.Product.__table__.c[field] for field in EXPORT_FIELDS[:5]]
+    with bind.connect() as stream, bind.connect() as lookups:
+        result = stream.execution_options(yield_per=batch_size).execute(
+            select(*columns).order_by(models.Product.product_id)
+        )
+        for partition in result.partitions():
+            product_ids = [row.product_id for row in partition]
+            related = {
+                field: _names_by_product(lookups, field, product_ids)
+                for field in _RELATED_NAMES
+            }
+            yield [
+                {
+                    **dict(zip(EXPORT_FIELDS, row)),
+                    **{
+                        field: names.get(row.product_id, [])
+                        for field, names in related.items()
+                    },
+                }
+                for row in partition
+            ]
+
+
+def render_ndjson(batches: Iterable[List[Dict]]) -> Iterator[str]:
+    """
+    One JSON object per line, one chunk per batch
+    """
+    for batch in batches:
+        yield "".join(json.dumps(row) + "\n" for row in batch)
+
+
+def render_csv(batches: Iterable[List[Dict]]) -> Iterator[str]:
+    """
+    Header line, then one chunk of rows per batch; lists are joined by
+    ``CSV_LIST_SEPARATOR``
+    """
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(EXPORT_FIELDS)
+    for batch in batches:
+        for row in batch:
+            writer.writerow(
+                [
+                    CSV_LIST_SEPARATOR.join(value)
+                    if isinstance(value, list)
+                    else value
+                    for value in (row[field] for field in EXPORT_FIELDS)
+                ]
+            )
+        yield buffer.getvalue()
+        buffer.seek(0)
+        buffer.truncate()
+    if buffer.tell():
+        yield buffer.getvalue()
+
+
+@router.get("/export/products")
+def export_products(
+    output_format: str = Query("ndjson", alias="format", pattern="^(ndjson|csv)$"),
+    db: Session = Depends(get_db),
+):
+    """
+    Stream the whole catalog as NDJSON (default) or CSV
+    """
+    renderer = render_csv if output_format == "csv" else render_ndjson
+    # Reads through connections of its own: the request's session is closed
+    # before the body is sent
+    return StreamingResponse(
+        renderer(export_rows(db.get_bind(), settings.EXPORT_BATCH_SIZE)),
+        media_type=MEDIA_TYPES[output_format],
+        headers={
+            "Content-Disposition": f'attachment; filename="products.{output_format}"'
+        },
+    )
@@ -1,29 +1,120 @@
 """
 API endpoints for ingredients
 """
+from bisect import bisect_right
 from typing import List, Optional
-from fastapi import APIRouter, Depends
+from fastapi import APIRouter, Depends, HTTPException, Query, Response
 from sqlalchemy.orm import Session
 
 from app import schemas
+from app.api.pagination import decode_cursor, set_next_cursor
 from app.db import models
+from app.db.fulltext import SEARCH_MODE_PATTERN, fulltext_matches
 from app.db.session import get_db
+from app.core.config import settings
+from app.core.ingredient_index import get_ingredient_index
+from app.core.spell_index import get_spell_index
+from app.core.suggest_index import MAX_SUGGESTIONS, get_ingredient_suggestions
 
 router = APIRouter()
 
+@router.get("/ingredients/suggest", response_model=List[schemas.Suggestion])
+def suggest_ingredients(
+    q: str,
+    limit: int = Query(10, ge=1, le=MAX_SUGGESTIONS),
+    db: Session = Depends(get_db),
+):
+    """
+    Ingredients with a word starting with ``q``, used in the most products first.
+    Served from an in-memory prefix index, without a database round trip.
+    """
+    return [
+        {"name": name, "product_count": count}
+        for name, count in get_ingredient_suggestions(db).suggest(q, limit)
+    ]
+
+
+def _cursor_id(cursor: str) -> int:
+    try:
+        return int(decode_cursor(cursor, "id")["id"])
+    except (TypeError, ValueError) as e:
+        raise HTTPException(status_code=400, detail="Invalid cursor") from e
+
+
+def _page(response: Response, rows: list, limit: int) -> list:
+    """
+    Trim the one extra row fetched and advertise the page after it
+    """
+    if len(rows) > limit > 0:
+        rows = rows[:limit]
+        set_next_cursor(response, {"id": rows[-1].ingredient_id})
+    return rows
+
+
 @router.get("/ingredients", response_model=List[schemas.Ingredient])
 def list_ingredients(
+    response: Response,
     search: Optional[str] = None,
     skip: int = 0,
     limit: int = 100,
+    search_mode: Optional[str] = Query(None, pattern=SEARCH_MODE_PATTERN),
+    cursor: Optional[str] = None,
     db: Session = Depends(get_db)
 ):
     """
     Get list of ingredients.
+    Substring searches resolve through the in-memory name index instead of an
+    ILIKE scan, and a search matching nothing is retried with misspelled
+    words corrected; ``search_mode=fulltext`` returns the most relevant first.
+    Other listings are in id order and paged by cursor: pass the
+    ``X-Next-Cursor`` response header back as ``cursor``. ``skip`` is kept
+    for existing clients.
     """
+    if cursor and skip:
+        raise HTTPException(status_code=400, detail="Use either cursor or skip")
+    after_id = _cursor_id(cursor) if cursor else None
     query = db.query(models.Ingredient)
 
+    matches = None
+    if search and (search_mode or settings.CATALOG_SEARCH_MODE) == "fulltext":
+        if settings.SPELL_CORRECTION:
+            search = get_spell_index(db).correct(search)
+        matches = fulltext_matches(db, "ingredients", search)
+    if matches is not None:
+        if cursor:
+            raise HTTPException(
+                status_code=400, detail="Full-text results are paged with skip"
+            )
+        return (
+            query.join(matches, matches.c.entity_id == models.Ingredient.ingredient_id)
+            .order_by(matches.c.relevance.desc(), models.Ingredient.ingredient_id)
+            .offset(skip)
+            .limit(limit)
+            .all()
+        )
+
     if search:
-        query = query.filter(models.Ingredient.inci_name.ilike(f"%{search}%"))
+        # Matches come back in id order, so a cursor is a bisection
+        index = get_ingredient_index(db)
+        found = index.search(search)
+        if not found and settings.SPELL_CORRECTION:
+            corrected = get_spell_index(db).correct(search)
+            if corrected != search.lower():
+                found = index.search(corrected)
+        start = skip if after_id is None else bisect_right(found, after_id)
+        ingredient_ids = found[start : start + limit + 1]
+        if not ingredient_ids:
+            return []
+        rows = (
+            query.filter(models.Ingredient.ingredient_id.in_(ingredient_ids))
+            .order_by(models.Ingredient.ingredient_id)
+            .all()
+        )
+        return _page(response, rows, limit)
 
-    return query.offset(skip).limit(limit).all()
+    query = query.order_by(models.Ingredient.ingredient_id)
+    if after_id is not None:
+        query = query.filter(models.Ingredient.ingredient_id > after_id)
+    else:
+        query = query.offset(skip)
+    return _page(response, query.limit(limit + 1).all(), limit)
@@ -2,14 +2,20 @@
 API endpoints for products
 """
 
-from typing import List, Optional
-from fastapi import APIRouter, Depends, HTTPException, Query
+from typing import List, Optional, Tuple
+from fastapi import APIRouter, Depends, HTTPException, Query, Response
 from sqlalchemy.orm import Session
 from sqlalchemy import or_
 
 from app import schemas
+from app.api.pagination import decode_cursor, set_next_cursor
+from app.core.config import settings
+from app.core.spell_index import get_spell_index
+from app.core.suggest_index import MAX_SUGGESTIONS, get_brand_suggestions
 from app.db import models
+from app.db.fulltext import SEARCH_MODE_PATTERN, fulltext_matches
 from app.db.session import get_db
+from app.db.hydration import with_product_relationships
 
 router = APIRouter()
 
@@ -20,62 +26,200 @@ def get_product(product_id: int, db: Session = Depends(get_db)):
     Get a specific product by ID.
     """
     product = (
-        db.query(models.Product).filter(models.Product.product_id == product_id).first()
+        with_product_relationships(db.query(models.Product))
+        .filter(models.Product.product_id == product_id)
+        .first()
     )
     if not product:
         raise HTTPException(status_code=404, detail="Product not found")
     return product
 
 
-@router.get("/products", response_model=List[schemas.Product])
+@router.get("/brands/suggest", response_model=List[schemas.Suggestion])
+def suggest_brands(
+    q: str,
+    limit: int = Query(10, ge=1, le=MAX_SUGGESTIONS),
+    db: Session = Depends(get_db),
+):
+    """
+    Brands with a word starting with ``q``, largest catalogs first.
+    """
+    return [
+        {"name": name, "product_count": count}
+        for name, count in get_brand_suggestions(db).suggest(q, limit)
+    ]
+
+
 def _filter_params(
     search: Optional[str] = None,
     skin_types: List[str] = Query(None, alias="skin_type"),
     ingredients: List[str] = Query(None, alias="ingredient"),
     skip: int = 0,
     limit: int = 50,
+    search_mode: Optional[str] = Query(None, pattern=SEARCH_MODE_PATTERN),
+    cursor: Optional[str] = None,
 ):
     return {
         "search": search,
+        "search_mode": search_mode or settings.CATALOG_SEARCH_MODE,
         "skin_types": skin_types,
         "ingredients": ingredients,
         "skip": skip,
         "limit": limit,
+        "cursor": cursor,
     }
 
 
+def _cursor_position(cursor: str) -> Tuple[Optional[float], int]:
+    """
+    ``(rank, product_id)`` of the last row of the previous page
+    """
+    position = decode_cursor(cursor, "r", "id")
+    try:
+        product_id = int(position["id"])
+        rank = None if position["r"] is None else float(position["r"])
+    except (TypeError, ValueError) as e:
+        raise HTTPException(status_code=400, detail="Invalid cursor") from e
+    return rank, product_id
+
+
+def _keyset_page(query, position, count: int) -> list:
+    """
+    Up to ``count`` products after ``position`` in ``rank DESC, product_id``
+    order, where unranked products come last
+
+    An ``OR ... IS NULL`` in one predicate would stop the database from
+    seeking, so ranked rows are one range of ix_products_rank_product_id and
+    the unranked tail is a second range, read only once the first runs out.
+    """
+    rows = []
+    after_id = position[1] if position else None
+    if position is None or position[0] is not None:
+        ranked = query.filter(models.Product.rank.isnot(None))
+        if position is not None:
+            rank = position[0]
+            ranked = ranked.filter(
+                models.Product.rank <= rank,
+                or_(models.Product.rank < rank, models.Product.product_id > after_id),
+            )
+        rows = (
+            ranked.order_by(models.Product.rank.desc(), models.Product.product_id)
+            .limit(count)
+            .all()
+        )
+        if len(rows) == count:
+            return rows
+        after_id = None
+
+    unranked = query.filter(models.Product.rank.is_(None))
+    if after_id is not None:
+        unranked = unranked.filter(models.Product.product_id > after_id)
+    return rows + (
+        unranked.order_by(models.Product.product_id).limit(count - len(rows)).all()
+    )
+
+
+def _name_or_brand_filter(search: str):
+    search_term = f"%{search}%"
+    return or_(
+        models.Product.product_name.ilike(search_term),
+        models.Product.brand_name.ilike(search_term),
+    )
+
+
+def _spelled_search(db: Session, search: str, fulltext: bool) -> str:
+    """``search`` as typed if it finds any product, else spell-corrected.
+
+    Like the ingredient search, a search that matches something is never
+    rewritten, so "mouth" is not turned into the brand word "youth".
+    """
+    matches = fulltext_matches(db, "products", search) if fulltext else None
+    if matches is not None:
+        found = db.query(matches.c.entity_id).first()
+    else:
+        found = (
+            db.query(models.Product.product_id)
+            .filter(_name_or_brand_filter(search))
+            .first()
+        )
+    if found is not None:
+        return search
+    return get_spell_index(db).correct(search)
+
+
 @router.get("/products", response_model=List[schemas.Product])
 def filter_products(
-    params: dict = Depends(_filter_params), db: Session = Depends(get_db)
+    response: Response,
+    params: dict = Depends(_filter_params),
+    db: Session = Depends(get_db),
 ):
     """
     Filter Endpoint.
+    Products come back highest ranked first, or most relevant first with
+    ``search_mode=fulltext``. A ``search`` matching no product is retried
+    with misspelled words corrected. Substring listings are paged by
+    cursor: pass the ``X-Next-Cursor`` response header back as ``cursor`` for
+    the next page, which costs the same as the first. ``skip`` still works but
+    reads and discards every skipped row.
     """
     search = params.get("search")
     skin_types = params.get("skin_types")
     ingredients = params.get("ingredients")
     skip = params.get("skip", 0)
     limit = params.get("limit", 50)
-    query = db.query(models.Product)
+    cursor = params.get("cursor")
+    if cursor and skip:
+        raise HTTPException(status_code=400, detail="Use either cursor or skip")
+    fulltext = params.get("search_mode") == "fulltext"
+    if search and settings.SPELL_CORRECTION:
+        search = _spelled_search(db, search, fulltext)
+    query = with_product_relationships(db.query(models.Product))
 
-    if search:
-        search_term = f"%{search}%"
-        query = query.filter(
-            or_(
-                models.Product.product_name.ilike(search_term),
-                models.Product.brand_name.ilike(search_term),
+    matches = None
+    if search and fulltext:
+        matches = fulltext_matches(db, "products", search)
+    if matches is not None:
+        query = query.join(
+            matches, matches.c.entity_id == models.Product.product_id
+        ).order_by(matches.c.relevance.desc(), models.Product.product_id)
+        if cursor:
+            raise HTTPException(
+                status_code=400, detail="Full-text results are paged with skip"
             )
-        )
+    elif search:
+        query = query.filter(_name_or_brand_filter(search))
 
+    # EXISTS filters rather than joins, so no DISTINCT is needed and the
+    # relevance order stays valid on MySQL
     if skin_types:
-        query = query.join(models.Product.skin_types)
-        query = query.filter(models.SkinType.type_name.in_(skin_types))
+        query = query.filter(
+            models.Product.skin_types.any(models.SkinType.type_name.in_(skin_types))
+        )
 
     if ingredients:
-        query = query.join(models.Product.ingredients)
-        query = query.filter(models.Ingredient.inci_name.in_(ingredients))
+        query = query.filter(
+            models.Product.ingredients.any(
+                models.Ingredient.inci_name.in_(ingredients)
+            )
+        )
 
-    query = query.distinct()
-    products = query.offset(skip).limit(limit).all()
+    if matches is not None:
+        return query.offset(skip).limit(limit).all()
+
+    # One extra row tells whether there is a next page
+    if skip:
+        products = (
+            query.order_by(models.Product.rank.desc(), models.Product.product_id)
+            .offset(skip)
+            .limit(limit + 1)
+            .all()
+        )
+    else:
+        position = _cursor_position(cursor) if cursor else None
+        products = _keyset_page(query, position, limit + 1)
+    if len(products) > limit > 0:
+        products = products[:limit]
+        last = products[-1]
+        set_next_cursor(response, {"r": last.rank, "id": last.product_id})
 
     return products
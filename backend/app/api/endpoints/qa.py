@@ -35,7 +35,9 @@ async def answer_question(req: QARequest):
             context += " | User Profile - " + ", ".join(profile_parts)
 
         # Generate actual LLM response with intake data
-        answer = await generate_answer(req.question, context, req.intake_data)
+        answer = await generate_answer(
+            req.question, context, req.intake_data, use_cache=not req.bypass_cache
+        )
 
         return QAResponse(answer=answer, context_summary=context, citations=[])
     except (
@@ -0,0 +1,47 @@
+"""
+Opaque cursors for keyset pagination of the catalog endpoints.
+
+``OFFSET n`` makes the database read and discard ``n`` rows, so deep pages
+get slower the further in they are. A cursor instead carries the sort key of
+the last row returned, and the next page starts with a ``WHERE`` on that key,
+which an index answers directly. Cursors are URL-safe base64 JSON; clients
+only pass back the ``X-Next-Cursor`` header value they were given.
+"""
+import base64
+import binascii
+import json
+from typing import Dict
+
+from fastapi import HTTPException, Response
+
+NEXT_CURSOR_HEADER = "X-Next-Cursor"
+
+
+def encode_cursor(position: Dict) -> str:
+    """
+    Cursor pointing just after ``position`` (the last row's sort key)
+    """
+    raw = json.dumps(position, separators=(",", ":")).encode("utf-8")
+    return base64.urlsafe_b64encode(raw).decode("ascii").rstrip("=")
+
+
+def decode_cursor(cursor: str, *keys: str) -> Dict:
+    """
+    Sort key stored in ``cursor``; 400 if it is malformed or lacks ``keys``
+    """
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        position = json.loads(base64.urlsafe_b64decode(padded.encode("ascii")))
+    except (ValueError, binascii.Error) as e:
+        raise HTTPException(status_code=400, detail="Invalid cursor") from e
+    if not isinstance(position, dict) or any(key not in position for key in keys):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+    return position
+
+
+def set_next_cursor(response: Response, position: Dict | None) -> None:
+    """
+    Advertise the next page, if there is one
+    """
+    if position is not None:
+        response.headers[NEXT_CURSOR_HEADER] = encode_cursor(position)
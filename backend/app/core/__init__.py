@@ -1,10 +1,22 @@
 """Core logic for the RAG pipeline."""
 
 __all__ = [
+    "ann_index",
+    "batched_catalog",
+    "bm25_index",
+    "cache",
+    "catalog_index",
+    "catalog_version",
     "compose",
     "config",
+    "dense_index",
     "generate",
     "hybrid_retrieve",
+    "ingredient_index",
+    "ingredient_matrix",
+    "keyword_matcher",
     "prompts",
     "rag_pipeline",
+    "rerank",
+    "results",
 ]
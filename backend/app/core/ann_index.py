@@ -0,0 +1,288 @@
+"""Inverted-file (IVF) approximate nearest neighbour index for dense vectors.
+
+Exact cosine search touches every product vector, which is fine for the
+seed catalog but grows linearly with multi-retailer catalogs. The IVF index
+clusters the unit vectors with spherical k-means (the coarse quantizer) and
+stores each cluster's vectors contiguously. A query is compared with the
+``nlist`` centroids first and only the ``nprobe`` closest clusters are
+scanned, so ``nprobe / nlist`` is the fraction of the catalog searched:
+raising ``nprobe`` trades latency for recall.
+
+The index is built offline from the dense product vectors and saved as
+plain ``.npy`` arrays that are memory-mapped at query time, so a large
+catalog does not have to fit in the server's heap. The saved index records
+the catalog version and the ``ANN_NLIST`` setting it was built with, and
+is rebuilt when either has changed.
+"""
+
+import logging
+import math
+import os
+from typing import List, Optional, Sequence, Tuple
+
+import numpy as np
+from sqlalchemy.orm import Session
+
+from .bm25_index import top_k_scores
+from .catalog_version import CatalogCache, read_catalog_version
+from .config import settings
+from .dense_index import DenseIndex, get_dense_index
+
+logger = logging.getLogger(__name__)
+
+KMEANS_ITERATIONS = 10
+# Training points per centroid; k-means runs on a sample, not every vector
+KMEANS_SAMPLE_PER_LIST = 64
+_ASSIGN_CHUNK = 65_536
+
+_FILES = ("centroids", "offsets", "vectors", "ids")
+
+
+def default_nlist(n_vectors: int) -> int:
+    """Number of clusters used when ``ANN_NLIST`` is 0: about sqrt(n)."""
+    return max(1, int(round(math.sqrt(n_vectors))))
+
+
+def _assign(vectors: np.ndarray, centroids: np.ndarray) -> np.ndarray:
+    """Nearest centroid (by dot product) of each row, in bounded chunks."""
+    assignments = np.empty(len(vectors), dtype=np.int32)
+    for start in range(0, len(vectors), _ASSIGN_CHUNK):
+        block = np.asarray(vectors[start : start + _ASSIGN_CHUNK])
+        assignments[start : start + len(block)] = np.argmax(
+            block @ centroids.T, axis=1
+        )
+    return assignments
+
+
+def _normalize_rows(matrix: np.ndarray) -> np.ndarray:
+    norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+    return matrix / np.where(norms > 0, norms, 1.0)
+
+
+def spherical_kmeans(
+    vectors: np.ndarray,
+    nlist: int,
+    iterations: int = KMEANS_ITERATIONS,
+    seed: int = 0,
+) -> np.ndarray:
+    """Unit-norm centroids of ``nlist`` clusters of unit ``vectors``."""
+    rng = np.random.default_rng(seed)
+    n_vectors = len(vectors)
+    sample_size = min(n_vectors, nlist * KMEANS_SAMPLE_PER_LIST)
+    # Sorted indices keep reads sequential when ``vectors`` is memory-mapped
+    sample = np.asarray(
+        vectors[np.sort(rng.choice(n_vectors, sample_size, replace=False))],
+        dtype=np.float32,
+    )
+    centroids = sample[rng.choice(sample_size, nlist, replace=False)].copy()
+
+    for _ in range(iterations):
+        assignments = _assign(sample, centroids)
+        order = np.argsort(assignments, kind="stable")
+        counts = np.bincount(assignments, minlength=nlist)
+        starts = np.concatenate(([0], np.cumsum(counts)[:-1]))
+        filled = counts > 0
+        sums = np.zeros_like(centroids)
+        sums[filled] = np.add.reduceat(sample[order], starts[filled], axis=0)
+        centroids = _normalize_rows(sums)
+        # Restart empty clusters from random training points
+        empty = np.flatnonzero(~filled)
+        if len(empty):
+            centroids[empty] = sample[rng.choice(sample_size, len(empty))]
+    return centroids.astype(np.float32)
+
+
+class IVFIndex:
+    """Clustered product vectors searched by probing the nearest clusters."""
+
+    def __init__(
+        self,
+        centroids: np.ndarray,
+        offsets: np.ndarray,
+        vectors: np.ndarray,
+        product_ids: np.ndarray,
+    ):
+        self.centroids = centroids
+        self.offsets = offsets
+        self.vectors = vectors
+        self.product_ids = product_ids
+
+    def __len__(self) -> int:
+        return len(self.product_ids)
+
+    @property
+    def nlist(self) -> int:
+        """Number of clusters."""
+        return len(self.centroids)
+
+    @classmethod
+    def build(
+        cls,
+        vectors: np.ndarray,
+        product_ids: np.ndarray,
+        nlist: int = 0,
+        seed: int = 0,
+    ) -> "IVFIndex":
+        """Cluster unit ``vectors`` and lay them out list by list."""
+        n_vectors = len(vectors)
+        if n_vectors == 0:
+            return cls(
+                np.zeros((0, vectors.shape[1]), dtype=np.float32),
+                np.zeros(1, dtype=np.int64),
+                np.zeros((0, vectors.shape[1]), dtype=np.float32),
+                np.zeros(0, dtype=np.int64),
+            )
+        nlist = min(nlist or default_nlist(n_vectors), n_vectors)
+        centroids = spherical_kmeans(vectors, nlist, seed=seed)
+        assignments = _assign(vectors, centroids)
+        # Stable sort keeps product-id order inside every list
+        order = np.argsort(assignments, kind="stable")
+        offsets = np.zeros(nlist + 1, dtype=np.int64)
+        offsets[1:] = np.cumsum(np.bincount(assignments, minlength=nlist))
+        return cls(
+            centroids,
+            offsets,
+            np.ascontiguousarray(np.asarray(vectors, dtype=np.float32)[order]),
+            np.asarray(product_ids, dtype=np.int64)[order],
+        )
+
+    @classmethod
+    def from_dense(cls, dense: DenseIndex, nlist: int = 0) -> "IVFIndex":
+        """Build over the vectors of a dense index."""
+        return cls.build(dense.vectors, dense.product_ids, nlist)
+
+    def search_vector(
+        self,
+        query: np.ndarray,
+        k: int,
+        exclude: Sequence[int] = (),
+        nprobe: Optional[int] = None,
+    ) -> List[Tuple[int, float]]:
+        """Approximate cosine top-k, scanning the ``nprobe`` closest lists."""
+        if k <= 0 or not len(self):
+            return []
+        nprobe = min(max(nprobe or settings.ANN_NPROBE, 1), self.nlist)
+        centroid_scores = self.centroids @ query
+        if nprobe < self.nlist:
+            probed = np.argpartition(-centroid_scores, nprobe - 1)[:nprobe]
+        else:
+            probed = np.arange(self.nlist)
+
+        ids_parts, score_parts = [], []
+        for list_id in probed:
+            start, end = self.offsets[list_id], self.offsets[list_id + 1]
+            if start == end:
+                continue
+            ids_parts.append(self.product_ids[start:end])
+            score_parts.append(self.vectors[start:end] @ query)
+        if not ids_parts:
+            return []
+        ids = np.concatenate(ids_parts)
+        scores = np.concatenate(score_parts)
+        if len(exclude):
+            scores[np.isin(ids, exclude)] = 0.0
+        return top_k_scores(scores, ids, k)
+
+    def save(
+        self,
+        directory: str,
+        catalog_version: Optional[int] = None,
+        nlist_setting: int = 0,
+    ) -> None:
+        """Write the index arrays into ``directory``.
+
+        ``nlist_setting`` is the ``ANN_NLIST`` value the index was built with.
+        """
+        os.makedirs(directory, exist_ok=True)
+        arrays = dict(
+            zip(_FILES, (self.centroids, self.offsets, self.vectors, self.product_ids))
+        )
+        arrays["version"] = np.array(
+            [-1 if catalog_version is None else catalog_version, nlist_setting],
+            dtype=np.int64,
+        )
+        paths = _paths(directory)
+        for name, array in arrays.items():
+            np.save(f"{paths[name]}.tmp.npy", array)
+        for name, path in paths.items():
+            os.replace(f"{path}.tmp.npy", path)
+
+    @classmethod
+    def load(
+        cls, directory: str
+    ) -> Tuple["IVFIndex", Optional[int], Optional[int]]:
+        """Memory-map an index written by ``save``.
+
+        Returns the index, its catalog version and its ``nlist_setting``
+        (None for indexes saved before the setting was recorded).
+        """
+        paths = _paths(directory)
+        arrays = {
+            name: np.load(paths[name], mmap_mode="r", allow_pickle=False)
+            for name in _FILES
+        }
+        meta = np.load(paths["version"], allow_pickle=False)
+        version = int(meta[0])
+        nlist_setting = int(meta[1]) if len(meta) > 1 else None
+        # Centroids and offsets are small and touched by every query
+        index = cls(
+            np.array(arrays["centroids"]),
+            np.array(arrays["offsets"]),
+            arrays["vectors"],
+            arrays["ids"],
+        )
+        return index, None if version < 0 else version, nlist_setting
+
+
+def _paths(directory: str) -> dict:
+    return {
+        name: os.path.join(directory, f"ivf_{name}.npy")
+        for name in _FILES + ("version",)
+    }
+
+
+def ann_enabled(n_products: int) -> bool:
+    """Whether dense retrieval should go through the IVF index."""
+    return n_products >= settings.ANN_MIN_PRODUCTS
+
+
+def _load_or_build(db_session: Session) -> IVFIndex:
+    """Memory-map the persisted index if it matches the catalog and the
+    ``ANN_NLIST`` setting, else build it."""
+    version = read_catalog_version()
+    directory = settings.INDEX_DIR
+    paths = _paths(directory).values()
+    if version is not None and all(os.path.exists(p) for p in paths):
+        try:
+            index, stored_version, nlist_setting = IVFIndex.load(directory)
+            if stored_version == version and nlist_setting == settings.ANN_NLIST:
+                return index
+        except (OSError, ValueError) as e:
+            logger.warning("Ignoring unreadable IVF index in %s: %s", directory, e)
+
+    index = IVFIndex.from_dense(get_dense_index(db_session), settings.ANN_NLIST)
+    if version is not None:
+        try:
+            index.save(directory, version, settings.ANN_NLIST)
+            return IVFIndex.load(directory)[0]
+        except OSError as e:
+            logger.warning("Could not persist IVF index to %s: %s", directory, e)
+    return index
+
+
+_ann_index: CatalogCache[IVFIndex] = CatalogCache(_load_or_build, name="IVF index")
+
+
+def get_ann_index(db_session: Session) -> IVFIndex:
+    """Return the shared IVF index, memory-mapping or building it if needed."""
+    return _ann_index.get(db_session)
+
+
+def reload_ann_index(db_session: Session | None = None) -> IVFIndex:
+    """Rebuild (or reload from disk) the shared IVF index now."""
+    return _ann_index.reload(db_session)
+
+
+def clear_ann_index() -> None:
+    """Drop the shared IVF index."""
+    _ann_index.clear()
@@ -0,0 +1,238 @@
+"""Exact-match cache of LLM answers.
+
+``build_qa_prompt`` is deterministic, so a popular question asked from a
+common profile produces a byte-identical OpenRouter request every time.
+Answers are keyed on a hash of everything that shapes the completion
+(model, messages and sampling parameters) and kept in an in-process LRU.
+An optional SQLite file behind it keeps warm answers across restarts and
+shares them between workers on one host.
+"""
+
+import asyncio
+import hashlib
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+from typing import Any, Callable, Dict, Optional
+
+from .cache import TTLCache
+from .config import settings
+
+logger = logging.getLogger(__name__)
+
+
+def answer_cache_key(data: Dict) -> str:
+    """Hash of a chat completion request body; streaming does not change it."""
+    body = {name: value for name, value in data.items() if name != "stream"}
+    canonical = json.dumps(
+        body, sort_keys=True, separators=(",", ":"), ensure_ascii=False
+    )
+    return hashlib.sha256(canonical.encode("utf-8")).hexdigest()
+
+
+class SqliteAnswerStore:
+    """Answers persisted in a SQLite file.
+
+    Entries expire after ``ttl`` seconds of wall-clock time (0 or less keeps
+    them forever), and beyond ``maxsize`` the least recently used go first.
+    Writes only follow an LLM call, so trimming on every write is cheap by
+    comparison.
+    """
+
+    def __init__(
+        self,
+        path: str,
+        maxsize: int,
+        ttl: float,
+        clock: Callable[[], float] = time.time,
+    ):
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self.path = path
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(
+            path, check_same_thread=False, isolation_level=None, timeout=5.0
+        )
+        with self._lock:
+            # WAL lets other workers read while one writes
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS answers ("
+                "key TEXT PRIMARY KEY, answer TEXT NOT NULL, "
+                "expires_at REAL, used_at REAL NOT NULL)"
+            )
+            self._conn.execute(
+                "CREATE INDEX IF NOT EXISTS ix_answers_used_at ON answers (used_at)"
+            )
+
+    def __len__(self) -> int:
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM answers").fetchone()[0]
+
+    def get(self, key: str) -> Optional[str]:
+        """The stored answer for ``key``, or None if missing or expired."""
+        now = self._clock()
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT answer, expires_at FROM answers WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None:
+                return None
+            answer, expires_at = row
+            if expires_at is not None and expires_at <= now:
+                self._conn.execute("DELETE FROM answers WHERE key = ?", (key,))
+                return None
+            self._conn.execute(
+                "UPDATE answers SET used_at = ? WHERE key = ?", (now, key)
+            )
+            return answer
+
+    def set(self, key: str, answer: str) -> None:
+        """Store ``answer``, then drop expired and least recently used rows."""
+        if self.maxsize <= 0:
+            return
+        now = self._clock()
+        expires_at = now + self.ttl if self.ttl > 0 else None
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO answers (key, answer, expires_at, used_at) "
+                "VALUES (?, ?, ?, ?)",
+                (key, answer, expires_at, now),
+            )
+            self._conn.execute("DELETE FROM answers WHERE expires_at <= ?", (now,))
+            excess = (
+                self._conn.execute("SELECT COUNT(*) FROM answers").fetchone()[0]
+                - self.maxsize
+            )
+            if excess > 0:
+                self._conn.execute(
+                    "DELETE FROM answers WHERE key IN "
+                    "(SELECT key FROM answers ORDER BY used_at LIMIT ?)",
+                    (excess,),
+                )
+
+    def clear(self) -> None:
+        """Drop every stored answer."""
+        with self._lock:
+            self._conn.execute("DELETE FROM answers")
+
+    def close(self) -> None:
+        """Close the database connection."""
+        with self._lock:
+            self._conn.close()
+
+
+class AnswerCache:
+    """In-process LRU of answers with an optional SQLite store behind it.
+
+    The store is only consulted on a memory miss, from a worker thread so
+    disk access never blocks the event loop; a hit there is promoted into
+    memory. Store errors are logged and treated as misses.
+    """
+
+    def __init__(self, memory: TTLCache, store: Optional[SqliteAnswerStore] = None):
+        self.memory = memory
+        self.store = store
+        self.disk_hits = 0
+        self.disk_misses = 0
+        self.bypasses = 0
+
+    async def get(self, key: str) -> Optional[str]:
+        """The cached answer for ``key``, or None."""
+        answer = self.memory.get(key)
+        if answer is not None or self.store is None:
+            return answer
+        try:
+            answer = await asyncio.to_thread(self.store.get, key)
+        except sqlite3.Error as e:
+            logger.warning("Answer cache store read failed: %s", e)
+            return None
+        if answer is None:
+            self.disk_misses += 1
+            return None
+        self.disk_hits += 1
+        self.memory.set(key, answer)
+        return answer
+
+    async def set(self, key: str, answer: str) -> None:
+        """Cache ``answer`` in memory and in the store."""
+        self.memory.set(key, answer)
+        if self.store is None:
+            return
+        try:
+            await asyncio.to_thread(self.store.set, key, answer)
+        except sqlite3.Error as e:
+            logger.warning("Answer cache store write failed: %s", e)
+
+    def stats(self) -> Dict[str, Any]:
+        """Counters for monitoring; ``hit_rate`` counts hits in either tier."""
+        memory = self.memory.stats()
+        lookups = memory["hits"] + memory["misses"]
+        hits = memory["hits"] + self.disk_hits
+        return {
+            "hits": hits,
+            "misses": lookups - hits,
+            "hit_rate": round(hits / lookups, 4) if lookups else 0.0,
+            "bypasses": self.bypasses,
+            "memory": memory,
+            "disk": (
+                {
+                    "path": self.store.path,
+                    "maxsize": self.store.maxsize,
+                    "hits": self.disk_hits,
+                    "misses": self.disk_misses,
+                }
+                if self.store is not None
+                else None
+            ),
+        }
+
+
+_answer_cache: Optional[AnswerCache] = None
+
+
+def get_answer_cache() -> AnswerCache:
+    """
+    The shared answer cache, created from settings on first use
+    """
+    global _answer_cache  # pylint: disable=global-statement
+    if _answer_cache is None:
+        store = None
+        if settings.LLM_CACHE_PATH:
+            try:
+                store = SqliteAnswerStore(
+                    settings.LLM_CACHE_PATH,
+                    settings.LLM_CACHE_DISK_SIZE,
+                    settings.LLM_CACHE_TTL,
+                )
+            except (OSError, sqlite3.Error) as e:
+                logger.warning(
+                    "Could not open answer cache at %s: %s", settings.LLM_CACHE_PATH, e
+                )
+        _answer_cache = AnswerCache(
+            TTLCache(maxsize=settings.LLM_CACHE_SIZE, ttl=settings.LLM_CACHE_TTL),
+            store,
+        )
+    return _answer_cache
+
+
+def reset_answer_cache() -> None:
+    """
+    Drop the shared cache (closing its store) so the next use rebuilds it
+    """
+    global _answer_cache  # pylint: disable=global-statement
+    if _answer_cache is not None and _answer_cache.store is not None:
+        _answer_cache.store.close()
+    _answer_cache = None
+
+
+def answer_cache_stats() -> Dict[str, Any]:
+    """Counters of the shared answer cache."""
+    return get_answer_cache().stats()
@@ -0,0 +1,236 @@
+"""Two-round-trip retrieval backend.
+
+The default SQL backend issues one query per lookup (skin type, concern
+categories, beneficial ingredients, ingredients to avoid, top rated) and
+then lazy-loads relationships per product. ``BatchedSqlCatalog`` fetches
+every candidate set in a single ``UNION ALL`` statement with a tag column,
+followed by one hydration statement for the ingredients and skin types of
+all returned products. It then answers the same lookups as ``CatalogIndex``
+from the prefetched rows.
+"""
+
+import logging
+import re
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+from sqlalchemy import literal, null, or_, select, union_all
+from sqlalchemy.orm import Session
+
+from app.db.models import (
+    Ingredient,
+    Product,
+    SkinType,
+    product_ingredients_table,
+    product_skin_types_table,
+)
+from .catalog_index import CatalogIngredient, CatalogProduct, CatalogSkinType
+from .ingredient_index import NameQuery, get_ingredient_index
+
+logger = logging.getLogger(__name__)
+
+TAG_SKIN_TYPE = "skin_type"
+TAG_CATEGORY = "category"
+TAG_TOP_RATED = "top_rated"
+TAG_INGREDIENT = "ingredient"
+
+
+def _ranked_products_select(tag: str, stmt, min_rank: float, limit: int):
+    """Wrap a product query as a tagged, limited UNION member."""
+    limited = (
+        stmt.where(Product.rank.isnot(None), Product.rank >= min_rank)
+        .order_by(Product.rank.desc(), Product.product_id)
+        .limit(limit)
+        .subquery()
+    )
+    return select(
+        literal(tag).label("tag"),
+        limited.c.product_id.label("entity_id"),
+        limited.c.product_name.label("name"),
+        limited.c.brand_name,
+        limited.c.category,
+        limited.c.rank,
+    )
+
+
+def _product_columns():
+    return select(
+        Product.product_id,
+        Product.product_name,
+        Product.brand_name,
+        Product.category,
+        Product.rank,
+    )
+
+
+def _lookup_key(names: NameQuery):
+    """Hashable key of an ingredient lookup; compiled patterns are their own."""
+    return names if isinstance(names, re.Pattern) else tuple(names)
+
+
+# pylint: disable=too-many-instance-attributes
+class BatchedSqlCatalog:
+    """Catalog lookups prefetched for one retrieval in two statements.
+
+    Construct it with every lookup the retrieval will make; the lookup
+    methods then return the prefetched rows and never touch the database.
+    """
+
+    # pylint: disable=too-many-arguments
+    def __init__(
+        self,
+        db_session: Session,
+        skin_type: Optional[Tuple[str, float, int]] = None,
+        categories: Optional[Tuple[Sequence[str], float, int]] = None,
+        top_rated: Optional[Tuple[float, int]] = None,
+        ingredient_lookups: Iterable[Tuple[NameQuery, int]] = (),
+    ):
+        self._by_tag: Dict[str, List[CatalogProduct]] = {
+            TAG_SKIN_TYPE: [],
+            TAG_CATEGORY: [],
+            TAG_TOP_RATED: [],
+        }
+        self._ingredients: Dict[int, CatalogIngredient] = {}
+        self._products: Dict[int, CatalogProduct] = {}
+
+        # Ingredient names are resolved to ids in memory, so the statement
+        # only needs a primary-key IN filter for them
+        name_index = get_ingredient_index(db_session)
+        self._ingredient_ids: Dict[object, List[int]] = {
+            _lookup_key(names): name_index.resolve(names, limit)
+            for names, limit in ingredient_lookups
+        }
+
+        members = []
+        if skin_type is not None:
+            name, min_rank, limit = skin_type
+            stmt = (
+                _product_columns()
+                .join(product_skin_types_table)
+                .join(SkinType)
+                .where(SkinType.type_name.ilike(f"%{name}%"))
+            )
+            members.append(_ranked_products_select(TAG_SKIN_TYPE, stmt, min_rank, limit))
+        if categories is not None:
+            names, min_rank, limit = categories
+            stmt = _product_columns().where(
+                or_(*[Product.category.ilike(f"%{cat}%") for cat in names])
+            )
+            members.append(_ranked_products_select(TAG_CATEGORY, stmt, min_rank, limit))
+        if top_rated is not None:
+            min_rank, limit = top_rated
+            members.append(
+                _ranked_products_select(TAG_TOP_RATED, _product_columns(), min_rank, limit)
+            )
+        wanted_ingredients = sorted(
+            {i for ids in self._ingredient_ids.values() for i in ids}
+        )
+        if wanted_ingredients:
+            members.append(
+                select(
+                    literal(TAG_INGREDIENT).label("tag"),
+                    Ingredient.ingredient_id.label("entity_id"),
+                    Ingredient.inci_name.label("name"),
+                    null().label("brand_name"),
+                    null().label("category"),
+                    null().label("rank"),
+                ).where(Ingredient.ingredient_id.in_(wanted_ingredients))
+            )
+
+        if members:
+            rows = db_session.execute(
+                members[0] if len(members) == 1 else union_all(*members)
+            ).all()
+            self._load_candidates(rows)
+            self._hydrate(db_session)
+
+    def _load_candidates(self, rows) -> None:
+        products: Dict[int, CatalogProduct] = {}
+        for row in rows:
+            if row.tag == TAG_INGREDIENT:
+                self._ingredients[row.entity_id] = CatalogIngredient(
+                    row.entity_id, row.name
+                )
+                continue
+            product = products.get(row.entity_id)
+            if product is None:
+                product = CatalogProduct(
+                    row.entity_id, row.name, row.brand_name, row.category, row.rank
+                )
+                products[row.entity_id] = product
+            if product not in self._by_tag[row.tag]:
+                self._by_tag[row.tag].append(product)
+
+        # UNION members lose their ORDER BY, so restore it per tag
+        for tagged in self._by_tag.values():
+            tagged.sort(key=lambda p: (-p.rank, p.product_id))
+        self._products = products
+
+    def _hydrate(self, db_session: Session) -> None:
+        """Load ingredients and skin types of every candidate in one statement."""
+        if not self._products:
+            return
+        product_ids = list(self._products)
+        ingredients = (
+            select(
+                product_ingredients_table.c.product_id,
+                literal(TAG_INGREDIENT).label("kind"),
+                Ingredient.ingredient_id.label("entity_id"),
+                Ingredient.inci_name.label("name"),
+            )
+            .select_from(product_ingredients_table)
+            .join(Ingredient)
+            .where(product_ingredients_table.c.product_id.in_(product_ids))
+        )
+        skin_types = (
+            select(
+                product_skin_types_table.c.product_id,
+                literal(TAG_SKIN_TYPE).label("kind"),
+                SkinType.skin_type_id.label("entity_id"),
+                SkinType.type_name.label("name"),
+            )
+            .select_from(product_skin_types_table)
+            .join(SkinType)
+            .where(product_skin_types_table.c.product_id.in_(product_ids))
+        )
+        rows = sorted(
+            db_session.execute(union_all(ingredients, skin_types)).all(),
+            key=lambda r: (r.product_id, r.entity_id),
+        )
+
+        ingredient_lists: Dict[int, list] = {}
+        skin_type_lists: Dict[int, list] = {}
+        for row in rows:
+            if row.kind == TAG_INGREDIENT:
+                ingredient_lists.setdefault(row.product_id, []).append(
+                    CatalogIngredient(row.entity_id, row.name)
+                )
+            else:
+                skin_type_lists.setdefault(row.product_id, []).append(
+                    CatalogSkinType(row.entity_id, row.name)
+                )
+        for product_id, product in self._products.items():
+            product.ingredients = tuple(ingredient_lists.get(product_id, ()))
+            product.skin_types = tuple(skin_type_lists.get(product_id, ()))
+
+    def skin_type_products(
+        self, _skin_type: str, _min_rank: float, limit: int
+    ) -> List[CatalogProduct]:
+        """Prefetched skin-type candidates."""
+        return self._by_tag[TAG_SKIN_TYPE][:limit]
+
+    def category_products(
+        self, _categories: Iterable[str], _min_rank: float, limit: int
+    ) -> List[CatalogProduct]:
+        """Prefetched concern-category candidates."""
+        return self._by_tag[TAG_CATEGORY][:limit]
+
+    def top_rated_products(self, _min_rank: float, limit: int) -> List[CatalogProduct]:
+        """Prefetched top-rated candidates."""
+        return self._by_tag[TAG_TOP_RATED][:limit]
+
+    def ingredients_matching(
+        self, names: NameQuery, limit: int
+    ) -> List[CatalogIngredient]:
+        """Prefetched ingredients for a lookup passed to the constructor."""
+        ids = self._ingredient_ids.get(_lookup_key(names), [])
+        return [self._ingredients[i] for i in ids[:limit] if i in self._ingredients]
@@ -0,0 +1,380 @@
+"""BM25 lexical index over product text.
+
+Each product is indexed as one document made of its name, brand, category
+and ingredient list. Postings are kept in CSR form: ``indptr`` gives the
+slice of ``postings``/``freqs`` that belongs to each term, so scoring a
+query is a handful of vectorized NumPy updates over those slices rather
+than a Python loop over documents.
+
+The index is persisted as a single ``.npz`` file stamped with the catalog
+version it was built from, so a restarted server loads it from disk instead
+of rebuilding it until the catalog is reseeded.
+"""
+
+import csv
+import logging
+import os
+import re
+from collections import Counter
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+import numpy as np
+from sqlalchemy.orm import Session
+
+from .catalog_index import CatalogIndex, get_catalog_index
+from .catalog_version import CatalogCache, read_catalog_version
+from .config import settings
+
+logger = logging.getLogger(__name__)
+
+K1 = 1.2
+B = 0.75
+
+# Term frequency multipliers per field; names and categories are short, so
+# a match there says more about the product than one more ingredient does.
+FIELD_WEIGHTS = {"name": 2, "brand": 1, "category": 2, "ingredients": 1}
+
+STOPWORDS = frozenset(
+    "a an and are as at be best by can do does for from good have i in is it "
+    "me my of on or recommend should skin something that the this to what "
+    "which with you your".split()
+)
+NEGATION_CUES = frozenset({"without", "no", "not", "avoid", "avoiding"})
+# Words that keep a negated span going: "no fragrance or alcohol"
+_NEGATION_JOINERS = frozenset({"or", "nor"})
+_MAX_NEGATED_SPAN = 3
+
+_TOKEN_RE = re.compile(r"[a-z0-9]+")
+
+
+def tokenize(text: Optional[str]) -> List[str]:
+    """Lowercase alphanumeric tokens of ``text``."""
+    if not text:
+        return []
+    return _TOKEN_RE.findall(text.lower())
+
+
+def parse_query(query: str) -> Tuple[List[str], List[str]]:
+    """Split a query into terms to score and terms the user wants to avoid.
+
+    "without fragrance", "no alcohol or menthol", "fragrance-free" and
+    "free of parabens" mark their terms as excluded; excluded terms are
+    dropped from the scored terms. Both lists are de-duplicated and keep
+    query order.
+    """
+    tokens = tokenize(query)
+    terms: List[str] = []
+    excluded: List[str] = []
+
+    i = 0
+    while i < len(tokens):
+        token = tokens[i]
+        span_start = None
+        if token in NEGATION_CUES:
+            span_start = i + 1
+        elif token == "free":
+            if i + 1 < len(tokens) and tokens[i + 1] == "of":
+                span_start = i + 2
+            elif terms and i > 0 and tokens[i - 1] == terms[-1]:
+                # "fragrance free": the previous word was the negated one
+                excluded.append(terms.pop())
+        if span_start is None:
+            if token not in STOPWORDS and token != "free":
+                terms.append(token)
+            i += 1
+            continue
+
+        i = span_start
+        taken = 0
+        while i < len(tokens) and taken < _MAX_NEGATED_SPAN:
+            word = tokens[i]
+            if word in _NEGATION_JOINERS:
+                i += 1
+                continue
+            if word in STOPWORDS or word in NEGATION_CUES or word == "free":
+                break
+            excluded.append(word)
+            taken += 1
+            i += 1
+
+    excluded = list(dict.fromkeys(excluded))
+    blocked = set(excluded)
+    terms = [t for t in dict.fromkeys(terms) if t not in blocked]
+    return terms, excluded
+
+
+def product_fields(product) -> Dict[str, Optional[str]]:
+    """Searchable text of a catalog product, keyed by field."""
+    return {
+        "name": product.product_name,
+        "brand": product.brand_name,
+        "category": product.category,
+        "ingredients": " ".join(i.inci_name for i in product.ingredients),
+    }
+
+
+def csv_documents(csv_path: str) -> List[Tuple[int, Dict[str, str]]]:
+    """Searchable text of every product in the Kaggle CSV.
+
+    Rows are numbered from 1 in file order, which is the id
+    ``scripts/seed_db.py`` gives each product when it seeds empty tables.
+    """
+    with open(csv_path, mode="r", encoding="utf-8-sig") as f:
+        return [
+            (
+                row_number,
+                {
+                    "name": row.get("name", ""),
+                    "brand": row.get("brand", ""),
+                    "category": row.get("Label", ""),
+                    "ingredients": row.get("ingredients", ""),
+                },
+            )
+            for row_number, row in enumerate(csv.DictReader(f), start=1)
+        ]
+
+
+# pylint: disable=too-many-instance-attributes
+class BM25Index:
+    """Okapi BM25 over product documents, stored as CSR arrays."""
+
+    # pylint: disable=too-many-arguments
+    def __init__(
+        self,
+        product_ids: np.ndarray,
+        doc_lengths: np.ndarray,
+        terms: Sequence[str],
+        indptr: np.ndarray,
+        postings: np.ndarray,
+        freqs: np.ndarray,
+        k1: float = K1,
+        b: float = B,
+    ):
+        self.product_ids = np.asarray(product_ids, dtype=np.int64)
+        self.doc_lengths = np.asarray(doc_lengths, dtype=np.float32)
+        self.terms = list(terms)
+        self.indptr = np.asarray(indptr, dtype=np.int64)
+        self.postings = np.asarray(postings, dtype=np.int32)
+        self.freqs = np.asarray(freqs, dtype=np.float32)
+        self.k1 = k1
+        self.b = b
+        self._term_ids: Dict[str, int] = {t: i for i, t in enumerate(self.terms)}
+
+        n_docs = len(self.product_ids)
+        doc_freqs = np.diff(self.indptr).astype(np.float32)
+        self.idf = np.log1p((n_docs - doc_freqs + 0.5) / (doc_freqs + 0.5))
+        avg_length = float(self.doc_lengths.mean()) if n_docs else 1.0
+        # Per-document part of the BM25 denominator, computed once
+        self._length_norm = self.k1 * (
+            1.0 - self.b + self.b * self.doc_lengths / (avg_length or 1.0)
+        )
+
+    def __len__(self) -> int:
+        return len(self.product_ids)
+
+    @classmethod
+    def from_documents(
+        cls, documents: Iterable[Tuple[int, Dict[str, str]]]
+    ) -> "BM25Index":
+        """Build from ``(product_id, {field: text})`` pairs."""
+        product_ids: List[int] = []
+        doc_lengths: List[int] = []
+        term_docs: Dict[str, List[Tuple[int, int]]] = {}
+        for position, (product_id, fields) in enumerate(
+            sorted(documents, key=lambda d: d[0])
+        ):
+            counts: Counter = Counter()
+            for field, text in fields.items():
+                weight = FIELD_WEIGHTS.get(field, 1)
+                for token in tokenize(text):
+                    counts[token] += weight
+            product_ids.append(product_id)
+            doc_lengths.append(sum(counts.values()))
+            for term, count in counts.items():
+                term_docs.setdefault(term, []).append((position, count))
+
+        terms = sorted(term_docs)
+        indptr = np.zeros(len(terms) + 1, dtype=np.int64)
+        for i, term in enumerate(terms):
+            indptr[i + 1] = indptr[i] + len(term_docs[term])
+        postings = np.empty(indptr[-1], dtype=np.int32)
+        freqs = np.empty(indptr[-1], dtype=np.float32)
+        for i, term in enumerate(terms):
+            entries = term_docs[term]
+            postings[indptr[i] : indptr[i + 1]] = [p for p, _ in entries]
+            freqs[indptr[i] : indptr[i + 1]] = [c for _, c in entries]
+        return cls(
+            np.array(product_ids, dtype=np.int64),
+            np.array(doc_lengths, dtype=np.float32),
+            terms,
+            indptr,
+            postings,
+            freqs,
+        )
+
+    @classmethod
+    def from_catalog(cls, catalog: CatalogIndex) -> "BM25Index":
+        """Build from the in-memory catalog index."""
+        return cls.from_documents(
+            (product.product_id, product_fields(product))
+            for product in catalog.products.values()
+        )
+
+    @classmethod
+    def from_csv(cls, csv_path: str) -> "BM25Index":
+        """Build from the Kaggle CSV without a database."""
+        return cls.from_documents(csv_documents(csv_path))
+
+    def _postings_of(self, term: str) -> Optional[Tuple[np.ndarray, np.ndarray, int]]:
+        term_id = self._term_ids.get(term)
+        if term_id is None:
+            return None
+        start, end = self.indptr[term_id], self.indptr[term_id + 1]
+        return self.postings[start:end], self.freqs[start:end], term_id
+
+    def scores(self, terms: Iterable[str]) -> np.ndarray:
+        """BM25 score of every document for ``terms``, in index order."""
+        scores = np.zeros(len(self.product_ids), dtype=np.float32)
+        for term in dict.fromkeys(terms):
+            found = self._postings_of(term)
+            if found is None:
+                continue
+            docs, tf, term_id = found
+            # Postings hold each document at most once per term, so plain
+            # fancy-index addition is safe here
+            scores[docs] += (
+                self.idf[term_id] * tf * (self.k1 + 1.0)
+                / (tf + self._length_norm[docs])
+            )
+        return scores
+
+    def top_k(
+        self, terms: Iterable[str], k: int, exclude: Iterable[str] = ()
+    ) -> List[Tuple[int, float]]:
+        """Best ``k`` ``(product_id, score)`` pairs with a positive score.
+
+        Documents containing any ``exclude`` term are dropped. Ties are
+        broken by product id so results are deterministic.
+        """
+        if k <= 0:
+            return []
+        scores = self.scores(terms)
+        for term in exclude:
+            found = self._postings_of(term)
+            if found is not None:
+                scores[found[0]] = 0.0
+
+        return top_k_scores(scores, self.product_ids, k)
+
+    def containing(self, terms: Iterable[str]) -> np.ndarray:
+        """Ids of products whose text contains any of ``terms``."""
+        positions = [
+            found[0]
+            for found in map(self._postings_of, dict.fromkeys(terms))
+            if found is not None
+        ]
+        if not positions:
+            return np.empty(0, dtype=np.int64)
+        return self.product_ids[np.unique(np.concatenate(positions))]
+
+    def save(self, path: str, catalog_version: Optional[int] = None) -> None:
+        """Write the index to ``path`` as one uncompressed ``.npz`` file."""
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, "wb") as f:
+            np.savez(
+                f,
+                product_ids=self.product_ids,
+                doc_lengths=self.doc_lengths,
+                terms=np.array(self.terms, dtype=np.str_),
+                indptr=self.indptr,
+                postings=self.postings,
+                freqs=self.freqs,
+                params=np.array([self.k1, self.b], dtype=np.float64),
+                catalog_version=np.array(
+                    [-1 if catalog_version is None else catalog_version],
+                    dtype=np.int64,
+                ),
+            )
+        os.replace(tmp_path, path)
+
+    @classmethod
+    def load(cls, path: str) -> Tuple["BM25Index", Optional[int]]:
+        """Read an index written by ``save`` and the catalog version it holds."""
+        with np.load(path, allow_pickle=False) as data:
+            k1, b = data["params"].tolist()
+            version = int(data["catalog_version"][0])
+            index = cls(
+                data["product_ids"],
+                data["doc_lengths"],
+                data["terms"].tolist(),
+                data["indptr"],
+                data["postings"],
+                data["freqs"],
+                k1=k1,
+                b=b,
+            )
+        return index, None if version < 0 else version
+
+
+def top_k_scores(
+    scores: np.ndarray, product_ids: np.ndarray, k: int
+) -> List[Tuple[int, float]]:
+    """Best ``k`` positive scores as ``(product_id, score)``, ties by id."""
+    candidates = np.flatnonzero(scores > 0)
+    if len(candidates) > k:
+        # argpartition finds the k best in linear time; the boundary score
+        # is widened to include every tie so the id tie-break stays exact
+        kth = np.partition(scores[candidates], len(candidates) - k)[
+            len(candidates) - k
+        ]
+        candidates = candidates[scores[candidates] >= kth]
+    order = np.lexsort((product_ids[candidates], -scores[candidates]))
+    chosen = candidates[order][:k]
+    return [(int(product_ids[i]), float(scores[i])) for i in chosen]
+
+
+def bm25_index_path() -> str:
+    """Where the persisted index lives."""
+    return os.path.join(settings.INDEX_DIR, "bm25.npz")
+
+
+def _load_or_build(db_session: Session) -> BM25Index:
+    """Load the persisted index if it matches the catalog, else rebuild it."""
+    version = read_catalog_version()
+    path = bm25_index_path()
+    if version is not None and os.path.exists(path):
+        try:
+            index, stored_version = BM25Index.load(path)
+            if stored_version == version:
+                return index
+        except (OSError, ValueError, KeyError) as e:
+            logger.warning("Ignoring unreadable BM25 index at %s: %s", path, e)
+
+    index = BM25Index.from_catalog(get_catalog_index(db_session))
+    # Unversioned catalogs (never seeded through the scripts) are not
+    # persisted, since nothing would tell a later load that they changed
+    if version is not None:
+        try:
+            index.save(path, version)
+        except OSError as e:
+            logger.warning("Could not persist BM25 index to %s: %s", path, e)
+    return index
+
+
+_bm25_index: CatalogCache[BM25Index] = CatalogCache(_load_or_build, name="BM25 index")
+
+
+def get_bm25_index(db_session: Session) -> BM25Index:
+    """Return the shared BM25 index, loading or building it if needed."""
+    return _bm25_index.get(db_session)
+
+
+def reload_bm25_index(db_session: Session | None = None) -> BM25Index:
+    """Rebuild (or reload from disk) the shared BM25 index now."""
+    return _bm25_index.reload(db_session)
+
+
+def clear_bm25_index() -> None:
+    """Drop the shared BM25 index."""
+    _bm25_index.clear()
@@ -0,0 +1,293 @@
+"""In-memory catalog used as an alternative retrieval backend.
+
+The catalog is small (a couple of thousand products), so the products,
+ingredients and skin types can be held in compact in-process structures
+and queried without any database round trips. ``CatalogIndex`` exposes the
+same lookups that ``hybrid_retrieve`` issues against MySQL, with identical
+filtering and ordering, so both backends produce the same results.
+"""
+
+import heapq
+import logging
+from typing import Dict, Iterable, List, Optional, Sequence
+
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+
+from app.db.models import (
+    Ingredient,
+    Product,
+    SkinType,
+    product_ingredients_table,
+    product_skin_types_table,
+)
+from .catalog_version import CatalogCache
+from .ingredient_index import IngredientNameIndex, NameQuery
+
+logger = logging.getLogger(__name__)
+
+
+# pylint: disable=too-few-public-methods
+class CatalogIngredient:
+    """Read-only ingredient record shared by every product that contains it."""
+
+    __slots__ = ("ingredient_id", "inci_name")
+
+    def __init__(self, ingredient_id: int, inci_name: str):
+        self.ingredient_id = ingredient_id
+        self.inci_name = inci_name
+
+
+# pylint: disable=too-few-public-methods
+class CatalogSkinType:
+    """Read-only skin type record."""
+
+    __slots__ = ("skin_type_id", "type_name")
+
+    def __init__(self, skin_type_id: int, type_name: str):
+        self.skin_type_id = skin_type_id
+        self.type_name = type_name
+
+
+# pylint: disable=too-few-public-methods,too-many-arguments
+class CatalogProduct:
+    """Read-only product record with its relationships already resolved.
+
+    Attribute names mirror ``app.db.models.Product`` so the formatting
+    helpers in ``hybrid_retrieve`` accept either object.
+    """
+
+    __slots__ = (
+        "product_id",
+        "product_name",
+        "brand_name",
+        "category",
+        "rank",
+        "ingredients",
+        "skin_types",
+    )
+
+    def __init__(
+        self,
+        product_id: int,
+        product_name: str,
+        brand_name: Optional[str],
+        category: Optional[str],
+        rank: Optional[float],
+    ):
+        self.product_id = product_id
+        self.product_name = product_name
+        self.brand_name = brand_name
+        self.category = category
+        self.rank = rank
+        self.ingredients: tuple = ()
+        self.skin_types: tuple = ()
+
+
+def _rank_key(product: CatalogProduct) -> tuple:
+    """Sort key matching ``ORDER BY rank DESC, product_id``."""
+    return (-product.rank, product.product_id)
+
+
+def _take_ranked(
+    products: Iterable[CatalogProduct], min_rank: float, limit: int
+) -> List[CatalogProduct]:
+    """Take up to ``limit`` products from a rank-sorted iterable above a floor."""
+    taken: List[CatalogProduct] = []
+    seen = set()
+    if limit <= 0:
+        return taken
+    for product in products:
+        if product.rank < min_rank:
+            break
+        if product.product_id in seen:
+            continue
+        seen.add(product.product_id)
+        taken.append(product)
+        if len(taken) >= limit:
+            break
+    return taken
+
+
+class CatalogIndex:
+    """Compact in-memory view of products, ingredients and skin types."""
+
+    def __init__(
+        self,
+        products: Sequence[CatalogProduct],
+        ingredients: Sequence[CatalogIngredient],
+        skin_types: Sequence[CatalogSkinType],
+    ):
+        self.products: Dict[int, CatalogProduct] = {
+            p.product_id: p for p in products
+        }
+        self.ingredients = sorted(ingredients, key=lambda i: i.ingredient_id)
+        self.skin_types = sorted(skin_types, key=lambda s: s.skin_type_id)
+        self._ingredients_by_id: Dict[int, CatalogIngredient] = {
+            i.ingredient_id: i for i in self.ingredients
+        }
+        self.ingredient_names = IngredientNameIndex(
+            (i.ingredient_id, i.inci_name) for i in self.ingredients
+        )
+
+        # Products that have a rank, pre-sorted the way every lookup orders them
+        self._ranked = sorted(
+            (p for p in products if p.rank is not None), key=_rank_key
+        )
+        self._ranked_by_skin_type: Dict[int, List[CatalogProduct]] = {}
+        self._ranked_by_category: Dict[str, List[CatalogProduct]] = {}
+        for product in self._ranked:
+            for skin_type in product.skin_types:
+                self._ranked_by_skin_type.setdefault(
+                    skin_type.skin_type_id, []
+                ).append(product)
+            if product.category is not None:
+                self._ranked_by_category.setdefault(product.category, []).append(
+                    product
+                )
+
+    @classmethod
+    def from_session(cls, db_session: Session) -> "CatalogIndex":
+        """Load the whole catalog with five bulk SELECTs."""
+        ingredients = {
+            row.ingredient_id: CatalogIngredient(row.ingredient_id, row.inci_name)
+            for row in db_session.execute(
+                select(Ingredient.ingredient_id, Ingredient.inci_name)
+            )
+        }
+        skin_types = {
+            row.skin_type_id: CatalogSkinType(row.skin_type_id, row.type_name)
+            for row in db_session.execute(
+                select(SkinType.skin_type_id, SkinType.type_name)
+            )
+        }
+        products = {
+            row.product_id: CatalogProduct(
+                row.product_id,
+                row.product_name,
+                row.brand_name,
+                row.category,
+                row.rank,
+            )
+            for row in db_session.execute(
+                select(
+                    Product.product_id,
+                    Product.product_name,
+                    Product.brand_name,
+                    Product.category,
+                    Product.rank,
+                )
+            )
+        }
+
+        product_ingredients: Dict[int, list] = {}
+        for product_id, ingredient_id in db_session.execute(
+            select(
+                product_ingredients_table.c.product_id,
+                product_ingredients_table.c.ingredient_id,
+            ).order_by(
+                product_ingredients_table.c.product_id,
+                product_ingredients_table.c.ingredient_id,
+            )
+        ):
+            if ingredient_id in ingredients:
+                product_ingredients.setdefault(product_id, []).append(
+                    ingredients[ingredient_id]
+                )
+
+        product_skin_types: Dict[int, list] = {}
+        for product_id, skin_type_id in db_session.execute(
+            select(
+                product_skin_types_table.c.product_id,
+                product_skin_types_table.c.skin_type_id,
+            ).order_by(
+                product_skin_types_table.c.product_id,
+                product_skin_types_table.c.skin_type_id,
+            )
+        ):
+            if skin_type_id in skin_types:
+                product_skin_types.setdefault(product_id, []).append(
+                    skin_types[skin_type_id]
+                )
+
+        for product_id, product in products.items():
+            product.ingredients = tuple(product_ingredients.get(product_id, ()))
+            product.skin_types = tuple(product_skin_types.get(product_id, ()))
+
+        logger.info(
+            "Loaded catalog index: %d products, %d ingredients, %d skin types",
+            len(products),
+            len(ingredients),
+            len(skin_types),
+        )
+        return cls(
+            list(products.values()),
+            list(ingredients.values()),
+            list(skin_types.values()),
+        )
+
+    def skin_type_products(
+        self, skin_type: str, min_rank: float, limit: int
+    ) -> List[CatalogProduct]:
+        """Top-ranked products suitable for skin types matching ``skin_type``."""
+        needle = skin_type.lower()
+        lists = [
+            self._ranked_by_skin_type.get(st.skin_type_id, [])
+            for st in self.skin_types
+            if needle in st.type_name.lower()
+        ]
+        return _take_ranked(heapq.merge(*lists, key=_rank_key), min_rank, limit)
+
+    def category_products(
+        self, categories: Iterable[str], min_rank: float, limit: int
+    ) -> List[CatalogProduct]:
+        """Top-ranked products whose category contains any of ``categories``."""
+        needles = [c.lower() for c in categories]
+        lists = [
+            ranked
+            for category, ranked in self._ranked_by_category.items()
+            if any(needle in category.lower() for needle in needles)
+        ]
+        return _take_ranked(heapq.merge(*lists, key=_rank_key), min_rank, limit)
+
+    def top_rated_products(self, min_rank: float, limit: int) -> List[CatalogProduct]:
+        """Top-ranked products across the whole catalog."""
+        return _take_ranked(self._ranked, min_rank, limit)
+
+    def ingredients_matching(
+        self, names: NameQuery, limit: int
+    ) -> List[CatalogIngredient]:
+        """Ingredients whose INCI name contains any of ``names``, by id.
+
+        ``names`` may also be a compiled pattern searched in each name.
+        """
+        return [
+            self._ingredients_by_id[ingredient_id]
+            for ingredient_id in self.ingredient_names.resolve(names, limit)
+        ]
+
+
+_catalog_index: CatalogCache[CatalogIndex] = CatalogCache(
+    CatalogIndex.from_session, name="catalog index"
+)
+
+
+def get_catalog_index(db_session: Session) -> CatalogIndex:
+    """Return the shared catalog index, (re)building it if the catalog changed.
+
+    ``db_session`` is only used when the index has to be built.
+    """
+    return _catalog_index.get(db_session)
+
+
+def reload_catalog_index(db_session: Session | None = None) -> CatalogIndex:
+    """Rebuild the shared catalog index now, e.g. after the catalog is reseeded.
+
+    Opens a short-lived session when ``db_session`` is not provided.
+    """
+    return _catalog_index.reload(db_session)
+
+
+def clear_catalog_index() -> None:
+    """Drop the shared index so the next lookup rebuilds it."""
+    _catalog_index.clear()
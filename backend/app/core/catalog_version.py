@@ -0,0 +1,142 @@
+"""Cross-process catalog version stamp.
+
+The seed and reset scripts run in a different process from the API server,
+so in-memory catalog structures cannot be invalidated by a direct call.
+Instead the scripts bump a small stamp file and the server compares the
+stamp's modification time against the one its caches were built from.
+``CatalogCache`` wraps that check for any structure derived from the catalog.
+"""
+
+import asyncio
+import os
+import time
+import logging
+import threading
+from typing import Callable, Generic, Optional, TypeVar
+
+from sqlalchemy.orm import Session
+from sqlalchemy.util import await_only
+from sqlalchemy.util.concurrency import in_greenlet
+
+from .config import settings
+
+logger = logging.getLogger(__name__)
+
+
+def read_catalog_version() -> Optional[int]:
+    """Return the current catalog version, or None if it was never bumped.
+
+    This is a single ``stat`` call so it is cheap enough to run per request.
+    """
+    try:
+        return os.stat(settings.CATALOG_VERSION_FILE).st_mtime_ns
+    except OSError:
+        return None
+
+
+def bump_catalog_version() -> Optional[int]:
+    """Mark the catalog as changed so running servers rebuild their caches."""
+    path = settings.CATALOG_VERSION_FILE
+    try:
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, "w", encoding="utf-8") as f:
+            f.write(f"{time.time_ns()}\n")
+    except OSError as e:
+        logger.warning("Could not bump catalog version at %s: %s", path, e)
+        return None
+    return read_catalog_version()
+
+
+T = TypeVar("T")
+
+# How often a build waiting under AsyncSession.run_sync retries the lock
+_LOCK_POLL_INTERVAL = 0.005
+
+
+def _acquire(lock: threading.Lock) -> None:
+    """Take ``lock`` without ever blocking an event loop.
+
+    Under ``AsyncSession.run_sync`` this code runs on the event loop thread,
+    and whoever holds the lock may be another request whose queries need
+    that loop to finish. There the wait yields to the loop between tries;
+    plain threads block as usual.
+    """
+    if not in_greenlet():
+        lock.acquire()
+        return
+    while not lock.acquire(blocking=False):
+        await_only(asyncio.sleep(_LOCK_POLL_INTERVAL))
+
+
+class CatalogCache(Generic[T]):
+    """Holds one structure derived from the catalog and rebuilds it on change.
+
+    ``builder`` receives a database session and returns the structure. The
+    cached value is rebuilt whenever the catalog version stamp moves. When a
+    ``refresher`` is given, a stale value is passed to it together with the
+    session instead, so it can be updated incrementally.
+    """
+
+    def __init__(
+        self,
+        builder: Callable[[Session], T],
+        name: str = "catalog cache",
+        refresher: Optional[Callable[[T, Session], T]] = None,
+    ):
+        self._builder = builder
+        self._refresher = refresher
+        self._name = name
+        self._lock = threading.Lock()
+        self._value: Optional[T] = None
+        self._version: Optional[int] = None
+
+    def get(self, db_session: Session) -> T:
+        """Return the cached value, building it with ``db_session`` if stale."""
+        version = read_catalog_version()
+        value = self._value
+        if value is not None and self._version == version:
+            return value
+
+        _acquire(self._lock)
+        try:
+            if self._value is None:
+                self._value = self._builder(db_session)
+                self._version = version
+                logger.info("Built %s (catalog version %s)", self._name, version)
+            elif self._version != version:
+                if self._refresher is not None:
+                    self._value = self._refresher(self._value, db_session)
+                    action = "Refreshed"
+                else:
+                    self._value = self._builder(db_session)
+                    action = "Rebuilt"
+                self._version = version
+                logger.info("%s %s (catalog version %s)", action, self._name, version)
+            return self._value
+        finally:
+            self._lock.release()
+
+    def reload(self, db_session: Session | None = None) -> T:
+        """Rebuild now; opens a short-lived session when none is given."""
+        owns_session = db_session is None
+        if owns_session:
+            from app.db.session import SessionLocal  # pylint: disable=import-outside-toplevel
+
+            db_session = SessionLocal()
+        try:
+            version = read_catalog_version()
+            value = self._builder(db_session)
+        finally:
+            if owns_session:
+                db_session.close()
+
+        with self._lock:
+            self._value = value
+            self._version = version
+        return value
+
+    def clear(self) -> None:
+        """Drop the cached value so the next ``get`` rebuilds it."""
+        with self._lock:
+            self._value = None
+            self._version = None
@@ -7,14 +7,17 @@ that are consumed by the RAG pipeline and LLM generation code.
 
 from typing import List, Dict
 
+from .results import BUCKETS, MatchType, ResultSet
+
 
 def compose_context(
-    results: List[Dict], token_budget: int = 400, intake_data: Dict = None
+    results: ResultSet | List[Dict], token_budget: int = 400, intake_data: Dict = None
 ) -> Dict:
     """Compose personalized skincare context from SQL query results and intake data.
 
     Args:
-        results: Retrieved products/ingredients from SQL queries
+        results: Retrieved products/ingredients from SQL queries, as a
+            ``ResultSet`` or as result dicts
         token_budget: Maximum token budget for context
         intake_data: User's intake form responses
 
@@ -29,7 +32,14 @@ def compose_context(
             "user_profile": _format_user_profile(intake_data) if intake_data else "",
         }
 
-    groups = _group_results(results)
+    if isinstance(results, ResultSet):
+        # Grouped while retrieval added them; dicts are only built for the response
+        groups = {
+            bucket: [r.text for r in records] for bucket, records in results.groups.items()
+        }
+        results = results.to_dicts()
+    else:
+        groups = _group_results(results)
 
     summary_parts = _build_summary_parts(groups, intake_data)
 
@@ -52,29 +62,26 @@ def compose_context(
     }
 
 
-def _group_results(results: List[Dict]) -> Dict[str, List[Dict]]:
-    """Group results into named buckets used for summary building."""
-    return {
-        "perfect_matches": [
-            r for r in results if r.get("metadata", {}).get("match_type") == "skin_type"
-        ],
-        "targeted_products": [
-            r for r in results if r.get("metadata", {}).get("match_type") == "concern"
-        ],
-        "beneficial_ingredients": [
-            r
-            for r in results
-            if r.get("metadata", {}).get("type") == "ingredient"
-            and r.get("metadata", {}).get("beneficial")
-        ],
-        "avoid_ingredients": [r for r in results if r.get("metadata", {}).get("avoid")],
-    }
+def _group_results(results: List[Dict]) -> Dict[str, List[str]]:
+    """Texts of result dicts in the named buckets used for summary building."""
+    groups: Dict[str, List[str]] = {bucket: [] for bucket in BUCKETS.values()}
+    for r in results:
+        metadata = r.get("metadata", {})
+        if metadata.get("match_type") == "skin_type":
+            groups[BUCKETS[MatchType.SKIN_TYPE]].append(r["text"])
+        elif metadata.get("match_type") == "concern":
+            groups[BUCKETS[MatchType.CONCERN]].append(r["text"])
+        if metadata.get("type") == "ingredient" and metadata.get("beneficial"):
+            groups[BUCKETS[MatchType.BENEFICIAL]].append(r["text"])
+        if metadata.get("avoid"):
+            groups[BUCKETS[MatchType.AVOID]].append(r["text"])
+    return groups
 
 
 def _build_summary_parts(
-    groups: Dict[str, List[Dict]], intake_data: Dict = None
+    groups: Dict[str, List[str]], intake_data: Dict = None
 ) -> List[str]:
-    """Build summary text parts from grouped results and intake data."""
+    """Build summary text parts from grouped result texts and intake data."""
     summary_parts: List[str] = []
 
     # User profile summary
@@ -88,28 +95,28 @@ def _build_summary_parts(
     if perfect_matches:
         summary_parts.append("\nPERFECT MATCHES FOR YOUR SKIN:")
         for product in perfect_matches[:2]:
-            summary_parts.append(f"• {product['text']}")
+            summary_parts.append(f"• {product}")
 
     # Products for specific concerns
     targeted_products = groups.get("targeted_products", [])
     if targeted_products:
         summary_parts.append("\nTARGETED SOLUTIONS:")
         for product in targeted_products[:2]:
-            summary_parts.append(f"• {product['text']}")
+            summary_parts.append(f"• {product}")
 
     # Beneficial ingredients
     beneficial_ingredients = groups.get("beneficial_ingredients", [])
     if beneficial_ingredients:
         summary_parts.append("\nKEY INGREDIENTS FOR YOU:")
         for ingredient in beneficial_ingredients[:3]:
-            summary_parts.append(f"• {ingredient['text']}")
+            summary_parts.append(f"• {ingredient}")
 
     # Ingredients to avoid
     avoid_ingredients = groups.get("avoid_ingredients", [])
     if avoid_ingredients:
         summary_parts.append("\n INGREDIENTS TO AVOID:")
         for ingredient in avoid_ingredients[:2]:
-            summary_parts.append(f"• {ingredient['text']}")
+            summary_parts.append(f"• {ingredient}")
 
     # Routine suggestion
     if perfect_matches or targeted_products:
@@ -145,39 +152,35 @@ def _format_user_profile(intake_data: Dict = None) -> str:
 
 
 def _generate_routine_suggestion(
-    perfect_matches: List[Dict], targeted_products: List[Dict]
+    perfect_matches: List[str], targeted_products: List[str]
 ) -> str:
-    """Generate a simple routine suggestion based on products."""
+    """Generate a simple routine suggestion based on product texts."""
     routine_steps = []
     cleansers = [
-        p
-        for p in perfect_matches + targeted_products
-        if "cleanser" in p.get("text", "").lower()
+        text for text in perfect_matches + targeted_products if "cleanser" in text.lower()
     ]
     treatments = [
-        p
-        for p in perfect_matches + targeted_products
-        if any(
-            word in p.get("text", "").lower() for word in ["serum", "treatment", "acid"]
-        )
+        text
+        for text in perfect_matches + targeted_products
+        if any(word in text.lower() for word in ["serum", "treatment", "acid"])
     ]
     moisturizers = [
-        p
-        for p in perfect_matches + targeted_products
-        if "moisturizer" in p.get("text", "").lower()
+        text
+        for text in perfect_matches + targeted_products
+        if "moisturizer" in text.lower()
     ]
 
     # Build routine
     if cleansers:
-        product_name = cleansers[0]["text"].split(":")[1].split("\n")[0].strip()
+        product_name = cleansers[0].split(":")[1].split("\n")[0].strip()
         routine_steps.append(f"1. Cleanse: {product_name}")
 
     if treatments:
-        product_name = treatments[0]["text"].split(":")[1].split("\n")[0].strip()
+        product_name = treatments[0].split(":")[1].split("\n")[0].strip()
         routine_steps.append(f"2. Treat: {product_name}")
 
     if moisturizers:
-        product_name = moisturizers[0]["text"].split(":")[1].split("\n")[0].strip()
+        product_name = moisturizers[0].split(":")[1].split("\n")[0].strip()
         routine_steps.append(f"3. Moisturize: {product_name}")
 
     routine_steps.append("4. Protect: Apply SPF 30+ sunscreen (AM only)")
@@ -1,18 +1,101 @@
 """
 Load env variables into pydantic
 """
-from typing import Optional
+from pathlib import Path
+from typing import Dict, Optional
 from pydantic_settings import BaseSettings, SettingsConfigDict
 
+BACKEND_DIR = Path(__file__).resolve().parents[2]
+
 class Settings(BaseSettings):
     """
     Pydantic settings
     Add other env vars here as needed
     """
     DATABASE_URL: str
+    # Defaults to DATABASE_URL with its driver swapped for aiomysql/aiosqlite
+    ASYNC_DATABASE_URL: Optional[str] = None
     OPENROUTER_API_KEY: Optional[str] = None
     OPENROUTER_BASE_URL: str = "https://openrouter.ai/api/v1"
     LLM_MODEL: str = "meta-llama/llama-3.3-70b-instruct:free"
+    # Pooled HTTP client shared by every OpenRouter call; timeouts are in
+    # seconds and LLM_HTTP2 needs the optional h2 package (httpx[http2])
+    LLM_MAX_CONNECTIONS: int = 20
+    LLM_MAX_KEEPALIVE_CONNECTIONS: int = 10
+    LLM_KEEPALIVE_EXPIRY: float = 60.0
+    LLM_HTTP2: bool = False
+    LLM_CONNECT_TIMEOUT: float = 5.0
+    LLM_READ_TIMEOUT: float = 30.0
+    LLM_WRITE_TIMEOUT: float = 10.0
+    LLM_POOL_TIMEOUT: float = 5.0
+    # Exact-match cache of LLM answers; LLM_CACHE_PATH adds a SQLite file
+    # behind the in-memory tier so answers survive restarts. A TTL of 0 or
+    # less never expires entries and a size of 0 disables a tier.
+    LLM_CACHE_SIZE: int = 512
+    LLM_CACHE_TTL: float = 86400.0
+    LLM_CACHE_PATH: Optional[str] = None
+    LLM_CACHE_DISK_SIZE: int = 50000
+    # Admission control for OpenRouter calls: at most LLM_MAX_IN_FLIGHT at
+    # once, started at LLM_RATE requests/s (bursts of LLM_BURST). Each answer
+    # adds LLM_RATE_INCREASE to the rate and each 429 multiplies it by
+    # LLM_RATE_DECREASE, within [LLM_MIN_RATE, LLM_MAX_RATE]. Calls give up
+    # after waiting LLM_QUEUE_TIMEOUT seconds, and a 429 is retried up to
+    # LLM_MAX_RETRIES times once its Retry-After has passed.
+    LLM_MAX_IN_FLIGHT: int = 8
+    LLM_RATE: float = 2.0
+    LLM_BURST: int = 5
+    LLM_MIN_RATE: float = 0.1
+    LLM_MAX_RATE: float = 20.0
+    LLM_RATE_INCREASE: float = 0.2
+    LLM_RATE_DECREASE: float = 0.5
+    LLM_QUEUE_TIMEOUT: float = 20.0
+    LLM_MAX_RETRIES: int = 2
+
+    # Retrieval backend used by sql_retrieve: "sql" queries the database once
+    # per lookup, "single_query" fetches every lookup in two round trips,
+    # "memory" answers from the in-process catalog index, "leaderboard" reads
+    # the precomputed top-ranked lists, "bm25" ranks products by text
+    # relevance to the query and "dense" fuses local vector similarity with
+    # BM25 and the profile signals.
+    RETRIEVAL_MODE: str = "sql"
+    # Products kept per leaderboard; deeper lookups fall back to "sql".
+    # Reseed (or rerun the leaderboard build) after changing it.
+    LEADERBOARD_DEPTH: int = 100
+    # Per-profile retrieval result cache; a size of 0 disables it
+    RETRIEVAL_CACHE_SIZE: int = 256
+    RETRIEVAL_CACHE_TTL: float = 300.0
+    # Drop products containing AVOID_INGREDIENTS for sensitive profiles
+    # instead of only ranking them lower
+    EXCLUDE_AVOIDED_PRODUCTS: bool = True
+    # Correct misspelled ingredient, brand and keyword words in chat queries
+    # and catalog searches against the catalog vocabulary
+    SPELL_CORRECTION: bool = True
+    DATA_DIR: str = str(BACKEND_DIR / "data")
+    # Default search_mode of /api/products and /api/ingredients: "substring"
+    # matches anywhere in the name, "fulltext" uses the FULLTEXT (MySQL) or
+    # FTS5 (SQLite) indexes and orders results by relevance
+    CATALOG_SEARCH_MODE: str = "substring"
+
+    # Persisted search indexes built from the catalog
+    INDEX_DIR: str = str(BACKEND_DIR / "data" / "index")
+    # Dense mode switches from exact search to the IVF index at this catalog
+    # size. ANN_NLIST of 0 picks about sqrt(n) clusters; ANN_NPROBE clusters
+    # are scanned per query, so raising it trades latency for recall.
+    ANN_MIN_PRODUCTS: int = 50000
+    ANN_NLIST: int = 0
+    ANN_NPROBE: int = 8
+    # run_pipeline retrieves RERANK_CANDIDATES results and reranks them down
+    # to k within RERANK_BUDGET_MS; RERANK_WEIGHTS (JSON) overrides feature
+    # weights by name, e.g. {"rating": 0.3}
+    RERANK_ENABLED: bool = True
+    RERANK_CANDIDATES: int = 24
+    RERANK_BUDGET_MS: float = 2.0
+    RERANK_WEIGHTS: Dict[str, float] = {}
+    # Rows fetched per round trip (and flushed per chunk) by /api/export
+    EXPORT_BATCH_SIZE: int = 500
+    # Touched by the seed/reset scripts so in-process catalog caches can
+    # notice a reseed without polling the database.
+    CATALOG_VERSION_FILE: str = str(BACKEND_DIR / "data" / ".catalog_version")
 
     model_config = SettingsConfigDict(
         env_file=".env",
@@ -0,0 +1,227 @@
+"""Local dense vector index over product text.
+
+Products are embedded without any network model: words and character
+trigrams of the product text are hashed into a fixed number of signed
+buckets (the hashing trick), weighted by sublinear term frequency and an
+IDF learnt from the catalog, and L2-normalized. Cosine similarity against a
+query is then a single float32 matrix-vector product over the whole
+catalog, and ``argpartition`` picks the top k without sorting every score.
+
+Character n-grams let "hydrating" match "hydration" and "moisturiser"
+match "moisturizer", which the exact-token BM25 index cannot do.
+
+The vectors are saved as a plain ``.npy`` file next to a small metadata
+file, stamped with the catalog version like the BM25 index.
+"""
+
+import logging
+import math
+import os
+import zlib
+from collections import Counter
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+import numpy as np
+from sqlalchemy.orm import Session
+
+from .bm25_index import FIELD_WEIGHTS, product_fields, tokenize, top_k_scores
+from .catalog_index import CatalogIndex, get_catalog_index
+from .catalog_version import CatalogCache, read_catalog_version
+from .config import settings
+
+logger = logging.getLogger(__name__)
+
+DIMENSIONS = 256
+CHAR_NGRAM = 3
+
+
+def _features(text_fields: Dict[str, Optional[str]]) -> Counter:
+    """Weighted word and character n-gram counts of the given fields."""
+    counts: Counter = Counter()
+    for field, text in text_fields.items():
+        weight = FIELD_WEIGHTS.get(field, 1)
+        for token in tokenize(text):
+            counts[f"w:{token}"] += weight
+            padded = f"#{token}#"
+            for i in range(len(padded) - CHAR_NGRAM + 1):
+                counts[f"c:{padded[i : i + CHAR_NGRAM]}"] += weight
+    return counts
+
+
+def _bucket(feature: str, dimensions: int) -> Tuple[int, float]:
+    """Stable bucket and sign of a feature (``hash()`` is salted per process)."""
+    digest = zlib.crc32(feature.encode("utf-8"))
+    return digest % dimensions, 1.0 if digest & 0x80000000 else -1.0
+
+
+def _hashed(counts: Counter, dimensions: int) -> Dict[int, float]:
+    """Sublinear-tf feature vector as ``{bucket: signed weight}``."""
+    vector: Dict[int, float] = {}
+    for feature, count in counts.items():
+        bucket, sign = _bucket(feature, dimensions)
+        vector[bucket] = vector.get(bucket, 0.0) + sign * (1.0 + math.log(count))
+    return vector
+
+
+class DenseIndex:
+    """Row-normalized float32 product embeddings with cosine top-k search."""
+
+    def __init__(
+        self,
+        product_ids: np.ndarray,
+        vectors: np.ndarray,
+        idf: np.ndarray,
+    ):
+        self.product_ids = np.asarray(product_ids, dtype=np.int64)
+        self.vectors = vectors
+        self.idf = np.asarray(idf, dtype=np.float32)
+        self.dimensions = len(self.idf)
+
+    def __len__(self) -> int:
+        return len(self.product_ids)
+
+    @classmethod
+    def from_documents(
+        cls,
+        documents: Iterable[Tuple[int, Dict[str, Optional[str]]]],
+        dimensions: int = DIMENSIONS,
+    ) -> "DenseIndex":
+        """Embed ``(product_id, {field: text})`` pairs."""
+        ordered = sorted(documents, key=lambda d: d[0])
+        raw = np.zeros((len(ordered), dimensions), dtype=np.float32)
+        for row, (_, fields) in enumerate(ordered):
+            for bucket, value in _hashed(_features(fields), dimensions).items():
+                raw[row, bucket] = value
+
+        doc_freqs = np.count_nonzero(raw, axis=0).astype(np.float32)
+        idf = np.log1p(len(ordered) / (doc_freqs + 1.0)).astype(np.float32)
+        vectors = raw * idf
+        norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+        vectors /= np.where(norms > 0, norms, 1.0)
+        return cls(np.array([pid for pid, _ in ordered], dtype=np.int64), vectors, idf)
+
+    @classmethod
+    def from_catalog(
+        cls, catalog: CatalogIndex, dimensions: int = DIMENSIONS
+    ) -> "DenseIndex":
+        """Embed every product of the in-memory catalog index."""
+        return cls.from_documents(
+            (
+                (product.product_id, product_fields(product))
+                for product in catalog.products.values()
+            ),
+            dimensions,
+        )
+
+    def embed_query(self, text: str) -> Optional[np.ndarray]:
+        """Unit query vector, or None when the text has no features."""
+        vector = np.zeros(self.dimensions, dtype=np.float32)
+        features = _features({"query": text})
+        for bucket, value in _hashed(features, self.dimensions).items():
+            vector[bucket] = value
+        vector *= self.idf
+        norm = float(np.linalg.norm(vector))
+        return vector / norm if norm > 0 else None
+
+    def top_k(
+        self, text: str, k: int, exclude: Sequence[int] = ()
+    ) -> List[Tuple[int, float]]:
+        """Best ``k`` ``(product_id, cosine)`` pairs with a positive similarity.
+
+        ``exclude`` holds product ids that must not be returned. Ties are
+        broken by product id.
+        """
+        query = self.embed_query(text)
+        if query is None:
+            return []
+        return self.search_vector(query, k, exclude)
+
+    def search_vector(
+        self, query: np.ndarray, k: int, exclude: Sequence[int] = ()
+    ) -> List[Tuple[int, float]]:
+        """Exact cosine top-k for an already embedded unit query vector."""
+        if k <= 0 or not len(self):
+            return []
+        scores = self.vectors @ query
+        if len(exclude):
+            scores[np.isin(self.product_ids, exclude)] = 0.0
+        return top_k_scores(scores, self.product_ids, k)
+
+    def save(self, directory: str, catalog_version: Optional[int] = None) -> None:
+        """Write the vectors and metadata into ``directory``."""
+        os.makedirs(directory, exist_ok=True)
+        vectors_path, meta_path = _paths(directory)
+        np.save(f"{vectors_path}.tmp.npy", np.ascontiguousarray(self.vectors))
+        with open(f"{meta_path}.tmp", "wb") as f:
+            np.savez(
+                f,
+                product_ids=self.product_ids,
+                idf=self.idf,
+                catalog_version=np.array(
+                    [-1 if catalog_version is None else catalog_version],
+                    dtype=np.int64,
+                ),
+            )
+        os.replace(f"{vectors_path}.tmp.npy", vectors_path)
+        os.replace(f"{meta_path}.tmp", meta_path)
+
+    @classmethod
+    def load(
+        cls, directory: str, mmap: bool = True
+    ) -> Tuple["DenseIndex", Optional[int]]:
+        """Read an index written by ``save``; vectors are memory-mapped."""
+        vectors_path, meta_path = _paths(directory)
+        with np.load(meta_path, allow_pickle=False) as meta:
+            product_ids = meta["product_ids"]
+            idf = meta["idf"]
+            version = int(meta["catalog_version"][0])
+        vectors = np.load(vectors_path, mmap_mode="r" if mmap else None)
+        return cls(product_ids, vectors, idf), None if version < 0 else version
+
+
+def _paths(directory: str) -> Tuple[str, str]:
+    return (
+        os.path.join(directory, "dense_vectors.npy"),
+        os.path.join(directory, "dense_meta.npz"),
+    )
+
+
+def _load_or_build(db_session: Session) -> DenseIndex:
+    """Load the persisted vectors if they match the catalog, else re-embed."""
+    version = read_catalog_version()
+    directory = settings.INDEX_DIR
+    if version is not None and all(os.path.exists(p) for p in _paths(directory)):
+        try:
+            index, stored_version = DenseIndex.load(directory)
+            if stored_version == version:
+                return index
+        except (OSError, ValueError, KeyError) as e:
+            logger.warning("Ignoring unreadable dense index in %s: %s", directory, e)
+
+    index = DenseIndex.from_catalog(get_catalog_index(db_session))
+    if version is not None:
+        try:
+            index.save(directory, version)
+        except OSError as e:
+            logger.warning("Could not persist dense index to %s: %s", directory, e)
+    return index
+
+
+_dense_index: CatalogCache[DenseIndex] = CatalogCache(
+    _load_or_build, name="dense index"
+)
+
+
+def get_dense_index(db_session: Session) -> DenseIndex:
+    """Return the shared dense index, loading or building it if needed."""
+    return _dense_index.get(db_session)
+
+
+def reload_dense_index(db_session: Session | None = None) -> DenseIndex:
+    """Rebuild (or reload from disk) the shared dense index now."""
+    return _dense_index.reload(db_session)
+
+
+def clear_dense_index() -> None:
+    """Drop the shared dense index."""
+    _dense_index.clear()
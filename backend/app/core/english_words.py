@@ -0,0 +1,216 @@
+"""Common English words, for telling prose from misspelled catalog names.
+
+Spelling correction only rewrites words it does not recognise, and the
+catalog vocabulary alone does not cover ordinary prose: "could" is one edit
+from "cold" and "cheeks" one from "checks". Words in this list (and their
+regular inflections) are never corrected. It holds everyday words of
+chat questions about skin care, not a full dictionary; catalog words do
+not need to be here, since known words are left alone anyway.
+"""
+
+from typing import Iterator
+
+COMMON_WORDS = frozenset(
+    """
+    able about above absolute absorb accept access accident according account
+    ache achieve across act action active actual actually add addition address
+    adjust admit adult advance advantage advice advise affect afford affordable
+    afraid after afternoon again against age agency agent ago agree ahead air
+    airplane alike alive all allergic allergy allow almost alone along already
+    alright also alter alternative although always amaze amazing among amount
+    ancient anger angle angry animal announce annoy annoying another answer
+    anxious any anybody anymore anyone anything anyway anywhere apart apparent
+    appear apply appointment appreciate approach appropriate approve area argue
+    arise arm armpit army around arrange arrive article ask asleep aspect
+    assume attach attack attempt attend attention attitude attract aunt author
+    autumn available average avoid awake aware away awful awkward baby back
+    background backward bacteria bad badly bag balance ball band bank bare
+    barely base basic basically basis bath bathroom battle beach bear beard
+    beat beautiful beauty became because become bed bedroom been before began
+    begin beginner beginning behave behind being belief believe belly belong
+    below bend beneath benefit beside besides best better between beyond big
+    bigger bike bill birth birthday bit bite bitter black blame blank bleed
+    blemish blind block blood blotchy blow blue board boat body boil bold bone
+    book boost border bored boring born borrow boss both bother bottle bottom
+    bought bounce box boy brain branch brave bread break breakfast breath
+    breathe brick bridge brief bright bring broad broke broken brother brought
+    brown brush budget build building bump bumpy bunch burn burning burnt burst
+    bury business busy but buy buyer cake call calm came camera camp can cancer
+    cannot capable capital car card care career careful carefully carry case
+    cash cast casual catch caught cause ceiling cell center central century
+    certain certainly chair challenge chance change channel chapter character
+    charge cheap cheaper check cheek cheer chemical chest chief child childhood
+    children chin chlorine choice choose chose chosen church circle
+    circumstance citizen city claim class classic clean clear clearly clever
+    client climate climb clinic clock close closely closer clothes cloud club
+    clue coast coat code coffee cold collapse colleague collect college color
+    colour column combination combine come comfort comfortable coming comment
+    commercial common commonly communicate community company compare comparison
+    compete complain complaint complete completely complex complicated concern
+    concerned condition confidence confident confirm confuse confused confusing
+    connect consider consistent constant constantly contact contain content
+    context continue control convenient conversation convince cook cool cope
+    copy corner correct cost costly could count counter country couple courage
+    course court cousin cover crack crazy create creature credit crime crisis
+    critical cross crowd crucial cry culture cup curious current currently
+    curve customer cut cute daily damage damp dance danger dangerous dark data
+    date daughter day dead deal dealt dear death debate decade decent decide
+    decision deep deeply default defend define definitely degree delay delicate
+    deliver demand dentist deny depend describe desert deserve design desire
+    desk despite destroy detail determine develop development device diet
+    differ difference different difficult difficulty dinner direct direction
+    directly dirt dirty disappear disappoint discover discuss disease dish
+    distance divide doctor does doing dollar done door double doubt down
+    downside dozen draft drag drama draw dream dress drink drive driver drop
+    drove drug during dust duty each eager ear earlier early earn earth ease
+    easier easily east easy eat eaten edge effect effective effort eight either
+    elbow elderly else elsewhere email embarrass emerge emotion employ empty
+    enable encourage end enemy energy engage engine enjoy enough ensure enter
+    entire entirely environment equal equally error escape especially essay
+    establish even evening event eventually ever every everybody everyday
+    everyone everything everywhere evidence evil exact exactly exam example
+    excellent except exchange excited exciting excuse exercise exfoliant exist
+    expect expensive experience experiment expert explain explore expose
+    express extend extra extreme extremely eye eyebrow eyelid fabric face fact
+    factor fail failure fair fairly faith fall false familiar family famous
+    fancy far farm fashion fast fat father fault favor favorite favour
+    favourite fear feature fee feed feedback feel feeling feet fell fellow felt
+    female fever few field fight figure fill film final finally financial find
+    fine finger finish fire firm first fit five fix flag flaky flat flight
+    floor flow flower fly focus fold folk follow food foot force forehead
+    foreign forest forever forget forgot form formal former forth forward
+    fought found four frame free freedom frequent frequently fresh friend
+    friendly front frustrate frustrated fully fun funny further future gain
+    game garden gather gave general generally gentle gently get getting giant
+    gift girl girlfriend give given glad glass global goal god going gone good
+    goodness gorgeous government grab grade gradually grand grandmother grant
+    grateful greasy great greatly green grew grey ground group grow grown
+    growth guess guest guide guilty guy habit hair half hall hand handle hang
+    happen happy hard hardly harm harsh hate have having head health healthy
+    hear heard heart heat heavy height held help helpful hence here herself
+    hide high highly hill himself hint hire historic history hit hold hole
+    holiday home honest hope horrible horse hospital host hot hotel hour house
+    household however huge human humid hundred hungry hurry hurt husband idea
+    ideal identify ignore ill illness image imagine immediate immediately
+    impact importance important impossible impress improve include including
+    income increase indeed independent indicate individual industry influence
+    inform information initial injury inner inside insist instance instead
+    interest interested interesting internal international interview into
+    introduce invest invite involve iron island issue item itself jacket job
+    join joint joke journey judge juice jump junior just justice keep kept key
+    kick kid kill kind kinda kiss kitchen knee knew know knowledge known label
+    lack lady laid land language large largely last late lately later latest
+    laugh launch law lay layer lazy lead leader leaf learn least leave left leg
+    legal length less lesson let letter level library lie life lift light
+    likely limit line link lip list listen little live living loan local lock
+    long longer look loose lose loss lost lot loud love lovely low lower luck
+    lucky lunch machine mad made magazine main mainly maintain major majority
+    make maker male manage manager manner many map mark market marriage married
+    master match material matter may maybe meal mean meaning meant measure meat
+    media medical medication medicine medium meet meeting member memory mental
+    mention mess message met method middle might mild mind mine minor minute
+    mirror miss mistake mix model modern moment money month mood more morning
+    most mostly mother motion mountain mouth move movie much multiple music
+    must myself name narrow nasty nation national natural naturally nature near
+    nearby nearly neat necessary neck need negative neither nervous never
+    nevertheless new newly news next nice night nine nobody noise none normal
+    normally north nose note nothing notice novel now nowhere number nurse
+    object obvious obviously occasion occasional occasionally occur odd offer
+    office officer often okay old older once one online only onto open opening
+    operate opinion opportunity oppose opposite option orange order ordinary
+    organize original other others otherwise ought ourselves outcome outdoor
+    outside over overall overnight own owner pace pack page paid pain painful
+    paint pair pale panic paper parent park part particular particularly partly
+    partner party pass past patch path patient pattern pause pay peace peak
+    peeling people perfect perfectly perform perhaps period permanent person
+    personal personally phase phone photo physical pick picture piece pimple
+    pink place plain plan plane plant plastic plate play pleasant please
+    pleased plenty plus pocket point police policy polite poor popular portion
+    position positive possible possibly post potential pound pour power
+    practical practice prefer pregnancy pregnant prepare presence present press
+    pressure pretty prevent previous previously price pride primary print prior
+    priority private probably problem process produce product professional
+    program progress project promise proof proper properly property protect
+    proud prove provide public pull purchase pure purpose push put quality
+    quarter question quick quickly quiet quite race radio rain raise ran random
+    range rapid rare rarely rash rate rather raw reach react read reader ready
+    real realize really reason reasonable recall receive recent recently
+    recognize record recover redness reduce refer reflect refuse regard region
+    regular regularly reject relate relation relationship relative relatively
+    relax release relief rely remain remember remind remove rent repair repeat
+    replace reply report request require rescue research resist resource
+    respect respond response responsible rest result return reveal review rich
+    rid ride right ring rise risk road rock role roll room rough round routine
+    row rule run rush sad safe safety said sale same sample sat save saw say
+    scale scare scared scene schedule school science score scratch screen sea
+    search season seat second secret section see seek seem seen select self
+    sell send senior sense sensible sent separate series serious seriously
+    serve service set settle seven several severe shake shall shape share sharp
+    shave shaving shelf shift shine shiny shirt shock shoe shoot shop shopping
+    short shortly shot should shoulder shout show shower shut shy sick side
+    sight sign signal significant silly similar simple simply since sing single
+    sister sit site situation six size sleep slight slightly slow slowly small
+    smart smell smile smoke smooth snow social society soft softly soil sold
+    soldier solid solution solve some somebody somehow someone something
+    sometimes somewhat somewhere son song soon sore sorry sort sound south
+    space speak special specific specifically speech speed spend spent spite
+    split spoke sport spot spread spring square staff stage stair stand
+    standard star stare start state station stay steady steal step stick sticky
+    stiff still sting stock stomach stone stood stop store storm story straight
+    strange stranger street strength stress stretch strict strike string
+    stripping strong strongly struggle student study stuff stupid style subject
+    succeed success successful such sudden suddenly suffer suggest suggestion
+    suit summer sun sunny supply support suppose sure surely surface surprise
+    surprised surround survive suspect sweat sweaty sweet swell swim switch
+    symptom system table tail take taken talk tall taste taught tax teach
+    teacher team tear teen teenage teenager teeth tell temperature tend tender
+    term terrible test than thank thanks that their them theme themselves then
+    theory there therefore these they thick thin thing think third thirty this
+    those though thought thousand threat three threw throat through throughout
+    throw thus ticket tidy tight time tiny tip tired title today toe together
+    told tomorrow tone tonight too took tool tooth topic total totally touch
+    tough tour toward towards towel town track trade tradition traffic train
+    travel treat tree trend trial trick tried trip trouble true truly trust
+    truth try turn twelve twenty twice type typical typically ugly unable uncle
+    under understand understood uneven unfortunately union unique unit unless
+    unlike until unusual upon upper upset urban urge use used useful user usual
+    usually vacation valley value various vary vast version very via video view
+    village visible visit voice volume vote wait wake walk wall want war warm
+    warn wash washing waste watch water wave way weak wealth wear weather
+    website week weekend weigh weight weird welcome well went were west wet
+    whatever wheel when whenever where whereas wherever whether which while
+    white whole whom whose why wide wife wild will willing win wind window
+    winter wipe wise wish with within without woke woman women wonder wonderful
+    wood word wore work worker world worried worry worse worst worth would
+    wound write writer written wrong wrote yard yeah year yellow yes yesterday
+    yet young younger yourself youth zero
+    """.split()
+)
+
+# Longest first, so "es" is tried before "s"
+_SUFFIXES = (
+    "ness", "ing", "est", "ful", "ies", "ied", "ly", "ed", "er", "es", "s", "d"
+)
+
+
+def base_forms(word: str) -> Iterator[str]:
+    """Candidate base forms of ``word`` under the regular English endings."""
+    for suffix in _SUFFIXES:
+        if not word.endswith(suffix) or len(word) - len(suffix) < 2:
+            continue
+        stem = word[: -len(suffix)]
+        yield stem
+        if suffix in ("ies", "ied"):
+            yield stem + "y"
+        elif suffix in ("ing", "ed", "er", "est"):
+            # "making" -> "make", "stopped" -> "stop"
+            yield stem + "e"
+            if len(stem) > 2 and stem[-1] == stem[-2]:
+                yield stem[:-1]
+
+
+def is_common_word(word: str) -> bool:
+    """Whether lowercase ``word`` is a listed word or an inflection of one."""
+    return word in COMMON_WORDS or any(
+        stem in COMMON_WORDS for stem in base_forms(word)
+    )
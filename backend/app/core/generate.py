@@ -1,59 +1,85 @@
 """LLM generation helpers using OpenRouter.
 
-Provides async and sync wrappers to generate answers using OpenRouter APIs
-and helper functions that call the remote LLM with retries and fallbacks.
+Provides async and sync wrappers to generate answers using OpenRouter APIs,
+a streaming variant that yields the answer as it is generated, and helper
+functions that call the remote LLM with retries and fallbacks. Answers to
+identical requests are served from the answer cache unless the caller
+passes ``use_cache=False``, and concurrent identical requests share one
+upstream call. Every upstream call is admitted by the loop's
+``AdaptiveLimiter``, which paces calls and backs off on 429s.
 """
 
 import os
 import asyncio
 import concurrent.futures
+import json
 import logging
-from typing import Dict, Tuple, Optional
+from contextlib import aclosing, asynccontextmanager
+from typing import AsyncIterator, Dict, Tuple, Optional
 import httpx
 from .prompts import build_qa_prompt
 from .config import settings
+from .answer_cache import answer_cache_key, get_answer_cache
+from .llm_client import llm_client
+from .llm_limiter import QueueTimeout, Ticket, get_llm_limiter, parse_retry_after
+from .single_flight import SingleFlight
 
 logger = logging.getLogger(__name__)
 
+_answer_flights = SingleFlight("llm")
+
 
 async def generate_answer(
-    question: str, context: str, intake_data: Dict = None, prompt: str = None
+    question: str,
+    context: str,
+    intake_data: Dict = None,
+    prompt: str = None,
+    use_cache: bool = True,
 ) -> str:
-    """Generate answer using OpenRouter API with intake context or custom prompt."""
+    """Generate answer using OpenRouter API with intake context or custom prompt.
+
+    ``use_cache=False`` skips the answer cache lookup; the fresh answer
+    still replaces the cached one.
+    """
     if prompt is None:
         prompt = build_qa_prompt(question, context, intake_data)
 
-    return await _call_openrouter_api(prompt)
+    return await _call_openrouter_api(prompt, use_cache=use_cache)
 
 
-async def _call_openrouter_api(prompt: str) -> str:
-    """Call OpenRouter API for LLM generation using free models."""
-    api_key = settings.OPENROUTER_API_KEY
-    if not api_key:
-        logger.error("OPENROUTER_API_KEY not found in settings")
-        return (
-            "I'm sorry, I'm currently unable to process your request. "
-            "Please contact support."
-        )
+NO_API_KEY_MESSAGE = (
+    "I'm sorry, I'm currently unable to process your request. "
+    "Please contact support."
+)
+UNAVAILABLE_MESSAGE = (
+    "I'm currently unable to process your request. Please try again later."
+)
+EMPTY_RESPONSE_MESSAGE = (
+    "I apologize, but I'm having trouble generating a response right now. "
+    "Please try again."
+)
 
+# List of free models to try in order of preference
+FREE_MODELS = [
+    "meta-llama/llama-3.3-70b-instruct:free",
+]
+
+
+def _openrouter_request(prompt: str) -> Tuple[str, dict, dict]:
+    """URL, headers and JSON body of a chat completion request for ``prompt``."""
     url = f"{settings.OPENROUTER_BASE_URL}/chat/completions"
     headers = {
-        "Authorization": f"Bearer {api_key}",
+        "Authorization": f"Bearer {settings.OPENROUTER_API_KEY}",
         "Content-Type": "application/json",
         "HTTP-Referer": os.getenv("YOUR_SITE_URL", "http://localhost:3000"),
         "X-Title": "BoBeutician - AI Skincare Consultant",
     }
 
-    # List of free models to try in order of preference
-    free_models = [
-        "meta-llama/llama-3.3-70b-instruct:free",
-    ]
-
     model = settings.LLM_MODEL
 
     # If the set model isn't in our free list, use the first free model
-    if model not in free_models:
-        model = free_models[0]
+    if model not in FREE_MODELS:
+        model = FREE_MODELS[0]
 
     data = {
         "model": model,
@@ -72,16 +98,53 @@ async def _call_openrouter_api(prompt: str) -> str:
         "frequency_penalty": 0.0,
         "presence_penalty": 0.0,
     }
+    return url, headers, data
+
+
+async def _cached_answer(key: str, use_cache: bool) -> Optional[str]:
+    """The cached answer for ``key``, unless the caller bypasses the cache."""
+    cache = get_answer_cache()
+    if not use_cache:
+        cache.bypasses += 1
+        return None
+    return await cache.get(key)
+
+
+async def _call_openrouter_api(prompt: str, use_cache: bool = True) -> str:
+    """Call OpenRouter API for LLM generation using free models.
+
+    Only real answers are cached; apologies for failed calls are not. On a
+    cache miss, calls for a request that is already in flight await that
+    call's answer.
+    """
+    if not settings.OPENROUTER_API_KEY:
+        logger.error("OPENROUTER_API_KEY not found in settings")
+        return NO_API_KEY_MESSAGE
+
+    url, headers, data = _openrouter_request(prompt)
+    cache_key = answer_cache_key(data)
+    cached = await _cached_answer(cache_key, use_cache)
+    if cached is not None:
+        return cached
+    if not use_cache:
+        return await _fetch_answer(url, headers, data, cache_key)
+    return await _answer_flights.run(
+        cache_key, lambda: _fetch_answer(url, headers, data, cache_key)
+    )
+
 
+async def _fetch_answer(url: str, headers: dict, data: dict, cache_key: str) -> str:
+    """Answer from the first free model that gives one, cached under ``cache_key``."""
     final_answer = None
-    for attempt, model_to_try in enumerate(free_models):
+    for attempt, model_to_try in enumerate(FREE_MODELS):
         if attempt > 0:
             logger.info("Trying alternative free model: %s", model_to_try)
 
         answer, fallback = await _attempt_model_call(
-            url, headers, data, model_to_try, attempt == len(free_models) - 1
+            url, headers, data, model_to_try, attempt == len(FREE_MODELS) - 1
         )
         if answer:
+            await get_answer_cache().set(cache_key, answer)
             final_answer = answer
             break
         if fallback:
@@ -91,7 +154,7 @@ async def _call_openrouter_api(prompt: str) -> str:
     if final_answer:
         return final_answer
 
-    return "I'm currently unable to process your request. Please try again later."
+    return UNAVAILABLE_MESSAGE
 
 
 async def _attempt_model_call(
@@ -112,43 +175,95 @@ async def _attempt_model_call(
     local_data["model"] = model_to_try
 
     try:
-        async with httpx.AsyncClient(timeout=30.0) as client:
-            response = await client.post(url, json=local_data, headers=headers)
-            response.raise_for_status()
-
-            result = response.json()
-            if "choices" in result and len(result["choices"]) > 0:
-                final_answer = result["choices"][0]["message"]["content"].strip()
-                logger.info(
-                    "Successfully generated a %d-character response with %s",
-                    len(final_answer),
-                    model_to_try,
-                )
-            else:
-                logger.warning(
-                    "Unexpected API response format with %s: %s",
-                    model_to_try,
-                    result,
-                )
-                if last_attempt:
-                    final_fallback = (
-                        "I apologize, but I'm having trouble generating a response right now. "
-                        "Please try again."
-                    )
+        response = await _post_completion(url, headers, local_data)
+        response.raise_for_status()
 
-    except (httpx.TimeoutException, httpx.RequestError) as exc:
-        # Network-related errors share similar handling: warn and provide a
-        # last-attempt fallback message.
-        logger.warning("Network/request error with model %s: %s", model_to_try, exc)
+        result = response.json()
+        if "choices" in result and len(result["choices"]) > 0:
+            final_answer = result["choices"][0]["message"]["content"].strip()
+            logger.info(
+                "Successfully generated a %d-character response with %s",
+                len(final_answer),
+                model_to_try,
+            )
+        else:
+            logger.warning(
+                "Unexpected API response format with %s: %s",
+                model_to_try,
+                result,
+            )
+            if last_attempt:
+                final_fallback = EMPTY_RESPONSE_MESSAGE
+
+    except (httpx.HTTPError, ValueError, QueueTimeout) as exc:
+        final_fallback = _failure_message(exc, model_to_try, last_attempt)
+
+    return final_answer, final_fallback
+
+
+def _report_outcome(ticket: Ticket, response: httpx.Response) -> bool:
+    """Tell the limiter how a call went; True if it was throttled (429)."""
+    if response.status_code == 429:
+        ticket.throttled(parse_retry_after(response.headers.get("Retry-After")))
+        return True
+    if response.is_success:
+        ticket.succeeded()
+    return False
+
+
+async def _post_completion(url: str, headers: dict, data: dict) -> httpx.Response:
+    """POST a completion request once the limiter admits it.
+
+    A 429 is retried up to ``LLM_MAX_RETRIES`` times; the retry queues
+    again, so it waits out the ``Retry-After`` the limiter was given.
+    """
+    limiter = get_llm_limiter()
+    retries = settings.LLM_MAX_RETRIES
+    while True:
+        async with limiter.slot() as ticket, llm_client() as client:
+            response = await client.post(url, json=data, headers=headers)
+            throttled = _report_outcome(ticket, response)
+        if not throttled or retries <= 0:
+            return response
+        retries -= 1
+        logger.info("Model %s throttled; retrying", data["model"])
+
+
+@asynccontextmanager
+async def _completion_stream(
+    url: str, headers: dict, data: dict
+) -> AsyncIterator[httpx.Response]:
+    """Streamed variant of ``_post_completion``; holds the slot while open."""
+    limiter = get_llm_limiter()
+    retries = settings.LLM_MAX_RETRIES
+    while True:
+        async with limiter.slot() as ticket, llm_client() as client:
+            async with client.stream(
+                "POST", url, json=data, headers=headers
+            ) as response:
+                if not _report_outcome(ticket, response) or retries <= 0:
+                    yield response
+                    return
+        retries -= 1
+        logger.info("Model %s throttled; retrying", data["model"])
+
+
+def _failure_message(
+    exc: Exception, model_to_try: str, last_attempt: bool
+) -> Optional[str]:
+    """Log a failed model call; returns the message to answer with, if any."""
+    final_fallback: Optional[str] = None
+    if isinstance(exc, QueueTimeout):
+        logger.warning("Model %s call gave up waiting for a slot: %s", model_to_try, exc)
         if last_attempt:
             final_fallback = (
-                "I'm having technical difficulties with network communication. "
-                "Please try again or contact support."
+                "All free models are currently experiencing high demand. "
+                "Please try again in a few minutes."
             )
 
-    except httpx.HTTPStatusError as e:
-        logger.warning("Model %s HTTP error: %s", model_to_try, e.response.status_code)
-        code = e.response.status_code
+    elif isinstance(exc, httpx.HTTPStatusError):
+        logger.warning("Model %s HTTP error: %s", model_to_try, exc.response.status_code)
+        code = exc.response.status_code
         if code == 401:
             final_fallback = (
                 "I'm experiencing authentication issues. Please contact support."
@@ -164,13 +279,111 @@ async def _attempt_model_call(
                 "Please try again or contact support."
             )
 
-    except ValueError as e:
-        logger.warning("Invalid response from model %s: %s", model_to_try, e)
+    elif isinstance(exc, httpx.HTTPError):
+        # Network-related errors share similar handling: warn and provide a
+        # last-attempt fallback message.
+        logger.warning("Network/request error with model %s: %s", model_to_try, exc)
+        if last_attempt:
+            final_fallback = (
+                "I'm having technical difficulties with network communication. "
+                "Please try again or contact support."
+            )
+
+    else:
+        logger.warning("Invalid response from model %s: %s", model_to_try, exc)
         if last_attempt:
             final_fallback = "I encountered an unexpected response format." \
             "Please try again or contact support."
 
-    return final_answer, final_fallback
+    return final_fallback
+
+
+async def stream_answer(
+    question: str,
+    context: str,
+    intake_data: Dict = None,
+    prompt: str = None,
+    use_cache: bool = True,
+) -> AsyncIterator[str]:
+    """Yield the answer in pieces as OpenRouter generates them.
+
+    Sends the ``generate_answer`` request with ``stream: true`` and yields
+    each text delta as it arrives. A failure before any text yields the
+    message ``generate_answer`` would have returned. The upstream response
+    is only read as fast as the caller consumes it, and closing or
+    cancelling the generator closes the upstream request. A cached answer
+    is yielded in one piece, and an answer streamed to the end is cached.
+    """
+    if prompt is None:
+        prompt = build_qa_prompt(question, context, intake_data)
+
+    if not settings.OPENROUTER_API_KEY:
+        logger.error("OPENROUTER_API_KEY not found in settings")
+        yield NO_API_KEY_MESSAGE
+        return
+
+    url, headers, data = _openrouter_request(prompt)
+    cache_key = answer_cache_key(data)
+    cached = await _cached_answer(cache_key, use_cache)
+    if cached is not None:
+        yield cached
+        return
+
+    for attempt, model_to_try in enumerate(FREE_MODELS):
+        last_attempt = attempt == len(FREE_MODELS) - 1
+        pieces = []
+        streamed = False
+        fallback: Optional[str] = None
+        try:
+            # Closing this generator closes the upstream response right away,
+            # not whenever the abandoned inner generator is collected
+            async with aclosing(
+                _stream_model_call(
+                    url, headers, dict(data, model=model_to_try, stream=True)
+                )
+            ) as deltas:
+                async for delta in deltas:
+                    streamed = True
+                    pieces.append(delta)
+                    yield delta
+            if streamed:
+                await get_answer_cache().set(cache_key, "".join(pieces).strip())
+                return
+            logger.warning("Empty streamed response from %s", model_to_try)
+            if last_attempt:
+                fallback = EMPTY_RESPONSE_MESSAGE
+        except (httpx.HTTPError, ValueError, QueueTimeout) as exc:
+            if streamed:
+                # Part of the answer is already out; end it where it broke off
+                logger.warning("Stream from model %s broke off: %s", model_to_try, exc)
+                return
+            fallback = _failure_message(exc, model_to_try, last_attempt)
+        if fallback:
+            yield fallback
+            return
+
+    yield UNAVAILABLE_MESSAGE
+
+
+async def _stream_model_call(url: str, headers: dict, data: dict) -> AsyncIterator[str]:
+    """Text deltas of one streamed completion, read from its server-sent events."""
+    async with _completion_stream(url, headers, data) as response:
+        response.raise_for_status()
+        async with aclosing(response.aiter_lines()) as lines:
+            async for line in lines:
+                # Lines starting with ":" are keep-alive comments
+                if not line.startswith("data:"):
+                    continue
+                payload = line[len("data:") :].strip()
+                if payload == "[DONE]":
+                    return
+                chunk = json.loads(payload)
+                if "error" in chunk:
+                    raise ValueError(f"Error in stream: {chunk['error']}")
+                choices = chunk.get("choices") or [{}]
+                delta = (choices[0].get("delta") or {}).get("content")
+                if delta:
+                    yield delta
 
 
 def generate_answer_sync(question: str, context: str, prompt: str = None) -> str:
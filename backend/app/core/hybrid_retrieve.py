@@ -3,26 +3,82 @@
 Functions in this module query the database to find relevant products and
 ingredients based on a user's natural language query and intake/profile
 information. These are used by the RAG pipeline to build context for the
-LLM generation step.
+LLM generation step. The same lookups can be answered from the in-memory
+catalog index (``RETRIEVAL_MODE=memory``) without any database round trips,
+from the leaderboards precomputed at seed time (``RETRIEVAL_MODE=leaderboard``),
+or ranked by relevance to the query text: BM25 alone (``RETRIEVAL_MODE=bm25``)
+or local dense vectors fused with BM25 and the profile signals
+(``RETRIEVAL_MODE=dense``).
 """
 
-from typing import List, Dict
+from typing import Iterable, List, Dict, Sequence
 import logging
+import re
 from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import or_
 from sqlalchemy.exc import SQLAlchemyError
 from app.db.models import Product, Ingredient, SkinType
+from app.db.hydration import with_product_relationships
+from .ann_index import ann_enabled, get_ann_index
+from .batched_catalog import BatchedSqlCatalog
+from .bm25_index import get_bm25_index, parse_query
+from .dense_index import get_dense_index
+from .cache import TTLCache
+from .catalog_index import get_catalog_index
+from .catalog_version import read_catalog_version
+from .ingredient_index import NameQuery, get_ingredient_index
+from .ingredient_matrix import (
+    AVOID_OVERFETCH,
+    AvoidFilteredCatalog,
+    ProductIngredientMatrix,
+    get_ingredient_matrix,
+)
+from .keyword_matcher import KeywordMatcher
+from .leaderboards import (
+    CATEGORY_PREFIX,
+    GLOBAL_BOARD,
+    SKIN_TYPE_PREFIX,
+    get_leaderboard_names,
+    leaderboard_product_ids,
+    matching_boards,
+)
+from .rerank import ProductSignals
+from .results import MatchType, ResultSet, RetrievalResult
+from .spell_index import add_query_vocabulary, get_spell_index
+from .config import settings
 
 logger = logging.getLogger(__name__)
 DEFAULT_K = 8
 
+SKIN_TYPE_MIN_RANK = 3.5
+CONCERN_MIN_RANK = 3.0
+GENERAL_MIN_RANK = 4.0
+BENEFICIAL_INGREDIENT_LIMIT = 8
+AVOID_INGREDIENT_LIMIT = 5
 
+# Modes that rank products by the query text rather than the profile alone
+TEXT_RETRIEVAL_MODES = {"bm25", "dense"}
+# Reciprocal-rank fusion constant and how deep each fused list goes
+RRF_K = 60
+RRF_DEPTH = 50
+
+# Retrieval output depends only on the normalized profile (plus the parsed
+# query terms in text modes), and there are only a few dozen distinct
+# profiles, so results are cached per profile.
+_retrieval_cache = TTLCache(
+    maxsize=settings.RETRIEVAL_CACHE_SIZE, ttl=settings.RETRIEVAL_CACHE_TTL
+)
+
+
+# pylint: disable=too-many-arguments
 def sql_retrieve(
     db_session: Session,
     query: str,
     intake_data: Dict = None,
     concern: str | None = None,
     k: int = 8,
+    mode: str | None = None,
 ) -> List[Dict]:
     """SQL-backed retrieval for products and ingredients based on user profile.
 
@@ -32,196 +88,758 @@ def sql_retrieve(
         intake_data: User's intake form responses
         concern: Additional concern parameter
         k: Number of results to return
+        mode: Retrieval backend, "sql", "single_query", "memory",
+            "leaderboard", "bm25" or "dense"; defaults to
+            ``settings.RETRIEVAL_MODE``
 
     Returns:
         List of dicts with keys: id, text, source_id, score, metadata
     """
-    results = []
+    return retrieve_results(
+        db_session, query, intake_data, concern, k, mode
+    ).to_dicts()
+
+
+# pylint: disable=too-many-locals,too-many-arguments
+def retrieve_results(
+    db_session: Session,
+    query: str,
+    intake_data: Dict = None,
+    concern: str | None = None,
+    k: int = 8,
+    mode: str | None = None,
+) -> ResultSet:
+    """Retrieve products and ingredients for a user profile as typed records.
+
+    Takes the same arguments as ``sql_retrieve``. The returned set may be
+    shared with the retrieval cache, so its records must not be modified.
+    """
+    results = ResultSet()
+    query = _corrected_query(db_session, query)
 
     # Extract user attributes from intake data and query
     skin_type, concerns = _extract_skin_attributes(query, intake_data, concern)
     is_sensitive = intake_data.get("sensitive") == "yes" if intake_data else None
+    mode = mode or settings.RETRIEVAL_MODE
+    query_terms = parse_query(query) if mode in TEXT_RETRIEVAL_MODES else None
+
+    cache_key = _profile_cache_key(
+        mode, skin_type, concerns, is_sensitive, k, query_terms
+    )
+    cached = _retrieval_cache.get(cache_key)
+    if cached is not None:
+        return cached
+
+    signals = ProductSignals(
+        skin_type,
+        _concern_categories(concerns) if concerns else (),
+        _beneficial_ingredient_names(skin_type, concerns, is_sensitive),
+        AVOID_INGREDIENTS if is_sensitive else None,
+    )
 
     try:
-        _append_skin_type_products(results, db_session, skin_type, k)
-        _append_concern_products(results, db_session, concerns, k)
+        # Sensitive profiles never get products containing avoided
+        # ingredients; every product lookup over-fetches to make up for them
+        avoid = (
+            _avoid_filter(db_session)
+            if is_sensitive and settings.EXCLUDE_AVOIDED_PRODUCTS
+            else None
+        )
+        overfetch = AVOID_OVERFETCH if avoid else 1
+        if query_terms is not None:
+            catalog = get_catalog_index(db_session)
+            slots = _text_product_slots(k, is_sensitive)
+            hits = _text_hits(
+                db_session,
+                mode,
+                query_terms,
+                slots * overfetch,
+                catalog,
+                skin_type,
+                concerns,
+            )
+            if avoid:
+                hits = _without_avoided(hits, *avoid)[:slots]
+            _append_ranked_products(
+                results, catalog, hits, skin_type, concerns, mode, signals
+            )
+        else:
+            catalog = _select_catalog(
+                db_session, mode, skin_type, concerns, is_sensitive, k, overfetch
+            )
+        if avoid:
+            catalog = AvoidFilteredCatalog(catalog, *avoid, overfetch=overfetch)
+        # Text modes fall back to profile matches when nothing in the
+        # query matched the catalog
+        if not results:
+            _append_skin_type_products(results, catalog, skin_type, k, signals)
+            _append_concern_products(results, catalog, concerns, k, signals)
         _append_beneficial_ingredients(
-            results, db_session, skin_type, concerns, is_sensitive
+            results, catalog, skin_type, concerns, is_sensitive
         )
-        _append_avoid_ingredients(results, db_session, is_sensitive)
-        _append_general_products(results, db_session, k)
+        _append_avoid_ingredients(results, catalog, is_sensitive)
+        _append_general_products(results, catalog, k, signals)
     except SQLAlchemyError as e:
         logger.warning("SQL query failed: %s", e)
+        return ResultSet()
+
+    results = results.truncated(k)
+    _retrieval_cache.set(cache_key, results)
+    return results
+
+
+# pylint: disable=too-many-arguments
+async def async_sql_retrieve(
+    db_session: AsyncSession,
+    query: str,
+    intake_data: Dict = None,
+    concern: str | None = None,
+    k: int = 8,
+    mode: str | None = None,
+) -> List[Dict]:
+    """Async variant of ``sql_retrieve`` for an ``AsyncSession``.
+
+    The same retrieval code runs through ``AsyncSession.run_sync``, so every
+    database round trip awaits the async driver instead of blocking the
+    event loop while other requests wait on their LLM calls.
+    """
+    return (
+        await async_retrieve_results(db_session, query, intake_data, concern, k, mode)
+    ).to_dicts()
+
+
+# pylint: disable=too-many-arguments
+async def async_retrieve_results(
+    db_session: AsyncSession,
+    query: str,
+    intake_data: Dict = None,
+    concern: str | None = None,
+    k: int = 8,
+    mode: str | None = None,
+) -> ResultSet:
+    """Async variant of ``retrieve_results`` for an ``AsyncSession``."""
+    return await db_session.run_sync(
+        lambda session: retrieve_results(
+            session, query, intake_data, concern, k, mode
+        )
+    )
+
+
+# pylint: disable=too-many-arguments
+def _profile_cache_key(
+    mode: str,
+    skin_type: str | None,
+    concerns: List[str],
+    is_sensitive: bool | None,
+    k: int,
+    query_terms: tuple | None = None,
+) -> tuple:
+    """Canonical cache key for a retrieval profile.
+
+    Concern order is kept because it shows up in the formatted ingredient
+    text. The catalog version is part of the key so a reseed (which bumps
+    the version stamp) invalidates every entry across processes. Text
+    retrieval modes also depend on the parsed query terms.
+    """
+    return (
+        mode,
+        skin_type,
+        tuple(concerns),
+        bool(is_sensitive),
+        k,
+        tuple(tuple(part) for part in query_terms) if query_terms else None,
+        read_catalog_version(),
+    )
+
+
+def invalidate_retrieval_cache() -> None:
+    """Drop every cached retrieval result."""
+    _retrieval_cache.invalidate()
+
+
+def retrieval_cache_stats() -> Dict:
+    """Hit/miss/eviction counters of the retrieval cache."""
+    return _retrieval_cache.stats()
+
+
+class _SqlCatalog:
+    """Catalog lookups answered by querying the database on every call.
+
+    Method names and semantics match ``CatalogIndex`` so the append helpers
+    below work against either backend. Product relationships are loaded
+    for the whole result with one IN query each, not lazily per product.
+    """
+
+    def __init__(self, db_session: Session):
+        self.db_session = db_session
+
+    def skin_type_products(
+        self, skin_type: str, min_rank: float, limit: int
+    ) -> List[Product]:
+        """Top-ranked products suitable for skin types matching ``skin_type``."""
+        return (
+            with_product_relationships(self.db_session.query(Product))
+            .join(Product.skin_types)
+            .filter(SkinType.type_name.ilike(f"%{skin_type}%"))
+            .filter(Product.rank.isnot(None), Product.rank >= min_rank)
+            .order_by(Product.rank.desc(), Product.product_id)
+            .limit(limit)
+            .all()
+        )
+
+    def category_products(
+        self, categories: Iterable[str], min_rank: float, limit: int
+    ) -> List[Product]:
+        """Top-ranked products whose category contains any of ``categories``."""
+        conds = [Product.category.ilike(f"%{cat}%") for cat in categories]
+        return (
+            with_product_relationships(self.db_session.query(Product))
+            .filter(or_(*conds))
+            .filter(Product.rank.isnot(None), Product.rank >= min_rank)
+            .order_by(Product.rank.desc(), Product.product_id)
+            .limit(limit)
+            .all()
+        )
+
+    def top_rated_products(self, min_rank: float, limit: int) -> List[Product]:
+        """Top-ranked products across the whole catalog."""
+        return (
+            with_product_relationships(self.db_session.query(Product))
+            .filter(Product.rank.isnot(None), Product.rank >= min_rank)
+            .order_by(Product.rank.desc(), Product.product_id)
+            .limit(limit)
+            .all()
+        )
+
+    def ingredients_matching(
+        self, names: NameQuery, limit: int
+    ) -> List[Ingredient]:
+        """Ingredients whose INCI name contains any of ``names``, by id.
+
+        Names (or a compiled pattern) are resolved to ids through the
+        trigram name index, so the database only sees a primary-key lookup.
+        """
+        ingredient_ids = get_ingredient_index(self.db_session).resolve(names, limit)
+        if not ingredient_ids:
+            return []
+        return (
+            self.db_session.query(Ingredient)
+            .filter(Ingredient.ingredient_id.in_(ingredient_ids))
+            .order_by(Ingredient.ingredient_id)
+            .all()
+        )
+
+
+class _LeaderboardCatalog(_SqlCatalog):
+    """Product lookups answered from the precomputed leaderboards.
+
+    Each lookup reads the first ``limit`` positions of the matching boards
+    by primary key and loads those products by id. Lookups deeper than
+    ``LEADERBOARD_DEPTH`` use the SQL queries of the parent class.
+    """
+
+    def __init__(self, db_session: Session, boards: Sequence[str]):
+        super().__init__(db_session)
+        self.boards = boards
+
+    def _products(self, product_ids: List[int]) -> List[Product]:
+        if not product_ids:
+            return []
+        by_id = {
+            product.product_id: product
+            for product in with_product_relationships(self.db_session.query(Product))
+            .filter(Product.product_id.in_(product_ids))
+        }
+        return [by_id[i] for i in product_ids if i in by_id]
+
+    def _board_products(
+        self, boards: Sequence[str], min_rank: float, limit: int
+    ) -> List[Product]:
+        return self._products(
+            leaderboard_product_ids(self.db_session, boards, min_rank, limit)
+        )
+
+    def skin_type_products(
+        self, skin_type: str, min_rank: float, limit: int
+    ) -> List[Product]:
+        """Top-ranked products of the skin type boards matching ``skin_type``."""
+        if limit > settings.LEADERBOARD_DEPTH:
+            return super().skin_type_products(skin_type, min_rank, limit)
+        boards = matching_boards(self.boards, SKIN_TYPE_PREFIX, [skin_type])
+        return self._board_products(boards, min_rank, limit)
+
+    def category_products(
+        self, categories: Iterable[str], min_rank: float, limit: int
+    ) -> List[Product]:
+        """Top-ranked products of the category boards matching ``categories``."""
+        if limit > settings.LEADERBOARD_DEPTH:
+            return super().category_products(categories, min_rank, limit)
+        boards = matching_boards(self.boards, CATEGORY_PREFIX, categories)
+        return self._board_products(boards, min_rank, limit)
+
+    def top_rated_products(self, min_rank: float, limit: int) -> List[Product]:
+        """Top-ranked products of the global board."""
+        if limit > settings.LEADERBOARD_DEPTH:
+            return super().top_rated_products(min_rank, limit)
+        return self._board_products([GLOBAL_BOARD], min_rank, limit)
+
+
+# pylint: disable=too-many-arguments
+def _select_catalog(
+    db_session: Session,
+    mode: str,
+    skin_type: str | None,
+    concerns: List[str],
+    is_sensitive: bool | None,
+    k: int,
+    overfetch: int = 1,
+):
+    """Return the catalog backend for ``mode``.
+
+    The profile is only needed by "single_query", which prefetches every
+    lookup the append helpers below will make in one statement, each
+    product lookup ``overfetch`` times as deep.
+    """
+    if mode == "memory":
+        return get_catalog_index(db_session)
+    if mode == "leaderboard":
+        boards = get_leaderboard_names(db_session)
+        if boards:
+            return _LeaderboardCatalog(db_session, boards)
+        logger.warning("No leaderboards built yet, falling back to sql")
+        return _SqlCatalog(db_session)
+    if mode == "single_query":
+        categories = _concern_categories(concerns) if concerns else set()
+        ingredient_lookups = []
+        beneficial = _beneficial_ingredient_names(skin_type, concerns, is_sensitive)
+        if beneficial:
+            ingredient_lookups.append((beneficial, BENEFICIAL_INGREDIENT_LIMIT))
+        if is_sensitive:
+            ingredient_lookups.append((AVOID_INGREDIENTS, AVOID_INGREDIENT_LIMIT))
+        return BatchedSqlCatalog(
+            db_session,
+            skin_type=(
+                (skin_type, SKIN_TYPE_MIN_RANK, max(k // 2, 2) * overfetch)
+                if skin_type
+                else None
+            ),
+            categories=(
+                (sorted(categories), CONCERN_MIN_RANK, max(k // 3, 2) * overfetch)
+                if categories
+                else None
+            ),
+            # The general lookup asks for at most k products
+            top_rated=(GENERAL_MIN_RANK, k * overfetch),
+            ingredient_lookups=ingredient_lookups,
+        )
+    if mode != "sql":
+        logger.warning("Unknown retrieval mode %r, falling back to sql", mode)
+    return _SqlCatalog(db_session)
+
+
+def _avoid_filter(db_session: Session) -> tuple:
+    """Ingredient matrix and the mask of ``AVOID_INGREDIENTS``."""
+    matrix = get_ingredient_matrix(db_session)
+    avoided_ids = get_ingredient_index(db_session).resolve(AVOID_INGREDIENTS)
+    return matrix, matrix.mask(avoided_ids)
+
+
+def _without_avoided(
+    hits: List[tuple], matrix: ProductIngredientMatrix, mask
+) -> List[tuple]:
+    """Drop hits whose product contains an ingredient in ``mask``."""
+    if not hits:
+        return hits
+    avoided = matrix.containing_any([pid for pid, _ in hits], mask)
+    return [hit for hit, bad in zip(hits, avoided) if not bad]
+
+
+# pylint: disable=too-many-arguments
+def _text_hits(
+    db_session: Session,
+    mode: str,
+    query_terms: tuple,
+    limit: int,
+    catalog,
+    skin_type: str | None,
+    concerns: List[str],
+) -> List[tuple]:
+    """``(product_id, score)`` pairs ranked by relevance to the query text."""
+    terms, excluded = query_terms
+    if not terms:
         return []
+    bm25 = get_bm25_index(db_session)
+    if mode == "bm25":
+        return bm25.top_k(terms, limit, exclude=excluded)
+
+    # "dense": semantic and lexical matches generate the candidates, which
+    # are then re-ordered together with the profile signals
+    excluded_ids = bm25.containing(excluded) if excluded else ()
+    semantic = _semantic_hits(db_session, " ".join(terms), RRF_DEPTH, excluded_ids)
+    lexical = bm25.top_k(terms, RRF_DEPTH, exclude=excluded)
+    candidates = [
+        catalog.products[pid]
+        for pid in dict.fromkeys(pid for pid, _ in semantic + lexical)
+        if pid in catalog.products
+    ]
+    ranked = sorted(
+        (p for p in candidates if p.rank is not None),
+        key=lambda p: (-p.rank, p.product_id),
+    )
+    categories = _concern_categories(concerns) if concerns else set()
+    match_types = {
+        p.product_id: _product_match_type(p, skin_type, categories) for p in ranked
+    }
+    rankings = [
+        [pid for pid, _ in semantic],
+        [pid for pid, _ in lexical],
+        [p.product_id for p in ranked],
+        [
+            p.product_id
+            for p in ranked
+            if match_types[p.product_id] is MatchType.SKIN_TYPE
+        ],
+        [
+            p.product_id
+            for p in ranked
+            if match_types[p.product_id] is MatchType.CONCERN
+        ],
+    ]
+    return reciprocal_rank_fusion(rankings)[:limit]
+
+
+def _semantic_hits(
+    db_session: Session, text: str, limit: int, exclude: Sequence[int]
+) -> List[tuple]:
+    """Dense-vector matches, through the IVF index for large catalogs."""
+    dense = get_dense_index(db_session)
+    query = dense.embed_query(text)
+    if query is None:
+        return []
+    if ann_enabled(len(dense)):
+        return get_ann_index(db_session).search_vector(query, limit, exclude)
+    return dense.search_vector(query, limit, exclude)
+
+
+def reciprocal_rank_fusion(
+    rankings: Iterable[Sequence[int]], k: int = RRF_K
+) -> List[tuple]:
+    """Fuse ranked id lists into ``(id, score)`` pairs, best first.
+
+    Each list contributes ``1 / (k + position)`` for every id it contains,
+    so items ranked well by several signals rise to the top without the
+    signals' raw scores having to be comparable. Ties go to the lower id.
+    """
+    fused: Dict[int, float] = {}
+    for ranking in rankings:
+        for position, item in enumerate(ranking, start=1):
+            fused[item] = fused.get(item, 0.0) + 1.0 / (k + position)
+    return sorted(fused.items(), key=lambda item: (-item[1], item[0]))
+
+
+def _text_product_slots(k: int, is_sensitive: bool | None) -> int:
+    """Products a text mode returns, leaving room for the ingredient notes."""
+    ingredient_slots = max(DEFAULT_K // 4, 1) + (1 if is_sensitive else 0)
+    return max(k - ingredient_slots, 1)
+
+
+# Formatting context for each product match type
+_MATCH_CONTEXTS = {
+    MatchType.SKIN_TYPE: "skin_type_match",
+    MatchType.CONCERN: "concern_match",
+    MatchType.GENERAL: "top_rated",
+}
+
+
+def _product_match_type(
+    product, skin_type: str | None, categories: set
+) -> MatchType:
+    """Label a ranked product the way the profile lookups would have found it."""
+    if skin_type and any(
+        skin_type.lower() in st.type_name.lower() for st in product.skin_types
+    ):
+        return MatchType.SKIN_TYPE
+    category = (product.category or "").lower()
+    if any(cat.lower() in category for cat in categories):
+        return MatchType.CONCERN
+    return MatchType.GENERAL
+
+
+# pylint: disable=too-many-arguments
+def _append_ranked_products(
+    results: ResultSet,
+    catalog,
+    hits: List[tuple],
+    skin_type: str | None,
+    concerns: List[str],
+    retriever: str,
+    signals: ProductSignals,
+) -> None:
+    """Append relevance-ranked products with scores scaled to the best hit."""
+    if not hits:
+        return
 
-    return results[:k]
+    categories = _concern_categories(concerns) if concerns else set()
+    top_score = hits[0][1]
+    for product_id, raw_score in hits:
+        product = catalog.products.get(product_id)
+        if product is None:
+            continue
+        match_type = _product_match_type(product, skin_type, categories)
+        metadata = {
+            "category": product.category,
+            "retriever": retriever,
+            "raw_score": round(raw_score, 4),
+            **signals.of(product),
+        }
+        if match_type is MatchType.SKIN_TYPE:
+            metadata["skin_type"] = skin_type
+        elif match_type is MatchType.CONCERN:
+            metadata["concerns"] = concerns
+        results.add(
+            RetrievalResult(
+                product.product_id,
+                match_type,
+                _format_product_text(product, context=_MATCH_CONTEXTS[match_type]),
+                round(raw_score / top_score, 4) if top_score > 0 else 0.0,
+                metadata,
+            )
+        )
 
 
 def _append_skin_type_products(
-    results: List[Dict], db_session: Session, skin_type: str | None, k: int
+    results: ResultSet,
+    catalog,
+    skin_type: str | None,
+    k: int,
+    signals: ProductSignals,
 ) -> None:
     if not skin_type:
         return
 
-    skin_type_query = (
-        db_session.query(Product)
-        .join(Product.skin_types)
-        .filter(SkinType.type_name.ilike(f"%{skin_type}%"))
+    skin_type_products = catalog.skin_type_products(
+        skin_type, SKIN_TYPE_MIN_RANK, max(k // 2, 2)
     )
-
-    skin_type_query = skin_type_query.filter(
-        Product.rank.isnot(None), Product.rank >= 3.5
-    ).order_by(Product.rank.desc())
-
-    skin_type_products = skin_type_query.limit(max(k // 2, 2)).all()
     for product in skin_type_products:
-        results.append(
-            {
-                "id": f"skintype_product_{product.product_id}",
-                "text": _format_product_text(product, context="skin_type_match"),
-                "source_id": "products_db",
-                "score": 0.95,
-                "metadata": {
-                    "type": "product",
-                    "match_type": "skin_type",
+        results.add(
+            RetrievalResult(
+                product.product_id,
+                MatchType.SKIN_TYPE,
+                _format_product_text(product, context="skin_type_match"),
+                0.95,
+                {
                     "skin_type": skin_type,
                     "category": product.category,
+                    **signals.of(product),
                 },
-            }
+            )
         )
 
 
-def _append_concern_products(
-    results: List[Dict], db_session: Session, concerns: List[str], k: int
-) -> None:
-    if not concerns:
-        return
+CONCERN_CATEGORIES = {
+    "acne": ["Cleanser", "Treatment"],
+    "aging": ["Moisturizer", "Treatment", "Serum"],
+    "pigmentation": ["Treatment", "Serum"],
+    "dryness": ["Moisturizer", "Oil"],
+    "blackheads": ["Cleanser", "Treatment"],
+    "sun_damage": ["Treatment", "Sunscreen"],
+}
 
-    concern_mappings = {
-        "acne": ["Cleanser", "Treatment"],
-        "aging": ["Moisturizer", "Treatment", "Serum"],
-        "pigmentation": ["Treatment", "Serum"],
-        "dryness": ["Moisturizer", "Oil"],
-        "blackheads": ["Cleanser", "Treatment"],
-        "sun_damage": ["Treatment", "Sunscreen"],
-    }
 
+def _concern_categories(concerns: List[str]) -> set:
+    """Product categories that address any of ``concerns``."""
     relevant_categories = set()
     for concern_item in concerns:
-        relevant_categories.update(concern_mappings.get(concern_item, []))
+        relevant_categories.update(CONCERN_CATEGORIES.get(concern_item, []))
+    return relevant_categories
+
 
+def _append_concern_products(
+    results: ResultSet,
+    catalog,
+    concerns: List[str],
+    k: int,
+    signals: ProductSignals,
+) -> None:
+    if not concerns:
+        return
+
+    relevant_categories = _concern_categories(concerns)
     if not relevant_categories:
         return
 
-    conds = [Product.category.ilike(f"%{cat}%") for cat in relevant_categories]
-    concern_query = (
-        db_session.query(Product)
-        .filter(or_(*conds))
-        .filter(Product.rank.isnot(None), Product.rank >= 3.0)
-        .order_by(Product.rank.desc())
+    concern_products = catalog.category_products(
+        relevant_categories, CONCERN_MIN_RANK, max(k // 3, 2)
     )
-
-    concern_products = concern_query.limit(max(k // 3, 2)).all()
     for product in concern_products:
-        if not any(
-            r["id"] == f"skintype_product_{product.product_id}" for r in results
-        ):
-            results.append(
+        if results.has_product(product.product_id):
+            continue
+        results.add(
+            RetrievalResult(
+                product.product_id,
+                MatchType.CONCERN,
+                _format_product_text(product, context="concern_match"),
+                0.85,
                 {
-                    "id": f"concern_product_{product.product_id}",
-                    "text": _format_product_text(product, context="concern_match"),
-                    "source_id": "products_db",
-                    "score": 0.85,
-                    "metadata": {
-                        "type": "product",
-                        "match_type": "concern",
-                        "concerns": concerns,
-                        "category": product.category,
-                    },
-                }
+                    "concerns": concerns,
+                    "category": product.category,
+                    **signals.of(product),
+                },
             )
+        )
 
 
 def _append_beneficial_ingredients(
-    results: List[Dict],
-    db_session: Session,
+    results: ResultSet,
+    catalog,
     skin_type: str | None,
     concerns: List[str],
     is_sensitive: bool,
 ) -> None:
     beneficial_ingredients = _get_beneficial_ingredients(
-        db_session, skin_type, concerns, is_sensitive
+        catalog, skin_type, concerns, is_sensitive
     )
     limit = max(DEFAULT_K // 4, 1)
     for ingredient in beneficial_ingredients[:limit]:
-        results.append(
-            {
-                "id": f"ingredient_{ingredient.ingredient_id}",
-                "text": _format_ingredient_text(ingredient, skin_type, concerns),
-                "source_id": "ingredients_db",
-                "score": 0.75,
-                "metadata": {
-                    "type": "ingredient",
-                    "beneficial": True,
-                    "skin_type": skin_type,
-                },
-            }
+        results.add(
+            RetrievalResult(
+                ingredient.ingredient_id,
+                MatchType.BENEFICIAL,
+                _format_ingredient_text(ingredient, skin_type, concerns),
+                0.75,
+                {"skin_type": skin_type},
+            )
         )
 
 
 def _append_avoid_ingredients(
-    results: List[Dict], db_session: Session, is_sensitive: bool
+    results: ResultSet, catalog, is_sensitive: bool
 ) -> None:
     if not is_sensitive:
         return
 
-    avoid_ingredients = _get_ingredients_to_avoid(db_session, is_sensitive)
+    avoid_ingredients = _get_ingredients_to_avoid(catalog, is_sensitive)
     for ingredient in avoid_ingredients[:1]:
-        results.append(
-            {
-                "id": f"avoid_ingredient_{ingredient.ingredient_id}",
-                "text": (
-                    f"AVOID: {ingredient.inci_name} - " "may irritate sensitive skin"
-                ),
-                "source_id": "ingredients_db",
-                "score": 0.6,
-                "metadata": {"type": "ingredient", "beneficial": False, "avoid": True},
-            }
+        results.add(
+            RetrievalResult(
+                ingredient.ingredient_id,
+                MatchType.AVOID,
+                f"AVOID: {ingredient.inci_name} - may irritate sensitive skin",
+                0.6,
+            )
         )
 
 
-def _append_general_products(results: List[Dict], db_session: Session, k: int) -> None:
+def _append_general_products(
+    results: ResultSet, catalog, k: int, signals: ProductSignals
+) -> None:
     if len(results) >= k // 2:
         return
 
-    general_query = (
-        db_session.query(Product)
-        .filter(Product.rank.isnot(None), Product.rank >= 4.0)
-        .order_by(Product.rank.desc())
-    )
-    general_products = general_query.limit(k - len(results)).all()
+    general_products = catalog.top_rated_products(GENERAL_MIN_RANK, k - len(results))
     for product in general_products:
-        if not any(f"product_{product.product_id}" in r["id"] for r in results):
-            results.append(
-                {
-                    "id": f"general_product_{product.product_id}",
-                    "text": _format_product_text(product, context="top_rated"),
-                    "source_id": "products_db",
-                    "score": 0.7,
-                    "metadata": {
-                        "type": "product",
-                        "match_type": "general",
-                        "category": product.category,
-                    },
-                }
+        if results.has_product(product.product_id):
+            continue
+        results.add(
+            RetrievalResult(
+                product.product_id,
+                MatchType.GENERAL,
+                _format_product_text(product, context="top_rated"),
+                0.7,
+                {"category": product.category, **signals.of(product)},
             )
+        )
+
+
+SKIN_TYPE_KEYWORDS = ["oily", "dry", "normal", "combination", "sensitive"]
+
+CONCERN_KEYWORDS = {
+    "acne": ["acne", "breakout", "pimple", "blemish"],
+    "dryness": ["dry", "dehydrated", "flaky", "tight"],
+    "aging": ["wrinkle", "fine lines", "anti-aging", "firming"],
+    "pigmentation": [
+        "dark spots",
+        "hyperpigmentation",
+        "melasma",
+        "uneven tone",
+    ],
+    "sensitivity": ["sensitive", "irritation", "redness", "reactive"],
+    "blackheads": ["blackhead", "clogged pores", "comedone"],
+    "sun_damage": ["sun damage", "age spots", "photo damage"],
+}
+
+INGREDIENT_BENEFITS = {
+    "niacinamide": "controls oil production, minimizes pores, reduces inflammation",
+    "salicylic acid": "exfoliates inside pores, reduces blackheads and acne",
+    "hyaluronic acid": "deeply hydrates, plumps skin, reduces fine lines",
+    "retinol": "accelerates cell turnover, reduces wrinkles, improves texture",
+    "vitamin c": "brightens skin, fades dark spots, provides antioxidant protection",
+    "ceramides": "strengthens skin barrier, locks in moisture",
+    "glycerin": "attracts moisture to skin, maintains hydration",
+    "zinc": "reduces inflammation, controls acne bacteria",
+}
+
+# Labels are (kind, value) pairs; their position in this list decides which
+# match wins when several apply, mirroring the order of the tables above.
+_QUERY_LABELS = (
+    [("skin_type", st) for st in SKIN_TYPE_KEYWORDS]
+    + [("concern", cat) for cat in CONCERN_KEYWORDS]
+    + [("ingredient", name) for name in INGREDIENT_BENEFITS]
+)
+_LABEL_PRIORITY = {label: i for i, label in enumerate(_QUERY_LABELS)}
+
+_QUERY_MATCHER = KeywordMatcher(
+    [(st, ("skin_type", st)) for st in SKIN_TYPE_KEYWORDS]
+    + [
+        (keyword, ("concern", cat))
+        for cat, keywords in CONCERN_KEYWORDS.items()
+        for keyword in keywords
+    ]
+    + [(name, ("ingredient", name)) for name in INGREDIENT_BENEFITS]
+)
+_BENEFIT_MATCHER = KeywordMatcher((name, name) for name in INGREDIENT_BENEFITS)
+_BENEFIT_PRIORITY = {name: i for i, name in enumerate(INGREDIENT_BENEFITS)}
+add_query_vocabulary(
+    [value for _, value in _QUERY_LABELS]
+    + [keyword for keywords in CONCERN_KEYWORDS.values() for keyword in keywords]
+)
+
+
+def match_query(query: str) -> Dict[str, List[str]]:
+    """Skin types, concerns and known ingredients mentioned in ``query``.
+
+    One pass over the lowercased query; each list is in table order.
+    """
+    found: Dict[str, List[str]] = {"skin_type": [], "concern": [], "ingredient": []}
+    if not query:
+        return found
+    for kind, value in sorted(
+        _QUERY_MATCHER.labels(query.lower()), key=_LABEL_PRIORITY.__getitem__
+    ):
+        found[kind].append(value)
+    return found
+
+
+def _corrected_query(db_session: Session, query: str) -> str:
+    """``query`` with misspelled catalog and keyword words fixed.
+
+    Left unchanged when correction is off or the spell index cannot be
+    built, so a database error here never fails the retrieval.
+    """
+    if not query or not settings.SPELL_CORRECTION:
+        return query
+    try:
+        return get_spell_index(db_session).correct(query)
+    except SQLAlchemyError as e:
+        logger.warning("Spell index unavailable: %s", e)
+        return query
 
 
 def _extract_skin_attributes(
     query: str, intake_data: Dict = None, concern: str | None = None
 ) -> tuple[str | None, List[str]]:
     """Extract skin type and concerns from intake data and natural language query."""
-    query_lower = query.lower() if query else ""
+    mentioned = match_query(query)
 
     # Priority 1: Use intake form data if available
     skin_type = None
@@ -242,36 +860,13 @@ def _extract_skin_attributes(
             concerns.extend([c.lower() for c in intake_concerns])
 
     # Priority 2: Extract from query if intake data is missing
-    if not skin_type and query_lower:
-        skin_types = ["oily", "dry", "normal", "combination", "sensitive"]
-        for st in skin_types:
-            if st in query_lower:
-                skin_type = st.title()
-                break
+    if not skin_type and mentioned["skin_type"]:
+        skin_type = mentioned["skin_type"][0].title()
 
     # Extract additional concerns from query
-    if query_lower:
-        concern_keywords = {
-            "acne": ["acne", "breakout", "pimple", "blemish"],
-            "dryness": ["dry", "dehydrated", "flaky", "tight"],
-            "aging": ["wrinkle", "fine lines", "anti-aging", "firming"],
-            "pigmentation": [
-                "dark spots",
-                "hyperpigmentation",
-                "melasma",
-                "uneven tone",
-            ],
-            "sensitivity": ["sensitive", "irritation", "redness", "reactive"],
-            "blackheads": ["blackhead", "clogged pores", "comedone"],
-            "sun_damage": ["sun damage", "age spots", "photo damage"],
-        }
-
-        for concern_cat, keywords in concern_keywords.items():
-            if (
-                any(keyword in query_lower for keyword in keywords)
-                and concern_cat not in concerns
-            ):
-                concerns.append(concern_cat)
+    for concern_cat in mentioned["concern"]:
+        if concern_cat not in concerns:
+            concerns.append(concern_cat)
 
     if concern and concern not in concerns:
         concerns.append(concern)
@@ -279,8 +874,11 @@ def _extract_skin_attributes(
     return skin_type, concerns
 
 
-def _format_product_text(product: Product, context: str = "general") -> str:
-    """Format product information for context with enhanced details."""
+def _format_product_text(product, context: str = "general") -> str:
+    """Format product information for context with enhanced details.
+
+    Accepts an ORM ``Product`` or an in-memory ``CatalogProduct``.
+    """
     ingredients_str = ", ".join([ing.inci_name for ing in product.ingredients[:5]])
     if len(product.ingredients) > 5:
         ingredients_str += f" (+ {len(product.ingredients) - 5} more)"
@@ -305,7 +903,7 @@ Key ingredients: {ingredients_str}
 
 
 def _format_ingredient_text(
-    ingredient: Ingredient, skin_type: str = None, concerns: List[str] = None
+    ingredient, skin_type: str = None, concerns: List[str] = None
 ) -> str:
     """Format ingredient information with benefits and tailor to profile."""
     benefits = _get_ingredient_benefits(ingredient.inci_name)
@@ -326,13 +924,26 @@ def _format_ingredient_text(
 
 
 def _get_beneficial_ingredients(
-    db_session: Session,
+    catalog,
     skin_type: str | None,
     concerns: List[str],
     is_sensitive: bool = False,
 ) -> List[Ingredient]:
     """Get ingredients beneficial for specific skin types/concerns with sensitivity
     consideration."""
+    names = _beneficial_ingredient_names(skin_type, concerns, is_sensitive)
+    if not names:
+        return []
+
+    return catalog.ingredients_matching(names, BENEFICIAL_INGREDIENT_LIMIT)
+
+
+def _beneficial_ingredient_names(
+    skin_type: str | None,
+    concerns: List[str],
+    is_sensitive: bool = False,
+) -> List[str]:
+    """Names of ingredients to look up for a profile, at most ten."""
     beneficial_names = []
 
     # Base ingredients by skin type
@@ -381,56 +992,44 @@ def _get_beneficial_ingredients(
             seen.add(name.lower())
             unique_names.append(name)
 
-    if not unique_names:
-        return []
-
-    conds = [Ingredient.inci_name.ilike(f"%{name}%") for name in unique_names[:10]]
-    return db_session.query(Ingredient).filter(or_(*conds)).limit(8).all()
-
-
-def _get_ingredients_to_avoid(
-    db_session: Session, is_sensitive: bool = False
-) -> List[Ingredient]:
+    return unique_names[:10]
+
+
+# Irritants for sensitive skin, as patterns over INCI names. Word boundaries
+# keep out look-alikes that are fine for sensitive skin: fatty alcohols
+# (Cetearyl Alcohol), Phenoxyethanol, mineral sulfates (Zinc Sulfate) and
+# citrus extracts, as opposed to citrus oils.
+AVOID_INGREDIENT_PATTERNS = [
+    r"^alcohol\b",  # ethanol's INCI name, also as "Alcohol Denat."
+    r"\balcohol denat\b",
+    r"\bsd alcohol\b",
+    r"\bisopropyl alcohol\b",
+    r"^ethanol\b",
+    r"\b(?:lauryl|laureth|coco|coceth|trideceth)[- ]sulfate\b",
+    r"paraben\b",
+    r"\bparfum\b",
+    r"\bfragrances?\b",
+    r"\bessential oils?\b",
+    r"\bmenthol\b",
+    r"\beucalyptus\b",
+    r"^citrus\b.*\boil\b",
+    r"\bformaldehyde\b",
+]
+AVOID_INGREDIENTS = re.compile("|".join(AVOID_INGREDIENT_PATTERNS), re.IGNORECASE)
+
+
+def _get_ingredients_to_avoid(catalog, is_sensitive: bool = False) -> List[Ingredient]:
     """Get ingredients that sensitive skin should avoid."""
     if not is_sensitive:
         return []
 
-    avoid_names = [
-        "Fragrance",
-        "Alcohol",
-        "Sulfates",
-        "Parabens",
-        "Essential Oils",
-        "Menthol",
-        "Eucalyptus",
-        "Citrus",
-        "Formaldehyde",
-    ]
-
-    return (
-        db_session.query(Ingredient)
-        .filter(or_(*[Ingredient.inci_name.ilike(f"%{name}%") for name in avoid_names]))
-        .limit(5)
-        .all()
-    )
+    return catalog.ingredients_matching(AVOID_INGREDIENTS, AVOID_INGREDIENT_LIMIT)
 
 
 def _get_ingredient_benefits(ingredient_name: str) -> str:
     """Get specific benefits of an ingredient for the user's profile."""
-    benefits_db = {
-        "niacinamide": "controls oil production, minimizes pores, reduces inflammation",
-        "salicylic acid": "exfoliates inside pores, reduces blackheads and acne",
-        "hyaluronic acid": "deeply hydrates, plumps skin, reduces fine lines",
-        "retinol": "accelerates cell turnover, reduces wrinkles, improves texture",
-        "vitamin c": "brightens skin, fades dark spots, provides antioxidant protection",
-        "ceramides": "strengthens skin barrier, locks in moisture",
-        "glycerin": "attracts moisture to skin, maintains hydration",
-        "zinc": "reduces inflammation, controls acne bacteria",
-    }
-
-    ingredient_lower = ingredient_name.lower()
-    for key, benefit in benefits_db.items():
-        if key in ingredient_lower:
-            return benefit
+    matched = _BENEFIT_MATCHER.labels(ingredient_name.lower())
+    if matched:
+        return INGREDIENT_BENEFITS[min(matched, key=_BENEFIT_PRIORITY.__getitem__)]
 
     return "provides skincare benefits for your skin type"
@@ -0,0 +1,122 @@
+"""Substring index over ingredient INCI names.
+
+``ILIKE '%name%'`` cannot use the unique index on ``inci_name`` because of
+the leading wildcard, so every lookup scans the whole ingredients table.
+This module keeps a trigram inverted index over the lowercased names
+instead: a needle's trigrams narrow the candidates to a handful of names,
+which are then confirmed with a plain substring check. Results are the
+same as the case-insensitive ``LIKE`` they replace, ordered by id.
+
+Lookups that need word boundaries (``Ethanol`` but not ``Phenoxyethanol``)
+pass a compiled regular expression instead of names; it is searched in
+every name.
+"""
+
+import re
+from typing import Dict, Iterable, List, Optional, Tuple, Union
+
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+
+from app.db.models import Ingredient
+from .catalog_version import CatalogCache
+
+NGRAM = 3
+
+# What ``resolve`` accepts: substrings of names, or one regular expression
+NameQuery = Union[Iterable[str], re.Pattern]
+
+
+def _ngrams(text: str) -> set:
+    return {text[i : i + NGRAM] for i in range(len(text) - NGRAM + 1)}
+
+
+class IngredientNameIndex:
+    """Trigram index mapping name fragments to ingredient ids."""
+
+    def __init__(self, entries: Iterable[Tuple[int, str]]):
+        ordered = sorted(entries)
+        self.ids: List[int] = [ingredient_id for ingredient_id, _ in ordered]
+        self.names: List[str] = [name for _, name in ordered]
+        self._lowered: List[str] = [name.lower() for name in self.names]
+
+        # Postings hold positions into the id-sorted arrays, so any
+        # intersection of them is already in id order once sorted
+        postings: Dict[str, List[int]] = {}
+        for position, name in enumerate(self._lowered):
+            for gram in _ngrams(name):
+                postings.setdefault(gram, []).append(position)
+        self._postings: Dict[str, Tuple[int, ...]] = {
+            gram: tuple(positions) for gram, positions in postings.items()
+        }
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    def _positions(self, needle: str) -> List[int]:
+        """Positions of names containing ``needle`` (already lowercased)."""
+        if len(needle) < NGRAM:
+            return [i for i, name in enumerate(self._lowered) if needle in name]
+
+        lists = []
+        for gram in _ngrams(needle):
+            positions = self._postings.get(gram)
+            if not positions:
+                return []
+            lists.append(positions)
+        lists.sort(key=len)
+
+        candidates = set(lists[0])
+        for positions in lists[1:]:
+            candidates.intersection_update(positions)
+            if not candidates:
+                return []
+        return sorted(i for i in candidates if needle in self._lowered[i])
+
+    def search(self, needle: str) -> List[int]:
+        """Ids of ingredients whose name contains ``needle``, ascending."""
+        return [self.ids[i] for i in self._positions(needle.lower())]
+
+    def resolve(self, names: NameQuery, limit: Optional[int] = None) -> List[int]:
+        """Ids of ingredients whose name contains any of ``names``, ascending.
+
+        ``names`` may also be a compiled pattern, which selects the names
+        it finds a match in.
+        """
+        if isinstance(names, re.Pattern):
+            ordered = [
+                ingredient_id
+                for ingredient_id, name in zip(self.ids, self.names)
+                if names.search(name)
+            ]
+        else:
+            positions = set()
+            for name in names:
+                positions.update(self._positions(name.lower()))
+            ordered = [self.ids[i] for i in sorted(positions)]
+        return ordered if limit is None else ordered[:limit]
+
+
+def _build_from_session(db_session: Session) -> IngredientNameIndex:
+    rows = db_session.execute(select(Ingredient.ingredient_id, Ingredient.inci_name))
+    return IngredientNameIndex((row.ingredient_id, row.inci_name) for row in rows)
+
+
+_ingredient_index: CatalogCache[IngredientNameIndex] = CatalogCache(
+    _build_from_session, name="ingredient name index"
+)
+
+
+def get_ingredient_index(db_session: Session) -> IngredientNameIndex:
+    """Return the shared ingredient name index, building it if needed."""
+    return _ingredient_index.get(db_session)
+
+
+def reload_ingredient_index(db_session: Session | None = None) -> IngredientNameIndex:
+    """Rebuild the shared ingredient name index now."""
+    return _ingredient_index.reload(db_session)
+
+
+def clear_ingredient_index() -> None:
+    """Drop the shared ingredient name index."""
+    _ingredient_index.clear()
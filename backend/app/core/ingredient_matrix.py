@@ -0,0 +1,313 @@
+"""Product × ingredient bitset for excluding products by ingredient.
+
+Sensitive users should never be recommended a product that contains one of
+the ingredients they are told to avoid. Checking that in SQL means a join
+per candidate product, so instead the ``product_ingredients`` table is held
+as a bit matrix: one row per product, one bit per ingredient, packed into
+64-bit words. A profile's avoided ingredients become a mask of the same
+width, and whether each candidate contains any of them is a vectorized
+``AND`` over the candidate rows.
+
+The seed scripts only ever append products or wipe the tables, so when the
+catalog version moves the matrix is extended with the new rows instead of
+being rebuilt, as long as a fingerprint of the rows it already holds still
+matches the database.
+"""
+
+import logging
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+import numpy as np
+from sqlalchemy import func, select
+from sqlalchemy.orm import Session
+
+from app.db.models import Ingredient, Product, product_ingredients_table
+from .catalog_version import CatalogCache
+
+logger = logging.getLogger(__name__)
+
+WORD_BITS = 64
+# Candidates fetched per wanted product when avoided products are dropped
+AVOID_OVERFETCH = 4
+
+
+def _words(n_columns: int) -> int:
+    return max(1, -(-n_columns // WORD_BITS))
+
+
+def _fingerprint(db_session: Session, max_product_id: int, max_ingredient_id: int):
+    """Counts and id sums of the rows at or below the given ids."""
+    pi = product_ingredients_table.c
+    pairs = db_session.execute(
+        select(
+            func.count(),
+            func.coalesce(func.sum(pi.product_id), 0),
+            func.coalesce(func.sum(pi.ingredient_id), 0),
+        ).where(pi.product_id <= max_product_id)
+    ).one()
+    products = db_session.execute(
+        select(func.count()).where(Product.product_id <= max_product_id)
+    ).scalar()
+    ingredients = db_session.execute(
+        select(func.count()).where(Ingredient.ingredient_id <= max_ingredient_id)
+    ).scalar()
+    return (products, ingredients, *(int(v) for v in pairs))
+
+
+class ProductIngredientMatrix:
+    """Bit matrix of which ingredients each product contains."""
+
+    def __init__(
+        self,
+        product_ids: np.ndarray,
+        ingredient_ids: np.ndarray,
+        bits: np.ndarray,
+        fingerprint: tuple,
+    ):
+        self.product_ids = product_ids
+        self.ingredient_ids = ingredient_ids
+        self.bits = bits
+        self.fingerprint = fingerprint
+        self._masks: Dict[Tuple[int, ...], np.ndarray] = {}
+
+    def __len__(self) -> int:
+        return len(self.product_ids)
+
+    @classmethod
+    def from_pairs(
+        cls,
+        product_ids: Iterable[int],
+        ingredient_ids: Iterable[int],
+        pairs: Sequence[Tuple[int, int]],
+    ) -> "ProductIngredientMatrix":
+        """Build from every product id, ingredient id and junction row."""
+        products = np.unique(np.fromiter(product_ids, dtype=np.int64))
+        ingredients = np.unique(np.fromiter(ingredient_ids, dtype=np.int64))
+        bits = np.zeros((len(products), _words(len(ingredients))), dtype=np.uint64)
+        pair_array = np.array(pairs, dtype=np.int64).reshape(-1, 2)
+        _set_bits(bits, products, ingredients, pair_array)
+        fingerprint = (
+            len(products),
+            len(ingredients),
+            len(pair_array),
+            int(pair_array[:, 0].sum()),
+            int(pair_array[:, 1].sum()),
+        )
+        return cls(products, ingredients, bits, fingerprint)
+
+    @classmethod
+    def from_session(cls, db_session: Session) -> "ProductIngredientMatrix":
+        """Load the whole junction table with three bulk SELECTs."""
+        pi = product_ingredients_table.c
+        matrix = cls.from_pairs(
+            db_session.execute(select(Product.product_id)).scalars(),
+            db_session.execute(select(Ingredient.ingredient_id)).scalars(),
+            db_session.execute(select(pi.product_id, pi.ingredient_id)).all(),
+        )
+        logger.info(
+            "Loaded product ingredient matrix: %d products x %d ingredients",
+            len(matrix.product_ids),
+            len(matrix.ingredient_ids),
+        )
+        return matrix
+
+    def refreshed(self, db_session: Session) -> "ProductIngredientMatrix":
+        """Extend with products and ingredients added since this was built.
+
+        Falls back to a full rebuild when any row already held has changed
+        (e.g. the tables were wiped and reseeded with different data).
+        """
+        max_product = int(self.product_ids[-1]) if len(self.product_ids) else 0
+        max_ingredient = (
+            int(self.ingredient_ids[-1]) if len(self.ingredient_ids) else 0
+        )
+        if _fingerprint(db_session, max_product, max_ingredient) != self.fingerprint:
+            logger.info("Product ingredient matrix changed, rebuilding")
+            return self.from_session(db_session)
+
+        pi = product_ingredients_table.c
+        new_products = np.fromiter(
+            db_session.execute(
+                select(Product.product_id).where(Product.product_id > max_product)
+            ).scalars(),
+            dtype=np.int64,
+        )
+        new_ingredients = np.fromiter(
+            db_session.execute(
+                select(Ingredient.ingredient_id).where(
+                    Ingredient.ingredient_id > max_ingredient
+                )
+            ).scalars(),
+            dtype=np.int64,
+        )
+        new_pairs = np.array(
+            db_session.execute(
+                select(pi.product_id, pi.ingredient_id).where(
+                    pi.product_id > max_product
+                )
+            ).all(),
+            dtype=np.int64,
+        ).reshape(-1, 2)
+        if not len(new_products) and not len(new_ingredients):
+            # Same rows as before; masks are rebuilt since names may differ
+            self._masks.clear()
+            return self
+
+        # New ids are larger than every held one, so appending keeps both
+        # axes sorted
+        products = np.concatenate([self.product_ids, np.sort(new_products)])
+        ingredients = np.concatenate([self.ingredient_ids, np.sort(new_ingredients)])
+        bits = np.zeros((len(products), _words(len(ingredients))), dtype=np.uint64)
+        bits[: self.bits.shape[0], : self.bits.shape[1]] = self.bits
+        _set_bits(bits, products, ingredients, new_pairs)
+        fingerprint = (
+            len(products),
+            len(ingredients),
+            self.fingerprint[2] + len(new_pairs),
+            self.fingerprint[3] + int(new_pairs[:, 0].sum()),
+            self.fingerprint[4] + int(new_pairs[:, 1].sum()),
+        )
+        logger.info(
+            "Extended product ingredient matrix by %d products, %d ingredients",
+            len(new_products),
+            len(new_ingredients),
+        )
+        return ProductIngredientMatrix(products, ingredients, bits, fingerprint)
+
+    def mask(self, ingredient_ids: Iterable[int]) -> np.ndarray:
+        """Row-width bitmask with the bits of ``ingredient_ids`` set."""
+        key = tuple(sorted(set(ingredient_ids)))
+        cached = self._masks.get(key)
+        if cached is not None:
+            return cached
+        mask = np.zeros(self.bits.shape[1], dtype=np.uint64)
+        wanted = np.array(key, dtype=np.int64)
+        columns = np.searchsorted(self.ingredient_ids, wanted)
+        known = columns < len(self.ingredient_ids)
+        known[known] = self.ingredient_ids[columns[known]] == wanted[known]
+        columns = columns[known]
+        np.bitwise_or.at(
+            mask,
+            columns // WORD_BITS,
+            np.left_shift(np.uint64(1), (columns % WORD_BITS).astype(np.uint64)),
+        )
+        self._masks[key] = mask
+        return mask
+
+    def containing_any(self, product_ids: Sequence[int], mask: np.ndarray) -> np.ndarray:
+        """For each product id, whether it contains any ingredient in ``mask``.
+
+        Unknown product ids are reported as not containing anything.
+        """
+        wanted = np.asarray(product_ids, dtype=np.int64)
+        result = np.zeros(len(wanted), dtype=bool)
+        if not len(wanted) or not len(self.product_ids):
+            return result
+        rows = np.searchsorted(self.product_ids, wanted)
+        known = rows < len(self.product_ids)
+        known[known] = self.product_ids[rows[known]] == wanted[known]
+        result[known] = np.any(self.bits[rows[known]] & mask, axis=1)
+        return result
+
+
+def _set_bits(
+    bits: np.ndarray,
+    products: np.ndarray,
+    ingredients: np.ndarray,
+    pairs: np.ndarray,
+) -> None:
+    """Set the bit of every ``(product_id, ingredient_id)`` pair."""
+    if not len(pairs):
+        return
+    rows = np.searchsorted(products, pairs[:, 0])
+    columns = np.searchsorted(ingredients, pairs[:, 1])
+    np.bitwise_or.at(
+        bits,
+        (rows, columns // WORD_BITS),
+        np.left_shift(np.uint64(1), (columns % WORD_BITS).astype(np.uint64)),
+    )
+
+
+class AvoidFilteredCatalog:
+    """Catalog wrapper that drops products containing avoided ingredients.
+
+    Each product lookup over-fetches ``overfetch`` times the requested
+    number of candidates, removes those whose row intersects ``mask`` and
+    returns the first ``limit`` survivors. Other attributes pass through.
+    """
+
+    def __init__(
+        self,
+        catalog,
+        matrix: ProductIngredientMatrix,
+        mask: np.ndarray,
+        overfetch: int = AVOID_OVERFETCH,
+    ):
+        self._catalog = catalog
+        self._matrix = matrix
+        self._mask = mask
+        self._overfetch = overfetch
+
+    def __getattr__(self, name):
+        return getattr(self._catalog, name)
+
+    def allowed(self, products: List, limit: Optional[int] = None) -> List:
+        """``products`` without the avoided ones, at most ``limit`` of them."""
+        if not products:
+            return []
+        avoided = self._matrix.containing_any(
+            [p.product_id for p in products], self._mask
+        )
+        kept = [p for p, bad in zip(products, avoided) if not bad]
+        return kept if limit is None else kept[:limit]
+
+    def skin_type_products(self, skin_type: str, min_rank: float, limit: int) -> List:
+        """Skin-type lookup without avoided products."""
+        return self.allowed(
+            self._catalog.skin_type_products(
+                skin_type, min_rank, limit * self._overfetch
+            ),
+            limit,
+        )
+
+    def category_products(
+        self, categories: Iterable[str], min_rank: float, limit: int
+    ) -> List:
+        """Concern-category lookup without avoided products."""
+        return self.allowed(
+            self._catalog.category_products(
+                categories, min_rank, limit * self._overfetch
+            ),
+            limit,
+        )
+
+    def top_rated_products(self, min_rank: float, limit: int) -> List:
+        """Top-rated lookup without avoided products."""
+        return self.allowed(
+            self._catalog.top_rated_products(min_rank, limit * self._overfetch),
+            limit,
+        )
+
+
+_ingredient_matrix: CatalogCache[ProductIngredientMatrix] = CatalogCache(
+    ProductIngredientMatrix.from_session,
+    name="product ingredient matrix",
+    refresher=lambda matrix, db_session: matrix.refreshed(db_session),
+)
+
+
+def get_ingredient_matrix(db_session: Session) -> ProductIngredientMatrix:
+    """Return the shared matrix, extending or rebuilding it if needed."""
+    return _ingredient_matrix.get(db_session)
+
+
+def reload_ingredient_matrix(
+    db_session: Session | None = None,
+) -> ProductIngredientMatrix:
+    """Rebuild the shared matrix from scratch now."""
+    return _ingredient_matrix.reload(db_session)
+
+
+def clear_ingredient_matrix() -> None:
+    """Drop the shared matrix."""
+    _ingredient_matrix.clear()
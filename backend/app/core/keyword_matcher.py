@@ -0,0 +1,68 @@
+"""Aho-Corasick multi-pattern matcher for query keyword extraction.
+
+The automaton is built once from the whole keyword vocabulary. Matching
+walks the text a single time and reports every keyword occurrence,
+including overlapping ones, so the cost of a lookup grows with the length
+of the text and the number of hits, not with the size of the vocabulary.
+"""
+
+from collections import deque
+from typing import Dict, FrozenSet, Hashable, Iterable, List, Set, Tuple
+
+
+class KeywordMatcher:
+    """Finds which labelled keywords occur as substrings of a text.
+
+    Build it from ``(keyword, label)`` pairs; a keyword may carry several
+    labels and several keywords may share one. Matching is case-sensitive,
+    so callers lowercase both the vocabulary and the text.
+    """
+
+    def __init__(self, vocabulary: Iterable[Tuple[str, Hashable]]):
+        self._goto: List[Dict[str, int]] = [{}]
+        self._fail: List[int] = [0]
+        outputs: List[Set[Hashable]] = [set()]
+
+        for keyword, label in vocabulary:
+            if not keyword:
+                continue
+            state = 0
+            for char in keyword:
+                next_state = self._goto[state].get(char)
+                if next_state is None:
+                    next_state = len(self._goto)
+                    self._goto[state][char] = next_state
+                    self._goto.append({})
+                    self._fail.append(0)
+                    outputs.append(set())
+                state = next_state
+            outputs[state].add(label)
+
+        # Breadth-first pass sets failure links and folds in the outputs of
+        # every keyword that ends inside a longer one
+        queue = deque(self._goto[0].values())
+        while queue:
+            state = queue.popleft()
+            for char, next_state in self._goto[state].items():
+                queue.append(next_state)
+                fallback = self._fail[state]
+                while fallback and char not in self._goto[fallback]:
+                    fallback = self._fail[fallback]
+                target = self._goto[fallback].get(char, 0)
+                self._fail[next_state] = target if target != next_state else 0
+                outputs[next_state] |= outputs[self._fail[next_state]]
+
+        self._outputs: List[FrozenSet[Hashable]] = [frozenset(o) for o in outputs]
+
+    def labels(self, text: str) -> Set[Hashable]:
+        """Labels of every keyword that occurs anywhere in ``text``."""
+        goto, fail, outputs = self._goto, self._fail, self._outputs
+        found: Set[Hashable] = set()
+        state = 0
+        for char in text:
+            while state and char not in goto[state]:
+                state = fail[state]
+            state = goto[state].get(char, 0)
+            if outputs[state]:
+                found |= outputs[state]
+        return found
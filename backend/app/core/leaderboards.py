@@ -0,0 +1,157 @@
+"""Precomputed top-ranked product lists.
+
+The "sql" retrieval backend sorts products by rank on every request, joining
+through ``product_skin_types`` for the skin-type lookup. The seed scripts
+instead materialize the ``LEADERBOARD_DEPTH`` best ranked products of every
+skin type, every category and the whole catalog into ``product_leaderboards``.
+The boards are replaced in the same transaction that loads the catalog, so
+readers see either the old boards or the new ones, never a mix. Retrieval
+(``RETRIEVAL_MODE=leaderboard``) then reads a primary-key range per board.
+"""
+
+import logging
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+from sqlalchemy import delete, insert, select
+from sqlalchemy.orm import Session
+
+from app.db.models import (
+    Product,
+    ProductLeaderboard,
+    SkinType,
+    product_skin_types_table,
+)
+from .catalog_version import CatalogCache
+from .config import settings
+
+logger = logging.getLogger(__name__)
+
+GLOBAL_BOARD = "global"
+SKIN_TYPE_PREFIX = "skin_type:"
+CATEGORY_PREFIX = "category:"
+
+
+def skin_type_board(type_name: str) -> str:
+    """Board of the products suitable for ``type_name``."""
+    return f"{SKIN_TYPE_PREFIX}{type_name}"
+
+
+def category_board(category: str) -> str:
+    """Board of the products in ``category``."""
+    return f"{CATEGORY_PREFIX}{category}"
+
+
+def leaderboard_entries(db, depth: int) -> List[Dict]:
+    """Rows of every board, each at most ``depth`` long.
+
+    ``db`` is a session or connection. Unranked products are left out, as
+    the retrieval lookups never return them.
+    """
+    skin_types: Dict[int, List[str]] = {}
+    for product_id, type_name in db.execute(
+        select(product_skin_types_table.c.product_id, SkinType.type_name)
+        .join(SkinType)
+        .order_by(SkinType.skin_type_id)
+    ):
+        skin_types.setdefault(product_id, []).append(type_name)
+
+    boards: Dict[str, List[Dict]] = {}
+    products = db.execute(
+        select(Product.product_id, Product.category, Product.rank)
+        .where(Product.rank.isnot(None))
+        .order_by(Product.rank.desc(), Product.product_id)
+    )
+    for product_id, category, rank in products:
+        keys = [GLOBAL_BOARD]
+        if category:
+            keys.append(category_board(category))
+        keys.extend(skin_type_board(name) for name in skin_types.get(product_id, ()))
+        for key in keys:
+            entries = boards.setdefault(key, [])
+            if len(entries) < depth:
+                entries.append(
+                    {
+                        "board": key,
+                        "position": len(entries),
+                        "product_id": product_id,
+                        "rank": rank,
+                    }
+                )
+    return [entry for entries in boards.values() for entry in entries]
+
+
+def rebuild_leaderboards(db, depth: Optional[int] = None) -> int:
+    """Replace every board with ones computed from the current catalog.
+
+    Runs inside the caller's transaction and does not commit, so the new
+    boards become visible together with the catalog change that caused
+    them. Returns the number of entries written.
+    """
+    depth = settings.LEADERBOARD_DEPTH if depth is None else depth
+    entries = leaderboard_entries(db, depth)
+    db.execute(delete(ProductLeaderboard))
+    if entries:
+        db.execute(insert(ProductLeaderboard), entries)
+    logger.info("Rebuilt leaderboards: %d entries", len(entries))
+    return len(entries)
+
+
+def matching_boards(
+    boards: Iterable[str], prefix: str, needles: Iterable[str]
+) -> List[str]:
+    """Boards under ``prefix`` whose name contains any of ``needles``.
+
+    Matches case-insensitively, like the ``ILIKE`` filters of the SQL lookups.
+    """
+    needles = [needle.lower() for needle in needles]
+    return [
+        board
+        for board in boards
+        if board.startswith(prefix)
+        and any(needle in board[len(prefix) :].lower() for needle in needles)
+    ]
+
+
+def leaderboard_product_ids(
+    db_session: Session, boards: Sequence[str], min_rank: float, limit: int
+) -> List[int]:
+    """Ids of the ``limit`` best products across ``boards`` ranked ``min_rank``+.
+
+    Each board contributes at most its first ``limit`` positions, so this is
+    a primary-key range read; boards are merged in ``rank DESC, product_id``
+    order without duplicates.
+    """
+    if not boards or limit <= 0:
+        return []
+    rows = db_session.execute(
+        select(ProductLeaderboard.product_id, ProductLeaderboard.rank).where(
+            ProductLeaderboard.board.in_(boards),
+            ProductLeaderboard.position < limit,
+            ProductLeaderboard.rank >= min_rank,
+        )
+    ).all()
+    merged = sorted(set(rows), key=lambda row: (-row.rank, row.product_id))
+    return [product_id for product_id, _ in merged[:limit]]
+
+
+def _board_names(db_session: Session) -> Tuple[str, ...]:
+    return tuple(
+        db_session.scalars(
+            select(ProductLeaderboard.board).distinct().order_by(ProductLeaderboard.board)
+        )
+    )
+
+
+_board_names_cache: CatalogCache[Tuple[str, ...]] = CatalogCache(
+    _board_names, name="leaderboard names"
+)
+
+
+def get_leaderboard_names(db_session: Session) -> Tuple[str, ...]:
+    """Names of the built boards, cached until the catalog version changes."""
+    return _board_names_cache.get(db_session)
+
+
+def clear_leaderboard_names() -> None:
+    """Drop the cached board names; mainly for tests."""
+    _board_names_cache.clear()
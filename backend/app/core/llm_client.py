@@ -0,0 +1,98 @@
+"""Pooled HTTP client for OpenRouter calls.
+
+Opening an ``httpx.AsyncClient`` per request pays for DNS, TCP connect and
+the TLS handshake on every answer. Instead one client is opened in the
+application lifespan and every LLM call borrows a pooled keep-alive
+connection from it. An ``httpx.AsyncClient`` belongs to the event loop it
+was first used on, so calls from any other loop (``generate_answer_sync``,
+scripts, tests) fall back to a short-lived client of their own.
+"""
+
+import asyncio
+import logging
+from contextlib import asynccontextmanager
+from typing import AsyncIterator, Optional
+
+import httpx
+
+from .config import settings
+
+logger = logging.getLogger(__name__)
+
+_client: Optional[httpx.AsyncClient] = None
+_client_loop: Optional[asyncio.AbstractEventLoop] = None
+
+
+def _http2_enabled() -> bool:
+    """``LLM_HTTP2``, unless the optional ``h2`` package is missing."""
+    if not settings.LLM_HTTP2:
+        return False
+    try:
+        import h2  # pylint: disable=import-outside-toplevel,unused-import
+    except ImportError:
+        logger.warning("LLM_HTTP2 needs the h2 package (httpx[http2]); using HTTP/1.1")
+        return False
+    return True
+
+
+def create_llm_client(
+    transport: Optional[httpx.AsyncBaseTransport] = None,
+) -> httpx.AsyncClient:
+    """New client with the configured pool limits, keep-alive and timeouts."""
+    return httpx.AsyncClient(
+        http2=_http2_enabled(),
+        limits=httpx.Limits(
+            max_connections=settings.LLM_MAX_CONNECTIONS,
+            max_keepalive_connections=settings.LLM_MAX_KEEPALIVE_CONNECTIONS,
+            keepalive_expiry=settings.LLM_KEEPALIVE_EXPIRY,
+        ),
+        timeout=httpx.Timeout(
+            connect=settings.LLM_CONNECT_TIMEOUT,
+            read=settings.LLM_READ_TIMEOUT,
+            write=settings.LLM_WRITE_TIMEOUT,
+            pool=settings.LLM_POOL_TIMEOUT,
+        ),
+        transport=transport,
+    )
+
+
+async def open_llm_client(
+    transport: Optional[httpx.AsyncBaseTransport] = None,
+) -> httpx.AsyncClient:
+    """
+    Open the shared client on the running loop, e.g. on application startup
+    """
+    global _client, _client_loop  # pylint: disable=global-statement
+    await close_llm_client()
+    _client = create_llm_client(transport)
+    _client_loop = asyncio.get_running_loop()
+    return _client
+
+
+async def close_llm_client() -> None:
+    """
+    Close the shared client and its pooled connections, e.g. on shutdown
+    """
+    global _client, _client_loop  # pylint: disable=global-statement
+    client = _client
+    _client = None
+    _client_loop = None
+    if client is not None:
+        await client.aclose()
+
+
+@asynccontextmanager
+async def llm_client() -> AsyncIterator[httpx.AsyncClient]:
+    """
+    The shared client when it is open on this loop, else a temporary one
+    """
+    client = _client
+    if (
+        client is not None
+        and not client.is_closed
+        and _client_loop is asyncio.get_running_loop()
+    ):
+        yield client
+        return
+    async with create_llm_client() as temporary:
+        yield temporary
@@ -0,0 +1,295 @@
+"""Admission control for OpenRouter calls.
+
+The free OpenRouter models answer 429 once a shared rate limit is hit, and
+sending more requests at them only prolongs the error storm. Every upstream
+call therefore waits for admission from an ``AdaptiveLimiter``:
+
+- at most ``max_in_flight`` calls hold a slot at once, and callers queue
+  for a slot in arrival order;
+- a token bucket paces how fast admitted calls start. Its rate adapts by
+  AIMD: each answered call adds ``increase`` requests per second, and a 429
+  multiplies the rate by ``decrease``;
+- a 429's ``Retry-After`` pauses every call until it has passed;
+- a caller waits at most ``max_wait`` seconds in all, after which it gets
+  a ``QueueTimeout`` instead of a slot.
+"""
+
+import asyncio
+import time
+import weakref
+from collections import deque
+from contextlib import asynccontextmanager
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
+from typing import Any, AsyncIterator, Callable, Dict, Optional
+
+from .config import settings
+
+# Waits kept for the wait-time percentiles in ``stats``
+_RECENT_WAITS = 1000
+
+
+class QueueTimeout(TimeoutError):
+    """No upstream call could start within the maximum queue wait."""
+
+
+class Ticket:
+    """Admission to one upstream call.
+
+    Report the response with ``succeeded`` or ``throttled`` before leaving
+    the slot; calls that report neither (other errors) leave the rate as is.
+    """
+
+    __slots__ = ("admitted_at", "outcome", "retry_after")
+
+    def __init__(self, admitted_at: float):
+        self.admitted_at = admitted_at
+        self.outcome: Optional[str] = None
+        self.retry_after: Optional[float] = None
+
+    def succeeded(self) -> None:
+        """The call was answered."""
+        self.outcome = "ok"
+
+    def throttled(self, retry_after: Optional[float] = None) -> None:
+        """The call got a 429, optionally asking to wait ``retry_after`` seconds."""
+        self.outcome = "throttled"
+        self.retry_after = retry_after
+
+
+# pylint: disable=too-many-instance-attributes
+class AdaptiveLimiter:
+    """Concurrency cap, queue and AIMD-paced token bucket for one event loop."""
+
+    # pylint: disable=too-many-arguments
+    def __init__(
+        self,
+        max_in_flight: int,
+        rate: float,
+        burst: int,
+        min_rate: float,
+        max_rate: float,
+        increase: float,
+        decrease: float,
+        max_wait: float,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        self.max_in_flight = max(max_in_flight, 1)
+        self.min_rate = min_rate
+        self.max_rate = max(max_rate, min_rate)
+        self.rate = min(max(rate, self.min_rate), self.max_rate)
+        self.burst = max(burst, 1)
+        self.increase = increase
+        self.decrease = decrease
+        self.max_wait = max_wait
+        self._clock = clock
+        self._tokens = float(self.burst)
+        self._refilled_at = clock()
+        self._paused_until = 0.0
+        self._last_decrease = float("-inf")
+        self._slot_waiters: "deque[asyncio.Future]" = deque()
+        self._waits: "deque[float]" = deque(maxlen=_RECENT_WAITS)
+        self.in_flight = 0
+        self.queue_depth = 0
+        self.max_queue_depth = 0
+        self.admitted = 0
+        self.timeouts = 0
+        self.throttles = 0
+        self.rate_decreases = 0
+
+    @asynccontextmanager
+    async def slot(self) -> AsyncIterator[Ticket]:
+        """Hold an upstream slot for the duration of the block."""
+        ticket = await self.acquire()
+        try:
+            yield ticket
+        finally:
+            self.release(ticket)
+
+    async def acquire(self) -> Ticket:
+        """Wait for a slot and a token; raises ``QueueTimeout`` past ``max_wait``."""
+        start = self._clock()
+        deadline = start + self.max_wait
+        self.queue_depth += 1
+        self.max_queue_depth = max(self.max_queue_depth, self.queue_depth)
+        try:
+            await self._take_slot(deadline)
+            try:
+                await self._take_token(deadline)
+            except BaseException:
+                self._hand_on_slot()
+                raise
+        except QueueTimeout:
+            self.timeouts += 1
+            raise
+        finally:
+            self.queue_depth -= 1
+        now = self._clock()
+        self._waits.append(now - start)
+        self.admitted += 1
+        return Ticket(now)
+
+    def release(self, ticket: Ticket) -> None:
+        """Give the slot back and adapt the rate to how the call went."""
+        if ticket.outcome == "ok":
+            self.rate = min(self.max_rate, self.rate + self.increase)
+        elif ticket.outcome == "throttled":
+            self._on_throttled(ticket)
+        self._hand_on_slot()
+
+    def _on_throttled(self, ticket: Ticket) -> None:
+        self.throttles += 1
+        now = self._clock()
+        if ticket.retry_after is not None:
+            self._paused_until = max(self._paused_until, now + ticket.retry_after)
+        # A burst of calls admitted before the last decrease were all sent at
+        # the old rate; count their 429s as one signal, not many
+        if ticket.admitted_at >= self._last_decrease:
+            self._refill(now)
+            self.rate = max(self.min_rate, self.rate * self.decrease)
+            self._tokens = min(self._tokens, 0.0)
+            self._last_decrease = now
+            self.rate_decreases += 1
+
+    async def _take_slot(self, deadline: float) -> None:
+        if self.in_flight < self.max_in_flight and not self._slot_waiters:
+            self.in_flight += 1
+            return
+        loop = asyncio.get_running_loop()
+        waiter = loop.create_future()
+        self._slot_waiters.append(waiter)
+        timer = loop.call_later(max(deadline - self._clock(), 0.0), _expire, waiter)
+        try:
+            # A granted waiter inherits the releasing call's slot
+            await waiter
+        except asyncio.CancelledError:
+            if waiter.done() and not waiter.cancelled():
+                # Granted just as the caller was cancelled; pass the slot on
+                self._hand_on_slot()
+            raise
+        finally:
+            timer.cancel()
+            # Granted waiters were already popped; drop expired or cancelled
+            # ones so they do not hold up later callers
+            try:
+                self._slot_waiters.remove(waiter)
+            except ValueError:
+                pass
+
+    def _hand_on_slot(self) -> None:
+        """Grant the slot to the next waiter, or free it."""
+        while self._slot_waiters:
+            waiter = self._slot_waiters.popleft()
+            if not waiter.done():
+                waiter.set_result(None)
+                return
+        self.in_flight -= 1
+
+    async def _take_token(self, deadline: float) -> None:
+        now = self._clock()
+        self._refill(now)
+        self._tokens -= 1
+        # A negative balance is the reservations ahead of this one
+        ready_at = now + max(-self._tokens, 0.0) / self.rate
+        try:
+            while True:
+                # A 429 while waiting pushes the start back further
+                ready_at = max(ready_at, self._paused_until)
+                if ready_at > deadline:
+                    raise QueueTimeout(
+                        f"No upstream slot within {self.max_wait:g} seconds"
+                    )
+                now = self._clock()
+                if ready_at <= now:
+                    return
+                await asyncio.sleep(ready_at - now)
+        except BaseException:
+            self._tokens += 1
+            raise
+
+    def _refill(self, now: float) -> None:
+        elapsed = max(now - self._refilled_at, 0.0)
+        self._tokens = min(float(self.burst), self._tokens + elapsed * self.rate)
+        self._refilled_at = now
+
+    def stats(self) -> Dict[str, Any]:
+        """Counters for monitoring; wait times are in milliseconds."""
+        waits = sorted(self._waits)
+
+        def percentile(q: float) -> float:
+            if not waits:
+                return 0.0
+            return round(waits[min(int(q * len(waits)), len(waits) - 1)] * 1000, 3)
+
+        return {
+            "rate": round(self.rate, 4),
+            "in_flight": self.in_flight,
+            "max_in_flight": self.max_in_flight,
+            "queue_depth": self.queue_depth,
+            "max_queue_depth": self.max_queue_depth,
+            "admitted": self.admitted,
+            "timeouts": self.timeouts,
+            "throttles": self.throttles,
+            "rate_decreases": self.rate_decreases,
+            "paused_for": round(max(self._paused_until - self._clock(), 0.0), 3),
+            "wait_ms_p50": percentile(0.5),
+            "wait_ms_p95": percentile(0.95),
+            "wait_ms_max": round(waits[-1] * 1000, 3) if waits else 0.0,
+        }
+
+
+def parse_retry_after(value: Optional[str]) -> Optional[float]:
+    """Seconds to wait from a ``Retry-After`` header (delay or HTTP date)."""
+    if not value:
+        return None
+    value = value.strip()
+    try:
+        return max(float(value), 0.0)
+    except ValueError:
+        pass
+    try:
+        when = parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    if when.tzinfo is None:
+        when = when.replace(tzinfo=timezone.utc)
+    return max((when - datetime.now(timezone.utc)).total_seconds(), 0.0)
+
+
+def _expire(waiter: asyncio.Future) -> None:
+    if not waiter.done():
+        waiter.set_exception(QueueTimeout("No upstream slot came free in time"))
+
+
+def create_llm_limiter() -> AdaptiveLimiter:
+    """New limiter from the LLM_* rate limit settings."""
+    return AdaptiveLimiter(
+        max_in_flight=settings.LLM_MAX_IN_FLIGHT,
+        rate=settings.LLM_RATE,
+        burst=settings.LLM_BURST,
+        min_rate=settings.LLM_MIN_RATE,
+        max_rate=settings.LLM_MAX_RATE,
+        increase=settings.LLM_RATE_INCREASE,
+        decrease=settings.LLM_RATE_DECREASE,
+        max_wait=settings.LLM_QUEUE_TIMEOUT,
+    )
+
+
+# Futures and sleeps belong to one event loop, so each loop gets its own
+_limiters: "weakref.WeakKeyDictionary" = weakref.WeakKeyDictionary()
+
+
+def get_llm_limiter() -> AdaptiveLimiter:
+    """
+    The limiter of the running event loop, created from settings on first use
+    """
+    loop = asyncio.get_running_loop()
+    limiter = _limiters.get(loop)
+    if limiter is None:
+        limiter = _limiters[loop] = create_llm_limiter()
+    return limiter
+
+
+def llm_limiter_stats() -> Dict[str, Any]:
+    """Counters of the running loop's limiter; call it from a coroutine."""
+    return get_llm_limiter().stats()
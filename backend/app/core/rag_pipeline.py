@@ -1,21 +1,31 @@
 """Orchestration pipeline that retrieves, composes, and generates responses.
 
-This module coordinates SQL-backed retrieval, optional reranking, context
+This module coordinates SQL-backed retrieval, feature-based reranking, context
 composition, and LLM generation to produce personalized skincare
-recommendations consumed by the API endpoints.
+recommendations consumed by the API endpoints. Concurrent identical
+``run_pipeline`` calls share one run.
 """
 
-from typing import List, Dict
+from typing import AsyncIterator, List, Dict, Tuple
+import json
 import logging
 import asyncio
+from contextlib import aclosing
 
-from .generate import generate_answer
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from .generate import generate_answer, stream_answer
 from .compose import compose_context
-from .hybrid_retrieve import sql_retrieve
+from .config import settings
+from .hybrid_retrieve import async_retrieve_results, retrieve_results
 from .prompts import build_qa_prompt
+from .rerank import rerank
+from .single_flight import SingleFlight
 
 logger = logging.getLogger(__name__)
 
+_pipeline_flights = SingleFlight("pipeline")
+
 
 async def run_pipeline(
     question: str,
@@ -23,46 +33,81 @@ async def run_pipeline(
     intake_data: Dict = None,
     concern: str | None = None,
     k: int = 8,
+    use_cache: bool = True,
 ) -> dict:
     """Run SQL-backed retrieval pipeline with intake form integration.
 
     Args:
         question: User's natural language question
-        db_session: Database session
+        db_session: Database session; an ``AsyncSession`` keeps retrieval
+            from blocking the event loop
         intake_data: User's intake form responses
         concern: Additional concern parameter
         k: Number of results to retrieve
+        use_cache: False skips the LLM answer cache lookup and runs
+            without joining identical in-flight calls
 
     Returns:
         Complete skincare recommendation with personalized context
-    """
-    try:
-        logger.info("Starting retrieval pipeline for query: %s...", question[:50])
 
-        # SQL-backed retrieval with intake data
-        results = sql_retrieve(
-            db_session=db_session,
-            query=question,
-            intake_data=intake_data,
-            concern=concern,
-            k=k,
+    Calls made while an identical one (same question, intake, concern and
+    k) is running await its response instead of retrieving and generating
+    again; ``use_cache=False`` calls always run on their own.
+    """
+    if not use_cache:
+        return await _pipeline_response(
+            question, db_session, intake_data, concern, k, use_cache=False
         )
+    key = (
+        question,
+        json.dumps(intake_data, sort_keys=True, default=str),
+        concern,
+        k,
+    )
+    response = await _pipeline_flights.run(
+        key,
+        lambda: _shared_pipeline_response(
+            question, db_session, intake_data, concern, k
+        ),
+    )
+    # Followers share the leader's response; give each caller its own dict
+    return dict(response)
 
-        if not results:
-            logger.warning("No results retrieved for query")
-            return _create_fallback_response(question, intake_data)
 
-        logger.info("Retrieved %d results", len(results))
+async def _shared_pipeline_response(
+    question: str,
+    db_session,
+    intake_data: Dict = None,
+    concern: str | None = None,
+    k: int = 8,
+) -> dict:
+    """``_pipeline_response`` for a coalesced run, on a session of its own.
 
-        # No reranker: use retrieval order directly
-        ordered_results = results
+    The run outlives any caller that is cancelled, and that caller's request
+    session is closed when it goes, so an async session is replaced by a new
+    one on the same engine.
+    """
+    if isinstance(db_session, AsyncSession) and db_session.bind is not None:
+        async with AsyncSession(db_session.bind) as session:
+            return await _pipeline_response(question, session, intake_data, concern, k)
+    return await _pipeline_response(question, db_session, intake_data, concern, k)
 
-        # Context composition with intake data
-        composed = compose_context(
-            results=ordered_results,
-            token_budget=500,  # Increased budget for richer context
-            intake_data=intake_data,
+
+async def _pipeline_response(
+    question: str,
+    db_session=None,
+    intake_data: Dict = None,
+    concern: str | None = None,
+    k: int = 8,
+    use_cache: bool = True,
+) -> dict:
+    """Retrieve, compose and generate the response of one ``run_pipeline``."""
+    try:
+        composed = await _retrieve_and_compose(
+            question, db_session, intake_data, concern, k
         )
+        if composed is None:
+            return _create_fallback_response(question, intake_data)
 
         try:
             prompt = build_qa_prompt(question, composed["summary"], intake_data)
@@ -71,6 +116,7 @@ async def run_pipeline(
                 composed["summary"],
                 intake_data=intake_data,
                 prompt=prompt,
+                use_cache=use_cache,
             )
             logger.info("Successfully generated answer using LLM")
         except asyncio.CancelledError as e:
@@ -89,8 +135,7 @@ async def run_pipeline(
             "user_profile": composed.get("user_profile", ""),
             "citations": composed["citations"],
             "used_results": composed["used_results"],
-            "recommendation_confidence": _calculate_confidence(results, intake_data),
-            "routine_suggestion": _extract_routine_from_context(composed["summary"]),
+            **_closing_fields(composed, intake_data),
         }
 
         logger.info("Retrieval pipeline completed successfully")
@@ -101,6 +146,149 @@ async def run_pipeline(
         return _create_error_response(question, intake_data, str(e))
 
 
+async def stream_pipeline(
+    question: str,
+    db_session=None,
+    intake_data: Dict = None,
+    concern: str | None = None,
+    k: int = 8,
+    use_cache: bool = True,
+) -> AsyncIterator[Tuple[str, Dict]]:
+    """Streaming variant of ``run_pipeline`` yielding ``(event, data)`` pairs.
+
+    Events come in this order:
+    - ``context``: ``context_summary``, ``user_profile`` and ``citations``,
+      as soon as retrieval is done
+    - ``delta``: ``{"text": ...}`` for each piece of the answer as the LLM
+      generates it
+    - ``done``: the full ``answer``, ``recommendation_confidence`` and
+      ``routine_suggestion``
+
+    Retrieval runs before the first event is yielded, so a caller can take
+    that event while its database session is still open. Fallback and
+    error answers arrive as a single delta.
+    """
+    response = None
+    try:
+        composed = await _retrieve_and_compose(
+            question, db_session, intake_data, concern, k
+        )
+        if composed is None:
+            response = _create_fallback_response(question, intake_data)
+    except (RuntimeError, ValueError, ConnectionError, OSError) as e:
+        logger.error("Retrieval pipeline failed: %s", e, exc_info=True)
+        response = _create_error_response(question, intake_data, str(e))
+
+    if response is not None:
+        yield "context", {
+            "context_summary": response["context_summary"],
+            "user_profile": response["user_profile"],
+            "citations": response["citations"],
+        }
+        yield "delta", {"text": response["answer"]}
+        yield "done", {
+            "answer": response["answer"],
+            "recommendation_confidence": response["recommendation_confidence"],
+            "routine_suggestion": response["routine_suggestion"],
+        }
+        return
+
+    yield "context", {
+        "context_summary": composed["summary"],
+        "user_profile": composed.get("user_profile", ""),
+        "citations": composed["citations"],
+    }
+
+    pieces: List[str] = []
+    try:
+        prompt = build_qa_prompt(question, composed["summary"], intake_data)
+        async with aclosing(
+            stream_answer(
+                question,
+                composed["summary"],
+                intake_data=intake_data,
+                prompt=prompt,
+                use_cache=use_cache,
+            )
+        ) as texts:
+            async for text in texts:
+                pieces.append(text)
+                yield "delta", {"text": text}
+        logger.info("Successfully streamed answer using LLM")
+    except asyncio.CancelledError:
+        # The client went away; leaving the aclosing block closed the upstream
+        logger.info("Answer streaming cancelled after %d pieces", len(pieces))
+        raise
+    except (TimeoutError, RuntimeError, ConnectionError, ValueError) as e:
+        logger.error("Answer streaming failed: %s", e)
+        if not pieces:
+            # Nothing was sent yet, so the manual answer can stand in
+            pieces.append(_create_manual_response(composed, intake_data))
+            yield "delta", {"text": pieces[0]}
+
+    yield "done", {"answer": "".join(pieces), **_closing_fields(composed, intake_data)}
+
+
+async def _retrieve_and_compose(
+    question: str,
+    db_session,
+    intake_data: Dict = None,
+    concern: str | None = None,
+    k: int = 8,
+) -> Dict | None:
+    """Retrieve, rerank and compose the LLM context; None if nothing matched."""
+    logger.info("Starting retrieval pipeline for query: %s...", question[:50])
+
+    # Over-fetch candidates so the reranker has something to choose from
+    fetch_k = max(k, settings.RERANK_CANDIDATES) if settings.RERANK_ENABLED else k
+
+    # SQL-backed retrieval with intake data
+    if isinstance(db_session, AsyncSession):
+        results = await async_retrieve_results(
+            db_session=db_session,
+            query=question,
+            intake_data=intake_data,
+            concern=concern,
+            k=fetch_k,
+        )
+    else:
+        results = retrieve_results(
+            db_session=db_session,
+            query=question,
+            intake_data=intake_data,
+            concern=concern,
+            k=fetch_k,
+        )
+
+    if not results:
+        logger.warning("No results retrieved for query")
+        return None
+
+    logger.info("Retrieved %d results", len(results))
+
+    if settings.RERANK_ENABLED:
+        ordered_results = rerank(question, results, k)
+    else:
+        ordered_results = results.truncated(k)
+
+    # Context composition with intake data
+    return compose_context(
+        results=ordered_results,
+        token_budget=500,  # Increased budget for richer context
+        intake_data=intake_data,
+    )
+
+
+def _closing_fields(composed: Dict, intake_data: Dict = None) -> Dict:
+    """Confidence and routine fields derived from the composed context."""
+    return {
+        "recommendation_confidence": _calculate_confidence(
+            composed["used_results"], intake_data
+        ),
+        "routine_suggestion": _extract_routine_from_context(composed["summary"]),
+    }
+
+
 def _create_fallback_response(question: str, intake_data: Dict = None) -> dict:
     """Create a helpful fallback response when no products are found."""
     profile_text = ""
@@ -0,0 +1,245 @@
+"""Feature-based reranking of retrieved products.
+
+Retrieval assigns each product a fixed score per lookup (skin type, concern,
+top rated), so the order it returns says little about how well a product
+fits a particular user. ``run_pipeline`` therefore over-fetches candidates
+and reranks them here: every product gets a feature vector (retrieval score,
+rating, skin-type and category match, beneficial-ingredient overlap, avoid
+ingredient hits and query-term overlap), and all candidates are scored with
+one matrix-vector product against configurable weights.
+
+Retrieval computes the product signals while it still has the product
+objects at hand (see ``ProductSignals``); the reranker only reads them from
+the result metadata. Reranking has a strict latency budget: if it is
+exhausted the retrieval order is kept.
+"""
+
+import dataclasses
+import logging
+import re
+import threading
+import time
+from typing import Dict, Iterable, Iterator, List, Mapping, Optional
+
+import numpy as np
+
+from .bm25_index import parse_query
+from .config import settings
+from .keyword_matcher import KeywordMatcher
+from .results import ResultSet, RetrievalResult
+
+logger = logging.getLogger(__name__)
+
+FEATURES = (
+    "retrieval_score",
+    "rating",
+    "skin_type_match",
+    "category_match",
+    "beneficial_overlap",
+    "avoid_hits",
+    "query_overlap",
+)
+
+# Positive weights sum to 1, so a product scores in [0, 1] before the
+# avoid-ingredient penalty, which keeps confidence calculations meaningful
+DEFAULT_WEIGHTS = {
+    "retrieval_score": 0.15,
+    "rating": 0.2,
+    "skin_type_match": 0.2,
+    "category_match": 0.1,
+    "beneficial_overlap": 0.15,
+    "avoid_hits": -0.3,
+    "query_overlap": 0.2,
+}
+
+# Beneficial ingredient hits at which the overlap feature saturates
+BENEFICIAL_SATURATION = 3
+
+
+def _name_matcher(names: Iterable[str]) -> KeywordMatcher:
+    return KeywordMatcher((name.lower(), name.lower()) for name in names)
+
+
+class ProductSignals:
+    """Computes the per-product reranking signals for one retrieval profile."""
+
+    def __init__(
+        self,
+        skin_type: Optional[str],
+        categories: Iterable[str],
+        beneficial_names: Iterable[str],
+        avoid_pattern: Optional[re.Pattern] = None,
+    ):
+        self._skin_type = skin_type.lower() if skin_type else None
+        self._categories = [c.lower() for c in categories]
+        self._beneficial = _name_matcher(beneficial_names)
+        self._avoid = avoid_pattern
+
+    def of(self, product) -> Dict:
+        """Signals of ``product`` to merge into its result metadata."""
+        # Newline-joined so no keyword can match across two ingredient names
+        ingredients = "\n".join(i.inci_name for i in product.ingredients).lower()
+        category = (product.category or "").lower()
+        skin_type_match = bool(self._skin_type) and any(
+            self._skin_type in st.type_name.lower() for st in product.skin_types
+        )
+        return {
+            "product_id": product.product_id,
+            "rank": product.rank,
+            "skin_type_match": skin_type_match,
+            "category_match": any(c in category for c in self._categories),
+            "beneficial_hits": len(self._beneficial.labels(ingredients)),
+            # Ingredients the avoid pattern finds a match in
+            "avoid_hits": (
+                sum(bool(self._avoid.search(i.inci_name)) for i in product.ingredients)
+                if self._avoid
+                else 0
+            ),
+        }
+
+
+class RerankStats:
+    """Thread-safe counters for the metrics endpoint."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.calls = 0
+        self.candidates = 0
+        self.budget_exceeded = 0
+        self.total_ms = 0.0
+        self.max_ms = 0.0
+
+    def record(self, n_candidates: int, elapsed_ms: float, exceeded: bool) -> None:
+        """Count one rerank call."""
+        with self._lock:
+            self.calls += 1
+            self.candidates += n_candidates
+            self.budget_exceeded += int(exceeded)
+            self.total_ms += elapsed_ms
+            self.max_ms = max(self.max_ms, elapsed_ms)
+
+    def snapshot(self) -> Dict:
+        """Counters for monitoring."""
+        with self._lock:
+            return {
+                "calls": self.calls,
+                "candidates": self.candidates,
+                "budget_exceeded": self.budget_exceeded,
+                "avg_ms": round(self.total_ms / self.calls, 4) if self.calls else 0.0,
+                "max_ms": round(self.max_ms, 4),
+            }
+
+
+_stats = RerankStats()
+
+
+def rerank_stats() -> Dict:
+    """Call, latency and budget counters of the reranker."""
+    return _stats.snapshot()
+
+
+def resolve_weights(overrides: Optional[Mapping[str, float]] = None) -> np.ndarray:
+    """Weight vector in ``FEATURES`` order, defaults overridden by settings."""
+    weights = dict(DEFAULT_WEIGHTS)
+    weights.update(settings.RERANK_WEIGHTS)
+    if overrides:
+        weights.update(overrides)
+    unknown = set(weights) - set(FEATURES)
+    if unknown:
+        raise ValueError(f"Unknown rerank features: {sorted(unknown)}")
+    return np.array([weights[name] for name in FEATURES], dtype=np.float32)
+
+
+def _feature_columns(
+    products: List[RetrievalResult], query: str
+) -> Iterator[List[float]]:
+    """Feature values of every candidate, one ``FEATURES`` column at a time."""
+    metas = [r.metadata for r in products]
+    yield [float(r.score) for r in products]
+    yield [float(m.get("rank") or 0.0) / 5.0 for m in metas]
+    yield [float(bool(m.get("skin_type_match"))) for m in metas]
+    yield [float(bool(m.get("category_match"))) for m in metas]
+    yield [
+        min(m.get("beneficial_hits", 0) / BENEFICIAL_SATURATION, 1.0) for m in metas
+    ]
+    yield [float(min(m.get("avoid_hits", 0), 1)) for m in metas]
+
+    # Substring containment rather than tokenizing every text: it is several
+    # times faster and lets "hydrat" style stems and plurals count as well
+    terms = set(parse_query(query)[0])
+    if not terms:
+        yield [0.0] * len(products)
+        return
+    yield [
+        sum(term in text for term in terms) / len(terms)
+        for text in (r.text.lower() for r in products)
+    ]
+
+
+# pylint: disable=too-many-locals
+def rerank(
+    query: str,
+    results: Iterable[RetrievalResult],
+    k: int,
+    weights: Optional[Mapping[str, float]] = None,
+    budget_ms: Optional[float] = None,
+) -> ResultSet:
+    """Reorder product results by weighted features and keep the best ``k``.
+
+    Ingredient notes are not reranked; they keep their retrieval order
+    after the products and always fit in the ``k`` results. Reranked
+    products get the weighted score (clipped to [0, 1]) as their ``score``
+    and the feature values in ``metadata["features"]``.
+
+    If extracting features takes longer than ``budget_ms`` (default
+    ``settings.RERANK_BUDGET_MS``), the retrieval order is returned
+    unchanged, truncated to ``k``.
+    """
+    start = time.perf_counter()
+    budget_ms = settings.RERANK_BUDGET_MS if budget_ms is None else budget_ms
+    deadline = start + budget_ms / 1000.0
+
+    results = list(results)
+    products = [r for r in results if r.is_product]
+    notes = [r for r in results if not r.is_product]
+    if not products:
+        return ResultSet(results[:k])
+    weight_vector = resolve_weights(weights)
+
+    features = np.empty((len(products), len(FEATURES)), dtype=np.float32)
+    for column, values in enumerate(_feature_columns(products, query)):
+        features[:, column] = values
+        if time.perf_counter() > deadline:
+            elapsed = (time.perf_counter() - start) * 1000
+            _stats.record(len(products), elapsed, exceeded=True)
+            logger.warning(
+                "Rerank budget of %.2f ms exceeded after %d of %d features",
+                budget_ms,
+                column + 1,
+                len(FEATURES),
+            )
+            return ResultSet(results[:k])
+
+    scores = features @ weight_vector
+    # Stable descending order keeps retrieval order among equal scores
+    order = np.argsort(-scores, kind="stable")
+
+    product_slots = max(k - len(notes), 0)
+    reranked = []
+    for i in order[:product_slots]:
+        product = products[i]
+        reranked.append(
+            dataclasses.replace(
+                product,
+                score=round(float(np.clip(scores[i], 0.0, 1.0)), 4),
+                metadata={
+                    **product.metadata,
+                    "retrieval_score": product.score,
+                    "features": dict(zip(FEATURES, np.round(features[i], 4).tolist())),
+                },
+            )
+        )
+
+    elapsed = (time.perf_counter() - start) * 1000
+    _stats.record(len(products), elapsed, exceeded=False)
+    return ResultSet((reranked + notes)[:k])
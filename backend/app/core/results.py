@@ -0,0 +1,165 @@
+"""Typed retrieval results.
+
+Retrieval builds ``RetrievalResult`` records with integer entity ids and a
+``MatchType`` instead of dicts keyed by strings like
+``"skintype_product_12"``. ``ResultSet`` collects them in order, rejects
+duplicates with a set lookup and files each record into its summary bucket
+as it is added, so neither retrieval nor context composition rescans the
+list. Records become the dict shape the API returns only at the boundary
+(``to_dict``).
+"""
+
+import copy
+from dataclasses import dataclass, field
+from enum import Enum
+from typing import Any, Dict, Iterable, Iterator, List, Tuple
+
+
+class MatchType(str, Enum):
+    """Why a result was retrieved."""
+
+    SKIN_TYPE = "skin_type"
+    CONCERN = "concern"
+    GENERAL = "general"
+    BENEFICIAL = "beneficial"
+    AVOID = "avoid"
+
+
+PRODUCT_MATCHES = frozenset({MatchType.SKIN_TYPE, MatchType.CONCERN, MatchType.GENERAL})
+
+_ID_PREFIXES = {
+    MatchType.SKIN_TYPE: "skintype_product",
+    MatchType.CONCERN: "concern_product",
+    MatchType.GENERAL: "general_product",
+    MatchType.BENEFICIAL: "ingredient",
+    MatchType.AVOID: "avoid_ingredient",
+}
+
+# Summary section each match type is listed under by compose_context
+BUCKETS = {
+    MatchType.SKIN_TYPE: "perfect_matches",
+    MatchType.CONCERN: "targeted_products",
+    MatchType.BENEFICIAL: "beneficial_ingredients",
+    MatchType.AVOID: "avoid_ingredients",
+}
+
+
+@dataclass(slots=True)
+class RetrievalResult:
+    """One retrieved product or ingredient note.
+
+    ``entity_id`` is a product id for product matches and an ingredient id
+    otherwise. ``metadata`` holds the extra fields (category, reranking
+    signals, ...) returned alongside the fixed ones.
+    """
+
+    entity_id: int
+    match_type: MatchType
+    text: str
+    score: float
+    metadata: Dict[str, Any] = field(default_factory=dict)
+
+    @property
+    def is_product(self) -> bool:
+        """Whether this result recommends a product."""
+        return self.match_type in PRODUCT_MATCHES
+
+    @property
+    def key(self) -> Tuple:
+        """Identity used for de-duplication.
+
+        A product is listed once whatever it matched; an ingredient may be
+        both a beneficial and an avoid note.
+        """
+        if self.is_product:
+            return ("product", self.entity_id)
+        return (self.match_type, self.entity_id)
+
+    @property
+    def id(self) -> str:  # pylint: disable=invalid-name
+        """String id used in citations, e.g. ``"skintype_product_12"``."""
+        return f"{_ID_PREFIXES[self.match_type]}_{self.entity_id}"
+
+    @property
+    def source_id(self) -> str:
+        """Table the result was retrieved from."""
+        return "products_db" if self.is_product else "ingredients_db"
+
+    def to_dict(self) -> Dict:
+        """The API's result dict: id, text, source_id, score and metadata."""
+        if self.is_product:
+            metadata = {"type": "product", "match_type": self.match_type.value}
+        else:
+            metadata = {
+                "type": "ingredient",
+                "beneficial": self.match_type is MatchType.BENEFICIAL,
+            }
+            if self.match_type is MatchType.AVOID:
+                metadata["avoid"] = True
+        metadata.update(copy.deepcopy(self.metadata))
+        return {
+            "id": self.id,
+            "text": self.text,
+            "source_id": self.source_id,
+            "score": self.score,
+            "metadata": metadata,
+        }
+
+
+class ResultSet:
+    """Ordered, de-duplicated results grouped into summary buckets.
+
+    Records are shared, not copied: treat them as read-only once added
+    (``dataclasses.replace`` makes a modified copy).
+    """
+
+    __slots__ = ("_results", "_keys", "groups")
+
+    def __init__(self, results: Iterable[RetrievalResult] = ()):
+        self._results: List[RetrievalResult] = []
+        self._keys: set = set()
+        self.groups: Dict[str, List[RetrievalResult]] = {
+            bucket: [] for bucket in BUCKETS.values()
+        }
+        for result in results:
+            self.add(result)
+
+    def __len__(self) -> int:
+        return len(self._results)
+
+    def __iter__(self) -> Iterator[RetrievalResult]:
+        return iter(self._results)
+
+    def __getitem__(self, index: int) -> RetrievalResult:
+        return self._results[index]
+
+    def __eq__(self, other) -> bool:
+        if not isinstance(other, ResultSet):
+            return NotImplemented
+        return self._results == other._results
+
+    def add(self, result: RetrievalResult) -> bool:
+        """Append ``result`` unless it is already present; True if added."""
+        key = result.key
+        if key in self._keys:
+            return False
+        self._keys.add(key)
+        self._results.append(result)
+        bucket = BUCKETS.get(result.match_type)
+        if bucket is not None:
+            self.groups[bucket].append(result)
+        return True
+
+    def has_product(self, product_id: int) -> bool:
+        """Whether the product was already added under any match type."""
+        return ("product", product_id) in self._keys
+
+    def truncated(self, k: int) -> "ResultSet":
+        """The first ``k`` results, or this set itself if it is no longer."""
+        if len(self._results) <= k:
+            return self
+        return ResultSet(self._results[:k])
+
+    def to_dicts(self) -> List[Dict]:
+        """Every result in the API's dict shape."""
+        return [result.to_dict() for result in self._results]
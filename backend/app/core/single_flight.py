@@ -0,0 +1,70 @@
+"""Coalescing of concurrent identical work.
+
+When a burst of requests asks for the same thing at once, only the first
+(the leader) starts the work; the others (followers) await the leader's
+result instead of repeating the retrieval queries and the LLM call. The
+work runs in a task of its own and every caller awaits it through
+``asyncio.shield``, so cancelling any one caller, the leader included,
+leaves the shared work running for the rest.
+"""
+
+import asyncio
+from functools import partial
+from typing import Any, Awaitable, Callable, Dict, Hashable, TypeVar
+
+T = TypeVar("T")
+
+_flights: Dict[str, "SingleFlight"] = {}
+
+
+class SingleFlight:
+    """Runs at most one task per key at a time and shares its outcome.
+
+    A key is only coalesced while its task is running; the next call after
+    it finishes starts fresh work. Tasks belong to the event loop that
+    started them, so flights on different loops never mix.
+    """
+
+    def __init__(self, name: str):
+        self.name = name
+        self._tasks: Dict[tuple, asyncio.Task] = {}
+        self.leaders = 0
+        self.followers = 0
+        _flights[name] = self
+
+    async def run(self, key: Hashable, work: Callable[[], Awaitable[T]]) -> T:
+        """Result of ``work()``, shared with concurrent calls for ``key``.
+
+        Exceptions raised by the work reach every caller.
+        """
+        loop = asyncio.get_running_loop()
+        flight_key = (loop, key)
+        task = self._tasks.get(flight_key)
+        if task is None:
+            task = loop.create_task(work())
+            self._tasks[flight_key] = task
+            task.add_done_callback(partial(self._landed, flight_key))
+            self.leaders += 1
+        else:
+            self.followers += 1
+        return await asyncio.shield(task)
+
+    def _landed(self, flight_key: tuple, task: asyncio.Task) -> None:
+        if self._tasks.get(flight_key) is task:
+            del self._tasks[flight_key]
+        if not task.cancelled():
+            # Mark the exception retrieved in case every caller went away
+            task.exception()
+
+    def stats(self) -> Dict[str, Any]:
+        """Counters for monitoring; ``followers`` counts calls saved."""
+        return {
+            "in_flight": len(self._tasks),
+            "leaders": self.leaders,
+            "followers": self.followers,
+        }
+
+
+def single_flight_stats() -> Dict[str, Dict[str, Any]]:
+    """Counters of every flight group by name."""
+    return {name: flight.stats() for name, flight in _flights.items()}
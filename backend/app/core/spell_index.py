@@ -0,0 +1,248 @@
+"""Spelling correction against the catalog vocabulary.
+
+INCI names are easy to misspell ("niacinimide", "hyaluronc"), and a single
+wrong letter makes every ``LIKE`` filter and keyword lookup miss. This is a
+symmetric-delete (SymSpell) index: every known word is stored under each
+string reachable from its first ``PREFIX_LENGTH`` characters by deleting up
+to ``MAX_EDIT_DISTANCE`` characters. A misspelling generates its own deletes
+the same way, and any shared key is a candidate, so a lookup is a few dozen
+dictionary probes plus an exact distance check on the handful of
+candidates. The nearest candidate wins, then the most frequent one.
+
+Words that start a known word are left alone, so partial names typed into
+a substring search ("hyaluron") are not rewritten into something else.
+So are common English words and contractions: "could" is one edit from
+"cold", but nobody misspells "cold" as "could". Corrections come from
+ingredient and brand names and the query keywords only; words of product
+names are recognised but never suggested, since they are mostly prose too.
+"""
+
+import re
+from bisect import bisect_left
+from collections import Counter
+from typing import Dict, Iterable, List, Mapping, Optional, Tuple
+
+from sqlalchemy import func, select
+from sqlalchemy.orm import Session
+
+from app.db.models import Ingredient, Product, product_ingredients_table
+from .bm25_index import NEGATION_CUES, STOPWORDS
+from .catalog_version import CatalogCache
+from .english_words import base_forms, is_common_word
+
+MAX_EDIT_DISTANCE = 2
+PREFIX_LENGTH = 7
+# Shorter words are left alone: too many real words are one edit apart
+MIN_CORRECTED_LENGTH = 5
+# Words this long may be two edits off; shorter ones only one
+TWO_EDIT_LENGTH = 8
+MIN_WORD_LENGTH = 3
+
+_WORD_RE = re.compile(r"[a-z0-9]+")
+# Words of a query, keeping contractions ("doesn't") in one piece
+_QUERY_WORD_RE = re.compile(r"[a-z0-9]+(?:['’][a-z]+)*")
+
+
+def _deletes(word: str, distance: int) -> List[set]:
+    """Strings made from ``word`` by deleting characters, by number deleted.
+
+    Item ``n`` holds the strings ``n`` deletions away, starting with
+    ``{word}`` itself.
+    """
+    levels = [{word}]
+    for _ in range(min(distance, len(word))):
+        levels.append(
+            {w[:i] + w[i + 1 :] for w in levels[-1] for i in range(len(w))}
+        )
+    return levels
+
+
+def edit_distance(a: str, b: str, limit: Optional[int] = None) -> int:
+    """Optimal string alignment distance: Levenshtein plus transpositions.
+
+    With a ``limit``, only cells within ``limit`` of the diagonal are
+    computed, and ``limit + 1`` is returned as soon as the distance is known
+    to exceed it.
+    """
+    if limit is None:
+        limit = max(len(a), len(b))
+    if abs(len(a) - len(b)) > limit:
+        return limit + 1
+    over = limit + 1
+    previous2: List[int] = []
+    previous = [min(j, over) for j in range(len(b) + 1)]
+    for i, char_a in enumerate(a, 1):
+        current = [over] * (len(b) + 1)
+        current[0] = row_min = min(i, over)
+        for j in range(max(1, i - limit), min(len(b), i + limit) + 1):
+            char_b = b[j - 1]
+            # Comparisons rather than min(): this loop is the lookup's hot path
+            cost = previous[j - 1] + (char_a != char_b)
+            if previous[j] + 1 < cost:
+                cost = previous[j] + 1
+            if current[j - 1] + 1 < cost:
+                cost = current[j - 1] + 1
+            if (
+                i > 1
+                and j > 1
+                and char_a == b[j - 2]
+                and a[i - 2] == char_b
+                and previous2[j - 2] + 1 < cost
+            ):
+                cost = previous2[j - 2] + 1
+            current[j] = cost if cost < over else over
+            if cost < row_min:
+                row_min = cost
+        if row_min > limit:
+            return over
+        previous2, previous = previous, current
+    return previous[-1]
+
+
+def allowed_distance(word: str) -> int:
+    """Edits a word of this length may be corrected by."""
+    if len(word) < MIN_CORRECTED_LENGTH:
+        return 0
+    return MAX_EDIT_DISTANCE if len(word) >= TWO_EDIT_LENGTH else 1
+
+
+class SpellIndex:
+    """Symmetric-delete index over a word -> frequency vocabulary.
+
+    ``words`` are the corrections on offer; ``known`` words are only
+    recognised, so they are left alone but never suggested.
+    """
+
+    def __init__(self, words: Mapping[str, int], known: Iterable[str] = ()):
+        self.words: Dict[str, int] = dict(words)
+        self._known = frozenset(self.words).union(known)
+        self._sorted = sorted(self._known)
+        # One table per number of deletions, so a lookup allowed fewer
+        # edits skips words that needed more deletions to share a key
+        self._candidates: List[Dict[str, List[str]]] = [
+            {} for _ in range(MAX_EDIT_DISTANCE + 1)
+        ]
+        for word in self.words:
+            levels = _deletes(word[:PREFIX_LENGTH], MAX_EDIT_DISTANCE)
+            for table, variants in zip(self._candidates, levels):
+                for variant in variants:
+                    table.setdefault(variant, []).append(word)
+
+    def __len__(self) -> int:
+        return len(self.words)
+
+    def __contains__(self, word: str) -> bool:
+        return word in self._known
+
+    def starts_word(self, prefix: str) -> bool:
+        """Whether some known or suggested word starts with ``prefix``."""
+        i = bisect_left(self._sorted, prefix)
+        return i < len(self._sorted) and self._sorted[i].startswith(prefix)
+
+    def lookup(self, word: str) -> Optional[str]:
+        """Closest known word to lowercase ``word``, or None if none is close.
+
+        Known words, their prefixes and inflections ("serums"), stopwords,
+        common English words, contractions and words too short to correct
+        come back as they are.
+        """
+        if (
+            word in STOPWORDS
+            or word in NEGATION_CUES
+            or self.starts_word(word)
+            or "'" in word
+            or "’" in word
+            or is_common_word(word)
+            or any(stem in self._known for stem in base_forms(word))
+        ):
+            return word
+        distance = allowed_distance(word)
+        if distance == 0 or word.isdigit():
+            return word
+
+        candidates = set()
+        tables = self._candidates[: distance + 1]
+        for variants in _deletes(word[:PREFIX_LENGTH], distance):
+            for variant in variants:
+                for table in tables:
+                    candidates.update(table.get(variant, ()))
+        best = None
+        best_key = None
+        for candidate in candidates:
+            # Only a candidate at most as far as the best so far can win
+            found = edit_distance(word, candidate, distance)
+            key = (found, -self.words[candidate], candidate)
+            if found <= distance and (best_key is None or key < best_key):
+                best, best_key = candidate, key
+                distance = found
+        return best
+
+    def correct(self, text: str) -> str:
+        """``text`` lowercased, with misspelled words replaced by known ones."""
+        return _QUERY_WORD_RE.sub(
+            lambda match: self.lookup(match.group()) or match.group(), text.lower()
+        )
+
+
+# Query keywords that are not catalog names but must never be "corrected"
+# into one; filled by the modules that own them
+_query_vocabulary: Counter = Counter()
+
+
+def add_query_vocabulary(phrases: Iterable[str]) -> None:
+    """Make the words of ``phrases`` known to every spell index built after."""
+    _query_vocabulary.update(vocabulary((phrase, 1) for phrase in phrases))
+
+
+def vocabulary(names: Iterable[tuple]) -> Counter:
+    """Word frequencies over ``(name, weight)`` pairs."""
+    counts: Counter = Counter()
+    for name, weight in names:
+        for word in _WORD_RE.findall((name or "").lower()):
+            if len(word) >= MIN_WORD_LENGTH and not word.isdigit():
+                counts[word] += max(weight, 1)
+    return counts
+
+
+def catalog_vocabulary(db_session: Session) -> Tuple[Counter, Counter]:
+    """Words of ingredient and brand names, and words of product names.
+
+    Both are weighted by use.
+    """
+    ingredients = db_session.execute(
+        select(Ingredient.inci_name, func.count(product_ingredients_table.c.product_id))
+        .outerjoin(product_ingredients_table)
+        .group_by(Ingredient.ingredient_id, Ingredient.inci_name)
+    )
+    brands = db_session.execute(
+        select(Product.brand_name, func.count()).group_by(Product.brand_name)
+    )
+    products = db_session.execute(
+        select(Product.product_name, func.count()).group_by(Product.product_name)
+    )
+    return vocabulary(ingredients) + vocabulary(brands), vocabulary(products)
+
+
+def _build(db_session: Session) -> SpellIndex:
+    names, product_words = catalog_vocabulary(db_session)
+    return SpellIndex(names + _query_vocabulary, known=product_words)
+
+
+_spell_index: CatalogCache[SpellIndex] = CatalogCache(
+    _build, name="catalog spell index"
+)
+
+
+def get_spell_index(db_session: Session) -> SpellIndex:
+    """Return the shared catalog spell index, building it if needed."""
+    return _spell_index.get(db_session)
+
+
+def reload_spell_index(db_session: Session | None = None) -> SpellIndex:
+    """Rebuild the shared catalog spell index now, e.g. at startup."""
+    return _spell_index.reload(db_session)
+
+
+def clear_spell_index() -> None:
+    """Drop the shared catalog spell index."""
+    _spell_index.clear()
@@ -0,0 +1,149 @@
+"""Prefix autocomplete over ingredient and brand names.
+
+Every word of every name starts one key: the lowercased rest of the name
+from that word on, so "hyal" and "acid" both complete "Hyaluronic Acid".
+Keys live in one sorted array, which turns a prefix into a contiguous range
+found with two bisections. Entries are numbered by popularity (products
+using the ingredient or carrying the brand), so the best suggestions for a
+prefix are the smallest entry numbers in its range. Short prefixes cover
+large ranges, so the top suggestions of every prefix whose range is longer
+than ``HEAVY_RANGE`` are computed once at build time; any other range is
+small enough to rank on the spot.
+"""
+
+import heapq
+import re
+from bisect import bisect_left
+from typing import Dict, Iterable, List, Tuple
+
+from sqlalchemy import func, select
+from sqlalchemy.orm import Session
+
+from app.db.models import Ingredient, Product, product_ingredients_table
+from .catalog_version import CatalogCache
+
+# Most suggestions one lookup can return
+MAX_SUGGESTIONS = 20
+# Prefix ranges longer than this get their suggestions precomputed
+HEAVY_RANGE = 64
+
+_NON_WORD = re.compile(r"[^0-9a-z]+")
+# Sorts after any character of a normalized key
+_KEY_END = "\uffff"
+
+
+def normalize(text: str) -> str:
+    """Lowercase ``text`` with every run of non-alphanumerics as one space."""
+    return _NON_WORD.sub(" ", text.lower()).strip()
+
+
+class SuggestIndex:
+    """Sorted word-prefix index over ``(name, weight)`` entries."""
+
+    def __init__(self, entries: Iterable[Tuple[str, int]]):
+        ranked = sorted(entries, key=lambda entry: (-entry[1], entry[0]))
+        self.names = [name for name, _ in ranked]
+        self.weights = [weight for _, weight in ranked]
+
+        keyed = []
+        for entry, name in enumerate(self.names):
+            normalized = normalize(name)
+            keyed.extend((normalized[start:], entry) for start in _word_starts(normalized))
+        keyed.sort()
+        self._keys = [key for key, _ in keyed]
+        self._entries = [entry for _, entry in keyed]
+
+        self._heavy: Dict[str, List[int]] = {}
+        self._precompute(0, len(self._keys), 0)
+
+    def __len__(self) -> int:
+        return len(self.names)
+
+    def _top(self, lo: int, hi: int, limit: int) -> List[int]:
+        # One name can own several keys in a range
+        return heapq.nsmallest(limit, set(self._entries[lo:hi]))
+
+    def _precompute(self, lo: int, hi: int, depth: int) -> None:
+        """Store suggestions for every heavy prefix extending ``keys[lo][:depth]``."""
+        if hi - lo <= HEAVY_RANGE:
+            return
+        if depth:
+            self._heavy[self._keys[lo][:depth]] = self._top(lo, hi, MAX_SUGGESTIONS)
+        start = lo
+        while start < hi:
+            key = self._keys[start]
+            if len(key) <= depth:
+                start += 1
+                continue
+            end = bisect_left(self._keys, key[: depth + 1] + _KEY_END, start, hi)
+            self._precompute(start, end, depth + 1)
+            start = end
+
+    def suggest(self, prefix: str, limit: int = 10) -> List[Tuple[str, int]]:
+        """Up to ``limit`` ``(name, weight)`` pairs with a word starting ``prefix``.
+
+        The most popular names come first; ``limit`` is capped at
+        ``MAX_SUGGESTIONS``.
+        """
+        prefix = normalize(prefix)
+        limit = min(limit, MAX_SUGGESTIONS)
+        if not prefix or limit <= 0:
+            return []
+        entries = self._heavy.get(prefix)
+        if entries is None:
+            lo = bisect_left(self._keys, prefix)
+            hi = bisect_left(self._keys, prefix + _KEY_END, lo)
+            entries = self._top(lo, hi, limit)
+        return [(self.names[i], self.weights[i]) for i in entries[:limit]]
+
+
+def _word_starts(normalized: str) -> List[int]:
+    return [0] + [i + 1 for i, char in enumerate(normalized) if char == " "]
+
+
+def _build_ingredients(db_session: Session) -> SuggestIndex:
+    rows = db_session.execute(
+        select(Ingredient.inci_name, func.count(product_ingredients_table.c.product_id))
+        .outerjoin(product_ingredients_table)
+        .group_by(Ingredient.ingredient_id, Ingredient.inci_name)
+    )
+    return SuggestIndex((name, count) for name, count in rows)
+
+
+def _build_brands(db_session: Session) -> SuggestIndex:
+    rows = db_session.execute(
+        select(Product.brand_name, func.count())
+        .where(Product.brand_name.isnot(None))
+        .group_by(Product.brand_name)
+    )
+    return SuggestIndex((name, count) for name, count in rows)
+
+
+_ingredient_suggestions: CatalogCache[SuggestIndex] = CatalogCache(
+    _build_ingredients, name="ingredient suggestions"
+)
+_brand_suggestions: CatalogCache[SuggestIndex] = CatalogCache(
+    _build_brands, name="brand suggestions"
+)
+
+
+def get_ingredient_suggestions(db_session: Session) -> SuggestIndex:
+    """Return the shared ingredient suggestion index, building it if needed."""
+    return _ingredient_suggestions.get(db_session)
+
+
+def get_brand_suggestions(db_session: Session) -> SuggestIndex:
+    """Return the shared brand suggestion index, building it if needed."""
+    return _brand_suggestions.get(db_session)
+
+
+def reload_suggest_indexes(db_session: Session | None = None) -> None:
+    """Rebuild both suggestion indexes now, e.g. at startup."""
+    _ingredient_suggestions.reload(db_session)
+    _brand_suggestions.reload(db_session)
+
+
+def clear_suggest_indexes() -> None:
+    """Drop both suggestion indexes."""
+    _ingredient_suggestions.clear()
+    _brand_suggestions.clear()
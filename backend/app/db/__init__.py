@@ -1,3 +1,3 @@
 """Database package."""
 
-__all__ = ["models", "session"]
+__all__ = ["hydration", "models", "session"]
@@ -0,0 +1,149 @@
+"""
+Full-text search over product and ingredient names.
+
+``ILIKE '%term%'`` cannot use an index, so those searches scan the whole
+table. On MySQL the models declare FULLTEXT indexes built with the ngram
+parser, so ``create_all`` recreates them after a reset; the
+``add_fulltext_indexes`` migration adds them to existing databases.
+Searches run ``MATCH ... AGAINST`` in boolean mode with every search word
+as a required phrase, so words still match inside longer names. SQLite (local and test runs) gets FTS5 tables
+with the trigram tokenizer instead, kept in sync with their base tables by
+triggers. Both report a relevance where higher is better.
+"""
+import re
+import weakref
+from typing import List
+
+from sqlalchemy import Float, Integer, column, select, text
+from sqlalchemy.dialects.mysql import match
+from sqlalchemy.orm import Session
+
+from app.db.models import Ingredient, Product
+
+# Values of the catalog endpoints' ``search_mode`` parameter
+SEARCH_MODE_PATTERN = "^(substring|fulltext)$"
+
+# Shortest word the trigram tokenizer can find; shorter words are ignored
+MIN_TERM_LENGTH = 3
+
+# Searchable table -> (primary key, indexed columns); the MATCH column list
+# must be exactly the column list of a FULLTEXT index
+FULLTEXT_TABLES = {
+    "products": (
+        Product.product_id,
+        (Product.product_name, Product.brand_name, Product.category),
+    ),
+    "ingredients": (Ingredient.ingredient_id, (Ingredient.inci_name,)),
+}
+
+_TERM_RE = re.compile(r"[a-z0-9]+")
+
+# SQLite engines whose FTS tables were checked in this process
+_prepared_engines: "weakref.WeakSet" = weakref.WeakSet()
+
+
+def search_terms(search: str) -> List[str]:
+    """Lowercase words of ``search`` long enough to be looked up."""
+    return [
+        term
+        for term in dict.fromkeys(_TERM_RE.findall(search.lower()))
+        if len(term) >= MIN_TERM_LENGTH
+    ]
+
+
+def sqlite_fulltext_ddl(table: str) -> List[str]:
+    """Statements creating the FTS5 mirror of ``table`` and its triggers.
+
+    The ``add_fulltext_indexes`` migration carries a frozen copy of them.
+    """
+    key, columns = FULLTEXT_TABLES[table]
+    fts = f"{table}_fts"
+    names = [c.name for c in columns]
+    cols = ", ".join(names)
+    new = ", ".join(f"new.{name}" for name in names)
+    old = ", ".join(f"old.{name}" for name in names)
+    delete = (
+        f"INSERT INTO {fts}({fts}, rowid, {cols}) "
+        f"VALUES ('delete', old.{key.name}, {old});"
+    )
+    insert = f"INSERT INTO {fts}(rowid, {cols}) VALUES (new.{key.name}, {new});"
+    return [
+        f"CREATE VIRTUAL TABLE IF NOT EXISTS {fts} USING fts5({cols}, "
+        f"content='{table}', content_rowid='{key.name}', tokenize='trigram')",
+        f"CREATE TRIGGER IF NOT EXISTS {fts}_ai AFTER INSERT ON {table} "
+        f"BEGIN {insert} END",
+        f"CREATE TRIGGER IF NOT EXISTS {fts}_ad AFTER DELETE ON {table} "
+        f"BEGIN {delete} END",
+        f"CREATE TRIGGER IF NOT EXISTS {fts}_au AFTER UPDATE ON {table} "
+        f"BEGIN {delete} {insert} END",
+        # Index whatever the base table already holds
+        f"INSERT INTO {fts}({fts}) VALUES ('rebuild')",
+    ]
+
+
+def ensure_sqlite_fulltext(connection) -> None:
+    """
+    Create any missing FTS5 tables and triggers on a SQLite ``connection``
+    """
+    triggers = {
+        row[0]
+        for row in connection.execute(
+            text("SELECT name FROM sqlite_master WHERE type = 'trigger'")
+        )
+    }
+    for table in FULLTEXT_TABLES:
+        # Dropping and recreating a base table drops its triggers as well
+        if f"{table}_fts_au" not in triggers:
+            for statement in sqlite_fulltext_ddl(table):
+                connection.execute(text(statement))
+
+
+def _prepare_sqlite(db: Session) -> None:
+    engine = db.get_bind().engine
+    if engine in _prepared_engines:
+        return
+    with engine.begin() as connection:
+        ensure_sqlite_fulltext(connection)
+    _prepared_engines.add(engine)
+
+
+def fulltext_matches(db: Session, table: str, search: str):
+    """
+    Subquery of ``(entity_id, relevance)`` for rows of ``table`` matching
+    every word of ``search``
+
+    Returns None when ``search`` has no word long enough to look up or the
+    database has no full-text support, so callers can fall back to a
+    substring search.
+    """
+    terms = search_terms(search)
+    if not terms:
+        return None
+    key, columns = FULLTEXT_TABLES[table]
+    dialect = db.get_bind().dialect.name
+
+    if dialect == "mysql":
+        relevance = match(
+            *columns, against=" ".join(f'+"{term}"' for term in terms)
+        ).in_boolean_mode()
+        return (
+            select(key.label("entity_id"), relevance.label("relevance"))
+            .where(relevance > 0)
+            .subquery()
+        )
+
+    if dialect == "sqlite":
+        _prepare_sqlite(db)
+        fts = f"{table}_fts"
+        # bm25() is lower for better matches
+        return (
+            text(
+                f"SELECT rowid AS entity_id, -bm25({fts}) AS relevance "
+                f"FROM {fts} WHERE {fts} MATCH :query"
+            )
+            .bindparams(query=" AND ".join(f'"{term}"' for term in terms))
+            .columns(column("entity_id", Integer), column("relevance", Float))
+            .subquery()
+        )
+
+    return None
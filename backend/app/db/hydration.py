@@ -0,0 +1,20 @@
+"""
+Batched loading of product relationships.
+
+``Product.ingredients`` and ``Product.skin_types`` are lazy loads, so reading
+them for every product in a result set costs two SELECTs per product. Queries
+wrapped with ``with_product_relationships`` load them for the whole result set
+with one IN query per relationship instead.
+"""
+from sqlalchemy.orm import Query, selectinload
+
+from app.db.models import Product
+
+PRODUCT_RELATIONSHIPS = (Product.ingredients, Product.skin_types)
+
+
+def with_product_relationships(query: Query) -> Query:
+    """
+    Eager-load product relationships with one IN query each when ``query`` runs
+    """
+    return query.options(*[selectinload(rel) for rel in PRODUCT_RELATIONSHIPS])
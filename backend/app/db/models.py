@@ -1,7 +1,7 @@
 """Database models for alembic"""
 
 # pylint: disable=import-error
-from sqlalchemy import Column, Integer, String, ForeignKey, Table, Float
+from sqlalchemy import Column, Integer, String, ForeignKey, Table, Float, Index
 from sqlalchemy.orm import relationship, declarative_base
 
 Base = declarative_base()
@@ -18,6 +18,8 @@ product_ingredients_table = Table(
         ForeignKey("ingredients.ingredient_id"),
         primary_key=True,
     ),
+    # The primary key only serves lookups by product
+    Index("ix_product_ingredients_ingredient_product", "ingredient_id", "product_id"),
 )
 
 product_skin_types_table = Table(
@@ -27,6 +29,7 @@ product_skin_types_table = Table(
     Column(
         "skin_type_id", Integer, ForeignKey("skin_types.skin_type_id"), primary_key=True
     ),
+    Index("ix_product_skin_types_skin_type_product", "skin_type_id", "product_id"),
 )
 
 
@@ -41,12 +44,31 @@ class Product(Base):
     brand_name = Column(String(255))
     category = Column(String(100))
     rank = Column(Float)
+    __table_args__ = (
+        # Listing order, so cursor pages seek instead of skipping rows
+        Index("ix_products_rank_product_id", rank.desc(), product_id),
+        # search_mode=fulltext (app.db.fulltext); SQLite uses FTS5 tables
+        Index(
+            "ft_products_name_brand_category",
+            "product_name",
+            "brand_name",
+            "category",
+            mysql_prefix="FULLTEXT",
+            mysql_with_parser="ngram",
+        ).ddl_if(dialect="mysql"),
+    )
     ingredients = relationship(
-        "Ingredient", secondary=product_ingredients_table, back_populates="products"
+        "Ingredient",
+        secondary=product_ingredients_table,
+        back_populates="products",
+        order_by="Ingredient.ingredient_id",
     )
 
     skin_types = relationship(
-        "SkinType", secondary=product_skin_types_table, back_populates="products"
+        "SkinType",
+        secondary=product_skin_types_table,
+        back_populates="products",
+        order_by="SkinType.skin_type_id",
     )
 
     def __repr__(self):
@@ -60,6 +82,14 @@ class Ingredient(Base):
     __tablename__ = "ingredients"
     ingredient_id = Column(Integer, primary_key=True)
     inci_name = Column(String(255), nullable=False, unique=True, index=True)
+    __table_args__ = (
+        Index(
+            "ft_ingredients_inci_name",
+            "inci_name",
+            mysql_prefix="FULLTEXT",
+            mysql_with_parser="ngram",
+        ).ddl_if(dialect="mysql"),
+    )
     products = relationship(
         "Product", secondary=product_ingredients_table, back_populates="ingredients"
     )
@@ -81,3 +111,24 @@ class SkinType(Base):
 
     def __repr__(self):
         return f"<SkinType(id={self.skin_type_id}, name='{self.type_name}')>"
+
+
+# pylint: disable=too-few-public-methods
+class ProductLeaderboard(Base):
+    """One entry of a precomputed top-ranked product list
+
+    Boards are rebuilt by the seed scripts (see app/core/leaderboards.py);
+    ``position`` 0 is the highest ranked product of ``board``.
+    """
+
+    __tablename__ = "product_leaderboards"
+    board = Column(String(128), primary_key=True)
+    position = Column(Integer, primary_key=True)
+    product_id = Column(Integer, ForeignKey("products.product_id"), nullable=False)
+    rank = Column(Float, nullable=False)
+
+    def __repr__(self):
+        return (
+            f"<ProductLeaderboard(board='{self.board}', position={self.position}, "
+            f"product_id={self.product_id})>"
+        )
@@ -1,7 +1,16 @@
 """
 Manages connection to MySQL
 """
+from typing import AsyncIterator, Optional
+
 from sqlalchemy import create_engine
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.asyncio import (
+    AsyncEngine,
+    AsyncSession,
+    async_sessionmaker,
+    create_async_engine,
+)
 from sqlalchemy.orm import sessionmaker
 from app.core.config import settings
 
@@ -9,6 +18,15 @@ engine = create_engine(settings.DATABASE_URL, pool_pre_ping=True)
 
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
+# Async drivers for each sync driver we deploy with
+ASYNC_DRIVERS = {
+    "mysql": "mysql+aiomysql",
+    "sqlite": "sqlite+aiosqlite",
+}
+
+_async_engine: Optional[AsyncEngine] = None
+_async_sessionmaker: Optional[async_sessionmaker] = None
+
 def get_db():
     """
 	Dependency injection for FastAPI
@@ -18,3 +36,59 @@ def get_db():
         yield db
     finally:
         db.close()
+
+
+def async_database_url(url: str) -> str:
+    """
+    Swap the sync driver in ``url`` for its async counterpart
+    """
+    parsed = make_url(url)
+    backend = parsed.get_backend_name()
+    if parsed.get_dialect().is_async or backend not in ASYNC_DRIVERS:
+        return url
+    return parsed.set(drivername=ASYNC_DRIVERS[backend]).render_as_string(
+        hide_password=False
+    )
+
+
+def get_async_engine() -> AsyncEngine:
+    """
+    Async engine, created on first use so the async driver is only required
+    when an async session is actually requested
+    """
+    global _async_engine  # pylint: disable=global-statement
+    if _async_engine is None:
+        url = settings.ASYNC_DATABASE_URL or async_database_url(settings.DATABASE_URL)
+        _async_engine = create_async_engine(url, pool_pre_ping=True)
+    return _async_engine
+
+
+def get_async_sessionmaker() -> async_sessionmaker:
+    """
+    Factory for ``AsyncSession`` objects bound to the async engine
+    """
+    global _async_sessionmaker  # pylint: disable=global-statement
+    if _async_sessionmaker is None:
+        _async_sessionmaker = async_sessionmaker(
+            get_async_engine(), autoflush=False, expire_on_commit=False
+        )
+    return _async_sessionmaker
+
+
+async def get_async_db() -> AsyncIterator[AsyncSession]:
+    """
+    Async dependency injection for FastAPI
+    """
+    async with get_async_sessionmaker()() as db:
+        yield db
+
+
+async def dispose_async_engine() -> None:
+    """
+    Close pooled async connections, e.g. on application shutdown
+    """
+    global _async_engine, _async_sessionmaker  # pylint: disable=global-statement
+    if _async_engine is not None:
+        await _async_engine.dispose()
+    _async_engine = None
+    _async_sessionmaker = None
@@ -1,16 +1,59 @@
 """
 Entrypoint for routers in FastAPI
 """
+import logging
+from contextlib import asynccontextmanager
+
 from dotenv import load_dotenv
 
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
+from sqlalchemy.exc import SQLAlchemyError
 
-from .api.endpoints import qa, products, ingredients, chat
+from .api.endpoints import qa, products, ingredients, chat, export
+from .api.pagination import NEXT_CURSOR_HEADER
+from .core.answer_cache import reset_answer_cache
+from .core.catalog_index import reload_catalog_index
+from .core.config import settings
+from .core.llm_client import close_llm_client, open_llm_client
+from .core.spell_index import reload_spell_index
+from .core.suggest_index import reload_suggest_indexes
+from .db.session import dispose_async_engine
 
 # Load environment variables from .env file
 load_dotenv()
 
+logger = logging.getLogger(__name__)
+
+
+@asynccontextmanager
+async def lifespan(_application: FastAPI):
+    """
+    Warm in-process caches and open the pooled LLM client on startup, and
+    release pooled connections and the answer cache file on shutdown
+    """
+    if settings.RETRIEVAL_MODE == "memory":
+        try:
+            reload_catalog_index()
+        except SQLAlchemyError as e:
+            # The index is built lazily on the first request instead
+            logger.warning("Could not preload catalog index: %s", e)
+    try:
+        reload_suggest_indexes()
+    except SQLAlchemyError as e:
+        # Built lazily on the first suggestion request instead
+        logger.warning("Could not preload suggestion indexes: %s", e)
+    if settings.SPELL_CORRECTION:
+        try:
+            reload_spell_index()
+        except SQLAlchemyError as e:
+            # Built lazily on the first corrected query instead
+            logger.warning("Could not preload spell index: %s", e)
+    await open_llm_client()
+    yield
+    await close_llm_client()
+    reset_answer_cache()
+    await dispose_async_engine()
 
 
 def create_app() -> FastAPI:
@@ -20,7 +63,8 @@ def create_app() -> FastAPI:
     application = FastAPI(
         title="BoBeutician API",
         description="AI-powered skincare consultation API",
-        version="1.0.0"
+        version="1.0.0",
+        lifespan=lifespan,
     )
 
     # Add CORS middleware for frontend integration
@@ -30,6 +74,8 @@ def create_app() -> FastAPI:
         allow_credentials=True,
         allow_methods=["*"],
         allow_headers=["*"],
+        # Lets the frontend read the next-page cursor of catalog listings
+        expose_headers=[NEXT_CURSOR_HEADER],
     )
 
     # Include routers
@@ -37,6 +83,7 @@ def create_app() -> FastAPI:
     application.include_router(qa.router, prefix="/api/qa", tags=["QA"])
     application.include_router(products.router, prefix="/api", tags=["Products"])
     application.include_router(ingredients.router, prefix="/api", tags=["Ingredients"])
+    application.include_router(export.router, prefix="/api", tags=["Export"])
 
     return application
 
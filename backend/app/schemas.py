@@ -33,6 +33,13 @@ class Ingredient(IngredientBase):
     ingredient_id: int
     model_config = ConfigDict(from_attributes=True)
 
+class Suggestion(BaseModel):
+    """
+    Autocomplete suggestion, most used first
+    """
+    name: str
+    product_count: int
+
 class SkinType(SkinTypeBase):
     """
     Read schema for skin types for API
@@ -77,6 +84,7 @@ class QARequest(BaseModel):
     question: str
     concern: Optional[str] = None
     intake_data: Optional[dict] = None  # Add intake data field
+    bypass_cache: bool = False  # Skip the LLM answer cache lookup
 
 class QAResponse(BaseModel):
     """
@@ -95,6 +103,7 @@ class ChatRequest(BaseModel):
     intake_data: Optional[dict] = None
     concern: Optional[str] = None
     conversation_id: Optional[str] = None
+    bypass_cache: bool = False  # Skip the LLM answer cache lookup
 
 
 class ChatResponse(BaseModel):
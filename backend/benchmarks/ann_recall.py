@@ -0,0 +1,92 @@
+"""
+Recall@k and latency of the IVF index against exact cosine search
+usage: python benchmarks/ann_recall.py [--products 100000] [--nprobe 1,2,4,8,16,32]
+       python benchmarks/ann_recall.py --from-index   (persisted dense vectors)
+Synthetic vectors are drawn around random topic centres, which is closer to
+real product embeddings than uniform noise.
+"""
+
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# pylint: disable=wrong-import-position
+from app.core.ann_index import IVFIndex
+from app.core.bm25_index import top_k_scores
+from app.core.config import settings
+from app.core.dense_index import DIMENSIONS, DenseIndex
+
+
+def _unit(matrix: np.ndarray) -> np.ndarray:
+    return matrix / np.linalg.norm(matrix, axis=1, keepdims=True)
+
+
+def synthetic_vectors(n_products: int, dimensions: int, seed: int = 0) -> np.ndarray:
+    """Unit vectors scattered around ``sqrt(n)`` random topic centres."""
+    rng = np.random.default_rng(seed)
+    centres = _unit(rng.standard_normal((int(np.sqrt(n_products)), dimensions)))
+    topics = rng.integers(0, len(centres), n_products)
+    noise = rng.standard_normal((n_products, dimensions)).astype(np.float32)
+    return _unit(centres[topics] + 0.08 * noise).astype(np.float32)
+
+
+def _timed(search, queries):
+    results, timings = [], []
+    for query in queries:
+        start = time.perf_counter()
+        results.append([pid for pid, _ in search(query)])
+        timings.append((time.perf_counter() - start) * 1000)
+    return results, float(np.percentile(timings, 50))
+
+
+def main():
+    """Print recall@k and median latency per nprobe setting."""
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--products", type=int, default=100_000)
+    parser.add_argument("--from-index", action="store_true")
+    parser.add_argument("--nlist", type=int, default=0)
+    parser.add_argument("--nprobe", default="1,2,4,8,16,32")
+    parser.add_argument("--k", type=int, default=10)
+    parser.add_argument("--queries", type=int, default=200)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(1)
+    if args.from_index:
+        dense, _ = DenseIndex.load(settings.INDEX_DIR)
+        vectors, product_ids = np.asarray(dense.vectors), dense.product_ids
+    else:
+        vectors = synthetic_vectors(args.products, DIMENSIONS)
+        product_ids = np.arange(1, len(vectors) + 1, dtype=np.int64)
+    # Queries are perturbed catalog vectors, like a query about a product
+    picks = rng.choice(len(vectors), min(args.queries, len(vectors)), replace=False)
+    queries = _unit(
+        vectors[picks] + 0.05 * rng.standard_normal((len(picks), vectors.shape[1]))
+    ).astype(np.float32)
+
+    start = time.perf_counter()
+    ivf = IVFIndex.build(vectors, product_ids, args.nlist)
+    build_s = time.perf_counter() - start
+    print(f"{len(vectors)} vectors, nlist={ivf.nlist}, built in {build_s:.1f}s")
+
+    exact, exact_ms = _timed(
+        lambda q: top_k_scores(vectors @ q, product_ids, args.k), queries
+    )
+    print(f"exact search p50 {exact_ms:.2f} ms")
+    print(f"{'nprobe':>7} {'recall@' + str(args.k):>10} {'p50 ms':>8}")
+    for nprobe in (int(n) for n in args.nprobe.split(",")):
+        approx, approx_ms = _timed(
+            lambda q, n=nprobe: ivf.search_vector(q, args.k, nprobe=n), queries
+        )
+        recall = np.mean(
+            [len(set(a) & set(e)) / max(len(e), 1) for a, e in zip(approx, exact)]
+        )
+        print(f"{nprobe:>7} {recall:>10.3f} {approx_ms:>8.2f}")
+
+
+if __name__ == "__main__":
+    main()
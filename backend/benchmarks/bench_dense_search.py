@@ -0,0 +1,81 @@
+"""
+Query latency of the dense retrieval index on synthetic catalogs
+usage: python benchmarks/bench_dense_search.py [--sizes 2000,100000,1000000]
+Vectors are random unit rows, so this measures search cost, not quality.
+"""
+
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# pylint: disable=wrong-import-position
+from app.core.dense_index import DIMENSIONS, DenseIndex
+
+QUERIES = [
+    "gentle vitamin c serum",
+    "oil free moisturizer for acne",
+    "hydrating night cream",
+    "mineral sunscreen spf 50",
+    "retinol eye cream",
+]
+
+
+def synthetic_index(n_products: int, dimensions: int, seed: int = 0) -> DenseIndex:
+    """Random unit vectors, generated in chunks to bound peak memory."""
+    rng = np.random.default_rng(seed)
+    vectors = np.empty((n_products, dimensions), dtype=np.float32)
+    chunk = 100_000
+    for start in range(0, n_products, chunk):
+        block = rng.standard_normal(
+            (min(chunk, n_products - start), dimensions), dtype=np.float32
+        )
+        block /= np.linalg.norm(block, axis=1, keepdims=True)
+        vectors[start : start + len(block)] = block
+    return DenseIndex(
+        np.arange(1, n_products + 1, dtype=np.int64),
+        vectors,
+        np.ones(dimensions, dtype=np.float32),
+    )
+
+
+def bench(n_products: int, k: int, repeats: int) -> dict:
+    """Median and p95 latency in milliseconds of ``top_k`` over ``repeats``."""
+    index = synthetic_index(n_products, DIMENSIONS)
+    index.top_k(QUERIES[0], k)  # warm up
+    timings = []
+    for i in range(repeats):
+        start = time.perf_counter()
+        index.top_k(QUERIES[i % len(QUERIES)], k)
+        timings.append((time.perf_counter() - start) * 1000)
+    return {
+        "products": n_products,
+        "p50_ms": float(np.percentile(timings, 50)),
+        "p95_ms": float(np.percentile(timings, 95)),
+        "matrix_mb": index.vectors.nbytes / 2**20,
+    }
+
+
+def main():
+    """Run the benchmark for each requested catalog size."""
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--sizes", default="2000,100000,1000000")
+    parser.add_argument("--k", type=int, default=50)
+    parser.add_argument("--repeats", type=int, default=50)
+    args = parser.parse_args()
+
+    print(f"{'products':>10} {'matrix MB':>10} {'p50 ms':>9} {'p95 ms':>9}")
+    for size in (int(s) for s in args.sizes.split(",")):
+        result = bench(size, args.k, args.repeats)
+        print(
+            f"{result['products']:>10} {result['matrix_mb']:>10.1f} "
+            f"{result['p50_ms']:>9.2f} {result['p95_ms']:>9.2f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,129 @@
+"""
+Throughput and peak memory of the streaming catalog export
+usage: python benchmarks/bench_export.py [--products 20000] [--batch-size 500]
+       [--url mysql+pymysql://...]
+Without --url a synthetic catalog is written to a temporary SQLite file.
+"""
+
+import argparse
+import os
+import random
+import sys
+import tempfile
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# pylint: disable=wrong-import-position
+from sqlalchemy import create_engine, insert
+
+from app.api.endpoints.export import export_rows, render_csv, render_ndjson
+from app.db import models
+
+INGREDIENTS = 2000
+PER_PRODUCT = 30
+
+
+def synthetic_catalog(url: str, n_products: int, seed: int = 0) -> None:
+    """Products with ``PER_PRODUCT`` random ingredients and two skin types."""
+    rng = random.Random(seed)
+    engine = create_engine(url)
+    models.Base.metadata.create_all(engine)
+    with engine.begin() as conn:
+        conn.execute(
+            insert(models.SkinType),
+            [{"skin_type_id": i, "type_name": f"Type {i}"} for i in range(1, 6)],
+        )
+        conn.execute(
+            insert(models.Ingredient),
+            [
+                {"ingredient_id": i, "inci_name": f"Ingredient {i}"}
+                for i in range(1, INGREDIENTS + 1)
+            ],
+        )
+        conn.execute(
+            insert(models.Product),
+            [
+                {
+                    "product_id": i,
+                    "product_name": f"Product {i}",
+                    "brand_name": f"Brand {i % 97}",
+                    "category": "Moisturizer",
+                    "rank": round(rng.uniform(1, 5), 1),
+                }
+                for i in range(1, n_products + 1)
+            ],
+        )
+        conn.execute(
+            insert(models.product_ingredients_table),
+            [
+                {"product_id": p, "ingredient_id": i}
+                for p in range(1, n_products + 1)
+                for i in rng.sample(range(1, INGREDIENTS + 1), PER_PRODUCT)
+            ],
+        )
+        conn.execute(
+            insert(models.product_skin_types_table),
+            [
+                {"product_id": p, "skin_type_id": s}
+                for p in range(1, n_products + 1)
+                for s in (1 + p % 5, 1 + (p + 2) % 5)
+            ],
+        )
+    engine.dispose()
+
+
+def export(engine, renderer, batch_size: int) -> int:
+    """Run one export, discarding the output; returns the rows exported."""
+    rows = 0
+
+    def counted(batches):
+        nonlocal rows
+        for batch in batches:
+            rows += len(batch)
+            yield batch
+
+    for _ in renderer(counted(export_rows(engine, batch_size))):
+        pass
+    return rows
+
+
+def run(engine, renderer, batch_size: int) -> tuple:
+    """Rows exported, seconds taken and peak traced MiB for one export."""
+    start = time.perf_counter()
+    rows = export(engine, renderer, batch_size)
+    elapsed = time.perf_counter() - start
+    # tracemalloc slows allocation down a lot, so memory gets its own pass
+    tracemalloc.start()
+    export(engine, renderer, batch_size)
+    peak = tracemalloc.get_traced_memory()[1] / 2**20
+    tracemalloc.stop()
+    return rows, elapsed, peak
+
+
+def main():
+    """Print rows/sec and peak memory for each export format."""
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--products", type=int, default=20000)
+    parser.add_argument("--batch-size", type=int, default=500)
+    parser.add_argument("--url", help="export this database instead")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        url = args.url
+        if url is None:
+            url = f"sqlite:///{os.path.join(tmp, 'catalog.db')}"
+            synthetic_catalog(url, args.products)
+        engine = create_engine(url)
+        for name, renderer in (("ndjson", render_ndjson), ("csv", render_csv)):
+            rows, elapsed, peak = run(engine, renderer, args.batch_size)
+            print(
+                f"{name}: {rows} rows in {elapsed:.2f} s, "
+                f"{rows / elapsed:,.0f} rows/s, peak {peak:.1f} MiB"
+            )
+        engine.dispose()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,107 @@
+"""
+Connection reuse of the pooled OpenRouter client against a local stub server
+usage: python benchmarks/bench_llm_client.py [--calls 1000] [--handshake-ms 0]
+Runs the same sequential generate_answer calls with a client per call (no
+app lifespan) and with the shared client, and reports connections opened
+and per-call latency. --handshake-ms delays the first response on every new
+connection to stand in for the DNS lookup and TLS handshake a real
+OpenRouter connection costs.
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# pylint: disable=wrong-import-position
+from app.core.config import settings
+from app.core.generate import generate_answer
+from app.core.llm_client import close_llm_client, open_llm_client
+
+ANSWER = json.dumps({"choices": [{"message": {"content": "ok"}}]}).encode()
+
+
+async def start_stub(stats: dict, handshake: float):
+    """HTTP/1.1 keep-alive server counting the connections it accepts."""
+
+    async def handle(reader, writer):
+        stats["connections"] += 1
+        first = True
+        try:
+            while True:
+                head = await reader.readuntil(b"\r\n\r\n")
+                length = 0
+                for line in head.split(b"\r\n"):
+                    name, _, value = line.partition(b":")
+                    if name.strip().lower() == b"content-length":
+                        length = int(value)
+                await reader.readexactly(length)
+                if first and handshake:
+                    await asyncio.sleep(handshake)
+                first = False
+                writer.write(
+                    b"HTTP/1.1 200 OK\r\nContent-Type: application/json\r\n"
+                    b"Content-Length: %d\r\n\r\n%s" % (len(ANSWER), ANSWER)
+                )
+                await writer.drain()
+        except (asyncio.IncompleteReadError, ConnectionError):
+            pass
+        finally:
+            writer.close()
+
+    return await asyncio.start_server(handle, "127.0.0.1", 0)
+
+
+async def run(calls: int, shared: bool, handshake: float) -> tuple:
+    """Connections opened and per-call latencies (ms) for one configuration."""
+    stats = {"connections": 0}
+    server = await start_stub(stats, handshake)
+    port = server.sockets[0].getsockname()[1]
+    settings.OPENROUTER_BASE_URL = f"http://127.0.0.1:{port}/api/v1"
+    if shared:
+        await open_llm_client()
+    timings = []
+    try:
+        for _ in range(calls):
+            start = time.perf_counter()
+            await generate_answer(
+                "question", "context", prompt="prompt", use_cache=False
+            )
+            timings.append((time.perf_counter() - start) * 1000)
+    finally:
+        await close_llm_client()
+        server.close()
+        await server.wait_closed()
+    return stats["connections"], timings
+
+
+def main():
+    """Print connections opened and latency percentiles per configuration."""
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--calls", type=int, default=1000)
+    parser.add_argument("--handshake-ms", type=float, default=0.0)
+    args = parser.parse_args()
+    settings.OPENROUTER_API_KEY = "benchmark"
+    # Measure connection reuse, not the admission pacing
+    settings.LLM_RATE = settings.LLM_MAX_RATE = 1e6
+    settings.LLM_BURST = args.calls
+
+    for label, shared in (("client per call", False), ("shared client", True)):
+        connections, timings = asyncio.run(
+            run(args.calls, shared, args.handshake_ms / 1000)
+        )
+        p50, p99 = np.percentile(timings, [50, 99])
+        print(
+            f"{label}: {args.calls} calls over {connections} connections, "
+            f"p50 {p50:.3f} ms, p99 {p99:.3f} ms, total {sum(timings) / 1000:.2f} s"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,156 @@
+"""
+Throughput of OpenRouter calls against a rate-limited stub server
+usage: python benchmarks/bench_llm_limiter.py [--requests 300] [--server-rate 20] [--latency-ms 50]
+The stub admits --server-rate requests per second (a token bucket with a
+one-second burst) and answers the rest with 429 and Retry-After: 1, like a
+free OpenRouter model under load. All requests are sent at once with
+distinct prompts, first with the adaptive limiter effectively off (no
+pacing, no retries) and then with the configured settings, and the run
+reports answers, apologies, 429s seen by the server and answers per second.
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# pylint: disable=wrong-import-position
+from app.core.config import settings
+from app.core.generate import generate_answer
+from app.core.llm_client import close_llm_client, open_llm_client
+from app.core.llm_limiter import get_llm_limiter
+
+ANSWER = "Patch test first."
+BODY = json.dumps({"choices": [{"message": {"content": ANSWER}}]}).encode()
+
+
+async def start_stub(stats: dict, rate: float, latency: float):
+    """Keep-alive server that throttles above ``rate`` requests per second."""
+    bucket = {"tokens": rate, "at": time.monotonic()}
+
+    def admit() -> bool:
+        now = time.monotonic()
+        bucket["tokens"] = min(rate, bucket["tokens"] + (now - bucket["at"]) * rate)
+        bucket["at"] = now
+        if bucket["tokens"] >= 1:
+            bucket["tokens"] -= 1
+            return True
+        return False
+
+    async def handle(reader, writer):
+        try:
+            while True:
+                head = await reader.readuntil(b"\r\n\r\n")
+                length = 0
+                for line in head.split(b"\r\n"):
+                    name, _, value = line.partition(b":")
+                    if name.strip().lower() == b"content-length":
+                        length = int(value)
+                await reader.readexactly(length)
+                if admit():
+                    stats["answered"] += 1
+                    await asyncio.sleep(latency)
+                    writer.write(
+                        b"HTTP/1.1 200 OK\r\nContent-Type: application/json\r\n"
+                        b"Content-Length: %d\r\n\r\n%s" % (len(BODY), BODY)
+                    )
+                else:
+                    stats["throttled"] += 1
+                    writer.write(
+                        b"HTTP/1.1 429 Too Many Requests\r\nRetry-After: 1\r\n"
+                        b"Content-Length: 0\r\n\r\n"
+                    )
+                await writer.drain()
+        except (asyncio.IncompleteReadError, ConnectionError):
+            pass
+        finally:
+            writer.close()
+
+    return await asyncio.start_server(handle, "127.0.0.1", 0)
+
+
+async def run(requests: int, server_rate: float, latency: float) -> dict:
+    """Outcome counts and timings for one burst of distinct requests."""
+    stats = {"answered": 0, "throttled": 0}
+    server = await start_stub(stats, server_rate, latency)
+    port = server.sockets[0].getsockname()[1]
+    settings.OPENROUTER_BASE_URL = f"http://127.0.0.1:{port}/api/v1"
+    await open_llm_client()
+    timings = []
+
+    async def one(i):
+        start = time.perf_counter()
+        answer = await generate_answer(
+            "question", "context", prompt=f"prompt {i}", use_cache=False
+        )
+        timings.append(time.perf_counter() - start)
+        return answer
+
+    try:
+        start = time.perf_counter()
+        answers = await asyncio.gather(*[one(i) for i in range(requests)])
+        elapsed = time.perf_counter() - start
+        limiter = get_llm_limiter().stats()
+    finally:
+        await close_llm_client()
+        server.close()
+        await server.wait_closed()
+    ok = sum(answer == ANSWER for answer in answers)
+    return {
+        "ok": ok,
+        "apologies": requests - ok,
+        "server_429s": stats["throttled"],
+        "elapsed": elapsed,
+        "p50": np.percentile(timings, 50),
+        "p99": np.percentile(timings, 99),
+        "limiter": limiter,
+    }
+
+
+def main():
+    """Print outcomes without and with adaptive admission control."""
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--requests", type=int, default=300)
+    parser.add_argument("--server-rate", type=float, default=20.0)
+    parser.add_argument("--latency-ms", type=float, default=50.0)
+    args = parser.parse_args()
+    settings.OPENROUTER_API_KEY = "benchmark"
+    configured = {
+        name: getattr(settings, name)
+        for name in ("LLM_MAX_IN_FLIGHT", "LLM_RATE", "LLM_MAX_RATE", "LLM_BURST")
+    }
+    configured["LLM_MAX_RETRIES"] = settings.LLM_MAX_RETRIES
+    unlimited = {
+        "LLM_MAX_IN_FLIGHT": args.requests,
+        "LLM_RATE": 1e6,
+        "LLM_MAX_RATE": 1e6,
+        "LLM_BURST": args.requests,
+        "LLM_MAX_RETRIES": 0,
+    }
+
+    for label, overrides in (("unlimited", unlimited), ("adaptive", configured)):
+        for name, value in overrides.items():
+            setattr(settings, name, value)
+        result = asyncio.run(
+            run(args.requests, args.server_rate, args.latency_ms / 1000)
+        )
+        limiter = result["limiter"]
+        print(
+            f"{label}: {result['ok']} answered, {result['apologies']} apologies, "
+            f"{result['server_429s']} 429s from the server, "
+            f"{result['ok'] / result['elapsed']:.1f} answers/s over "
+            f"{result['elapsed']:.2f} s, latency p50 {result['p50']:.2f} s "
+            f"p99 {result['p99']:.2f} s, final rate {limiter['rate']:.2f}/s, "
+            f"queue wait p95 {limiter['wait_ms_p95']:.0f} ms, "
+            f"{limiter['timeouts']} queue timeouts"
+        )
+
+
+if __name__ == "__main__":
+    main()
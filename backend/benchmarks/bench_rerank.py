@@ -0,0 +1,76 @@
+"""
+Latency of the reranking stage for a batch of candidates
+usage: python benchmarks/bench_rerank.py [--candidates 200] [--repeats 500]
+"""
+
+import argparse
+import os
+import random
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# pylint: disable=wrong-import-position
+from app.core.rerank import rerank
+from app.core.results import MatchType, RetrievalResult
+
+QUERY = "gentle niacinamide moisturizer for dry skin without fragrance"
+
+
+def synthetic_candidates(n_candidates: int, seed: int = 0) -> list:
+    """Product records shaped like ``retrieve_results`` output."""
+    rng = random.Random(seed)
+    categories = ["Moisturizer", "Cleanser", "Treatment", "Face Mask", "Eye cream"]
+    return [
+        RetrievalResult(
+            i,
+            MatchType.GENERAL,
+            (
+                f"Product: Brand {i % 13} Product {i}\n"
+                f"Category: {categories[i % len(categories)]}\n"
+                "Suitable for: Dry, Normal, Oily skin\n"
+                "Key ingredients: Water, Glycerin, Niacinamide, Squalane, "
+                "Fragrance (+ 25 more)\n"
+                f"Rating: {rng.uniform(3, 5):.1f}/5"
+            ),
+            rng.choice([0.95, 0.85, 0.7]),
+            {
+                "product_id": i,
+                "rank": rng.uniform(3, 5),
+                "skin_type_match": rng.random() < 0.5,
+                "category_match": rng.random() < 0.3,
+                "beneficial_hits": rng.randint(0, 4),
+                "avoid_hits": rng.randint(0, 1),
+            },
+        )
+        for i in range(n_candidates)
+    ]
+
+
+def main():
+    """Print rerank latency percentiles."""
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--candidates", type=int, default=200)
+    parser.add_argument("--repeats", type=int, default=500)
+    parser.add_argument("--k", type=int, default=8)
+    args = parser.parse_args()
+
+    candidates = synthetic_candidates(args.candidates)
+    rerank(QUERY, candidates, args.k, budget_ms=1e9)  # warm up
+    timings = []
+    for _ in range(args.repeats):
+        start = time.perf_counter()
+        rerank(QUERY, candidates, args.k, budget_ms=1e9)
+        timings.append((time.perf_counter() - start) * 1000)
+    p50, p95, p99 = np.percentile(timings, [50, 95, 99])
+    print(
+        f"{args.candidates} candidates: p50 {p50:.3f} ms, "
+        f"p95 {p95:.3f} ms, p99 {p99:.3f} ms"
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,101 @@
+"""
+Latency of spelling correction on the bundled catalog's vocabulary
+usage: python benchmarks/bench_spell.py [--csv data/cosmetic_p.csv] [--queries 20000]
+Queries are catalog words of five or more letters with one or two random
+edits; a fifth are left unchanged so the known-word path is timed too.
+"""
+
+import argparse
+import csv
+import os
+import random
+import sys
+import time
+from collections import Counter
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# pylint: disable=wrong-import-position
+from app.core.spell_index import MIN_CORRECTED_LENGTH, SpellIndex, vocabulary
+
+LETTERS = "abcdefghijklmnopqrstuvwxyz"
+
+
+def misspell(word: str, rng: random.Random) -> str:
+    """``word`` with one or two random deletions, insertions or substitutions."""
+    chars = list(word)
+    for _ in range(rng.randint(1, 2)):
+        i = rng.randrange(len(chars))
+        edit = rng.randrange(3)
+        if edit == 0 and len(chars) > 1:
+            del chars[i]
+        elif edit == 1:
+            chars.insert(i, rng.choice(LETTERS))
+        else:
+            chars[i] = rng.choice(LETTERS)
+    return "".join(chars)
+
+
+def catalog_vocabulary(path: str):
+    """Ingredient and brand words of the catalog CSV, and product name words.
+
+    Like the app's index, only the first are offered as corrections.
+    """
+    with open(path, encoding="utf-8-sig", newline="") as f:
+        rows = list(csv.DictReader(f))
+    ingredients = Counter(
+        name.strip() for row in rows for name in row["ingredients"].split(",")
+    )
+    brands = Counter(row["brand"] for row in rows)
+    products = Counter(row["name"] for row in rows)
+    return (
+        vocabulary(ingredients.items()) + vocabulary(brands.items()),
+        vocabulary(products.items()),
+    )
+
+
+def main():
+    """Print build time, correction latency percentiles and accuracy."""
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument(
+        "--csv",
+        default=os.path.join(
+            os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+            "data",
+            "cosmetic_p.csv",
+        ),
+    )
+    parser.add_argument("--queries", type=int, default=20_000)
+    args = parser.parse_args()
+
+    words, product_words = catalog_vocabulary(args.csv)
+    start = time.perf_counter()
+    index = SpellIndex(words, known=product_words)
+    print(f"built {len(index)} words in {time.perf_counter() - start:.2f} s")
+
+    rng = random.Random(1)
+    known = [word for word in words if len(word) >= MIN_CORRECTED_LENGTH]
+    queries = []
+    for _ in range(args.queries):
+        word = rng.choice(known)
+        queries.append((word, word if rng.random() < 0.2 else misspell(word, rng)))
+
+    timings = []
+    corrected = 0
+    for word, query in queries:
+        start = time.perf_counter()
+        found = index.lookup(query)
+        timings.append((time.perf_counter() - start) * 1000)
+        corrected += found == word
+    p50, p95, p99 = np.percentile(timings, [50, 95, 99])
+    print(
+        f"{args.queries} lookups: p50 {p50:.4f} ms, p95 {p95:.4f} ms, "
+        f"p99 {p99:.4f} ms, max {max(timings):.4f} ms"
+    )
+    print(f"restored the original word for {corrected / args.queries:.1%}")
+
+
+if __name__ == "__main__":
+    main()
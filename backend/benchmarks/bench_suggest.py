@@ -0,0 +1,74 @@
+"""
+Latency of ingredient/brand autocomplete on a synthetic vocabulary
+usage: python benchmarks/bench_suggest.py [--entries 100000] [--queries 20000]
+Prefixes are 1-6 characters of a random word of a random name, the way a
+user types them.
+"""
+
+import argparse
+import os
+import random
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# pylint: disable=wrong-import-position
+from app.core.suggest_index import SuggestIndex
+
+SYLLABLES = [
+    "a", "al", "ce", "cy", "di", "ete", "gly", "hy", "ic", "lau", "lo", "me",
+    "mi", "na", "ne", "ol", "pro", "pyl", "ra", "ryl", "sa", "so", "te", "thyl",
+    "tri", "um", "vi", "xy", "ze",
+]
+
+
+def synthetic_vocabulary(n_entries: int, seed: int = 0) -> list:
+    """INCI-like names with Zipf-distributed product counts."""
+    rng = random.Random(seed)
+    names = set()
+    while len(names) < n_entries:
+        words = [
+            "".join(rng.choice(SYLLABLES) for _ in range(rng.randint(2, 5))).title()
+            for _ in range(rng.randint(1, 4))
+        ]
+        names.add(" ".join(words))
+    counts = np.random.default_rng(seed).zipf(1.6, size=n_entries)
+    return list(zip(sorted(names), counts.tolist()))
+
+
+def main():
+    """Print build time and suggestion latency percentiles."""
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--entries", type=int, default=100_000)
+    parser.add_argument("--queries", type=int, default=20_000)
+    parser.add_argument("--limit", type=int, default=10)
+    args = parser.parse_args()
+
+    vocabulary = synthetic_vocabulary(args.entries)
+    start = time.perf_counter()
+    index = SuggestIndex(vocabulary)
+    print(f"built {len(index)} entries in {time.perf_counter() - start:.2f} s")
+
+    rng = random.Random(1)
+    prefixes = []
+    for _ in range(args.queries):
+        word = rng.choice(rng.choice(vocabulary)[0].split())
+        prefixes.append(word[: rng.randint(1, 6)])
+
+    timings = []
+    for prefix in prefixes:
+        start = time.perf_counter()
+        index.suggest(prefix, args.limit)
+        timings.append((time.perf_counter() - start) * 1000)
+    p50, p95, p99 = np.percentile(timings, [50, 95, 99])
+    print(
+        f"{args.queries} lookups: p50 {p50:.4f} ms, p95 {p95:.4f} ms, "
+        f"p99 {p99:.4f} ms, max {max(timings):.4f} ms"
+    )
+
+
+if __name__ == "__main__":
+    main()
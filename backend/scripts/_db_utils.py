@@ -6,14 +6,20 @@ truncate sequence is not duplicated across multiple scripts.
 
 from sqlalchemy import text
 
+from app.core.catalog_version import bump_catalog_version
+
 
 def truncate_tables(db):
     """Disable foreign key checks, truncate tables, re-enable and commit.
 
+    Bumps the catalog version afterwards so running servers drop any
+    in-memory copy of the old catalog.
+
     Expects a SQLAlchemy connection/session-like object with `execute`
     and `commit` methods.
     """
     db.execute(text("SET FOREIGN_KEY_CHECKS = 0"))
+    db.execute(text("TRUNCATE TABLE product_leaderboards"))
     db.execute(text("TRUNCATE TABLE product_ingredients"))
     db.execute(text("TRUNCATE TABLE product_skin_types"))
     db.execute(text("TRUNCATE TABLE products"))
@@ -21,3 +27,4 @@ def truncate_tables(db):
     db.execute(text("TRUNCATE TABLE skin_types"))
     db.execute(text("SET FOREIGN_KEY_CHECKS = 1"))
     db.commit()
+    bump_catalog_version()
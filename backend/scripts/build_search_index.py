@@ -0,0 +1,69 @@
+"""
+Build and persist the search indexes used by RETRIEVAL_MODE=bm25 and dense
+(BM25 postings, dense vectors and the IVF index over them)
+usage: python scripts/build_search_index.py [--csv]
+With --csv the indexes are built from data/cosmetic_p.csv instead of the database.
+"""
+
+import sys
+import os
+from app.core.ann_index import IVFIndex, reload_ann_index
+from app.core.bm25_index import (
+    BM25Index,
+    bm25_index_path,
+    csv_documents,
+    reload_bm25_index,
+)
+from app.core.catalog_version import bump_catalog_version, read_catalog_version
+from app.core.config import settings
+from app.core.dense_index import DenseIndex, reload_dense_index
+from sqlalchemy.exc import SQLAlchemyError
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+def build_from_database():
+    """Build the indexes from the current catalog and write them to disk."""
+    # A versioned catalog is required for the server to trust the files
+    if read_catalog_version() is None:
+        bump_catalog_version()
+    try:
+        bm25 = reload_bm25_index()
+        dense = reload_dense_index()
+        ivf = reload_ann_index()
+    except SQLAlchemyError as e:
+        print(f"Error: {e}")
+        return
+    print(f"Indexed {len(bm25)} products (BM25) and {len(dense)} (dense)")
+    print(f"IVF index: {ivf.nlist} lists")
+    print(f"Written to {settings.INDEX_DIR}")
+
+
+def build_from_csv(csv_file_path: str):
+    """Build the indexes from the seed CSV and write them to disk."""
+    documents = csv_documents(csv_file_path)
+    version = read_catalog_version()
+    if version is None:
+        version = bump_catalog_version()
+    BM25Index.from_documents(documents).save(bm25_index_path(), version)
+    dense = DenseIndex.from_documents(documents)
+    dense.save(settings.INDEX_DIR, version)
+    IVFIndex.from_dense(dense, settings.ANN_NLIST).save(
+        settings.INDEX_DIR, version, settings.ANN_NLIST
+    )
+    print(f"Indexed {len(documents)} products into {settings.INDEX_DIR}")
+
+
+if __name__ == "__main__":
+    if "--csv" in sys.argv[1:]:
+        CSV_PATH = os.path.join(
+            os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+            "data",
+            "cosmetic_p.csv",
+        )
+        if not os.path.exists(CSV_PATH):
+            print(f"File not found: {CSV_PATH}")
+        else:
+            build_from_csv(CSV_PATH)
+    else:
+        build_from_database()
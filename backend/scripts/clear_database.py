@@ -8,6 +8,7 @@ from app.db.models import Product, Ingredient, SkinType
 from app.db.session import SessionLocal, engine
 from app.db.models import Base
 from scripts._db_utils import truncate_tables
+from app.core.catalog_version import bump_catalog_version
 
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
@@ -36,6 +37,7 @@ def clear_database():
             db.close()
             Base.metadata.drop_all(bind=engine)
             Base.metadata.create_all(bind=engine)
+            bump_catalog_version()
             print("   DROP/CREATE successful")
             db = SessionLocal()
 
@@ -0,0 +1,206 @@
+"""
+Check that the catalog and retrieval queries are served by indexes
+usage: python scripts/explain_queries.py [--verbose]
+Issues every request-time query shape against DATABASE_URL, runs EXPLAIN on
+each statement and exits with status 1 if any reads a table with a full scan.
+Seed the database first. Structures built once per catalog version (name
+index, ingredient matrix) are warmed up before statements are collected.
+"""
+
+import os
+import re
+import sys
+
+from fastapi.testclient import TestClient
+from sqlalchemy import event
+
+from app.api.pagination import encode_cursor
+from app.core.hybrid_retrieve import invalidate_retrieval_cache, sql_retrieve
+from app.db.models import Base
+from app.db.session import SessionLocal, engine
+from app.main import create_app
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+PROFILE = {"skin_type": "dry", "sensitive": "yes", "concerns": ["aging", "acne"]}
+
+# Bare "SCAN t": no index, no virtual table index; older SQLite says TABLE
+_SQLITE_FULL_SCAN = re.compile(r"^SCAN (?:TABLE )?(\w+)$")
+# SQLAlchemy aliases tables as products_1, products_2, ...
+_ALIAS_SUFFIX = re.compile(r"_\d+$")
+
+
+def _next_cursor(response) -> str:
+    return response.headers.get("x-next-cursor", "")
+
+
+def _retrieve(mode: str):
+    def run(_client, db):
+        invalidate_retrieval_cache()
+        sql_retrieve(db, "what should I use?", PROFILE, mode=mode)
+
+    return run
+
+
+# (name, issue the queries, tables allowed a full scan and why)
+SCENARIOS = [
+    (
+        "product listing, first and next page",
+        lambda client, _db: client.get(
+            "/api/products",
+            params={
+                "limit": 20,
+                "cursor": _next_cursor(client.get("/api/products", params={"limit": 20})),
+            },
+        ),
+        {},
+    ),
+    (
+        "product listing, unranked tail",
+        lambda client, _db: client.get(
+            "/api/products",
+            params={"limit": 20, "cursor": encode_cursor({"r": None, "id": 0})},
+        ),
+        {},
+    ),
+    (
+        "products by skin type",
+        lambda client, _db: client.get(
+            "/api/products", params={"skin_type": "Dry", "limit": 20}
+        ),
+        {},
+    ),
+    (
+        "products by ingredient",
+        lambda client, _db: client.get(
+            "/api/products", params={"ingredient": "Glycerin", "limit": 20}
+        ),
+        {},
+    ),
+    (
+        "product full-text search",
+        lambda client, _db: client.get(
+            "/api/products",
+            params={"search": "cream", "search_mode": "fulltext", "limit": 20},
+        ),
+        {},
+    ),
+    (
+        "single product",
+        lambda client, _db: client.get("/api/products/1"),
+        {},
+    ),
+    (
+        "ingredient listing, first and next page",
+        lambda client, _db: client.get(
+            "/api/ingredients",
+            params={
+                "limit": 20,
+                "cursor": _next_cursor(
+                    client.get("/api/ingredients", params={"limit": 20})
+                ),
+            },
+        ),
+        # The first page walks the clustered primary key and stops at LIMIT
+        {"ingredients": "primary key order"},
+    ),
+    (
+        "ingredient search",
+        lambda client, _db: client.get(
+            "/api/ingredients", params={"search": "acid", "limit": 20}
+        ),
+        {},
+    ),
+    *[
+        (
+            f"retrieval ({mode})",
+            _retrieve(mode),
+            # Matched by substring; a handful of rows
+            {"skin_types": "ILIKE on a tiny table"},
+        )
+        for mode in ("sql", "single_query", "leaderboard")
+    ],
+]
+
+
+def full_scans(connection, statement: str, parameters) -> list:
+    """Plan lines and the catalog tables ``statement`` reads in full."""
+    dialect = connection.dialect.name
+    if dialect == "sqlite":
+        plan = [
+            row[-1]
+            for row in connection.exec_driver_sql(
+                f"EXPLAIN QUERY PLAN {statement}", parameters
+            )
+        ]
+        scanned = [m.group(1) for m in map(_SQLITE_FULL_SCAN.match, plan) if m]
+    elif dialect == "mysql":
+        rows = connection.exec_driver_sql(f"EXPLAIN {statement}", parameters)
+        rows = rows.mappings().all()
+        plan = [
+            f"{row['table']}: type={row['type']} key={row['key']} {row['Extra'] or ''}"
+            for row in rows
+        ]
+        scanned = [row["table"] for row in rows if row["type"] == "ALL"]
+    else:
+        raise SystemExit(f"EXPLAIN is not supported for {dialect}")
+
+    tables = {_ALIAS_SUFFIX.sub("", name) for name in scanned if name}
+    # Subqueries, derived tables and the schema catalog are not our tables
+    return plan, sorted(tables & set(Base.metadata.tables))
+
+
+def collect(client, db, issue) -> list:
+    """Distinct ``(statement, parameters)`` that ``issue`` sends."""
+    statements = {}
+
+    def capture(_conn, _cursor, statement, parameters, _context, executemany):
+        if not executemany:
+            statements.setdefault(statement, parameters)
+
+    event.listen(engine, "before_cursor_execute", capture)
+    try:
+        issue(client, db)
+    finally:
+        event.remove(engine, "before_cursor_execute", capture)
+    return list(statements.items())
+
+
+def main() -> int:
+    """Explain every scenario; returns the process exit status."""
+    verbose = "--verbose" in sys.argv[1:]
+    client = TestClient(create_app())
+    db = SessionLocal()
+    failures = 0
+    try:
+        # Build the per-catalog caches outside the checked window
+        for _, issue, _ in SCENARIOS:
+            issue(client, db)
+
+        with engine.connect() as connection:
+            for name, issue, allowed in SCENARIOS:
+                statements = collect(client, db, issue)
+                bad = []
+                for statement, parameters in statements:
+                    plan, tables = full_scans(connection, statement, parameters)
+                    scanned = [t for t in tables if t not in allowed]
+                    if scanned or verbose:
+                        print(f"  {' '.join(statement.split())[:160]}")
+                        for line in plan:
+                            print(f"      {line}")
+                    bad.extend(scanned)
+                status = "FULL SCAN of " + ", ".join(sorted(set(bad))) if bad else "ok"
+                print(f"{name}: {len(statements)} statements, {status}")
+                failures += bool(bad)
+    finally:
+        db.close()
+
+    if failures:
+        print(f"{failures} query shapes fall back to full scans")
+        return 1
+    print("Every query shape uses an index")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
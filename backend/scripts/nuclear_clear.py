@@ -7,6 +7,7 @@ import os
 from app.db.session import SessionLocal
 from sqlalchemy import text
 from sqlalchemy.exc import SQLAlchemyError
+from app.core.catalog_version import bump_catalog_version
 
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
@@ -33,6 +34,7 @@ def nuclear_clear():
         # Nuclear clear sequence
         commands = [
             "SET FOREIGN_KEY_CHECKS = 0",
+            "TRUNCATE TABLE product_leaderboards",
             "TRUNCATE TABLE product_ingredients",
             "TRUNCATE TABLE product_skin_types",
             "TRUNCATE TABLE products",
@@ -47,6 +49,7 @@ def nuclear_clear():
                 db.execute(text(cmd))
 
             db.commit()
+            bump_catalog_version()
             print("All commands executed")
         except SQLAlchemyError:
             db.rollback()
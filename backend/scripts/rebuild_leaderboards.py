@@ -0,0 +1,34 @@
+"""
+Rebuild the product leaderboards from the catalog already in the database
+usage: python scripts/rebuild_leaderboards.py
+Run once after the add_product_leaderboards migration on a database seeded
+before it; seed_db.py rebuilds the boards on every seed from then on.
+"""
+
+import sys
+import os
+from app.db.session import SessionLocal
+from app.core.catalog_version import bump_catalog_version
+from app.core.leaderboards import rebuild_leaderboards
+from sqlalchemy.exc import SQLAlchemyError
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+def rebuild():
+    """Replace every board in one transaction and invalidate cached names."""
+    db = SessionLocal()
+    try:
+        entries = rebuild_leaderboards(db)
+        db.commit()
+        bump_catalog_version()
+        print(f"Rebuilt leaderboards: {entries} entries.")
+    except SQLAlchemyError as e:
+        print(f"Error: {e}")
+        db.rollback()
+    finally:
+        db.close()
+
+
+if __name__ == "__main__":
+    rebuild()
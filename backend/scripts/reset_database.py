@@ -10,6 +10,7 @@ from app.db.session import engine, SessionLocal
 from app.db.models import Base, Product, Ingredient, SkinType
 from scripts.seed_db import seed_data
 from scripts._db_utils import truncate_tables
+from app.core.catalog_version import bump_catalog_version
 
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
@@ -34,6 +35,7 @@ def reset_database():
             # Fallback: Drop and recreate tables
             Base.metadata.drop_all(bind=engine)
             Base.metadata.create_all(bind=engine)
+            bump_catalog_version()
             print("Tables dropped and recreated")
 
         # Step 2: Verify clean state
@@ -9,6 +9,8 @@ import sys
 import os
 from app.db.session import SessionLocal
 from app.db.models import Product, Ingredient, SkinType
+from app.core.catalog_version import bump_catalog_version
+from app.core.leaderboards import rebuild_leaderboards
 from sqlalchemy.exc import SQLAlchemyError
 
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
@@ -43,8 +45,12 @@ def seed_data(csv_file_path: str):
                 if count % 100 == 0:
                     print(f"Processed {count} products...")
 
+            # Same transaction as the products, so the boards never lag them
+            db.flush()
+            entries = rebuild_leaderboards(db)
             db.commit()
-            print(f"Success! Seeded {count} products.")
+            bump_catalog_version()
+            print(f"Success! Seeded {count} products ({entries} leaderboard entries).")
 
     except (csv.Error, OSError, ValueError, SQLAlchemyError) as e:
         print(f"Error: {e}")
@@ -44,3 +44,187 @@ def client(app):
     Accepts the `app` fixture and returns a configured TestClient.
     """
     return TestClient(app)
+
+
+SAMPLE_SKIN_TYPES = ["Combination", "Dry", "Normal", "Oily", "Sensitive"]
+
+SAMPLE_INGREDIENTS = [
+    "Water",
+    "Glycerin",
+    "Niacinamide",
+    "Salicylic Acid",
+    "Hyaluronic Acid",
+    "Sodium Hyaluronate",
+    "Ceramide NP",
+    "Squalane",
+    "Zinc Oxide",
+    "Retinol",
+    "Fragrance",
+    "Alcohol Denat.",
+    "Sodium Lauryl Sulfate",
+    "Menthol",
+    "Citrus Aurantium Dulcis (Orange) Peel Oil",
+    "Aloe Barbadensis Leaf Juice",
+    "Allantoin",
+    "Tocopherol",
+    "Cetearyl Alcohol",
+]
+
+# Positions in SAMPLE_INGREDIENTS of names matching AVOID_INGREDIENTS
+IRRITANT_POSITIONS = range(11, 16)
+
+SAMPLE_CATEGORIES = [
+    "Moisturizer",
+    "Cleanser",
+    "Treatment",
+    "Face Mask",
+    "Eye cream",
+    "Sun protect",
+]
+
+
+def seed_sample_catalog(session, n_products=36):
+    """Insert a small deterministic catalog for retrieval tests.
+
+    Ranks repeat so ties exercise the ``product_id`` tie-breaker, and a few
+    products are unranked. Odd products carry none of the irritants at
+    ``IRRITANT_POSITIONS``, so sensitive profiles have matches.
+    Leaderboards are built in the same transaction, as the seed script does.
+    """
+    # pylint: disable=import-outside-toplevel
+    from app.core.leaderboards import rebuild_leaderboards
+    from app.db.models import Product, Ingredient, SkinType
+
+    skin_types = [SkinType(type_name=name) for name in SAMPLE_SKIN_TYPES]
+    ingredients = [Ingredient(inci_name=name) for name in SAMPLE_INGREDIENTS]
+    session.add_all(skin_types + ingredients)
+    session.flush()
+
+    ranks = [4.8, 4.5, 4.5, 4.1, 3.9, 3.5, 3.2, 3.0, 2.5, None]
+    for i in range(n_products):
+        product = Product(
+            product_name=f"Product {i}",
+            brand_name=f"Brand {i % 7}",
+            category=SAMPLE_CATEGORIES[i % len(SAMPLE_CATEGORIES)],
+            rank=ranks[i % len(ranks)],
+        )
+        product.ingredients = [
+            ingredients[j]
+            for j in range(len(ingredients))
+            if ((i * 7 + j * 3) % 5 == 0 or j == 0)
+            and not (i % 2 and j in IRRITANT_POSITIONS)
+        ]
+        product.skin_types = [
+            skin_types[j] for j in range(len(skin_types)) if (i + j) % 3 != 0
+        ]
+        session.add(product)
+    session.flush()
+    rebuild_leaderboards(session)
+    session.commit()
+
+
+@pytest.fixture(autouse=True)
+def _fresh_catalog_caches(tmp_path, monkeypatch):
+    """Drop process-wide caches so tests never see another test's data.
+
+    Persisted indexes go to a per-test directory instead of ``data/index``.
+    """
+    # pylint: disable=import-outside-toplevel
+    from app.core.ann_index import clear_ann_index
+    from app.core.answer_cache import reset_answer_cache
+    from app.core.bm25_index import clear_bm25_index
+    from app.core.catalog_index import clear_catalog_index
+    from app.core.config import settings
+    from app.core.dense_index import clear_dense_index
+    from app.core.ingredient_index import clear_ingredient_index
+    from app.core.ingredient_matrix import clear_ingredient_matrix
+    from app.core.hybrid_retrieve import invalidate_retrieval_cache
+    from app.core.leaderboards import clear_leaderboard_names
+    from app.core.spell_index import clear_spell_index
+    from app.core.suggest_index import clear_suggest_indexes
+
+    def _clear():
+        clear_catalog_index()
+        clear_ingredient_index()
+        clear_ingredient_matrix()
+        clear_bm25_index()
+        clear_dense_index()
+        clear_ann_index()
+        clear_leaderboard_names()
+        clear_suggest_indexes()
+        clear_spell_index()
+        invalidate_retrieval_cache()
+        reset_answer_cache()
+
+    monkeypatch.setattr(settings, "INDEX_DIR", str(tmp_path / "index"))
+    _clear()
+    yield
+    _clear()
+
+
+@pytest.fixture
+def catalog_session():
+    """Session bound to a fresh in-memory SQLite catalog with sample data."""
+    # pylint: disable=import-outside-toplevel
+    from sqlalchemy import create_engine
+    from sqlalchemy.orm import sessionmaker
+    from sqlalchemy.pool import StaticPool
+    from app.db.models import Base
+
+    engine = create_engine(
+        "sqlite://",
+        connect_args={"check_same_thread": False},
+        poolclass=StaticPool,
+    )
+    Base.metadata.create_all(bind=engine)
+    session = sessionmaker(autocommit=False, autoflush=False, bind=engine)()
+    seed_sample_catalog(session)
+    try:
+        yield session
+    finally:
+        session.close()
+        engine.dispose()
+
+
+@pytest.fixture
+def catalog_db_url(tmp_path):
+    """URL of a file-backed SQLite catalog with sample data.
+
+    File-backed so separate (e.g. async) engines can open the same data.
+    """
+    # pylint: disable=import-outside-toplevel
+    from sqlalchemy import create_engine
+    from sqlalchemy.orm import sessionmaker
+    from app.db.models import Base
+
+    url = f"sqlite:///{tmp_path / 'catalog.db'}"
+    engine = create_engine(url)
+    Base.metadata.create_all(bind=engine)
+    with sessionmaker(bind=engine)() as session:
+        seed_sample_catalog(session)
+    engine.dispose()
+    return url
+
+
+@pytest.fixture
+def count_statements(catalog_session):
+    """Context manager factory counting SQL statements on the catalog engine."""
+    # pylint: disable=import-outside-toplevel
+    from contextlib import contextmanager
+    from sqlalchemy import event
+
+    @contextmanager
+    def _counter():
+        statements = []
+
+        def _record(_conn, _cursor, statement, *_args):
+            statements.append(statement)
+
+        engine = catalog_session.get_bind()
+        event.listen(engine, "before_cursor_execute", _record)
+        try:
+            yield statements
+        finally:
+            event.remove(engine, "before_cursor_execute", _record)
+
+    return _counter
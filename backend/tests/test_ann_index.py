@@ -0,0 +1,99 @@
+"""Tests for the IVF approximate nearest neighbour index."""
+
+import numpy as np
+
+from app.core import ann_index
+from app.core.ann_index import IVFIndex
+from app.core.bm25_index import top_k_scores
+from app.core.config import settings
+from app.core import hybrid_retrieve
+from app.core.hybrid_retrieve import invalidate_retrieval_cache, sql_retrieve
+
+
+def _clustered(n_vectors=2000, dimensions=32, seed=0):
+    rng = np.random.default_rng(seed)
+    centres = rng.standard_normal((40, dimensions))
+    points = centres[rng.integers(0, 40, n_vectors)]
+    points += 0.3 * rng.standard_normal((n_vectors, dimensions))
+    points /= np.linalg.norm(points, axis=1, keepdims=True)
+    return points.astype(np.float32), np.arange(1, n_vectors + 1, dtype=np.int64)
+
+
+def test_probing_every_list_is_exact():
+    """With nprobe == nlist the index returns exactly the brute-force top k."""
+    vectors, ids = _clustered()
+    index = IVFIndex.build(vectors, ids, nlist=16)
+    for query in vectors[:20]:
+        exact = top_k_scores(vectors @ query, ids, 10)
+        approx = index.search_vector(query, 10, nprobe=16)
+        assert [pid for pid, _ in approx] == [pid for pid, _ in exact]
+
+
+def test_recall_is_high_with_few_probes():
+    """A handful of probed lists already recovers most true neighbours."""
+    vectors, ids = _clustered()
+    index = IVFIndex.build(vectors, ids)
+    hits = 0
+    for query in vectors[:50]:
+        exact = {pid for pid, _ in top_k_scores(vectors @ query, ids, 10)}
+        approx = {pid for pid, _ in index.search_vector(query, 10, nprobe=4)}
+        hits += len(exact & approx)
+    assert hits / 500 >= 0.9
+
+
+def test_lists_partition_every_vector():
+    """Each product lands in exactly one list."""
+    vectors, ids = _clustered(500)
+    index = IVFIndex.build(vectors, ids, nlist=10)
+    assert index.offsets[-1] == len(ids)
+    assert sorted(index.product_ids.tolist()) == ids.tolist()
+
+
+def test_saved_index_is_memory_mapped(tmp_path):
+    """A loaded index maps its vectors from disk and searches identically."""
+    vectors, ids = _clustered(500)
+    index = IVFIndex.build(vectors, ids, nlist=10)
+    index.save(str(tmp_path), catalog_version=3, nlist_setting=10)
+
+    loaded, version, nlist_setting = IVFIndex.load(str(tmp_path))
+    assert version == 3
+    assert nlist_setting == 10
+    assert isinstance(loaded.vectors, np.memmap)
+    assert loaded.search_vector(vectors[0], 5, exclude=[1]) == index.search_vector(
+        vectors[0], 5, exclude=[1]
+    )
+
+
+def test_dense_mode_uses_ann_candidates(catalog_session, monkeypatch):
+    """Routing dense mode through a fully probed IVF index changes nothing."""
+    query = "squalane moisturizer without fragrance"
+    exact = sql_retrieve(catalog_session, query, k=10, mode="dense")
+
+    calls = []
+    real_get_ann_index = hybrid_retrieve.get_ann_index
+    monkeypatch.setattr(
+        hybrid_retrieve,
+        "get_ann_index",
+        lambda db: calls.append(db) or real_get_ann_index(db),
+    )
+    monkeypatch.setattr(settings, "ANN_MIN_PRODUCTS", 0)
+    monkeypatch.setattr(settings, "ANN_NPROBE", 1000)
+    invalidate_retrieval_cache()
+    assert sql_retrieve(catalog_session, query, k=10, mode="dense") == exact
+    assert calls
+
+
+def test_saved_index_is_rebuilt_when_nlist_changes(
+    catalog_session, monkeypatch, tmp_path
+):
+    """A persisted index built with another ANN_NLIST setting is not reused."""
+    # pylint: disable=protected-access
+    monkeypatch.setattr(settings, "INDEX_DIR", str(tmp_path))
+    monkeypatch.setattr(ann_index, "read_catalog_version", lambda: 7)
+    monkeypatch.setattr(settings, "ANN_NLIST", 4)
+    assert ann_index._load_or_build(catalog_session).nlist == 4
+    assert IVFIndex.load(str(tmp_path))[1:] == (7, 4)
+
+    monkeypatch.setattr(settings, "ANN_NLIST", 2)
+    assert ann_index._load_or_build(catalog_session).nlist == 2
+    assert IVFIndex.load(str(tmp_path))[1:] == (7, 2)
@@ -0,0 +1,233 @@
+"""Tests for the exact-match LLM answer cache.
+
+Generation tests run against a stub OpenRouter server on a local socket
+that counts the completion requests it receives.
+"""
+
+import asyncio
+import json
+
+import pytest
+
+from app.core import generate
+from app.core.answer_cache import (
+    AnswerCache,
+    SqliteAnswerStore,
+    answer_cache_key,
+    answer_cache_stats,
+)
+from app.core.cache import TTLCache
+from app.core.config import settings
+
+
+class FakeClock:
+    """Manually advanced clock for TTL tests."""
+
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+def test_key_covers_model_messages_and_sampling_but_not_streaming():
+    """Any change to what shapes the completion changes the key."""
+    _, _, data = generate._openrouter_request("prompt")  # pylint: disable=protected-access
+    key = answer_cache_key(data)
+    assert answer_cache_key(dict(data, stream=True)) == key
+    assert answer_cache_key(dict(reversed(list(data.items())))) == key
+    assert answer_cache_key(dict(data, temperature=0.2)) != key
+    assert answer_cache_key(dict(data, model="other")) != key
+    _, _, other = generate._openrouter_request("other prompt")  # pylint: disable=protected-access
+    assert answer_cache_key(other) != key
+
+
+def test_store_survives_reopening(tmp_path):
+    """Answers written by one store are read by the next one on that file."""
+    path = str(tmp_path / "cache" / "answers.db")
+    store = SqliteAnswerStore(path, maxsize=10, ttl=60)
+    store.set("k", "Use SPF daily.")
+    store.close()
+
+    reopened = SqliteAnswerStore(path, maxsize=10, ttl=60)
+    try:
+        assert reopened.get("k") == "Use SPF daily."
+        assert reopened.get("missing") is None
+    finally:
+        reopened.close()
+
+
+def test_store_expires_and_trims_least_recently_used(tmp_path):
+    """Expired rows read as misses; beyond maxsize the oldest used go first."""
+    clock = FakeClock()
+    store = SqliteAnswerStore(str(tmp_path / "a.db"), maxsize=2, ttl=10, clock=clock)
+    store.set("a", "1")
+    clock.now += 1
+    store.set("b", "2")
+    clock.now += 1
+    assert store.get("a") == "1"
+    clock.now += 1
+    store.set("c", "3")
+    assert len(store) == 2
+    assert store.get("b") is None
+    assert store.get("a") == "1"
+
+    clock.now += 11
+    assert store.get("a") is None
+    assert store.get("c") is None
+    assert len(store) == 0
+    store.close()
+
+
+def test_disk_hits_are_promoted_to_memory(tmp_path):
+    """A fresh process answers from disk once, then from memory."""
+    path = str(tmp_path / "answers.db")
+
+    async def scenario():
+        first = AnswerCache(TTLCache(8, 60), SqliteAnswerStore(path, 10, 60))
+        await first.set("k", "answer")
+        first.store.close()
+
+        second = AnswerCache(TTLCache(8, 60), SqliteAnswerStore(path, 10, 60))
+        results = [await second.get("k"), await second.get("k"), await second.get("x")]
+        second.store.close()
+        return results, second.stats()
+
+    results, stats = asyncio.run(scenario())
+    assert results == ["answer", "answer", None]
+    assert stats["disk"]["hits"] == 1
+    assert stats["disk"]["misses"] == 1
+    assert stats["memory"]["hits"] == 1
+    assert stats["hits"] == 2
+    assert stats["misses"] == 1
+    assert stats["hit_rate"] == pytest.approx(2 / 3, abs=1e-4)
+
+
+@pytest.fixture
+def openrouter_stub(monkeypatch):
+    """Run ``scenario`` against a stub server answering ``answer``."""
+    monkeypatch.setattr(settings, "OPENROUTER_API_KEY", "test-key")
+
+    def run(scenario, answer="Patch test first.", status=200):
+        stats = {"requests": 0}
+
+        async def handle(reader, writer):
+            head = await reader.readuntil(b"\r\n\r\n")
+            length = 0
+            for line in head.split(b"\r\n"):
+                name, _, value = line.partition(b":")
+                if name.strip().lower() == b"content-length":
+                    length = int(value)
+            request = json.loads(await reader.readexactly(length))
+            stats["requests"] += 1
+            if status != 200:
+                writer.write(b"HTTP/1.1 %d Error\r\nContent-Length: 0\r\n\r\n" % status)
+            elif request.get("stream"):
+                chunk = {"choices": [{"delta": {"content": answer}}]}
+                writer.write(
+                    b"HTTP/1.1 200 OK\r\nContent-Type: text/event-stream\r\n"
+                    b"Connection: close\r\n\r\n"
+                    + f"data: {json.dumps(chunk)}\n\ndata: [DONE]\n\n".encode()
+                )
+            else:
+                body = json.dumps({"choices": [{"message": {"content": answer}}]})
+                writer.write(
+                    b"HTTP/1.1 200 OK\r\nContent-Type: application/json\r\n"
+                    b"Connection: close\r\nContent-Length: %d\r\n\r\n%s"
+                    % (len(body), body.encode())
+                )
+            await writer.drain()
+            writer.close()
+
+        async def main():
+            server = await asyncio.start_server(handle, "127.0.0.1", 0)
+            port = server.sockets[0].getsockname()[1]
+            monkeypatch.setattr(
+                settings, "OPENROUTER_BASE_URL", f"http://127.0.0.1:{port}/api/v1"
+            )
+            try:
+                return await scenario()
+            finally:
+                server.close()
+                await server.wait_closed()
+
+        return asyncio.run(main()), stats
+
+    return run
+
+
+def test_identical_prompts_call_openrouter_once(openrouter_stub):
+    """Repeats are answered from the cache; other prompts still go upstream."""
+
+    async def scenario():
+        return [
+            await generate.generate_answer("q", "ctx", prompt="p"),
+            await generate.generate_answer("q", "ctx", prompt="p"),
+            await generate.generate_answer("q", "ctx", prompt="other"),
+        ]
+
+    answers, stats = openrouter_stub(scenario)
+    assert answers == ["Patch test first."] * 3
+    assert stats["requests"] == 2
+    assert answer_cache_stats()["hits"] == 1
+
+
+def test_bypass_skips_the_lookup_and_refreshes_the_entry(openrouter_stub):
+    """use_cache=False always goes upstream and is counted as a bypass."""
+
+    async def scenario():
+        await generate.generate_answer("q", "ctx", prompt="p")
+        await generate.generate_answer("q", "ctx", prompt="p", use_cache=False)
+        return await generate.generate_answer("q", "ctx", prompt="p")
+
+    answer, stats = openrouter_stub(scenario)
+    assert answer == "Patch test first."
+    assert stats["requests"] == 2
+    cache = answer_cache_stats()
+    assert cache["bypasses"] == 1
+    assert cache["hits"] == 1
+
+
+def test_failures_are_not_cached(openrouter_stub):
+    """An apology for a failed call is not replayed to later callers."""
+
+    async def scenario():
+        return [await generate.generate_answer("q", "ctx", prompt="p") for _ in range(2)]
+
+    answers, stats = openrouter_stub(scenario, status=500)
+    assert "technical difficulties" in answers[0]
+    assert stats["requests"] == 2
+    assert answer_cache_stats()["memory"]["size"] == 0
+
+
+def test_streamed_answers_share_the_cache(openrouter_stub):
+    """A completed stream fills the cache for both streamed and plain calls."""
+
+    async def scenario():
+        streamed = [piece async for piece in generate.stream_answer("q", "c", prompt="p")]
+        replayed = [piece async for piece in generate.stream_answer("q", "c", prompt="p")]
+        plain = await generate.generate_answer("q", "c", prompt="p")
+        return streamed, replayed, plain
+
+    (streamed, replayed, plain), stats = openrouter_stub(scenario, answer="Use SPF.")
+    assert streamed == replayed == ["Use SPF."]
+    assert plain == "Use SPF."
+    assert stats["requests"] == 1
+
+
+def test_disk_tier_from_settings(openrouter_stub, monkeypatch, tmp_path):
+    """With LLM_CACHE_PATH set, answers outlive the in-process cache."""
+    # pylint: disable=import-outside-toplevel
+    from app.core.answer_cache import reset_answer_cache
+
+    monkeypatch.setattr(settings, "LLM_CACHE_PATH", str(tmp_path / "answers.db"))
+
+    async def scenario():
+        first = await generate.generate_answer("q", "ctx", prompt="p")
+        reset_answer_cache()
+        return first, await generate.generate_answer("q", "ctx", prompt="p")
+
+    answers, stats = openrouter_stub(scenario)
+    assert answers == ("Patch test first.", "Patch test first.")
+    assert stats["requests"] == 1
+    assert answer_cache_stats()["disk"]["hits"] == 1
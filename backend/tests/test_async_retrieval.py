@@ -0,0 +1,131 @@
+"""Tests for the async retrieval path used by `/api/chat/ask`.
+
+A listener on the async engine awaits a short sleep before every statement
+to stand in for the network round trip to MySQL. Because the sleep is
+awaited on the event loop, concurrent retrievals should overlap their
+waits instead of queueing behind each other.
+"""
+
+import asyncio
+import threading
+import time
+
+import pytest
+from sqlalchemy import event
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+from sqlalchemy.util import await_only
+
+from app.core.hybrid_retrieve import (
+    async_sql_retrieve,
+    invalidate_retrieval_cache,
+    sql_retrieve,
+)
+from app.db.session import async_database_url
+
+SIMULATED_RTT = 0.05
+CONCURRENT_REQUESTS = 5
+
+
+def _async_engine_with_latency(url):
+    engine = create_async_engine(async_database_url(url))
+
+    @event.listens_for(engine.sync_engine, "before_cursor_execute")
+    def _simulated_round_trip(*_args):
+        await_only(asyncio.sleep(SIMULATED_RTT))
+
+    return engine
+
+
+def test_async_retrieval_matches_sync(catalog_db_url, catalog_session):
+    """The async variant returns what the sync retrieval returns."""
+    intake = {"skin_type": "dry", "sensitive": "yes", "concerns": ["aging"]}
+    expected = sql_retrieve(catalog_session, "help", intake, mode="sql")
+    invalidate_retrieval_cache()
+
+    async def scenario():
+        engine = create_async_engine(async_database_url(catalog_db_url))
+        try:
+            async with async_sessionmaker(engine)() as session:
+                return await async_sql_retrieve(session, "help", intake, mode="sql")
+        finally:
+            await engine.dispose()
+
+    assert asyncio.run(scenario()) == expected
+
+
+def test_concurrent_requests_overlap_db_waits(catalog_db_url):
+    """N simultaneous retrievals take about as long as one, not N times as long."""
+    intake = {"skin_type": "oily", "sensitive": "yes", "concerns": ["acne"]}
+
+    async def scenario():
+        engine = _async_engine_with_latency(catalog_db_url)
+        sessions = async_sessionmaker(engine)
+
+        async def one_request(k):
+            async with sessions() as session:
+                return await async_sql_retrieve(
+                    session, "what should I use?", intake, k=k, mode="sql"
+                )
+
+        try:
+            # Build the catalog caches (concurrently, from cold) outside the
+            # timed sections
+            await asyncio.gather(one_request(3), one_request(3))
+
+            start = time.perf_counter()
+            await one_request(4)
+            single = time.perf_counter() - start
+
+            # Distinct k values keep the profile cache out of the way
+            start = time.perf_counter()
+            results = await asyncio.gather(
+                *(one_request(5 + i) for i in range(CONCURRENT_REQUESTS))
+            )
+            concurrent = time.perf_counter() - start
+        finally:
+            await engine.dispose()
+        return single, concurrent, results
+
+    single, concurrent, results = asyncio.run(scenario())
+
+    assert all(results)
+    assert single >= SIMULATED_RTT * 4
+    assert concurrent < single * CONCURRENT_REQUESTS / 2
+
+
+@pytest.mark.parametrize("mode", ["sql", "memory"])
+def test_concurrent_requests_on_cold_caches_finish(catalog_db_url, mode):
+    """Requests that find the catalog caches cold build them without
+    stalling the event loop for each other.
+
+    A loop blocked on a lock cannot time itself out, so the scenario runs
+    in a thread that the test only waits a bounded time for.
+    """
+    intake = {"skin_type": "dry", "sensitive": "yes", "concerns": ["aging"]}
+    outcome = {}
+
+    async def scenario():
+        engine = _async_engine_with_latency(catalog_db_url)
+        sessions = async_sessionmaker(engine)
+
+        async def one_request(k):
+            async with sessions() as session:
+                return await async_sql_retrieve(
+                    session, "what should I use?", intake, k=k, mode=mode
+                )
+
+        try:
+            return await asyncio.gather(
+                *(one_request(3 + i) for i in range(CONCURRENT_REQUESTS))
+            )
+        finally:
+            await engine.dispose()
+
+    def run():
+        outcome["results"] = asyncio.run(scenario())
+
+    worker = threading.Thread(target=run, daemon=True)
+    worker.start()
+    worker.join(timeout=15)
+    assert not worker.is_alive(), "concurrent cold-cache retrievals deadlocked"
+    assert all(outcome["results"])
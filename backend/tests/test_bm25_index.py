@@ -0,0 +1,165 @@
+"""Tests for the BM25 index and the bm25 retrieval mode."""
+
+import math
+import os
+
+import pytest
+
+from app.core import bm25_index as bm25_module
+from app.core.bm25_index import BM25Index, get_bm25_index, parse_query, tokenize
+from app.core.catalog_version import bump_catalog_version
+from app.core.config import settings
+from app.core.hybrid_retrieve import sql_retrieve
+
+DOCS = [
+    (3, {"name": "Gentle Vitamin C Serum", "ingredients": "Water, Ascorbic Acid"}),
+    (1, {"name": "Hydrating Cream", "ingredients": "Water, Glycerin, Fragrance"}),
+    (2, {"name": "Vitamin C Cream", "ingredients": "Water, Fragrance"}),
+    (4, {"name": "Cleanser", "category": "Cleanser", "ingredients": "Water"}),
+]
+
+
+def _naive_bm25(documents, terms, k1=1.2, b=0.75):
+    """Straightforward per-document BM25 used as a reference."""
+    weighted = []
+    for product_id, fields in documents:
+        tokens = []
+        for field, text in fields.items():
+            tokens += tokenize(text) * bm25_module.FIELD_WEIGHTS.get(field, 1)
+        weighted.append((product_id, tokens))
+    avg_length = sum(len(t) for _, t in weighted) / len(weighted)
+    scores = {}
+    for product_id, tokens in weighted:
+        score = 0.0
+        for term in set(terms):
+            df = sum(term in t for _, t in weighted)
+            tf = tokens.count(term)
+            if not tf:
+                continue
+            idf = math.log1p((len(weighted) - df + 0.5) / (df + 0.5))
+            norm = k1 * (1 - b + b * len(tokens) / avg_length)
+            score += idf * tf * (k1 + 1) / (tf + norm)
+        scores[product_id] = score
+    return scores
+
+
+@pytest.mark.parametrize(
+    "query,terms,excluded",
+    [
+        ("gentle vitamin C serum", ["gentle", "vitamin", "c", "serum"], []),
+        ("vitamin c serum without fragrance", ["vitamin", "c", "serum"], ["fragrance"]),
+        ("fragrance-free moisturizer", ["moisturizer"], ["fragrance"]),
+        ("cream with no alcohol or menthol", ["cream"], ["alcohol", "menthol"]),
+        ("free of parabens, for dry skin", ["dry"], ["parabens"]),
+        ("fragrance cream without fragrance", ["cream"], ["fragrance"]),
+    ],
+)
+def test_parse_query_separates_negated_terms(query, terms, excluded):
+    """Negated words are excluded rather than scored."""
+    assert parse_query(query) == (terms, excluded)
+
+
+def test_scores_match_reference_bm25():
+    """Vectorized CSR scoring equals a per-document implementation."""
+    index = BM25Index.from_documents(DOCS)
+    terms = ["vitamin", "cream", "water", "missing"]
+    expected = _naive_bm25(DOCS, terms)
+    scores = index.scores(terms)
+    for position, product_id in enumerate(index.product_ids.tolist()):
+        assert scores[position] == pytest.approx(expected[product_id], rel=1e-5)
+
+
+def test_top_k_orders_by_score_then_id_and_excludes():
+    """Ties go to the lower id and excluded terms drop whole documents."""
+    index = BM25Index.from_documents(DOCS)
+    hits = index.top_k(["vitamin", "cream"], 4)
+    assert hits == sorted(hits, key=lambda h: (-h[1], h[0]))
+    assert [pid for pid, _ in hits] == [2, 1, 3]
+
+    twins = BM25Index.from_documents(
+        [(9, {"name": "Serum"}), (5, {"name": "Serum"}), (7, {"name": "Serum"})]
+    )
+    assert [pid for pid, _ in twins.top_k(["serum"], 2)] == [5, 7]
+
+    assert index.top_k(["cream"], 5, exclude=["fragrance"]) == []
+    assert index.top_k(["nothing"], 5) == []
+
+
+def test_save_and_load_round_trip(tmp_path):
+    """A persisted index scores identically and keeps its catalog version."""
+    index = BM25Index.from_documents(DOCS)
+    path = str(tmp_path / "bm25.npz")
+    index.save(path, catalog_version=42)
+
+    loaded, version = BM25Index.load(path)
+    assert version == 42
+    assert loaded.terms == index.terms
+    assert loaded.top_k(["vitamin", "cream"], 3) == index.top_k(
+        ["vitamin", "cream"], 3
+    )
+
+
+def test_index_is_persisted_and_reused(catalog_session, monkeypatch):
+    """Once written for a catalog version, the index is loaded, not rebuilt."""
+    monkeypatch.setattr(
+        settings,
+        "CATALOG_VERSION_FILE",
+        os.path.join(settings.INDEX_DIR, "..", ".catalog_version"),
+    )
+    bump_catalog_version()
+    built = get_bm25_index(catalog_session)
+    assert os.path.exists(bm25_module.bm25_index_path())
+
+    bm25_module.clear_bm25_index()
+    monkeypatch.setattr(
+        BM25Index,
+        "from_catalog",
+        classmethod(lambda cls, catalog: pytest.fail("index was rebuilt")),
+    )
+    loaded = get_bm25_index(catalog_session)
+    assert loaded.terms == built.terms
+
+
+def test_from_csv_numbers_rows_like_the_seed_script():
+    """The CSV build assigns ids 1..n in file order."""
+    csv_path = os.path.join(settings.DATA_DIR, "cosmetic_p.csv")
+    index = BM25Index.from_csv(csv_path)
+    assert index.product_ids[0] == 1
+    assert index.product_ids[-1] == len(index)
+    assert index.top_k(["la", "mer"], 1)
+
+
+def test_bm25_mode_ranks_products_by_query_text(catalog_session):
+    """Products are ranked by relevance with scores scaled to the best hit."""
+    results = sql_retrieve(catalog_session, "squalane retinol", mode="bm25")
+    products = [r for r in results if r["metadata"]["type"] == "product"]
+
+    assert products
+    assert products[0]["score"] == 1.0
+    assert all(0 < r["score"] <= 1.0 for r in products)
+    assert all(r["metadata"]["retriever"] == "bm25" for r in products)
+    assert all("Squalane" in r["text"] or "Retinol" in r["text"] for r in products)
+
+
+def test_bm25_mode_honours_negation(catalog_session):
+    """Products containing a negated ingredient are not returned."""
+    results = sql_retrieve(
+        catalog_session, "niacinamide cream without fragrance", k=12, mode="bm25"
+    )
+    product_ids = [
+        int(r["id"].rsplit("_", 1)[1])
+        for r in results
+        if r["metadata"]["type"] == "product" and "retriever" in r["metadata"]
+    ]
+    index = get_bm25_index(catalog_session)
+    fragranced = {pid for pid, _ in index.top_k(["fragrance"], len(index))}
+    assert product_ids
+    assert not set(product_ids) & fragranced
+
+
+def test_bm25_mode_falls_back_to_profile_matches(catalog_session):
+    """A query with no catalog terms still returns the profile lookups."""
+    intake = {"skin_type": "oily", "concerns": ["acne"]}
+    text_results = sql_retrieve(catalog_session, "help", intake, mode="bm25")
+    memory_results = sql_retrieve(catalog_session, "help", intake, mode="memory")
+    assert text_results == memory_results
@@ -0,0 +1,74 @@
+"""Tests for the in-process caches in front of retrieval and generation."""
+
+from app.core.cache import TTLCache
+from app.core.hybrid_retrieve import retrieval_cache_stats, sql_retrieve
+
+
+class FakeClock:
+    """Manually advanced clock for TTL tests."""
+
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def test_ttl_cache_evicts_least_recently_used():
+    """The oldest untouched entry is evicted once maxsize is exceeded."""
+    cache = TTLCache(maxsize=2, ttl=0)
+    cache.set("a", 1)
+    cache.set("b", 2)
+    assert cache.get("a") == 1
+    cache.set("c", 3)
+
+    assert cache.get("b") is None
+    assert cache.get("a") == 1
+    assert cache.get("c") == 3
+    stats = cache.stats()
+    assert stats["evictions"] == 1
+    assert stats["hits"] == 3
+    assert stats["misses"] == 1
+
+
+def test_ttl_cache_expires_entries():
+    """Entries older than the TTL are treated as misses and dropped."""
+    clock = FakeClock()
+    cache = TTLCache(maxsize=10, ttl=5, clock=clock)
+    cache.set("a", 1)
+    clock.now = 4.9
+    assert cache.get("a") == 1
+    clock.now = 5.0
+    assert cache.get("a") is None
+    assert cache.stats()["expirations"] == 1
+    assert len(cache) == 0
+
+
+def test_ttl_cache_invalidate():
+    """Invalidation drops one key or everything."""
+    cache = TTLCache(maxsize=10, ttl=0)
+    cache.set("a", 1)
+    cache.set("b", 2)
+    cache.invalidate("a")
+    assert cache.get("a") is None
+    assert cache.get("b") == 2
+    cache.invalidate()
+    assert len(cache) == 0
+
+
+def test_retrieval_cache_serves_repeat_profiles(catalog_session):
+    """A second request with the same profile is answered from the cache.
+
+    The query text differs but normalizes to the same profile, and the
+    session is closed so any database access would fail.
+    """
+    intake = {"skin_type": "oily", "sensitive": "no", "concerns": ["acne"]}
+    first = sql_retrieve(catalog_session, "what do you recommend?", intake)
+    catalog_session.close()
+    catalog_session.bind = None
+
+    second = sql_retrieve(catalog_session, "any suggestions?", intake)
+    assert second == first
+    second[0]["metadata"]["category"] = "mutated"
+    assert sql_retrieve(catalog_session, "again", intake) == first
+    assert retrieval_cache_stats()["hits"] >= 2
@@ -0,0 +1,172 @@
+"""Endpoint tests for the catalog routers against an in-memory SQLite catalog.
+
+The `get_db` dependency is overridden with the seeded `catalog_session`
+fixture so these run without MySQL.
+"""
+
+import pytest
+from sqlalchemy.dialects import mysql
+from sqlalchemy.schema import CreateIndex
+
+from app.db.fulltext import FULLTEXT_TABLES
+from app.db.models import Base
+from app.db.session import get_db
+
+
+@pytest.fixture
+def catalog_client(app, client, catalog_session):
+    """TestClient whose database dependency yields the sample catalog."""
+    app.dependency_overrides[get_db] = lambda: catalog_session
+    yield client
+    app.dependency_overrides.pop(get_db, None)
+
+
+def test_ingredient_search_uses_substring_semantics(catalog_client):
+    """`/api/ingredients?search=` matches anywhere in the name, ordered by id."""
+    r = catalog_client.get("/api/ingredients", params={"search": "alcohol"})
+    assert r.status_code == 200
+    names = [i["inci_name"] for i in r.json()]
+    assert names == ["Alcohol Denat.", "Cetearyl Alcohol"]
+
+    r = catalog_client.get(
+        "/api/ingredients", params={"search": "acid", "skip": 1, "limit": 1}
+    )
+    assert [i["inci_name"] for i in r.json()] == ["Hyaluronic Acid"]
+
+
+@pytest.mark.parametrize("limit", [2, 30])
+def test_product_listing_query_count_is_fixed(catalog_client, count_statements, limit):
+    """Listing products costs the same number of queries for any page size."""
+    with count_statements() as statements:
+        r = catalog_client.get("/api/products", params={"limit": limit})
+
+    assert r.status_code == 200
+    products = r.json()
+    assert len(products) == limit
+    assert all(p["ingredients"] and p["skin_types"] for p in products)
+    assert len(statements) == 3
+
+
+def test_get_product_flattens_relationships(catalog_client):
+    """A single product comes back with flattened ingredient/skin type names."""
+    r = catalog_client.get("/api/products/1")
+    assert r.status_code == 200
+    body = r.json()
+    assert body["ingredients"][0] == "Water"
+    assert body["skin_types"]
+
+
+def test_fulltext_search_matches_substring_search(catalog_client):
+    """Full-text results are the substring matches, whole words or not."""
+    for search in ("alcohol", "hyaluron", "acid"):
+        substring = catalog_client.get("/api/ingredients", params={"search": search})
+        fulltext = catalog_client.get(
+            "/api/ingredients", params={"search": search, "search_mode": "fulltext"}
+        )
+        assert fulltext.status_code == 200
+        assert {i["inci_name"] for i in fulltext.json()} == {
+            i["inci_name"] for i in substring.json()
+        }
+
+    r = catalog_client.get(
+        "/api/ingredients",
+        params={"search": "hyaluronic acid", "search_mode": "fulltext"},
+    )
+    assert [i["inci_name"] for i in r.json()] == ["Hyaluronic Acid"]
+
+
+def test_fulltext_product_search_orders_by_relevance(catalog_client, catalog_session):
+    """Rows added after the index exists are found, best match first."""
+    # pylint: disable=import-outside-toplevel
+    from app.db.models import Product
+
+    params = {"search": "cleanser", "search_mode": "fulltext", "limit": 100}
+    before = catalog_client.get("/api/products", params=params).json()
+    assert before and all(p["category"] == "Cleanser" for p in before)
+
+    catalog_session.add(
+        Product(product_name="Cleanser", brand_name="Cleanser Lab", category="Cleanser")
+    )
+    catalog_session.commit()
+    after = catalog_client.get("/api/products", params=params).json()
+    assert len(after) == len(before) + 1
+    assert after[0]["product_name"] == "Cleanser"
+
+
+@pytest.mark.parametrize("table", sorted(FULLTEXT_TABLES))
+def test_models_declare_the_mysql_fulltext_indexes(table):
+    """create_all (reset/clear scripts) recreates the indexes MATCH needs."""
+    _key, columns = FULLTEXT_TABLES[table]
+    ddl = [
+        str(CreateIndex(index).compile(dialect=mysql.dialect()))
+        for index in Base.metadata.tables[table].indexes
+    ]
+    names = ", ".join(c.name for c in columns)
+    assert any(
+        stmt.startswith("CREATE FULLTEXT INDEX")
+        and f"ON {table} ({names}) WITH PARSER ngram" in stmt
+        for stmt in ddl
+    )
+
+
+def test_unknown_search_mode_is_rejected(catalog_client):
+    """Only the substring and fulltext modes are accepted."""
+    r = catalog_client.get("/api/products", params={"search": "x", "search_mode": "regex"})
+    assert r.status_code == 422
+
+
+def _walk_pages(client, path, params):
+    """Follow X-Next-Cursor until the last page; returns every row id seen."""
+    seen, cursor = [], None
+    while True:
+        page = {**params, **({"cursor": cursor} if cursor else {})}
+        r = client.get(path, params=page)
+        assert r.status_code == 200
+        seen.extend(row.get("product_id", row.get("ingredient_id")) for row in r.json())
+        cursor = r.headers.get("x-next-cursor")
+        if not cursor:
+            return seen
+
+
+def test_product_cursor_pages_cover_the_listing_once(catalog_client):
+    """Cursor pages, across rank ties and unranked products, equal one page."""
+    whole = catalog_client.get("/api/products", params={"limit": 1000})
+    assert "x-next-cursor" not in whole.headers
+    expected = [p["product_id"] for p in whole.json()]
+    ranks = [p["rank"] for p in whole.json()]
+    ranked = [r for r in ranks if r is not None]
+    assert ranked == sorted(ranked, reverse=True) and ranks[-1] is None
+
+    assert _walk_pages(catalog_client, "/api/products", {"limit": 7}) == expected
+    # Filters apply to every page
+    filtered = {"skin_type": "dry", "limit": 3}
+    assert _walk_pages(catalog_client, "/api/products", filtered) == [
+        p["product_id"]
+        for p in catalog_client.get(
+            "/api/products", params={**filtered, "limit": 1000}
+        ).json()
+    ]
+
+
+def test_ingredient_cursor_pages_cover_the_listing_once(catalog_client):
+    """Ingredient listings and substring searches page by id."""
+    for params in ({}, {"search": "a"}):
+        whole = catalog_client.get("/api/ingredients", params={**params, "limit": 1000})
+        expected = [i["ingredient_id"] for i in whole.json()]
+        assert expected == sorted(expected)
+        walked = _walk_pages(catalog_client, "/api/ingredients", {**params, "limit": 2})
+        assert walked == expected
+
+
+@pytest.mark.parametrize(
+    "params",
+    [
+        {"cursor": "not-a-cursor"},
+        {"cursor": "eyJpZCI6MX0", "skip": 5},  # valid cursor, but with skip
+        {"cursor": "eyJpZCI6MX0", "search": "cleanser", "search_mode": "fulltext"},
+    ],
+)
+def test_bad_cursor_requests_are_rejected(catalog_client, params):
+    """Malformed cursors and cursors mixed with skip or full-text are 400s."""
+    for path in ("/api/products", "/api/ingredients"):
+        assert catalog_client.get(path, params=params).status_code == 400
@@ -0,0 +1,120 @@
+"""Tests for the alternative catalog retrieval backends.
+
+The memory, single-query and leaderboard backends must return exactly what
+the SQL backend returns for the same profile, so each case runs both and compares
+the result dicts.
+"""
+
+import pytest
+
+from app.core.catalog_index import CatalogIndex
+from app.core.ingredient_index import IngredientNameIndex
+from app.core.hybrid_retrieve import sql_retrieve
+
+PROFILES = [
+    ("What should I use?", None, None),
+    ("I have oily skin with acne breakouts", None, None),
+    ("anti-aging cream for wrinkles", {"skin_type": "dry", "sensitive": "no"}, None),
+    (
+        "gentle products please",
+        {"skin_type": "combination", "sensitive": "yes", "concerns": ["dryness"]},
+        "pigmentation",
+    ),
+    ("sensitive skin with redness", {"sensitive": "yes"}, None),
+    ("blackheads and dark spots", {"skin_type": "normal", "concerns": "acne"}, None),
+]
+
+
+@pytest.mark.parametrize("mode", ["memory", "single_query", "leaderboard"])
+@pytest.mark.parametrize("query,intake,concern", PROFILES)
+@pytest.mark.parametrize("k", [4, 8, 12])
+# pylint: disable-next=too-many-arguments
+def test_backend_matches_sql(catalog_session, mode, query, intake, concern, k):
+    """Every backend returns identical results for the same profile."""
+    expected = sql_retrieve(catalog_session, query, intake, concern, k, mode="sql")
+    actual = sql_retrieve(catalog_session, query, intake, concern, k, mode=mode)
+    assert expected
+    assert actual == expected
+
+
+def test_single_query_backend_uses_two_statements(catalog_session, count_statements):
+    """Candidates come back in one statement and relationships in one more."""
+    intake = {"skin_type": "dry", "sensitive": "yes", "concerns": ["aging", "acne"]}
+    # Build the ingredient name index and matrix outside the counted window
+    warm_up = {"skin_type": "oily", "sensitive": "yes"}
+    sql_retrieve(catalog_session, "warm up", warm_up, mode="single_query")
+
+    with count_statements() as statements:
+        results = sql_retrieve(catalog_session, "help", intake, mode="single_query")
+
+    assert results
+    assert len(statements) == 2
+
+
+@pytest.mark.parametrize("k", [4, 12])
+def test_sql_backend_query_count_does_not_grow_with_k(
+    catalog_session, count_statements, k
+):
+    """Relationships load in batches, so more results cost no extra queries."""
+    intake = {"skin_type": "normal", "sensitive": "yes", "concerns": ["acne"]}
+    warm_up = {"skin_type": "oily", "sensitive": "yes"}
+    sql_retrieve(catalog_session, "warm up", warm_up, mode="sql")
+
+    with count_statements() as statements:
+        results = sql_retrieve(catalog_session, "help", intake, k=k, mode="sql")
+
+    assert len(results) >= 4
+    # skin type + concern products, each with two relationship loads, plus
+    # the beneficial and avoid ingredient lookups
+    assert len(statements) == 8
+
+
+def test_memory_backend_issues_no_queries_once_loaded(catalog_session):
+    """After the index is built, retrieval never touches the database."""
+    sql_retrieve(catalog_session, "oily skin", {"sensitive": "yes"}, mode="memory")
+    catalog_session.close()
+    catalog_session.bind = None
+
+    results = sql_retrieve(
+        catalog_session, "dry skin with wrinkles", {"sensitive": "yes"}, mode="memory"
+    )
+    assert results
+
+
+def test_catalog_index_resolves_relationships(catalog_session):
+    """Products carry their ingredients and skin types ordered by id."""
+    index = CatalogIndex.from_session(catalog_session)
+    product = index.products[1]
+    ingredient_ids = [i.ingredient_id for i in product.ingredients]
+    assert ingredient_ids == sorted(ingredient_ids)
+    assert {st.type_name for st in product.skin_types} <= {
+        "Combination",
+        "Dry",
+        "Normal",
+        "Oily",
+        "Sensitive",
+    }
+
+
+@pytest.mark.parametrize(
+    "needle", ["acid", "ALCOHOL", "Zinc", "er", "a", "hyaluron", "peel oil", "xyz"]
+)
+def test_ingredient_name_index_matches_substring_scan(catalog_session, needle):
+    """Trigram lookups agree with a case-insensitive substring scan."""
+    index = CatalogIndex.from_session(catalog_session)
+    expected = [
+        i.ingredient_id
+        for i in index.ingredients
+        if needle.lower() in i.inci_name.lower()
+    ]
+    assert index.ingredient_names.search(needle) == expected
+
+
+def test_ingredient_name_index_resolves_many_names():
+    """Resolving several names unions the matches in id order."""
+    index = IngredientNameIndex(
+        [(3, "Salicylic Acid"), (1, "Glycerin"), (2, "Hyaluronic Acid"), (4, "Water")]
+    )
+    assert index.resolve(["acid", "glycerin"]) == [1, 2, 3]
+    assert index.resolve(["acid", "glycerin"], limit=2) == [1, 2]
+    assert not index.resolve(["retinol"])
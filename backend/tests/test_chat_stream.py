@@ -0,0 +1,244 @@
+"""Tests for the streamed chat answer (`/api/chat/ask/stream`).
+
+``stream_answer`` is exercised against a stub OpenRouter server on a local
+socket, so the tests see exactly what the client sends and when it hangs up.
+"""
+
+import asyncio
+import json
+from contextlib import asynccontextmanager
+
+import pytest
+
+from app.core import generate, rag_pipeline
+from app.core.config import settings
+from app.core.generate import stream_answer
+from app.core.llm_limiter import get_llm_limiter
+from app.core.results import MatchType, ResultSet, RetrievalResult
+from app.db.session import get_async_db
+
+
+async def _read_request(reader) -> dict:
+    head = await reader.readuntil(b"\r\n\r\n")
+    length = 0
+    for line in head.split(b"\r\n"):
+        name, _, value = line.partition(b":")
+        if name.strip().lower() == b"content-length":
+            length = int(value)
+    return json.loads(await reader.readexactly(length))
+
+
+def _chunk(text):
+    return {"choices": [{"delta": {"content": text}}]}
+
+
+@pytest.fixture
+def openrouter_stub(monkeypatch):
+    """Run ``scenario`` against a stub server that streams ``chunks``.
+
+    After each chunk the server waits for ``state["proceed"]``, unless it is
+    unset. ``state`` records the request body and whether the client closed
+    the connection early.
+    """
+    monkeypatch.setattr(settings, "OPENROUTER_API_KEY", "test-key")
+
+    def run(chunks, scenario, status=200):
+        state = {"request": None, "client_closed": None, "proceed": None}
+
+        async def handle(reader, writer):
+            state["request"] = await _read_request(reader)
+            if status != 200:
+                writer.write(b"HTTP/1.1 %d Error\r\nContent-Length: 0\r\n\r\n" % status)
+                await writer.drain()
+                writer.close()
+                return
+            writer.write(
+                b"HTTP/1.1 200 OK\r\nContent-Type: text/event-stream\r\n"
+                b"Connection: close\r\n\r\n: OPENROUTER PROCESSING\n\n"
+            )
+            for chunk in chunks:
+                writer.write(f"data: {json.dumps(chunk)}\n\n".encode())
+                await writer.drain()
+                if state["proceed"] is not None:
+                    # Either the client asks for more or it hangs up
+                    hung_up = asyncio.ensure_future(reader.read())
+                    proceed = asyncio.ensure_future(state["proceed"].wait())
+                    await asyncio.wait(
+                        [hung_up, proceed], return_when=asyncio.FIRST_COMPLETED
+                    )
+                    proceed.cancel()
+                    if hung_up.done():
+                        state["client_closed"].set()
+                        writer.close()
+                        return
+                    hung_up.cancel()
+                    state["proceed"].clear()
+            writer.write(b"data: [DONE]\n\n")
+            await writer.drain()
+            writer.close()
+
+        async def main():
+            state["client_closed"] = asyncio.Event()
+            server = await asyncio.start_server(handle, "127.0.0.1", 0)
+            port = server.sockets[0].getsockname()[1]
+            monkeypatch.setattr(
+                settings, "OPENROUTER_BASE_URL", f"http://127.0.0.1:{port}/api/v1"
+            )
+            try:
+                return await scenario(state)
+            finally:
+                server.close()
+                await server.wait_closed()
+
+        return asyncio.run(main())
+
+    return run
+
+
+async def _collect(pieces):
+    return [piece async for piece in pieces]
+
+
+def test_stream_answer_relays_deltas(openrouter_stub):
+    """Each delta comes through as it arrives; comments and [DONE] do not."""
+
+    async def scenario(state):
+        pieces = await _collect(stream_answer("q", "ctx", prompt="p"))
+        return pieces, state["request"]
+
+    pieces, request = openrouter_stub(
+        [_chunk("Use "), {"choices": [{"delta": {}}]}, _chunk("SPF.")], scenario
+    )
+    assert pieces == ["Use ", "SPF."]
+    assert request["stream"] is True
+    assert request["messages"][-1] == {"role": "user", "content": "p"}
+
+
+@pytest.mark.parametrize("stop", ["close", "cancel"])
+def test_stopping_the_stream_closes_the_upstream_request(openrouter_stub, stop):
+    """A consumer that goes away hangs up on OpenRouter mid-answer.
+
+    Starlette cancels the response task when the client disconnects, so
+    cancellation while waiting for the next delta must do the same as
+    closing the generator.
+    """
+
+    async def scenario(state):
+        state["proceed"] = asyncio.Event()
+        pieces = stream_answer("q", "ctx", prompt="p")
+        first = await anext(pieces)
+        if stop == "close":
+            await pieces.aclose()
+        else:
+            waiting = asyncio.ensure_future(anext(pieces))
+            await asyncio.sleep(0.05)
+            waiting.cancel()
+            with pytest.raises(asyncio.CancelledError):
+                await waiting
+        await asyncio.wait_for(state["client_closed"].wait(), timeout=5)
+        return first
+
+    chunks = [_chunk("one"), _chunk("two"), _chunk("three")]
+    assert openrouter_stub(chunks, scenario) == "one"
+
+
+def test_closing_the_stream_releases_the_upstream_at_once(
+    openrouter_stub, monkeypatch
+):
+    """aclose() closes the upstream response and frees its limiter slot
+    before it returns, not when the garbage collector gets to it."""
+    responses = []
+    real_completion_stream = generate._completion_stream  # pylint: disable=protected-access
+
+    @asynccontextmanager
+    async def recording_completion_stream(*args):
+        async with real_completion_stream(*args) as response:
+            responses.append(response)
+            yield response
+
+    monkeypatch.setattr(generate, "_completion_stream", recording_completion_stream)
+
+    async def scenario(state):
+        state["proceed"] = asyncio.Event()
+        pieces = stream_answer("q", "ctx", prompt="p")
+        await anext(pieces)
+        limiter = get_llm_limiter()
+        assert limiter.in_flight == 1
+        await pieces.aclose()
+        return responses[0].is_closed, limiter.in_flight
+
+    chunks = [_chunk("one"), _chunk("two")]
+    assert openrouter_stub(chunks, scenario) == (True, 0)
+
+
+def test_stream_answer_reports_upstream_errors(openrouter_stub, monkeypatch):
+    """An error status before any text yields the usual apology once."""
+    monkeypatch.setattr(settings, "LLM_MAX_RETRIES", 0)
+
+    async def scenario(_state):
+        return await _collect(stream_answer("q", "ctx", prompt="p"))
+
+    pieces = openrouter_stub([], scenario, status=429)
+    assert len(pieces) == 1
+    assert "high demand" in pieces[0]
+
+
+@pytest.fixture
+def stream_client(app, client, monkeypatch):
+    """TestClient with canned retrieval and a fake two-piece LLM stream."""
+    results = ResultSet(
+        [
+            RetrievalResult(
+                1,
+                MatchType.SKIN_TYPE,
+                "Product: MockCleanser\nCategory: Cleanser\nSuitable for: Oily skin\n"
+                "Key ingredients: MockIngredient\nRating: 4.5",
+                0.9,
+            )
+        ]
+    )
+
+    async def fake_stream_answer(*_args, **_kwargs):
+        yield "Hello"
+        yield " there"
+
+    monkeypatch.setattr(rag_pipeline, "retrieve_results", lambda **_: results)
+    monkeypatch.setattr(rag_pipeline, "stream_answer", fake_stream_answer)
+    app.dependency_overrides[get_async_db] = lambda: None
+    yield client
+    app.dependency_overrides.pop(get_async_db, None)
+
+
+def _events(body: str) -> list:
+    events = []
+    for block in body.strip().split("\n\n"):
+        fields = dict(line.split(": ", 1) for line in block.split("\n"))
+        events.append((fields["event"], json.loads(fields["data"])))
+    return events
+
+
+def test_ask_stream_sends_context_deltas_then_summary(stream_client):
+    """Citations arrive before the answer, the scores after it."""
+    r = stream_client.post(
+        "/api/chat/ask/stream",
+        json={
+            "question": "cleanser for oily skin",
+            "intake_data": {"skin_type": "oily", "sensitive": "no"},
+            "conversation_id": "c-1",
+        },
+    )
+    assert r.status_code == 200
+    assert r.headers["content-type"].startswith("text/event-stream")
+
+    events = _events(r.text)
+    assert [name for name, _ in events] == ["context", "delta", "delta", "done"]
+    context, done = events[0][1], events[-1][1]
+    assert context["citations"]
+    assert "MockCleanser" in context["context_summary"]
+    assert [data["text"] for name, data in events if name == "delta"] == [
+        "Hello",
+        " there",
+    ]
+    assert done["answer"] == "Hello there"
+    assert done["conversation_id"] == "c-1"
+    assert done["recommendation_confidence"] > 0
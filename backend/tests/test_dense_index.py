@@ -0,0 +1,76 @@
+"""Tests for the local dense index and the dense (fused) retrieval mode."""
+
+import numpy as np
+
+from app.core.bm25_index import get_bm25_index
+from app.core.dense_index import DenseIndex
+from app.core.hybrid_retrieve import reciprocal_rank_fusion, sql_retrieve
+
+DOCS = [
+    (1, {"name": "Hydrating Moisturizer", "ingredients": "Water, Glycerin"}),
+    (2, {"name": "Clarifying Cleanser", "ingredients": "Salicylic Acid"}),
+    (3, {"name": "Vitamin C Serum", "ingredients": "Ascorbic Acid, Water"}),
+    (4, {"name": "Mineral Sunscreen", "ingredients": "Zinc Oxide"}),
+]
+
+
+def test_top_k_matches_exhaustive_sort():
+    """argpartition top-k equals a full sort of the cosine scores."""
+    index = DenseIndex.from_documents(DOCS)
+    query = index.embed_query("vitamin serum water")
+    scores = index.vectors @ query
+    expected = [
+        int(index.product_ids[i])
+        for i in sorted(np.flatnonzero(scores > 0), key=lambda i: -scores[i])
+    ][:2]
+    assert [pid for pid, _ in index.top_k("vitamin serum water", 2)] == expected
+
+
+def test_character_ngrams_match_spelling_variants():
+    """Regional spellings and word forms still find the product."""
+    index = DenseIndex.from_documents(DOCS)
+    assert index.top_k("moisturiser", 1)[0][0] == 1
+    assert index.top_k("cleansing", 1)[0][0] == 2
+
+
+def test_excluded_products_are_not_returned():
+    """Product ids passed in ``exclude`` never appear in the results."""
+    index = DenseIndex.from_documents(DOCS)
+    assert 3 not in [pid for pid, _ in index.top_k("vitamin c serum", 4, [3])]
+
+
+def test_save_and_load_memory_maps_vectors(tmp_path):
+    """The persisted vectors are memory-mapped and score identically."""
+    index = DenseIndex.from_documents(DOCS)
+    index.save(str(tmp_path), catalog_version=7)
+
+    loaded, version = DenseIndex.load(str(tmp_path))
+    assert version == 7
+    assert isinstance(loaded.vectors, np.memmap)
+    assert loaded.top_k("sunscreen", 2) == index.top_k("sunscreen", 2)
+
+
+def test_reciprocal_rank_fusion_rewards_agreement():
+    """Items ranked by several lists beat items ranked high by only one."""
+    fused = reciprocal_rank_fusion([[1, 2, 3], [2, 3], [3, 2]])
+    assert [item for item, _ in fused] == [2, 3, 1]
+    assert reciprocal_rank_fusion([[5], [4]]) == [(4, 1 / 61), (5, 1 / 61)]
+
+
+def test_dense_mode_fuses_text_and_profile(catalog_session):
+    """Dense mode returns query matches, honours negation and scores in (0, 1]."""
+    results = sql_retrieve(
+        catalog_session,
+        "squalane moisturizer without fragrance",
+        {"skin_type": "dry"},
+        k=10,
+        mode="dense",
+    )
+    products = [r for r in results if r["metadata"].get("retriever") == "dense"]
+    assert products
+    assert products[0]["score"] == 1.0
+    assert all(0 < r["score"] <= 1.0 for r in products)
+
+    fragranced = set(get_bm25_index(catalog_session).containing(["fragrance"]))
+    ids = {int(r["id"].rsplit("_", 1)[1]) for r in products}
+    assert not ids & fragranced
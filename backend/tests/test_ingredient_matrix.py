@@ -0,0 +1,159 @@
+"""Tests for the product × ingredient bitset and sensitive-skin filtering."""
+
+import os
+
+import pytest
+
+from app.core.catalog_version import bump_catalog_version
+from app.core.config import settings
+from app.core.hybrid_retrieve import AVOID_INGREDIENTS, sql_retrieve
+from app.core.ingredient_index import get_ingredient_index
+from app.core.ingredient_matrix import (
+    ProductIngredientMatrix,
+    get_ingredient_matrix,
+)
+from app.db.models import Ingredient, Product
+
+
+def _avoided_ids(session):
+    return set(get_ingredient_index(session).resolve(AVOID_INGREDIENTS))
+
+
+def test_matrix_matches_relationships(catalog_session):
+    """Every product row holds exactly the bits of its ingredients."""
+    matrix = ProductIngredientMatrix.from_session(catalog_session)
+    avoided = _avoided_ids(catalog_session)
+    products = catalog_session.query(Product).order_by(Product.product_id).all()
+
+    flags = matrix.containing_any(
+        [p.product_id for p in products], matrix.mask(avoided)
+    )
+    expected = [
+        any(i.ingredient_id in avoided for i in p.ingredients) for p in products
+    ]
+    assert flags.tolist() == expected
+    assert any(expected) and not all(expected)
+    # Unknown products contain nothing
+    assert not matrix.containing_any([10_000], matrix.mask(avoided)).any()
+
+
+@pytest.mark.parametrize("mode", ["sql", "single_query", "memory", "bm25", "dense"])
+def test_sensitive_retrieval_excludes_avoided_products(catalog_session, mode):
+    """No retrieval mode recommends an avoided ingredient to sensitive skin."""
+    intake = {"skin_type": "oily", "sensitive": "yes", "concerns": ["acne"]}
+    results = sql_retrieve(catalog_session, "product cream", intake, k=12, mode=mode)
+    product_ids = [
+        r["metadata"]["product_id"]
+        for r in results
+        if r["metadata"]["type"] == "product"
+    ]
+    assert product_ids
+
+    avoided = _avoided_ids(catalog_session)
+    for product in catalog_session.query(Product).filter(
+        Product.product_id.in_(product_ids)
+    ):
+        assert not {i.ingredient_id for i in product.ingredients} & avoided
+
+
+@pytest.mark.parametrize("mode", ["sql", "memory", "bm25"])
+def test_sensitive_retrieval_keeps_fatty_alcohols(catalog_session, mode):
+    """Cetearyl Alcohol is not an irritant; Sodium Lauryl Sulfate is."""
+    intake = {"skin_type": "oily", "sensitive": "yes"}
+
+    def retrieved_ingredients(query):
+        results = sql_retrieve(catalog_session, query, intake, k=36, mode=mode)
+        product_ids = [
+            r["metadata"]["product_id"]
+            for r in results
+            if r["metadata"]["type"] == "product"
+        ]
+        return [
+            {i.inci_name for i in product.ingredients}
+            for product in catalog_session.query(Product).filter(
+                Product.product_id.in_(product_ids)
+            )
+        ]
+
+    fatty = retrieved_ingredients("cetearyl alcohol cream")
+    assert any("Cetearyl Alcohol" in names for names in fatty)
+    sulfate = retrieved_ingredients("sodium lauryl sulfate cleanser")
+    assert sulfate
+    assert not any("Sodium Lauryl Sulfate" in names for names in sulfate)
+
+
+def test_avoid_patterns_respect_word_boundaries():
+    """Look-alike names of harmless ingredients are not avoided."""
+    avoided = [
+        "Alcohol",
+        "Alcohol Denat.",
+        "SD Alcohol 40-B",
+        "Ethanol",
+        "Sodium Lauryl Sulfate",
+        "Sodium Coco-Sulfate",
+        "Methylparaben",
+        "Parfum",
+        "Fragrance (Parfum)",
+        "Citrus Limon (Lemon) Peel Oil",
+    ]
+    kept = [
+        "Cetearyl Alcohol",
+        "Cetyl Alcohol",
+        "Stearyl Alcohol",
+        "Phenoxyethanol",
+        "Zinc Sulfate",
+        "Citrus Unshiu Peel Extract",
+    ]
+    assert all(AVOID_INGREDIENTS.search(name) for name in avoided)
+    assert not any(AVOID_INGREDIENTS.search(name) for name in kept)
+
+
+def test_new_products_extend_the_matrix(catalog_session, monkeypatch):
+    """A reseed that only appends rows is applied without a full rebuild."""
+    monkeypatch.setattr(
+        settings,
+        "CATALOG_VERSION_FILE",
+        os.path.join(settings.INDEX_DIR, "..", ".catalog_version"),
+    )
+    bump_catalog_version()
+    before = get_ingredient_matrix(catalog_session)
+
+    menthol = catalog_session.query(Ingredient).filter_by(inci_name="Menthol").one()
+    added = Ingredient(inci_name="Linalool")
+    product = Product(product_name="New Toner", category="Toner", rank=4.9)
+    product.ingredients = [menthol, added]
+    catalog_session.add(product)
+    catalog_session.commit()
+    bump_catalog_version()
+
+    monkeypatch.setattr(
+        ProductIngredientMatrix,
+        "from_session",
+        classmethod(lambda cls, session: pytest.fail("matrix was rebuilt")),
+    )
+    after = get_ingredient_matrix(catalog_session)
+    assert len(after) == len(before) + 1
+    assert after.containing_any([product.product_id], after.mask([added.ingredient_id]))
+    assert after.containing_any(
+        [product.product_id], after.mask([menthol.ingredient_id])
+    )
+
+
+def test_changed_rows_rebuild_the_matrix(catalog_session, monkeypatch):
+    """Editing rows the matrix already holds falls back to a full rebuild."""
+    monkeypatch.setattr(
+        settings,
+        "CATALOG_VERSION_FILE",
+        os.path.join(settings.INDEX_DIR, "..", ".catalog_version"),
+    )
+    bump_catalog_version()
+    before = get_ingredient_matrix(catalog_session)
+
+    product = catalog_session.get(Product, 2)
+    product.ingredients = []
+    catalog_session.commit()
+    bump_catalog_version()
+
+    after = get_ingredient_matrix(catalog_session)
+    assert after is not before
+    assert not after.bits[after.product_ids.tolist().index(2)].any()
@@ -0,0 +1,84 @@
+"""Tests for the multi-pattern keyword matcher used by query parsing."""
+
+from app.core.hybrid_retrieve import (
+    CONCERN_KEYWORDS,
+    INGREDIENT_BENEFITS,
+    SKIN_TYPE_KEYWORDS,
+    _extract_skin_attributes,
+    _get_ingredient_benefits,
+)
+from app.core.keyword_matcher import KeywordMatcher
+
+QUERIES = [
+    "",
+    "I have oily skin with acne and blackheads",
+    "My dry, flaky skin feels tight after washing",
+    "sensitive and reactive skin, lots of redness",
+    "combination skin with dark spots and fine lines",
+    "what helps with sun damage and age spots?",
+    "Looking for an anti-aging serum for normal skin",
+    "clogged pores and comedones on my T-zone",
+    "nothing relevant here",
+]
+
+
+def _naive_extract(query, intake_data=None, concern=None):
+    """The per-keyword scan the matcher replaced."""
+    query_lower = query.lower()
+    skin_type = None
+    concerns = []
+    if intake_data and intake_data.get("skin_type"):
+        skin_type = intake_data["skin_type"].title()
+    if intake_data:
+        concerns.extend(c.lower() for c in intake_data.get("concerns", []))
+    if not skin_type:
+        for st in SKIN_TYPE_KEYWORDS:
+            if st in query_lower:
+                skin_type = st.title()
+                break
+    for concern_cat, keywords in CONCERN_KEYWORDS.items():
+        if any(keyword in query_lower for keyword in keywords):
+            if concern_cat not in concerns:
+                concerns.append(concern_cat)
+    if concern and concern not in concerns:
+        concerns.append(concern)
+    return skin_type, concerns
+
+
+def test_matcher_reports_overlapping_keywords():
+    """Keywords nested inside or overlapping others are all found."""
+    matcher = KeywordMatcher(
+        [("he", "he"), ("she", "she"), ("his", "his"), ("hers", "hers")]
+    )
+    assert matcher.labels("ushers") == {"he", "she", "hers"}
+    assert matcher.labels("this") == {"his"}
+    assert matcher.labels("xyz") == set()
+
+
+def test_matcher_merges_labels_of_shared_keywords():
+    """A keyword listed under several labels reports all of them."""
+    matcher = KeywordMatcher([("dry", "skin_type"), ("dry", "concern")])
+    assert matcher.labels("very dry") == {"skin_type", "concern"}
+
+
+def test_extraction_matches_naive_scan():
+    """The compiled matcher extracts exactly what the keyword loops did."""
+    intakes = [None, {"skin_type": "normal", "concerns": ["aging"]}]
+    for query in QUERIES:
+        for intake in intakes:
+            for concern in (None, "acne"):
+                assert _extract_skin_attributes(
+                    query, intake, concern
+                ) == _naive_extract(query, intake, concern), query
+
+
+def test_ingredient_benefits_prefer_table_order():
+    """The first matching ingredient in table order supplies the benefit."""
+    assert _get_ingredient_benefits("Niacinamide") == INGREDIENT_BENEFITS["niacinamide"]
+    assert (
+        _get_ingredient_benefits("Zinc PCA, Salicylic Acid")
+        == INGREDIENT_BENEFITS["salicylic acid"]
+    )
+    assert _get_ingredient_benefits("Water") == (
+        "provides skincare benefits for your skin type"
+    )
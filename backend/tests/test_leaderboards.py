@@ -0,0 +1,85 @@
+"""Tests for the precomputed leaderboards and the leaderboard retrieval mode."""
+
+import pytest
+from sqlalchemy import select
+
+from app.core.config import settings
+from app.core.hybrid_retrieve import sql_retrieve
+from app.core.leaderboards import (
+    GLOBAL_BOARD,
+    SKIN_TYPE_PREFIX,
+    clear_leaderboard_names,
+    leaderboard_entries,
+    matching_boards,
+    rebuild_leaderboards,
+)
+from app.db.models import Product, ProductLeaderboard
+
+
+def _boards(session):
+    boards = {}
+    for entry in session.scalars(
+        select(ProductLeaderboard).order_by(
+            ProductLeaderboard.board, ProductLeaderboard.position
+        )
+    ):
+        boards.setdefault(entry.board, []).append(entry)
+    return boards
+
+
+def test_boards_are_bounded_and_rank_ordered(catalog_session):
+    """Every board lists its best ranked products first, at most depth long."""
+    entries = leaderboard_entries(catalog_session, depth=5)
+    by_board = {}
+    for entry in entries:
+        by_board.setdefault(entry["board"], []).append(entry)
+
+    assert GLOBAL_BOARD in by_board
+    assert any(board.startswith(SKIN_TYPE_PREFIX) for board in by_board)
+    for board in by_board.values():
+        assert [e["position"] for e in board] == list(range(len(board)))
+        assert len(board) <= 5
+        keys = [(-e["rank"], e["product_id"]) for e in board]
+        assert keys == sorted(keys)
+
+
+def test_rebuild_replaces_the_boards(catalog_session):
+    """A rebuild after a catalog change shows the change, and only it."""
+    product = catalog_session.get(Product, 10)  # one of the unranked products
+    assert product.rank is None
+    product.rank = 5.0
+    catalog_session.flush()
+    rebuild_leaderboards(catalog_session)
+    catalog_session.commit()
+
+    boards = _boards(catalog_session)
+    assert boards[GLOBAL_BOARD][0].product_id == 10
+    assert len(boards[GLOBAL_BOARD]) == len(
+        catalog_session.scalars(select(Product).where(Product.rank.isnot(None))).all()
+    )
+
+
+def test_board_names_match_like_ilike():
+    """Board lookup is a case-insensitive substring match per prefix."""
+    boards = ["global", "skin_type:Dry", "skin_type:Oily", "category:Moisturizer"]
+    assert matching_boards(boards, SKIN_TYPE_PREFIX, ["dry"]) == ["skin_type:Dry"]
+    assert matching_boards(boards, "category:", ["moist", "serum"]) == [
+        "category:Moisturizer"
+    ]
+
+
+@pytest.mark.parametrize("depth", [0, 2])
+def test_shallow_or_missing_boards_fall_back_to_sql(catalog_session, monkeypatch, depth):
+    """Lookups deeper than the boards, or with no boards, query the products."""
+    # k=8 asks for 4 skin type and 2 category products, so depth 2 mixes
+    # board reads with fallbacks
+    intake = {"skin_type": "dry", "sensitive": "no", "concerns": ["aging"]}
+    monkeypatch.setattr(settings, "LEADERBOARD_DEPTH", depth)
+    rebuild_leaderboards(catalog_session)
+    catalog_session.commit()
+    clear_leaderboard_names()
+
+    expected = sql_retrieve(catalog_session, "help", intake, k=8, mode="sql")
+    assert sql_retrieve(catalog_session, "help", intake, k=8, mode="leaderboard") == (
+        expected
+    )
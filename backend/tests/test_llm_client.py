@@ -0,0 +1,121 @@
+"""Tests for the pooled OpenRouter client.
+
+A stub OpenRouter server on a local socket counts accepted connections, so
+the tests can tell a reused keep-alive connection from a new one.
+"""
+
+import asyncio
+import json
+
+import pytest
+
+from app.core import generate
+from app.core.config import settings
+from app.core.llm_client import close_llm_client, llm_client, open_llm_client
+
+ANSWER = {"choices": [{"message": {"content": "Patch test first."}}]}
+
+
+async def _stub_server(stats):
+    """HTTP/1.1 server answering every request with ``ANSWER``."""
+
+    async def handle(reader, writer):
+        stats["connections"] += 1
+        try:
+            while True:
+                head = await reader.readuntil(b"\r\n\r\n")
+                length = 0
+                for line in head.split(b"\r\n"):
+                    name, _, value = line.partition(b":")
+                    if name.strip().lower() == b"content-length":
+                        length = int(value)
+                await reader.readexactly(length)
+                body = json.dumps(ANSWER).encode()
+                writer.write(
+                    b"HTTP/1.1 200 OK\r\nContent-Type: application/json\r\n"
+                    b"Content-Length: %d\r\n\r\n%s" % (len(body), body)
+                )
+                await writer.drain()
+        except (asyncio.IncompleteReadError, ConnectionError):
+            pass
+        finally:
+            writer.close()
+
+    return await asyncio.start_server(handle, "127.0.0.1", 0)
+
+
+@pytest.fixture
+def openrouter_stub(monkeypatch):
+    """Point OpenRouter settings at a stub server run inside ``scenario``."""
+    monkeypatch.setattr(settings, "OPENROUTER_API_KEY", "test-key")
+    # Connection reuse is under test here, not pacing
+    monkeypatch.setattr(settings, "LLM_RATE", settings.LLM_MAX_RATE)
+    monkeypatch.setattr(settings, "LLM_BURST", 100)
+
+    def run(scenario):
+        stats = {"connections": 0}
+
+        async def main():
+            server = await _stub_server(stats)
+            port = server.sockets[0].getsockname()[1]
+            monkeypatch.setattr(
+                settings, "OPENROUTER_BASE_URL", f"http://127.0.0.1:{port}/api/v1"
+            )
+            try:
+                return await scenario()
+            finally:
+                await close_llm_client()
+                server.close()
+                await server.wait_closed()
+
+        return asyncio.run(main()), stats
+
+    return run
+
+
+def test_shared_client_reuses_one_connection(openrouter_stub):
+    """Sequential answers through the open client share a keep-alive connection."""
+
+    async def scenario():
+        await open_llm_client()
+        return [
+            await generate.generate_answer("q", "ctx", use_cache=False)
+            for _ in range(20)
+        ]
+
+    answers, stats = openrouter_stub(scenario)
+    assert answers == ["Patch test first."] * 20
+    assert stats["connections"] == 1
+
+
+def test_without_shared_client_each_call_connects(openrouter_stub):
+    """Outside the app lifespan every call gets (and closes) its own client."""
+
+    async def scenario():
+        return [
+            await generate.generate_answer("q", "ctx", use_cache=False)
+            for _ in range(3)
+        ]
+
+    answers, stats = openrouter_stub(scenario)
+    assert answers == ["Patch test first."] * 3
+    assert stats["connections"] == 3
+
+
+def test_client_is_only_shared_on_its_own_loop():
+    """Another event loop gets a temporary client; close resets the shared one."""
+
+    async def borrow():
+        async with llm_client() as client:
+            return client
+
+    async def scenario():
+        shared = await open_llm_client()
+        assert await borrow() is shared
+        other = await asyncio.to_thread(asyncio.run, borrow())
+        assert other is not shared and other.is_closed
+        await close_llm_client()
+        assert shared.is_closed
+        assert await borrow() is not shared
+
+    asyncio.run(scenario())
@@ -0,0 +1,273 @@
+"""Tests for admission control of OpenRouter calls.
+
+The limiter runs on the real clock with rates high enough (or waits short
+enough) that each test takes a fraction of a second.
+"""
+
+import asyncio
+import json
+import time
+from email.utils import format_datetime
+from datetime import datetime, timedelta, timezone
+
+import pytest
+
+from app.core import generate
+from app.core.config import settings
+from app.core.llm_limiter import (
+    AdaptiveLimiter,
+    QueueTimeout,
+    get_llm_limiter,
+    parse_retry_after,
+)
+
+
+def _limiter(**overrides):
+    options = {
+        "max_in_flight": 2,
+        "rate": 1000.0,
+        "burst": 100,
+        "min_rate": 0.5,
+        "max_rate": 1000.0,
+        "increase": 1.0,
+        "decrease": 0.5,
+        "max_wait": 1.0,
+    }
+    options.update(overrides)
+    return AdaptiveLimiter(**options)
+
+
+def test_in_flight_calls_are_capped_and_admitted_in_order():
+    """No more than max_in_flight calls hold a slot; the rest queue FIFO."""
+    limiter = _limiter(max_in_flight=2)
+    order = []
+    running = {"now": 0, "peak": 0}
+
+    async def call(i):
+        async with limiter.slot():
+            order.append(i)
+            running["now"] += 1
+            running["peak"] = max(running["peak"], running["now"])
+            await asyncio.sleep(0.01)
+            running["now"] -= 1
+
+    async def scenario():
+        calls = [asyncio.ensure_future(call(i)) for i in range(6)]
+        await asyncio.sleep(0)
+        depth = limiter.queue_depth
+        await asyncio.gather(*calls)
+        return depth
+
+    assert asyncio.run(scenario()) == 4
+    assert running["peak"] == 2
+    assert order == list(range(6))
+    stats = limiter.stats()
+    assert stats["in_flight"] == 0
+    assert stats["queue_depth"] == 0
+    assert stats["max_queue_depth"] == 4
+    assert stats["admitted"] == 6
+    assert stats["wait_ms_max"] >= 10
+
+
+def test_waiting_longer_than_max_wait_times_out():
+    """A queued caller gives up after max_wait and leaves no trace behind."""
+    limiter = _limiter(max_in_flight=1, max_wait=0.05)
+
+    async def scenario():
+        holder = await limiter.acquire()
+        with pytest.raises(QueueTimeout):
+            await limiter.acquire()
+        limiter.release(holder)
+        # The expired waiter must not hold up the next caller
+        start = time.monotonic()
+        async with limiter.slot():
+            return time.monotonic() - start
+
+    assert asyncio.run(scenario()) < 0.05
+    assert limiter.stats()["timeouts"] == 1
+    assert limiter.in_flight == 0
+
+
+def test_cancelled_waiters_do_not_leak_slots():
+    """Cancelling a queued caller gives its place to the next one."""
+    limiter = _limiter(max_in_flight=1)
+
+    async def scenario():
+        holder = await limiter.acquire()
+        cancelled = asyncio.ensure_future(limiter.acquire())
+        queued = asyncio.ensure_future(limiter.acquire())
+        await asyncio.sleep(0)
+        cancelled.cancel()
+        await asyncio.sleep(0)
+        limiter.release(holder)
+        limiter.release(await queued)
+
+    asyncio.run(scenario())
+    assert limiter.in_flight == 0
+    assert limiter.queue_depth == 0
+
+
+def test_token_bucket_paces_call_starts():
+    """Past the burst, calls start no faster than the rate."""
+    limiter = _limiter(max_in_flight=10, rate=50.0, burst=1, max_rate=50.0)
+
+    async def scenario():
+        start = time.monotonic()
+        for _ in range(6):
+            async with limiter.slot():
+                pass
+        return time.monotonic() - start
+
+    elapsed = asyncio.run(scenario())
+    assert 0.09 <= elapsed < 0.5
+
+
+def test_rate_adapts_additively_up_and_multiplicatively_down():
+    """Answers add to the rate; a burst of 429s halves it once."""
+    limiter = _limiter(rate=10.0, increase=1.0, decrease=0.5, max_rate=100.0)
+
+    async def scenario():
+        ticket = await limiter.acquire()
+        ticket.succeeded()
+        limiter.release(ticket)
+        assert limiter.rate == 11.0
+
+        burst = [await limiter.acquire(), await limiter.acquire()]
+        for ticket in burst:
+            ticket.throttled()
+            limiter.release(ticket)
+
+    asyncio.run(scenario())
+    assert limiter.rate == 5.5
+    stats = limiter.stats()
+    assert stats["throttles"] == 2
+    assert stats["rate_decreases"] == 1
+
+
+def test_retry_after_pauses_every_call():
+    """Calls wait out Retry-After; one that cannot fails fast."""
+    limiter = _limiter(max_wait=0.5)
+
+    async def scenario():
+        ticket = await limiter.acquire()
+        ticket.throttled(retry_after=0.1)
+        limiter.release(ticket)
+        start = time.monotonic()
+        async with limiter.slot():
+            waited = time.monotonic() - start
+
+        ticket = await limiter.acquire()
+        ticket.throttled(retry_after=5)
+        limiter.release(ticket)
+        start = time.monotonic()
+        with pytest.raises(QueueTimeout):
+            await limiter.acquire()
+        return waited, time.monotonic() - start
+
+    waited, gave_up_after = asyncio.run(scenario())
+    assert waited >= 0.09
+    assert gave_up_after < 0.1
+
+
+def test_parse_retry_after():
+    """Both the delay-seconds and the HTTP-date forms are understood."""
+    assert parse_retry_after("2") == 2.0
+    assert parse_retry_after(" 0.5 ") == 0.5
+    assert parse_retry_after(None) is None
+    assert parse_retry_after("soon") is None
+    later = datetime.now(timezone.utc) + timedelta(seconds=30)
+    assert 25 < parse_retry_after(format_datetime(later, usegmt=True)) <= 30
+
+
+@pytest.fixture
+def throttling_openrouter(monkeypatch):
+    """Stub OpenRouter answering 429 with ``Retry-After`` ``throttle`` times."""
+    monkeypatch.setattr(settings, "OPENROUTER_API_KEY", "test-key")
+    # Fast enough that halving the rate after a 429 costs milliseconds
+    monkeypatch.setattr(settings, "LLM_RATE", 100.0)
+    monkeypatch.setattr(settings, "LLM_MAX_RATE", 100.0)
+    body = json.dumps({"choices": [{"message": {"content": "Patch test first."}}]})
+
+    def run(scenario, throttle=1, retry_after="0.1"):
+        stats = {"requests": 0}
+
+        async def handle(reader, writer):
+            head = await reader.readuntil(b"\r\n\r\n")
+            length = 0
+            for line in head.split(b"\r\n"):
+                name, _, value = line.partition(b":")
+                if name.strip().lower() == b"content-length":
+                    length = int(value)
+            await reader.readexactly(length)
+            stats["requests"] += 1
+            if stats["requests"] <= throttle:
+                writer.write(
+                    b"HTTP/1.1 429 Too Many Requests\r\nRetry-After: %s\r\n"
+                    b"Content-Length: 0\r\n\r\n" % retry_after.encode()
+                )
+            else:
+                writer.write(
+                    b"HTTP/1.1 200 OK\r\nContent-Type: application/json\r\n"
+                    b"Connection: close\r\nContent-Length: %d\r\n\r\n%s"
+                    % (len(body), body.encode())
+                )
+            await writer.drain()
+            writer.close()
+
+        async def main():
+            server = await asyncio.start_server(handle, "127.0.0.1", 0)
+            port = server.sockets[0].getsockname()[1]
+            monkeypatch.setattr(
+                settings, "OPENROUTER_BASE_URL", f"http://127.0.0.1:{port}/api/v1"
+            )
+            try:
+                return await scenario()
+            finally:
+                server.close()
+                await server.wait_closed()
+
+        return asyncio.run(main()), stats
+
+    return run
+
+
+def test_throttled_call_is_retried_after_retry_after(throttling_openrouter):
+    """A 429 is retried once its Retry-After has passed, and the answer returned."""
+
+    async def scenario():
+        start = time.monotonic()
+        answer = await generate.generate_answer("q", "ctx", prompt="p")
+        return answer, time.monotonic() - start, get_llm_limiter().stats()
+
+    (answer, elapsed, limiter), stats = throttling_openrouter(scenario)
+    assert answer == "Patch test first."
+    assert stats["requests"] == 2
+    assert elapsed >= 0.09
+    assert limiter["throttles"] == 1
+    assert limiter["admitted"] == 2
+
+
+def test_streamed_call_is_retried_too(throttling_openrouter):
+    """The streamed answer goes through the same admission and retries."""
+
+    async def scenario():
+        return [p async for p in generate.stream_answer("q", "ctx", prompt="p")]
+
+    pieces, stats = throttling_openrouter(scenario)
+    # The stub answers in JSON, which has no SSE data lines
+    assert len(pieces) == 1
+    assert stats["requests"] == 2
+
+
+def test_persistent_throttling_ends_in_the_usual_apology(
+    throttling_openrouter, monkeypatch
+):
+    """Retries are bounded; what is left is the high-demand message."""
+    monkeypatch.setattr(settings, "LLM_MAX_RETRIES", 1)
+
+    async def scenario():
+        return await generate.generate_answer("q", "ctx", prompt="p")
+
+    answer, stats = throttling_openrouter(scenario, throttle=10, retry_after="0")
+    assert "high demand" in answer
+    assert stats["requests"] == 2
@@ -12,6 +12,7 @@ from app.core.hybrid_retrieve import _extract_skin_attributes
 from app.core.compose import compose_context
 from app.core.prompts import build_qa_prompt
 from app.core import rag_pipeline as rp
+from app.core.results import MatchType, ResultSet, RetrievalResult
 
 # Ensure `backend` is on sys.path so `app` imports resolve during pytest
 backend_dir = pathlib.Path(__file__).resolve().parents[1]
@@ -79,30 +80,29 @@ def test_prompt_building_basic():
 
 
 def test_run_pipeline_with_mocks(monkeypatch):
-    """Patch `sql_retrieve` and `generate_answer` then call `run_pipeline`.
+    """Patch `retrieve_results` and `generate_answer` then call `run_pipeline`.
 
     This verifies the orchestration path: retrieval -> compose -> generate
     without requiring a real database or external LLM API.
     """
 
-    # Mock retrieval results resembling sql_retrieve output
-    mock_results = [
-        {
-            "id": "product_mock_1",
-            "text": (
+    # Mock retrieval results resembling retrieve_results output
+    mock_results = ResultSet(
+        [
+            RetrievalResult(
+                1,
+                MatchType.SKIN_TYPE,
                 "Product: MockCleanser\nCategory: Cleanser\nSuitable for: Oily skin\n"
-                "Key ingredients: MockIngredient\nRating: 4.5"
-            ),
-            "source_id": "products_db",
-            "score": 0.9,
-            "metadata": {"type": "product", "match_type": "skin_type"},
-        }
-    ]
+                "Key ingredients: MockIngredient\nRating: 4.5",
+                0.9,
+            )
+        ]
+    )
 
-    def fake_sql_retrieve(
+    def fake_retrieve_results(
         db_session=None, query=None, intake_data=None, concern=None, k=8, **kwargs
     ):
-        """Fake `sql_retrieve` returning pre-canned mock results for tests.
+        """Fake `retrieve_results` returning pre-canned mock results for tests.
 
         Parameters are accepted to match the real function signature but are
         unused in this fake implementation.
@@ -117,7 +117,7 @@ def test_run_pipeline_with_mocks(monkeypatch):
         return mock_results
 
     async def fake_generate_answer(
-        question, context, intake_data=None, prompt=None, llm=None
+        question, context, intake_data=None, prompt=None, llm=None, use_cache=True
     ):
         """Fake async answer generator returning a deterministic mock answer.
 
@@ -129,10 +129,11 @@ def test_run_pipeline_with_mocks(monkeypatch):
         _ = intake_data
         _ = prompt
         _ = llm
+        _ = use_cache
         return "MOCK ANSWER"
 
     # Patch retrieval and generation functions
-    monkeypatch.setattr(rp, "sql_retrieve", fake_sql_retrieve)
+    monkeypatch.setattr(rp, "retrieve_results", fake_retrieve_results)
     monkeypatch.setattr(rp, "generate_answer", fake_generate_answer)
 
     # Run the async pipeline synchronously for test
@@ -0,0 +1,96 @@
+"""Tests for the feature-based reranking stage."""
+
+import pytest
+
+from app.core.config import settings
+from app.core.hybrid_retrieve import sql_retrieve
+from app.core.rerank import FEATURES, rerank, rerank_stats, resolve_weights
+from app.core.results import MatchType, RetrievalResult
+
+
+def _product(pid, score=0.7, **metadata):
+    meta = {
+        "product_id": pid,
+        "rank": 4.0,
+        "skin_type_match": False,
+        "category_match": False,
+        "beneficial_hits": 0,
+        "avoid_hits": 0,
+    }
+    meta.update(metadata)
+    return RetrievalResult(
+        pid, MatchType.GENERAL, f"Product: Brand Product {pid}", score, meta
+    )
+
+
+NOTE = RetrievalResult(
+    3, MatchType.BENEFICIAL, "BENEFICIAL INGREDIENT: Niacinamide", 0.75
+)
+
+
+def test_profile_fit_outranks_retrieval_order():
+    """A well-matched product overtakes generic ones retrieved ahead of it."""
+    results = [
+        _product(1, score=0.95),
+        _product(2, score=0.95, avoid_hits=2),
+        _product(3, skin_type_match=True, category_match=True, beneficial_hits=3),
+    ]
+    ranked = rerank("", results, 3)
+    assert [r.entity_id for r in ranked] == [3, 1, 2]
+    assert all(0.0 <= r.score <= 1.0 for r in ranked)
+    assert set(ranked[0].metadata["features"]) == set(FEATURES)
+    assert ranked[0].metadata["retrieval_score"] == 0.7
+
+
+def test_query_terms_count_towards_the_score():
+    """Products mentioning the query terms rank above those that do not."""
+    results = [_product(1), _product(2)]
+    results[1].text = "Product: Brand Vitamin C Serum"
+    ranked = rerank("vitamin c serum", results, 2)
+    assert ranked[0].entity_id == 2
+
+
+def test_ingredient_notes_are_kept_within_k():
+    """Ingredient notes survive reranking and the output holds k results."""
+    results = [_product(i) for i in range(10)] + [NOTE]
+    ranked = rerank("", results, 4)
+    assert len(ranked) == 4
+    assert ranked[-1] is NOTE
+
+
+def test_weights_can_be_overridden():
+    """Per-call weights change the order; unknown features are rejected."""
+    results = [_product(1, rank=3.0, skin_type_match=True), _product(2, rank=5.0)]
+    by_rating = rerank("", results, 2, weights={"skin_type_match": 0.0})
+    assert by_rating[0].entity_id == 2
+    with pytest.raises(ValueError):
+        resolve_weights({"price": 1.0})
+
+
+def test_exhausted_budget_keeps_retrieval_order():
+    """Past the latency budget the candidates come back as retrieved."""
+    results = [_product(1), _product(2, skin_type_match=True)]
+    before = rerank_stats()["budget_exceeded"]
+    assert list(rerank("", results, 2, budget_ms=0)) == results
+    assert rerank_stats()["budget_exceeded"] == before + 1
+
+
+def test_retrieval_attaches_rerank_signals(catalog_session, monkeypatch):
+    """Product results carry the ids and signals the reranker reads."""
+    # Keep products with avoided ingredients so their hits show up
+    monkeypatch.setattr(settings, "EXCLUDE_AVOIDED_PRODUCTS", False)
+    intake = {"skin_type": "oily", "concerns": ["acne"], "sensitive": "yes"}
+    results = sql_retrieve(catalog_session, "", intake, k=24, mode="memory")
+    products = [r for r in results if r["metadata"]["type"] == "product"]
+    assert products
+    for result in products:
+        meta = result["metadata"]
+        assert isinstance(meta["product_id"], int)
+        assert {"rank", "skin_type_match", "category_match"} <= set(meta)
+        assert meta["beneficial_hits"] >= 0 and meta["avoid_hits"] >= 0
+    assert any(r["metadata"]["avoid_hits"] for r in products)
+    assert all(
+        r["metadata"]["skin_type_match"]
+        for r in products
+        if r["metadata"]["match_type"] == "skin_type"
+    )
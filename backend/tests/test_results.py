@@ -0,0 +1,63 @@
+"""Tests for the typed retrieval results and their dict conversion."""
+
+from app.core.compose import compose_context
+from app.core.hybrid_retrieve import retrieve_results, sql_retrieve
+from app.core.results import MatchType, ResultSet, RetrievalResult
+
+
+def test_result_set_dedupes_products_across_match_types():
+    """A product is kept once; ingredient notes are keyed by their role."""
+    results = ResultSet()
+    assert results.add(RetrievalResult(1, MatchType.SKIN_TYPE, "a", 0.95))
+    assert not results.add(RetrievalResult(1, MatchType.GENERAL, "b", 0.7))
+    # Product 12 must not shadow product 1 (the old ids were substring-matched)
+    assert results.add(RetrievalResult(12, MatchType.CONCERN, "c", 0.85))
+    assert results.add(RetrievalResult(1, MatchType.BENEFICIAL, "d", 0.75))
+    assert results.add(RetrievalResult(1, MatchType.AVOID, "e", 0.6))
+
+    assert [r.id for r in results] == [
+        "skintype_product_1",
+        "concern_product_12",
+        "ingredient_1",
+        "avoid_ingredient_1",
+    ]
+    assert {bucket: [r.text for r in rs] for bucket, rs in results.groups.items()} == {
+        "perfect_matches": ["a"],
+        "targeted_products": ["c"],
+        "beneficial_ingredients": ["d"],
+        "avoid_ingredients": ["e"],
+    }
+
+
+def test_to_dict_keeps_the_api_shape():
+    """Records convert to the dicts the API has always returned."""
+    product = RetrievalResult(
+        7, MatchType.CONCERN, "Product: X", 0.85, {"concerns": ["acne"]}
+    )
+    avoid = RetrievalResult(3, MatchType.AVOID, "AVOID: Menthol", 0.6)
+    assert product.to_dict() == {
+        "id": "concern_product_7",
+        "text": "Product: X",
+        "source_id": "products_db",
+        "score": 0.85,
+        "metadata": {"type": "product", "match_type": "concern", "concerns": ["acne"]},
+    }
+    assert avoid.to_dict()["metadata"] == {
+        "type": "ingredient",
+        "beneficial": False,
+        "avoid": True,
+    }
+    # Dicts are copies, so callers cannot change the (cached) record
+    product.to_dict()["metadata"]["concerns"].append("aging")
+    assert product.metadata == {"concerns": ["acne"]}
+
+
+def test_compose_context_accepts_records_and_dicts(catalog_session):
+    """Composing from records gives what composing from their dicts gives."""
+    intake = {"skin_type": "dry", "sensitive": "yes", "concerns": ["aging"]}
+    records = retrieve_results(catalog_session, "help", intake, mode="memory")
+    dicts = sql_retrieve(catalog_session, "help", intake, mode="memory")
+    assert records.to_dicts() == dicts
+    assert compose_context(records, intake_data=intake) == compose_context(
+        dicts, intake_data=intake
+    )
@@ -0,0 +1,228 @@
+"""Tests for coalescing concurrent identical requests.
+
+The shared work in these tests waits on an event, so every caller is known
+to have joined the flight before it finishes.
+"""
+
+import asyncio
+import json
+
+import pytest
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+
+from app.core import generate
+from app.core import rag_pipeline as rp
+from app.core.config import settings
+from app.core.single_flight import SingleFlight
+from app.db.session import async_database_url
+
+CONCURRENT_REQUESTS = 5
+
+
+def test_concurrent_calls_share_one_run():
+    """Followers get the leader's result; the next call after it runs again."""
+    flight = SingleFlight("test-share")
+    runs = []
+
+    async def scenario():
+        release = asyncio.Event()
+
+        def work(key):
+            async def run():
+                runs.append(key)
+                await release.wait()
+                return f"{key} answer"
+
+            return run
+
+        waiters = [
+            asyncio.ensure_future(flight.run("key", work("key")))
+            for _ in range(CONCURRENT_REQUESTS)
+        ]
+        other = asyncio.ensure_future(flight.run("other", work("other")))
+        await asyncio.sleep(0.01)
+        assert flight.stats()["in_flight"] == 2
+        release.set()
+        results = await asyncio.gather(*waiters, other)
+        return results, await flight.run("key", work("key"))
+
+    results, again = asyncio.run(scenario())
+    assert results == ["key answer"] * CONCURRENT_REQUESTS + ["other answer"]
+    assert again == "key answer"
+    assert runs == ["key", "other", "key"]
+    assert flight.stats() == {"in_flight": 0, "leaders": 3, "followers": 4}
+
+
+def test_cancelling_a_waiter_leaves_the_shared_work_running():
+    """Neither a cancelled leader nor a cancelled follower stops the run."""
+    flight = SingleFlight("test-cancel")
+
+    async def scenario():
+        release = asyncio.Event()
+        finished = []
+
+        async def work():
+            await release.wait()
+            finished.append(True)
+            return "answer"
+
+        leader = asyncio.ensure_future(flight.run("key", work))
+        follower = asyncio.ensure_future(flight.run("key", work))
+        survivor = asyncio.ensure_future(flight.run("key", work))
+        await asyncio.sleep(0)
+        leader.cancel()
+        follower.cancel()
+        await asyncio.sleep(0)
+        release.set()
+        result = await survivor
+        assert leader.cancelled() and follower.cancelled()
+        return result, finished
+
+    assert asyncio.run(scenario()) == ("answer", [True])
+
+
+def test_errors_reach_every_waiter():
+    """A failed run raises in every caller and is not remembered."""
+    flight = SingleFlight("test-error")
+
+    async def scenario():
+        release = asyncio.Event()
+
+        async def work():
+            await release.wait()
+            raise ValueError("upstream broke")
+
+        waiters = [asyncio.ensure_future(flight.run("key", work)) for _ in range(3)]
+        await asyncio.sleep(0)
+        release.set()
+        return await asyncio.gather(*waiters, return_exceptions=True)
+
+    errors = asyncio.run(scenario())
+    assert [str(e) for e in errors] == ["upstream broke"] * 3
+    assert flight.stats()["in_flight"] == 0
+
+
+@pytest.fixture
+def slow_openrouter(monkeypatch):
+    """Stub OpenRouter server answering after ``delay`` seconds; counts requests."""
+    monkeypatch.setattr(settings, "OPENROUTER_API_KEY", "test-key")
+    body = json.dumps({"choices": [{"message": {"content": "Patch test first."}}]})
+
+    def run(scenario, delay=0.1):
+        stats = {"requests": 0}
+
+        async def handle(reader, writer):
+            head = await reader.readuntil(b"\r\n\r\n")
+            length = 0
+            for line in head.split(b"\r\n"):
+                name, _, value = line.partition(b":")
+                if name.strip().lower() == b"content-length":
+                    length = int(value)
+            await reader.readexactly(length)
+            stats["requests"] += 1
+            await asyncio.sleep(delay)
+            writer.write(
+                b"HTTP/1.1 200 OK\r\nContent-Type: application/json\r\n"
+                b"Connection: close\r\nContent-Length: %d\r\n\r\n%s"
+                % (len(body), body.encode())
+            )
+            await writer.drain()
+            writer.close()
+
+        async def main():
+            server = await asyncio.start_server(handle, "127.0.0.1", 0)
+            port = server.sockets[0].getsockname()[1]
+            monkeypatch.setattr(
+                settings, "OPENROUTER_BASE_URL", f"http://127.0.0.1:{port}/api/v1"
+            )
+            try:
+                return await scenario()
+            finally:
+                server.close()
+                await server.wait_closed()
+
+        return asyncio.run(main()), stats
+
+    return run
+
+
+def test_identical_generations_make_one_upstream_call(slow_openrouter):
+    """A burst of cache misses for one prompt sends one request to OpenRouter."""
+
+    async def scenario():
+        return await asyncio.gather(
+            *[
+                generate.generate_answer("q", "ctx", prompt="p")
+                for _ in range(CONCURRENT_REQUESTS)
+            ]
+        )
+
+    answers, stats = slow_openrouter(scenario)
+    assert answers == ["Patch test first."] * CONCURRENT_REQUESTS
+    assert stats["requests"] == 1
+
+
+def test_bypassing_generations_are_not_coalesced(slow_openrouter):
+    """use_cache=False asks for a fresh answer, so it never joins a flight."""
+
+    async def scenario():
+        return await asyncio.gather(
+            *[
+                generate.generate_answer("q", "ctx", prompt="p", use_cache=False)
+                for _ in range(3)
+            ]
+        )
+
+    _, stats = slow_openrouter(scenario)
+    assert stats["requests"] == 3
+
+
+def test_pipeline_burst_retrieves_and_generates_once(catalog_db_url, monkeypatch):
+    """Identical pipeline calls share retrieval and generation, even when the
+    leader is cancelled and its request session closes."""
+    calls = {"retrieve": 0, "generate": 0}
+    intake = {"skin_type": "oily", "sensitive": "no", "concerns": ["acne"]}
+    real_retrieve = rp.async_retrieve_results
+
+    async def counting_retrieve(*args, **kwargs):
+        calls["retrieve"] += 1
+        return await real_retrieve(*args, **kwargs)
+
+    async def fake_generate_answer(*_args, **_kwargs):
+        calls["generate"] += 1
+        await asyncio.sleep(0.1)
+        return "MOCK ANSWER"
+
+    monkeypatch.setattr(rp, "async_retrieve_results", counting_retrieve)
+    monkeypatch.setattr(rp, "generate_answer", fake_generate_answer)
+
+    async def scenario():
+        engine = create_async_engine(async_database_url(catalog_db_url))
+        sessions = async_sessionmaker(engine)
+
+        async def one_request():
+            async with sessions() as session:
+                return await rp.run_pipeline(
+                    "cleanser for acne", db_session=session, intake_data=intake, k=4
+                )
+
+        try:
+            leader = asyncio.ensure_future(one_request())
+            await asyncio.sleep(0)
+            followers = [
+                asyncio.ensure_future(one_request())
+                for _ in range(CONCURRENT_REQUESTS - 1)
+            ]
+            await asyncio.sleep(0)
+            leader.cancel()
+            results = await asyncio.gather(*followers)
+            assert leader.cancelled()
+            return results
+        finally:
+            await engine.dispose()
+
+    results = asyncio.run(scenario())
+    assert [r["answer"] for r in results] == ["MOCK ANSWER"] * (CONCURRENT_REQUESTS - 1)
+    assert all(r["citations"] for r in results)
+    assert results[0] is not results[1]
+    assert calls == {"retrieve": 1, "generate": 1}
@@ -0,0 +1,210 @@
+"""Tests for spelling correction against the catalog vocabulary."""
+
+import random
+
+import pytest
+
+from app.api.endpoints import products
+from app.core.bm25_index import STOPWORDS
+from app.core.config import settings
+from app.core.english_words import base_forms, is_common_word
+from app.core.hybrid_retrieve import sql_retrieve
+from app.core.spell_index import SpellIndex, edit_distance, vocabulary
+from app.db.session import get_db
+
+
+def _index():
+    return SpellIndex(
+        vocabulary(
+            [
+                ("Niacinamide", 20),
+                ("Hyaluronic Acid", 12),
+                ("Sodium Hyaluronate", 8),
+                ("Salicylic Acid", 9),
+                ("Glycerin", 30),
+                ("Glycerine", 1),
+                ("Retinol", 4),
+                ("Ceramide NP", 6),
+            ]
+        )
+    )
+
+
+def test_edit_distance_counts_transpositions_once():
+    """Adjacent swaps cost one edit, like a typo does."""
+    assert edit_distance("retinol", "retinol") == 0
+    assert edit_distance("retniol", "retinol") == 1
+    assert edit_distance("niacinimide", "niacinamide") == 1
+    assert edit_distance("hyaluronc", "hyaluronic") == 1
+    assert edit_distance("", "acid") == 4
+    assert edit_distance("kitten", "sitting") == 3
+
+
+def test_lookup_corrects_misspellings():
+    """The nearest known word wins, then the more frequent one."""
+    index = _index()
+    assert index.lookup("niacinimide") == "niacinamide"
+    assert index.lookup("hyaluronc") == "hyaluronic"
+    assert index.lookup("hyalurnoic") == "hyaluronic"
+    assert index.lookup("salicilyc") == "salicylic"
+    assert index.lookup("retinl") == "retinol"
+    # Both are one edit from "glycerinn"; the common spelling is preferred
+    assert index.lookup("glycerinn") == "glycerin"
+    assert index.lookup("zzzzzzzz") is None
+
+
+def test_lookup_leaves_known_words_prefixes_and_short_words():
+    """Nothing is rewritten unless it is clearly a misspelling."""
+    index = _index()
+    assert index.lookup("glycerine") == "glycerine"
+    assert index.lookup("hyaluron") == "hyaluron"
+    assert index.lookup("acid") == "acid"
+    assert index.lookup("acud") == "acud"
+    assert index.lookup("without") == "without"
+    # Words under eight letters may only be one edit off
+    assert index.lookup("retnol") == "retinol"
+    assert index.lookup("rtenol") is None
+
+
+def test_correct_rewrites_words_in_place():
+    """Punctuation, spacing and unknown words survive correction."""
+    index = _index()
+    assert (
+        index.correct("Best NIACINIMIDE serum, no hyaluronc acid?")
+        == "best niacinamide serum, no hyaluronic acid?"
+    )
+
+
+@pytest.mark.parametrize(
+    "sentence",
+    [
+        "What could help my flaky cheeks and breakouts?",
+        "Which serum would be gentle around my mouth?",
+        "My skin doesn't like retinol, what else could I use?",
+        "I’m older and there are fine lines on my forehead",
+        "How often should I apply the creams and serums?",
+    ],
+)
+def test_correct_leaves_plain_english_alone(sentence):
+    """Ordinary words one edit from a catalog word are not rewritten."""
+    index = SpellIndex(
+        vocabulary(
+            [
+                ("Cold Pressed Oil", 5),
+                ("World Skin", 3),
+                ("Youth To The People", 9),
+                ("Checks", 2),
+                ("Does", 1),
+                ("Three", 1),
+                ("Apple Extract", 4),
+                ("Elder Flower", 2),
+                ("Soften", 2),
+                ("Retinol", 4),
+            ]
+        ),
+        known=vocabulary([("Cream", 1), ("Serum", 1)]),
+    )
+    assert index.correct(sentence) == sentence.lower()
+    assert index.correct("retinl") == "retinol"
+
+
+def test_product_words_are_recognised_but_not_suggested():
+    """Only ingredient, brand and keyword words are offered as corrections."""
+    index = SpellIndex(vocabulary([("Retinol", 4)]), known=["brightening"])
+    assert index.lookup("brightening") == "brightening"
+    assert index.lookup("brightenin") == "brightenin"
+    assert index.lookup("brihgtening") is None
+    assert index.lookup("retinl") == "retinol"
+
+
+def test_lookup_agrees_with_brute_force():
+    """The delete index finds exactly the words a full scan would."""
+    rng = random.Random(5)
+    letters = "aceilmnorstuy"
+    words = {
+        "".join(rng.choice(letters) for _ in range(rng.randint(5, 12))):
+        rng.randint(1, 9)
+        for _ in range(300)
+    }
+    index = SpellIndex(words)
+    for _ in range(300):
+        word = list(rng.choice(list(words)))
+        for _ in range(rng.randint(1, 2)):
+            word[rng.randrange(len(word))] = rng.choice(letters)
+        word = "".join(word)
+        if (
+            index.starts_word(word)
+            or word in STOPWORDS
+            or is_common_word(word)
+            or any(stem in words for stem in base_forms(word))
+        ):
+            continue
+        limit = 2 if len(word) >= 8 else 1
+        scored = [
+            (edit_distance(word, known), -count, known)
+            for known, count in words.items()
+        ]
+        close = sorted(s for s in scored if s[0] <= limit)
+        assert index.lookup(word) == (close[0][2] if close else None)
+
+
+def test_retrieval_parses_the_corrected_query(catalog_session, monkeypatch):
+    """A misspelled concern is still recognised in the chat query."""
+    misspelled = sql_retrieve(catalog_session, "moisturiser for breakuots")
+    exact = sql_retrieve(catalog_session, "moisturiser for breakouts")
+    assert misspelled == exact
+
+    monkeypatch.setattr(settings, "SPELL_CORRECTION", False)
+    assert sql_retrieve(catalog_session, "moisturiser for breakuots") != exact
+
+
+@pytest.fixture
+def spell_client(app, client, catalog_session):
+    """TestClient whose database dependency yields the sample catalog."""
+    app.dependency_overrides[get_db] = lambda: catalog_session
+    yield client
+    app.dependency_overrides.pop(get_db, None)
+
+
+def test_catalog_searches_correct_misspellings(spell_client, monkeypatch):
+    """`search` falls back to the corrected spelling, unless disabled."""
+    r = spell_client.get("/api/ingredients", params={"search": "niacinimide"})
+    assert [i["inci_name"] for i in r.json()] == ["Niacinamide"]
+    # Substrings of real names are searched as typed
+    r = spell_client.get("/api/ingredients", params={"search": "hyaluron"})
+    assert [i["inci_name"] for i in r.json()] == [
+        "Hyaluronic Acid",
+        "Sodium Hyaluronate",
+    ]
+
+    expected = spell_client.get("/api/products", params={"search": "brand 3"}).json()
+    assert expected
+    r = spell_client.get("/api/products", params={"search": "barnd 3"})
+    assert r.json() == expected
+
+    monkeypatch.setattr(settings, "SPELL_CORRECTION", False)
+    r = spell_client.get("/api/ingredients", params={"search": "niacinimide"})
+    assert r.json() == []
+
+
+def test_product_search_is_only_corrected_when_it_finds_nothing(
+    spell_client, monkeypatch
+):
+    """A product search that matches as typed is never rewritten."""
+    corrected = []
+
+    class Rewriter:
+        """Spell index that turns every search into "brand 3"."""
+
+        def correct(self, text):
+            corrected.append(text)
+            return "brand 3"
+
+    monkeypatch.setattr(products, "get_spell_index", lambda _db: Rewriter())
+    r = spell_client.get("/api/products", params={"search": "brand 5"})
+    assert {p["brand_name"] for p in r.json()} == {"Brand 5"}
+    assert not corrected
+
+    r = spell_client.get("/api/products", params={"search": "zzzzzz"})
+    assert {p["brand_name"] for p in r.json()} == {"Brand 3"}
+    assert corrected == ["zzzzzz"]
@@ -0,0 +1,96 @@
+"""Tests for the ingredient and brand autocomplete index."""
+
+import random
+
+import pytest
+
+from app.core import suggest_index
+from app.core.suggest_index import SuggestIndex, normalize
+from app.db.session import get_db
+
+
+def _brute_force(entries, prefix, limit):
+    prefix = normalize(prefix)
+    matches = [
+        (name, weight)
+        for name, weight in entries
+        if any(
+            normalize(name)[i:].startswith(prefix)
+            for i in [0] + [j + 1 for j, c in enumerate(normalize(name)) if c == " "]
+        )
+    ]
+    return sorted(matches, key=lambda e: (-e[1], e[0]))[:limit]
+
+
+def test_suggestions_match_word_prefixes_by_popularity():
+    """Any word can start a match; more products rank first, then by name."""
+    index = SuggestIndex(
+        [
+            ("Hyaluronic Acid", 5),
+            ("Salicylic Acid", 9),
+            ("Citrus Aurantifolia (Lime) Extract", 2),
+            ("Acrylates Copolymer", 5),
+        ]
+    )
+    assert index.suggest("ac") == [
+        ("Salicylic Acid", 9),
+        ("Acrylates Copolymer", 5),
+        ("Hyaluronic Acid", 5),
+    ]
+    assert index.suggest("HYAL") == [("Hyaluronic Acid", 5)]
+    # Punctuation is ignored on both sides
+    assert index.suggest("lime) ex") == [("Citrus Aurantifolia (Lime) Extract", 2)]
+    assert index.suggest("zz") == []
+    assert index.suggest("  ") == []
+
+
+def test_precomputed_prefixes_agree_with_brute_force(monkeypatch):
+    """Heavy prefixes come from the build-time table, light ones are ranked live."""
+    monkeypatch.setattr(suggest_index, "HEAVY_RANGE", 8)
+    rng = random.Random(3)
+    syllables = ["ka", "lo", "mi", "ne", "ro", "sa", "ti", "ve"]
+    entries = {
+        " ".join(
+            "".join(rng.choice(syllables) for _ in range(rng.randint(1, 3)))
+            for _ in range(rng.randint(1, 3))
+        ): rng.randint(0, 50)
+        for _ in range(400)
+    }.items()
+    index = SuggestIndex(entries)
+    assert index._heavy  # pylint: disable=protected-access
+    for prefix in ["k", "ka", "kal", "ro s", "t", "ve ve", "mi", "x"]:
+        for limit in (1, 5, 20):
+            assert index.suggest(prefix, limit) == _brute_force(entries, prefix, limit)
+
+
+@pytest.fixture
+def suggest_client(app, client, catalog_session):
+    """TestClient whose database dependency yields the sample catalog."""
+    app.dependency_overrides[get_db] = lambda: catalog_session
+    yield client
+    app.dependency_overrides.pop(get_db, None)
+
+
+def test_suggest_endpoints(suggest_client, catalog_session):
+    """Ingredient and brand suggestions carry their product counts."""
+    # pylint: disable=import-outside-toplevel
+    from app.db.models import Product
+
+    r = suggest_client.get("/api/ingredients/suggest", params={"q": "alco"})
+    assert r.status_code == 200
+    body = r.json()
+    assert {s["name"] for s in body} == {"Alcohol Denat.", "Cetearyl Alcohol"}
+    counts = [s["product_count"] for s in body]
+    assert counts == sorted(counts, reverse=True)
+
+    brands = suggest_client.get(
+        "/api/brands/suggest", params={"q": "brand", "limit": 3}
+    ).json()
+    per_brand = {}
+    for product in catalog_session.query(Product):
+        per_brand[product.brand_name] = per_brand.get(product.brand_name, 0) + 1
+    expected = sorted(per_brand.items(), key=lambda e: (-e[1], e[0]))[:3]
+    assert [(s["name"], s["product_count"]) for s in brands] == expected
+
+    r = suggest_client.get("/api/brands/suggest", params={"q": "b", "limit": 500})
+    assert r.status_code == 422